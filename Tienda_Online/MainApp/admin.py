@@ -1,5 +1,19 @@
-from django.contrib import admin
-from .models import Category, Product, ProductImage, Supply, Order, OrderImage
+import uuid
+
+from django import forms
+from django.contrib import admin, messages
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.html import format_html
+from django.utils import timezone
+from .autocomplete import get_index
+from .models import (
+    Category, Product, ProductImage, Supply, Order, OrderImage, OrderStatusChange,
+    ArchivedOrder, ArchivedOrderImage, OutboxMessage,
+)
+from .events import publish_order_change
+from .order_updates import INVALID, UNCHANGED, UPDATED, bulk_update_orders, check_transition, summarize
+from .paginators import EstimatedCountPaginator
 
 
 @admin.register(Category)
@@ -18,9 +32,20 @@ class ProductImageInline(admin.TabularInline):
 class ProductAdmin(admin.ModelAdmin):
     list_display = ("name", "category", "price", "featured", "created")
     list_filter = ("category", "featured")
-    search_fields = ("name", "description")
+    list_select_related = ("category",)
+    ordering = ("name",)
+    search_fields = ("name", "slug")
     prepopulated_fields = {"slug": ("name",)}
     inlines = [ProductImageInline]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        # Búsqueda por prefijo de palabras con el índice en memoria (autocomplete.py);
+        # también la usa el autocompletado de product_ref en OrderAdmin
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(pk__in=get_index().matching_ids(search_term)), False
 
 
 @admin.register(Supply)
@@ -28,18 +53,230 @@ class SupplyAdmin(admin.ModelAdmin):
     list_display = ("name", "type", "quantity", "unit", "brand", "color")
     list_filter = ("type", "brand", "color")
     search_fields = ("name", "type", "brand")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+def image_preview(image):
+    """Miniatura enlazada al archivo (sin widget de carga)"""
+    if not image:
+        return "-"
+    return format_html('<a href="{0}" target="_blank"><img src="{0}" alt="" style="max-height: 80px"></a>', image.url)
 
 
 class OrderImageInline(admin.TabularInline):
+    """
+    Las últimas `max_shown` imágenes del pedido como miniaturas de solo
+    lectura (OrderAdmin.get_formset_kwargs acota el queryset); todas, y el
+    alta de nuevas, en la lista de OrderImage filtrada por el pedido.
+    """
     model = OrderImage
-    extra = 1
+    extra = 0
+    max_shown = 12
+    can_delete = False
+    fields = ("preview", "created")
+    readonly_fields = fields
+    ordering = ("-created", "-id")
+
+    @admin.display(description="Imagen")
+    def preview(self, obj):
+        return image_preview(obj.image)
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+class OrderStatusChangeInline(admin.TabularInline):
+    model = OrderStatusChange
+    extra = 0
+    can_delete = False
+    fields = ("changed", "from_status", "to_status", "duration_seconds")
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+def bulk_order_action(description, **changes):
+    """Acción del admin que aplica el cambio con order_updates.bulk_update_orders()"""
+    def action(modeladmin, request, queryset):
+        results = bulk_update_orders(list(queryset.values_list('id', flat=True)), **changes)
+        summary = summarize(results)
+        modeladmin.message_user(
+            request,
+            f"{summary[UPDATED]} pedidos actualizados, {summary[UNCHANGED]} sin cambios, "
+            f"{summary[INVALID]} con transición no permitida",
+            level=messages.WARNING if summary[INVALID] else messages.SUCCESS,
+        )
+    action.__name__ = '_'.join(['bulk'] + [value for value in changes.values()])
+    action.short_description = description
+    return action
+
+
+class OrderAdminForm(forms.ModelForm):
+    """Al editar un pedido, el estado y el pago siguen order_updates.ALLOWED_TRANSITIONS"""
+
+    class Meta:
+        model = Order
+        fields = "__all__"
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.instance.pk:
+            error = check_transition(
+                {"status": self.instance.status, "payment_status": self.instance.payment_status},
+                cleaned_data.get("status"), cleaned_data.get("payment_status"),
+            )
+            if error:
+                raise forms.ValidationError(error)
+        return cleaned_data
 
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ("id", "customer_name", "platform", "status", "payment_status", "created")
+    form = OrderAdminForm
+    list_display = ("id", "customer_name", "product_ref", "platform", "status", "payment_status", "created")
     list_filter = ("platform", "status", "payment_status")
+    list_select_related = ("product_ref",)
     search_fields = ("customer_name", "email", "phone")
-    readonly_fields = ("token", "created")
-    inlines = [OrderImageInline]
+    autocomplete_fields = ("product_ref",)
+    readonly_fields = ("token", "created", "all_images")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    inlines = [OrderImageInline, OrderStatusChangeInline]
+    actions = [
+        bulk_order_action("Marcar como aprobados", status="aprobado"),
+        bulk_order_action("Marcar como en proceso", status="en_proceso"),
+        bulk_order_action("Marcar como realizados", status="realizada"),
+        bulk_order_action("Marcar como entregados", status="entregada"),
+        bulk_order_action("Marcar como finalizados", status="finalizada"),
+        bulk_order_action("Cancelar pedidos", status="cancelada"),
+        bulk_order_action("Marcar pago como pagado", payment_status="pagado"),
+    ]
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Búsqueda con índices: número -> id, UUID -> token, y si no, prefijo
+        del nombre, email exacto o prefijo del teléfono (índices de 0010).
+        """
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.isdigit():
+            return queryset.filter(Q(pk=int(term)) | Q(phone__startswith=term)), False
+        try:
+            return queryset.filter(token=uuid.UUID(term)), False
+        except ValueError:
+            pass
+        return queryset.filter(
+            Q(customer_name__istartswith=term) | Q(email__iexact=term) | Q(phone__startswith=term)
+        ), False
+
+    @admin.display(description="Imágenes")
+    def all_images(self, obj):
+        if obj is None or obj.pk is None:
+            return "-"
+        changelist = reverse("admin:MainApp_orderimage_changelist")
+        add = reverse("admin:MainApp_orderimage_add")
+        return format_html(
+            '<a href="{}?order__exact={}">Ver las {} imágenes</a> · <a href="{}?order={}">Agregar imagen</a>',
+            changelist, obj.pk, obj.images.count(), add, obj.pk,
+        )
+
+    def get_formset_kwargs(self, request, obj, inline, prefix):
+        kwargs = super().get_formset_kwargs(request, obj, inline, prefix)
+        if isinstance(inline, OrderImageInline) and obj is not None and obj.pk is not None:
+            # El formset filtra por pedido después: acotar por ids, no con un slice
+            shown = obj.images.order_by(*inline.ordering).values_list("pk", flat=True)[:inline.max_shown]
+            kwargs["queryset"] = inline.get_queryset(request).filter(pk__in=list(shown))
+        return kwargs
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Avisar a los streams SSE si cambió el estado del pedido o del pago
+        if change and {"status", "payment_status"} & set(form.changed_data):
+            publish_order_change(obj)
+
+
+@admin.register(OrderImage)
+class OrderImageAdmin(admin.ModelAdmin):
+    """Todas las imágenes de pedidos; desde un pedido se llega filtrado (?order__exact=)"""
+    list_display = ("id", "order", "preview", "created")
+    list_select_related = ("order",)
+    ordering = ("-created", "-id")
+    autocomplete_fields = ("order",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @admin.display(description="Imagen")
+    def preview(self, obj):
+        return image_preview(obj.image)
+
+
+class ArchivedOrderImageInline(admin.TabularInline):
+    model = ArchivedOrderImage
+    extra = 0
+    can_delete = False
+    readonly_fields = ("image", "created")
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    """Pedidos movidos por `manage.py archive_orders`: solo lectura"""
+    list_display = ("id", "customer_name", "product_ref", "platform", "status", "payment_status", "created", "archived")
+    list_filter = ("platform", "status")
+    list_select_related = ("product_ref",)
+    search_fields = ("=id",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    inlines = [ArchivedOrderImageInline]
+
+    def get_search_results(self, request, queryset, search_term):
+        # Solo búsquedas por índice: id, token o email
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.isdigit():
+            return queryset.filter(pk=int(term)), False
+        try:
+            return queryset.filter(token=uuid.UUID(term)), False
+        except ValueError:
+            pass
+        return queryset.filter(email_normalized=term.lower()), False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    """Notificaciones de pedidos (las envía `manage.py drain_outbox`)"""
+    list_display = ("id", "channel", "order_id", "state", "attempts", "available_at", "sent_at", "last_error")
+    list_filter = ("state", "channel")
+    search_fields = ("=order_id",)
+    readonly_fields = [field.name for field in OutboxMessage._meta.fields]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ["retry_now"]
+
+    @admin.action(description="Reintentar ahora")
+    def retry_now(self, request, queryset):
+        # Solo los que no tienen ya un mensaje pendiente más nuevo del mismo pedido
+        pending = OutboxMessage.objects.filter(state="pending").values("dedup_key")
+        count = (
+            queryset.filter(state="failed").exclude(dedup_key__in=pending)
+            .update(state="pending", attempts=0, available_at=timezone.now(), last_error="")
+        )
+        self.message_user(request, f"{count} notificaciones vuelven a la cola")
+
+    def has_add_permission(self, request):
+        return False
 
+    def has_change_permission(self, request, obj=None):
+        return False
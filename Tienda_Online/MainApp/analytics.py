@@ -0,0 +1,406 @@
+# MainApp/analytics.py
+#
+# Consultas de reportes compartidas por dashboard_reports, get_chart_data,
+# StatisticsAPIView y DashboardStatsAPIView. Todas aplican los mismos filtros
+# (estado, plataforma y fechas) y cada widget cuesta un número fijo de
+# consultas: las series por día/semana/mes salen de un único GROUP BY sobre
+# Trunc, sin importar cuántos períodos abarque el rango.
+#
+# Si el motor columnar (MainApp/columnar.py) está activo, select_orders()
+# devuelve un OrderSlice en vez de un QuerySet y cada función responde con
+# operaciones vectorizadas sobre las columnas en memoria.
+#
+# Los rankings sin filtros (productos y categorías más solicitados de todos
+# los tiempos) se leen de los contadores ProductOrderStats/CategoryOrderStats
+# que mantiene MainApp/counters.py, sin agrupar la tabla de pedidos.
+#
+# Cuando el rango de fechas llega a los pedidos archivados (MainApp/archive.py)
+# select_orders() devuelve un WithArchive: cada función calcula por separado
+# los pedidos activos y los archivados y suma los resultados. El archivo solo
+# cambia al archivar, así que su parte se guarda en caché.
+
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek, TruncYear
+from django.utils import timezone
+
+from . import archive
+from .columnar import OrderSlice, get_engine
+from .models import ArchivedOrder, CategoryOrderStats, Order, ProductOrderStats
+
+BUCKETS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'year': TruncYear,
+}
+
+# Máximo de puntos de una serie temporal (elección automática de granularidad)
+MAX_SERIES_POINTS = 120
+
+
+def parse_date(value):
+    """Convertir 'YYYY-MM-DD' en date (None si viene vacío o es inválido)"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def start_of_day(value):
+    """Inicio del día (timezone-aware) para una fecha"""
+    return timezone.make_aware(datetime.combine(value, time.min))
+
+
+class WithArchive:
+    """Pedidos activos (QuerySet u OrderSlice) más los archivados con los mismos filtros"""
+
+    def __init__(self, hot, archived):
+        self.hot = hot
+        self.archived = archived
+
+
+def _archived(function, orders, *args, **kwargs):
+    """function() sobre la parte archivada, en caché hasta el próximo archivado"""
+    key = archive.cache_key(function.__name__, str(orders.archived.query), args, sorted(kwargs.items()))
+    return cache.get_or_set(
+        key, lambda: function(orders.archived, *args, **kwargs), settings.ORDER_ARCHIVE['CACHE_SECONDS']
+    )
+
+
+def filter_orders(queryset=None, status=None, platform=None, date_from=None, date_to=None):
+    """
+    Aplicar los filtros comunes de los reportes.
+
+    date_from y date_to aceptan date (días completos, ambos inclusive) o
+    datetime timezone-aware (límites exactos).
+    """
+    if isinstance(queryset, OrderSlice):
+        return queryset.filter(status, platform, date_from, date_to)
+    if isinstance(queryset, WithArchive):
+        filters = dict(status=status, platform=platform, date_from=date_from, date_to=date_to)
+        return WithArchive(filter_orders(queryset.hot, **filters), filter_orders(queryset.archived, **filters))
+
+    orders = Order.objects.all() if queryset is None else queryset
+
+    if status:
+        orders = orders.filter(status=status)
+    if platform:
+        orders = orders.filter(platform=platform)
+
+    if date_from:
+        if not isinstance(date_from, datetime):
+            date_from = start_of_day(date_from)
+        orders = orders.filter(created__gte=date_from)
+    if date_to:
+        if isinstance(date_to, datetime):
+            orders = orders.filter(created__lte=date_to)
+        else:
+            orders = orders.filter(created__lt=start_of_day(date_to + timedelta(days=1)))
+
+    return orders
+
+
+def select_orders(**filters):
+    """
+    Pedidos filtrados desde el motor columnar si está activo, si no un QuerySet.
+
+    Si el rango llega al archivo se devuelve un WithArchive con ambas partes.
+    """
+    engine = get_engine()
+    if engine is not None:
+        orders = engine.slice().filter(**filters)
+    else:
+        orders = filter_orders(**filters)
+    if archive.reaches_archive(filters.get('date_from')):
+        return WithArchive(orders, filter_orders(ArchivedOrder.objects.all(), **filters))
+    return orders
+
+
+def filters_from_params(params):
+    """Leer status/platform/date_from/date_to de request.GET o query_params"""
+    return {
+        'status': params.get('status') or None,
+        'platform': params.get('platform') or None,
+        'date_from': parse_date(params.get('date_from')),
+        'date_to': parse_date(params.get('date_to')),
+    }
+
+
+def totals(orders):
+    """Cantidad de pedidos, ingresos y valor promedio en una sola consulta"""
+    if isinstance(orders, OrderSlice):
+        return orders.totals()
+    if isinstance(orders, WithArchive):
+        hot, old = totals(orders.hot), _archived(totals, orders)
+        count = hot['orders'] + old['orders']
+        revenue = hot['revenue'] + old['revenue']
+        return {
+            'orders': count,
+            'revenue': revenue,
+            'avg_order_value': revenue / count if count else 0,
+        }
+    result = orders.aggregate(orders=Count('id'), revenue=Sum('total_price'))
+    count = result['orders']
+    revenue = result['revenue'] or 0
+    return {
+        'orders': count,
+        'revenue': revenue,
+        'avg_order_value': revenue / count if count else 0,
+    }
+
+
+def counts_by(orders, field, count_key='total'):
+    """Pedidos agrupados por un campo (status, platform...), de mayor a menor"""
+    if isinstance(orders, OrderSlice):
+        return orders.counts_by(field, count_key)
+    if isinstance(orders, WithArchive):
+        merged = {}
+        for row in counts_by(orders.hot, field, count_key) + _archived(counts_by, orders, field, count_key):
+            item = merged.setdefault(row[field], {field: row[field], count_key: 0})
+            item[count_key] += row[count_key]
+        return sorted(merged.values(), key=lambda item: -item[count_key])
+    return list(
+        orders.values(field).annotate(**{count_key: Count('id')}).order_by(f'-{count_key}')
+    )
+
+
+def popular_products(orders, limit=10, count_key='total_orders', revenue_key=None,
+                     fields=('product_ref__name',), exclude_cancelled=False, avg_key=None):
+    """Productos más solicitados dentro de los pedidos filtrados (limit=None: todos)"""
+    if isinstance(orders, OrderSlice):
+        if exclude_cancelled:
+            orders = orders.filter(exclude_status='cancelada')
+        return orders.grouped_products(fields, limit, count_key, revenue_key, avg_key)
+    if isinstance(orders, WithArchive):
+        return _merged_products(orders, limit, count_key, revenue_key, fields, exclude_cancelled, avg_key)
+
+    orders = orders.filter(product_ref__isnull=False)
+    if exclude_cancelled:
+        orders = orders.filter(~Q(status='cancelada'))
+
+    aggregates = {count_key: Count('id')}
+    if revenue_key:
+        aggregates[revenue_key] = Sum('total_price')
+    if avg_key:
+        aggregates[avg_key] = Sum('total_price') / Count('id')
+
+    rows = orders.values(*fields).annotate(**aggregates).order_by(f'-{count_key}')
+    return list(rows if limit is None else rows[:limit])
+
+
+def _merged_products(orders, limit, count_key, revenue_key, fields, exclude_cancelled, avg_key):
+    """popular_products() de activos y archivados: se suman los grupos y se vuelve a ordenar"""
+    revenue = revenue_key or '_revenue'
+    options = dict(limit=None, count_key=count_key, revenue_key=revenue, fields=fields,
+                   exclude_cancelled=exclude_cancelled)
+    merged = {}
+    for row in popular_products(orders.hot, **options) + _archived(popular_products, orders, **options):
+        item = merged.setdefault(
+            tuple(row[field] for field in fields),
+            {**{field: row[field] for field in fields}, count_key: 0, revenue: 0},
+        )
+        item[count_key] += row[count_key]
+        item[revenue] += row[revenue] or 0
+
+    rows = sorted(merged.values(), key=lambda item: -item[count_key])
+    for row in rows:
+        if avg_key:
+            row[avg_key] = row[revenue] // row[count_key]
+        if not revenue_key:
+            del row[revenue]
+    return rows if limit is None else rows[:limit]
+
+
+def _ranked(model, columns, limit, count_key, revenue_key, avg_key):
+    """Filas de contadores con las mismas claves que popular_products()"""
+    rows = (
+        model.objects.filter(order_count__gt=0)
+        .order_by('-order_count')
+        .values(*columns.values(), 'order_count', 'revenue')
+    )
+    if limit is not None:
+        rows = rows[:limit]
+
+    result = []
+    for row in rows:
+        item = {field: row[column] for field, column in columns.items()}
+        item[count_key] = row['order_count']
+        if revenue_key:
+            item[revenue_key] = row['revenue']
+        if avg_key:
+            item[avg_key] = row['revenue'] // row['order_count']
+        result.append(item)
+    return result
+
+
+def ranked_products(limit=10, count_key='total_orders', revenue_key=None,
+                    fields=('product_ref__name',), avg_key=None):
+    """popular_products() sobre todos los pedidos, leído de ProductOrderStats"""
+    columns = {field: field.replace('product_ref__', 'product__', 1) for field in fields}
+    return _ranked(ProductOrderStats, columns, limit, count_key, revenue_key, avg_key)
+
+
+def ranked_categories(limit=None, count_key='total_orders', revenue_key=None,
+                      fields=('product_ref__category__name',)):
+    """Pedidos por categoría sobre todos los pedidos, leído de CategoryOrderStats"""
+    columns = {field: field.replace('product_ref__category__', 'category__', 1) for field in fields}
+    return _ranked(CategoryOrderStats, columns, limit, count_key, revenue_key, None)
+
+
+def bucket_start(value, bucket):
+    """Primer día del período (día, semana ISO, mes o año) que contiene la fecha"""
+    if bucket == 'week':
+        return value - timedelta(days=value.weekday())
+    if bucket == 'month':
+        return value.replace(day=1)
+    if bucket == 'year':
+        return value.replace(month=1, day=1)
+    return value
+
+
+def next_bucket(value, bucket):
+    if bucket == 'week':
+        return value + timedelta(days=7)
+    if bucket == 'month':
+        if value.month == 12:
+            return value.replace(year=value.year + 1, month=1)
+        return value.replace(month=value.month + 1)
+    if bucket == 'year':
+        return value.replace(year=value.year + 1)
+    return value + timedelta(days=1)
+
+
+def bucket_label(value, bucket):
+    if bucket == 'month':
+        return value.strftime('%Y-%m')
+    if bucket == 'year':
+        return value.strftime('%Y')
+    return value.strftime('%Y-%m-%d')
+
+
+def bucket_count(start, end, bucket):
+    """Cantidad de períodos entre start y end (dates, inclusive)"""
+    first, last = bucket_start(start, bucket), bucket_start(end, bucket)
+    if bucket == 'week':
+        return (last - first).days // 7 + 1
+    if bucket == 'month':
+        return (last.year - first.year) * 12 + last.month - first.month + 1
+    if bucket == 'year':
+        return last.year - first.year + 1
+    return (last - first).days + 1
+
+
+def choose_granularity(start, end, max_points=MAX_SERIES_POINTS):
+    """Granularidad más fina cuya serie no supera max_points puntos"""
+    for bucket in ('day', 'week', 'month'):
+        if bucket_count(start, end, bucket) <= max_points:
+            return bucket
+    return 'year'
+
+
+def time_series(orders, bucket, start, end, label_key='period', count_key='total', revenue_key=None):
+    """
+    Serie de pedidos por día, semana, mes o año entre start y end (dates, inclusive).
+
+    Una sola consulta GROUP BY sobre Trunc('created'); los períodos sin
+    pedidos se completan con cero.
+    """
+    if isinstance(orders, OrderSlice):
+        return orders.time_series(bucket, start, end, label_key, count_key, revenue_key)
+    if isinstance(orders, WithArchive):
+        series = time_series(orders.hot, bucket, start, end, label_key, count_key, revenue_key)
+        if not archive.reaches_archive(start):
+            return series
+        old = _archived(time_series, orders, bucket, start, end, label_key, count_key, revenue_key)
+        for item, archived in zip(series, old):
+            item[count_key] += archived[count_key]
+            if revenue_key:
+                item[revenue_key] += archived[revenue_key]
+        return series
+
+    trunc = BUCKETS[bucket]('created')
+    aggregates = {'n': Count('id')}
+    if revenue_key:
+        aggregates['revenue'] = Sum('total_price')
+
+    rows = (
+        filter_orders(orders, date_from=start, date_to=end)
+        .annotate(period=trunc)
+        .values('period')
+        .annotate(**aggregates)
+        .order_by('period')
+    )
+
+    found = {}
+    for row in rows:
+        period = row['period']
+        if isinstance(period, datetime):
+            period = timezone.localtime(period).date() if timezone.is_aware(period) else period.date()
+        found[period] = row
+
+    series = []
+    current = bucket_start(start, bucket)
+    last = bucket_start(end, bucket)
+    while current <= last:
+        row = found.get(current, {})
+        item = {label_key: bucket_label(current, bucket), count_key: row.get('n', 0)}
+        if revenue_key:
+            item[revenue_key] = row.get('revenue') or 0
+        series.append(item)
+        current = next_bucket(current, bucket)
+    return series
+
+
+def last_months_start(months, today=None):
+    """Primer día del mes de hace (months - 1) meses"""
+    today = today or timezone.localdate()
+    year, month = today.year, today.month - (months - 1)
+    while month <= 0:
+        month += 12
+        year -= 1
+    return date(year, month, 1)
+
+
+def period_summary(orders, periods, status_counts=()):
+    """
+    Pedidos e ingresos desde varios inicios de período en una sola consulta.
+
+    periods: {'today': datetime, ...} -> {'today': {'orders': n, 'revenue': x}, ...}
+    status_counts: estados cuyo total también se devuelve ({'solicitado': n}).
+    """
+    if isinstance(orders, OrderSlice):
+        return orders.period_summary(periods, status_counts)
+    if isinstance(orders, WithArchive):
+        summary = period_summary(orders.hot, periods, status_counts)
+        old = _archived(period_summary, orders, periods, status_counts)
+        for name in periods:
+            for key in ('orders', 'revenue'):
+                summary[name][key] += old[name][key]
+        for status in status_counts:
+            summary['by_status'][status] += old['by_status'][status]
+        return summary
+
+    aggregates = {}
+    for name, since in periods.items():
+        aggregates[f'{name}__orders'] = Count('id', filter=Q(created__gte=since))
+        aggregates[f'{name}__revenue'] = Sum('total_price', filter=Q(created__gte=since))
+    for status in status_counts:
+        aggregates[f'status__{status}'] = Count('id', filter=Q(status=status))
+
+    result = orders.aggregate(**aggregates)
+
+    summary = {
+        name: {
+            'orders': result[f'{name}__orders'],
+            'revenue': result[f'{name}__revenue'] or 0,
+        }
+        for name in periods
+    }
+    summary['by_status'] = {status: result[f'status__{status}'] for status in status_counts}
+    return summary
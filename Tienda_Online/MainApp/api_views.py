@@ -4,23 +4,117 @@ from rest_framework import viewsets, generics, filters, status
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count, Sum, Q
+from django.db.models import Q
+from django.http import Http404
 from datetime import datetime, timedelta
 from django.utils import timezone
+from operator import attrgetter
+import heapq
+import uuid
 
-from .models import Supply, Order, Product, Category, OrderImage
+from .models import Supply, Order, Product, Category, OrderImage, ArchivedOrder
+from . import analytics, archive, autocomplete, customers, facets, lead_times, order_updates, recommendations, single_flight
+from .query_budget import BudgetPagination, QueryBudgetMixin, TooManyRows, max_rows
+from .throttling import TokenBucketThrottle
 from .serializers import (
     SupplySerializer, OrderSerializer, OrderCreateSerializer,
     ProductSerializer, CategorySerializer, StatisticsSerializer,
-    OrderFilterSerializer
+    OrderFilterSerializer, OrderBulkUpdateSerializer, ProductRecommendationSerializer,
+    SparseFieldsMixin
 )
 
+
+class SparseFieldsQuerysetMixin:
+    """Joins y prefetches según los campos que el serializer va a devolver (?fields= / ?expand=)"""
+    
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer = self.get_serializer()
+        if isinstance(serializer, SparseFieldsMixin):
+            queryset = serializer.optimize_queryset(queryset)
+        return queryset
+
+
+class NewestFirst:
+    """
+    Pedidos activos y archivados intercalados por -created, para el paginador
+    (solo count() y slices). Cada página lee de cada parte hasta su última
+    fila, así que no se recorre más allá de QUERY_BUDGETS['MAX_ROWS'].
+    """
+    
+    def __init__(self, *parts):
+        self.parts = parts
+    
+    def count(self):
+        return sum(part.count() for part in self.parts)
+    
+    def __getitem__(self, index):
+        if index.stop > max_rows():
+            raise TooManyRows(max_rows())
+        merged = heapq.merge(*(part[:index.stop] for part in self.parts), key=attrgetter('created'), reverse=True)
+        return list(merged)[index]
+
+
+class OrderListMixin(QueryBudgetMixin):
+    """
+    Listados de pedidos paginados (BudgetPagination, ver query_budget.py) que
+    agregan los archivados (ver archive.py) cuando la consulta los alcanza:
+    get_archived_queryset() devuelve esa parte o None. Ambas partes vienen
+    ordenadas por -created y se intercalan (NewestFirst).
+    """
+    query_budget = 'orders'
+    pagination_class = BudgetPagination
+    
+    def get_archived_queryset(self):
+        return None
+    
+    def list(self, request, *args, **kwargs):
+        orders = self.filter_queryset(self.get_queryset())
+        archived = self.get_archived_queryset()
+        if archived is not None:
+            serializer = self.get_serializer()
+            if isinstance(serializer, SparseFieldsMixin):
+                archived = serializer.optimize_queryset(archived)
+            orders = NewestFirst(orders, archived)
+        
+        page = self.paginate_queryset(orders)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+
+class OrderSearchFilter(filters.SearchFilter):
+    """
+    ?search= de pedidos por índice: un UUID busca el token exacto, un email o
+    teléfono su clave normalizada, un @usuario la red social, y el resto el
+    prefijo del nombre del cliente.
+    """
+    
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '').strip()
+        if not term:
+            return queryset
+        try:
+            return queryset.filter(token=uuid.UUID(term))
+        except ValueError:
+            pass
+        if '@' in term[1:]:
+            return queryset.filter(email_normalized=customers.normalize_email(term))
+        phone = customers.normalize_phone(term)
+        if term.isdigit():
+            # Número de pedido o teléfono escrito sin separadores
+            return queryset.filter(Q(pk=int(term)) | Q(phone_digits=phone)) if phone else queryset.filter(pk=int(term))
+        if phone:
+            return queryset.filter(phone_digits=phone)
+        if term.startswith('@'):
+            return queryset.filter(social_handle=customers.normalize_handle(term))
+        return queryset.filter(customer_name__istartswith=term)
+
 # ============================================================================
 # 1. VIEWSETS (CRUD COMPLETO) - USANDO viewsets.ModelViewSet
 # ============================================================================
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(SparseFieldsQuerysetMixin, viewsets.ModelViewSet):
     """CRUD de Categorías usando viewsets.ModelViewSet"""
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
@@ -30,7 +124,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
     search_fields = ['name']
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(SparseFieldsQuerysetMixin, viewsets.ModelViewSet):
     """CRUD de Productos usando viewsets.ModelViewSet"""
     queryset = Product.objects.all().order_by('-created')
     serializer_class = ProductSerializer
@@ -41,9 +135,28 @@ class ProductViewSet(viewsets.ModelViewSet):
     ordering_fields = ['price', 'created', 'name']
     ordering = ['-created']
     lookup_field = 'slug'
+    
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """Sugerencias por prefijo de nombre o slug (índice en memoria, sin consultar la BD)"""
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = 10
+        results = autocomplete.suggest(request.query_params.get('q', ''), max(limit, 1))
+        return Response({'results': results}, status=status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['get'])
+    def recommendations(self, request, slug=None):
+        """Productos que los mismos clientes piden junto a este (precalculados, una consulta)"""
+        product = self.get_object()
+        serializer = ProductRecommendationSerializer(
+            recommendations.recommended_products(product), many=True
+        )
+        return Response(serializer.data)
 
 
-class SupplyViewSet(viewsets.ModelViewSet):
+class SupplyViewSet(SparseFieldsQuerysetMixin, viewsets.ModelViewSet):
     """CRUD de Insumos usando viewsets.ModelViewSet (API 1 del requerimiento)"""
     queryset = Supply.objects.all()
     serializer_class = SupplySerializer
@@ -75,35 +188,77 @@ class SupplyViewSet(viewsets.ModelViewSet):
             )
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(OrderListMixin, SparseFieldsQuerysetMixin, viewsets.ModelViewSet):
     """CRUD de Pedidos usando viewsets.ModelViewSet (API 2 del requerimiento)"""
     queryset = Order.objects.all().order_by('-created')
     permission_classes = [IsAuthenticated]  # USANDO IsAuthenticated
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, OrderSearchFilter]
     filterset_fields = ['status', 'platform', 'payment_status']
-    search_fields = ['customer_name', 'email', 'token']
     
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
             return OrderCreateSerializer  # USANDO OrderCreateSerializer
         return OrderSerializer
     
+    def get_archived_queryset(self):
+        """?search=<token> también encuentra el pedido archivado, como archive.find_order()"""
+        try:
+            token = uuid.UUID(self.request.query_params.get('search', '').strip())
+        except ValueError:
+            return None
+        return self.filter_queryset(ArchivedOrder.objects.filter(token=token)).order_by('-created')
+    
+    def get_object(self):
+        """Al consultar un pedido que ya no está en Order, buscarlo en el archivo (solo lectura)"""
+        try:
+            return super().get_object()
+        except Http404:
+            if self.action != 'retrieve':
+                raise
+        queryset = self.get_serializer().optimize_queryset(ArchivedOrder.objects.all())
+        order = generics.get_object_or_404(queryset, pk=self.kwargs['pk'])
+        self.check_object_permissions(self.request, order)
+        return order
+    
     @action(detail=True, methods=['post'])
     def change_status(self, request, pk=None):
-        """Cambiar estado de un pedido usando status para respuestas HTTP"""
+        """
+        Cambiar estado de un pedido con las mismas reglas que bulk-update
+        (order_updates.ALLOWED_TRANSITIONS) y los mismos errores: estado
+        inválido -> 400 del serializador; transición no permitida -> 400 con
+        {summary, results}.
+        """
         order = self.get_object()
-        new_status = request.data.get('status')
-        
-        if new_status and new_status in dict(Order.STATUS_CHOICES):
-            order.status = new_status
-            order.save()
-            return Response(
-                {'status': 'Estado actualizado', 'new_status': new_status},
-                status=status.HTTP_200_OK  # USANDO status
-            )
+        data = {'orders': [str(order.pk)]}
+        if 'status' in request.data:
+            data['status'] = request.data['status']
+        serializer = OrderBulkUpdateSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        new_status = serializer.validated_data['status']
+        
+        results = order_updates.bulk_update_orders([order.pk], status=new_status)
+        body = {'summary': order_updates.summarize(results), 'results': results}
+        if results[0]['result'] == order_updates.INVALID:
+            return Response(body, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {'status': 'Estado actualizado', 'new_status': new_status, **body},
+            status=status.HTTP_200_OK  # USANDO status
+        )
+    
+    @action(detail=False, methods=['post'], url_path='bulk-update')
+    def bulk_update(self, request):
+        """Cambiar estado y/o pago de varios pedidos (ids o tokens) en una transacción"""
+        serializer = OrderBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        results = order_updates.bulk_update_orders(
+            serializer.validated_data['orders'],
+            status=serializer.validated_data.get('status'),
+            payment_status=serializer.validated_data.get('payment_status'),
+        )
         return Response(
-            {'error': 'Estado no válido'},
-            status=status.HTTP_400_BAD_REQUEST  # USANDO status
+            {'summary': order_updates.summarize(results), 'results': results},
+            status=status.HTTP_200_OK
         )
     
     @action(detail=True, methods=['post'])
@@ -121,7 +276,7 @@ class OrderViewSet(viewsets.ModelViewSet):
 # 2. VISTAS CON FILTRADO AVANZADO - USANDO filters.SearchFilter y DjangoFilterBackend
 # ============================================================================
 
-class OrderFilterAPIView(generics.ListAPIView):
+class OrderFilterAPIView(OrderListMixin, SparseFieldsQuerysetMixin, generics.ListAPIView):
     """API 3 - Filtro avanzado de pedidos usando OrderFilterSerializer y Q objects"""
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]  # USANDO IsAuthenticated
@@ -131,9 +286,9 @@ class OrderFilterAPIView(generics.ListAPIView):
         queryset = Order.objects.all()
         
         # Validar con serializer (USANDO OrderFilterSerializer)
+        # Filtros inválidos: 400 en vez de devolver todos los pedidos
         filter_serializer = OrderFilterSerializer(data=self.request.query_params)
-        if not filter_serializer.is_valid():
-            return queryset.order_by('-created')
+        filter_serializer.is_valid(raise_exception=True)
         
         validated_data = filter_serializer.validated_data
         
@@ -156,9 +311,15 @@ class OrderFilterAPIView(generics.ListAPIView):
         if validated_data.get('payment_status'):
             q_objects &= Q(payment_status=validated_data['payment_status'])
         
-        # Filtrar por cliente (búsqueda parcial)
+        # Filtrar por cliente (prefijo del nombre, con índice)
         if validated_data.get('customer_name'):
-            q_objects &= Q(customer_name__icontains=validated_data['customer_name'])
+            q_objects &= Q(customer_name__istartswith=validated_data['customer_name'])
+        
+        # Filtrar por email o teléfono exactos (claves normalizadas, con índice)
+        if validated_data.get('email'):
+            q_objects &= Q(email_normalized=customers.normalize_email(validated_data['email']))
+        if validated_data.get('phone'):
+            q_objects &= Q(phone_digits=customers.normalize_phone(validated_data['phone']))
         
         # Filtrar por rango de fechas usando datetime
         if validated_data.get('date_from'):
@@ -171,16 +332,78 @@ class OrderFilterAPIView(generics.ListAPIView):
             date_to = datetime.combine(validated_data['date_to'], datetime.max.time())
             q_objects &= Q(created__lte=date_to)
         
+        # Un rango de fechas histórico incluye también los pedidos archivados
+        if (validated_data.get('date_from') or validated_data.get('date_to')) \
+                and archive.reaches_archive(validated_data.get('date_from')):
+            self.archived_filter = q_objects
+        
         return queryset.filter(q_objects).order_by('-created')
+    
+    def get_archived_queryset(self):
+        q_objects = getattr(self, 'archived_filter', None)
+        if q_objects is None:
+            return None
+        return ArchivedOrder.objects.filter(q_objects).order_by('-created')
+
+
+class CustomerHistoryAPIView(OrderListMixin, SparseFieldsQuerysetMixin, generics.ListAPIView):
+    """
+    Todos los pedidos de un cliente, del más reciente al más antiguo,
+    incluidos los archivados.
+    
+    ?email=, ?phone= y/o ?handle= (se combinan con OR), o ?token= de uno de
+    sus pedidos para usar las claves de ese pedido. Cada clave es una
+    búsqueda por índice (email_normalized, phone_digits, social_handle).
+    """
+    serializer_class = OrderSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        params = self.request.query_params
+        lookup = customers.lookup_from_params(params)
+        
+        if not lookup and params.get('token'):
+            keys = None
+            try:
+                token = uuid.UUID(params['token'])
+            except ValueError:
+                token = None
+            for model in (Order, ArchivedOrder) if token else ():
+                keys = model.objects.filter(token=token).values(*Order.CUSTOMER_KEY_FIELDS).first()
+                if keys is not None:
+                    break
+            if keys is None:
+                raise NotFound('Pedido no encontrado')
+            lookup = {name: value for name, value in keys.items() if value}
+            if not lookup:
+                # El pedido no tiene email, teléfono ni usuario con los que buscar otros
+                raise NotFound('No hay pedidos de este cliente')
+        
+        if not lookup:
+            if any(params.get(name) for name in ('email', 'phone', 'handle')):
+                # Valores que no son un email, teléfono o usuario válidos: nada coincide
+                raise NotFound('No hay pedidos de este cliente')
+            raise ValidationError('Indicar email, phone, handle o token')
+        
+        q_objects = Q()
+        for name, value in lookup.items():
+            q_objects |= Q(**{name: value})
+        self.customer_filter = q_objects
+        return Order.objects.filter(q_objects).order_by('-created')
+    
+    def get_archived_queryset(self):
+        return ArchivedOrder.objects.filter(self.customer_filter).order_by('-created')
 
 
-class ProductSearchAPIView(generics.ListAPIView):
+class ProductSearchAPIView(SparseFieldsQuerysetMixin, generics.ListAPIView):
     """Búsqueda avanzada de productos usando filters.SearchFilter"""
     serializer_class = ProductSerializer  # USANDO ProductSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]  # USANDO filters
     search_fields = ['name', 'description', 'category__name']
     ordering_fields = ['price', 'created', 'name']
     ordering = ['-created']
+    throttle_classes = [TokenBucketThrottle]  # pública y cara: límite por IP (ver throttling.py)
+    throttle_scope = 'search'
     
     def get_queryset(self):
         """Filtrar productos con lógica adicional usando Q"""
@@ -208,22 +431,60 @@ class ProductSearchAPIView(generics.ListAPIView):
             queryset = queryset.filter(Q(category__slug=category_slug))  # USANDO Q
         
         return queryset
+    
+    def list(self, request, *args, **kwargs):
+        """Con ?facets=1 responde {'results': [...], 'facets': {...}} (ver facets.py)"""
+        response = super().list(request, *args, **kwargs)
+        if request.query_params.get('facets') in ('1', 'true'):
+            response.data = {'results': response.data, 'facets': self.get_facets()}
+        return response
+    
+    def get_facets(self):
+        """Conteos por categoría, tramo de precio y destacados para la búsqueda actual"""
+        params = self.request.query_params
+        search = filters.SearchFilter()
+        products = search.filter_queryset(self.request, Product.objects.all(), self)
+        return facets.catalog_facets(
+            products, 'search', search.get_search_terms(self.request),
+            category=params.get('category') or None,
+            min_price=facets.parse_price(params.get('min_price')),
+            max_price=facets.parse_price(params.get('max_price')),
+        )
 
 # ============================================================================
 # 3. VISTAS DE ESTADÍSTICAS - USANDO Count, Sum, datetime, timedelta, timezone
 # ============================================================================
 
-class StatisticsAPIView(generics.GenericAPIView):
+class StatisticsAPIView(QueryBudgetMixin, generics.GenericAPIView):
     """Vista para obtener estadísticas usando Count, Sum y operaciones de fecha"""
     permission_classes = [IsAuthenticated]
+    query_budget = 'statistics'
     serializer_class = StatisticsSerializer  # USANDO StatisticsSerializer
     
     def get(self, request):
         """Obtener estadísticas con múltiples filtros de fecha"""
-        # Obtener parámetros de fecha
-        days = int(request.query_params.get('days', 30))
+        # Pedidos idénticos simultáneos (varias pestañas del dashboard) se calculan una vez
+        data, code = single_flight.coalesced(
+            single_flight.request_key('statistics', request.query_params),
+            lambda: self.compute(request),
+        )
+        return Response(data, status=code)
+    
+    def compute(self, request):
+        """Estadísticas como (datos, código HTTP)"""
+        # Obtener parámetros de fecha (inválidos: 400, no un rango por defecto)
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            days = 0
+        if not 1 <= days <= 3650:
+            return (
+                {'error': 'days debe ser un entero entre 1 y 3650'},
+                status.HTTP_400_BAD_REQUEST
+            )
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
+        granularity = request.query_params.get('granularity', 'auto')
         
         # Definir rango de fechas usando datetime, timedelta y timezone
         now = timezone.now()  # USANDO timezone
@@ -234,8 +495,10 @@ class StatisticsAPIView(generics.GenericAPIView):
                 start_date = datetime.strptime(start_date, '%Y-%m-%d')
                 start_date = timezone.make_aware(start_date)
             except ValueError:
-                # USANDO timedelta para calcular fechas relativas
-                start_date = now - timedelta(days=days)
+                return (
+                    {'error': 'start_date no válida: usar YYYY-MM-DD'},
+                    status.HTTP_400_BAD_REQUEST
+                )
         else:
             # USANDO timedelta
             start_date = now - timedelta(days=days)
@@ -246,127 +509,146 @@ class StatisticsAPIView(generics.GenericAPIView):
                 end_date = datetime.strptime(end_date, '%Y-%m-%d')
                 end_date = timezone.make_aware(end_date)
             except ValueError:
-                end_date = now
+                return (
+                    {'error': 'end_date no válida: usar YYYY-MM-DD'},
+                    status.HTTP_400_BAD_REQUEST
+                )
         else:
             end_date = now
         
-        # Filtrar pedidos por rango de fechas
-        orders = Order.objects.filter(created__range=[start_date, end_date])
-        
-        # Calcular estadísticas usando Count y Sum
-        total_orders = orders.count()  # USANDO Count
-        total_revenue = orders.aggregate(total=Sum('total_price'))['total'] or 0  # USANDO Sum
-        
-        # Pedidos por estado usando Count
-        orders_by_status = orders.values('status').annotate(
-            count=Count('id')  # USANDO Count
-        ).order_by('-count')
-        
-        # Pedidos por plataforma usando Count
-        orders_by_platform = orders.values('platform').annotate(
-            count=Count('id')  # USANDO Count
-        ).order_by('-count')
-        
-        # CORRECCIÓN: Productos más vendidos usando Count y Sum - Aplicando el mismo filtro de fecha
-        popular_products = Order.objects.filter(
-            Q(product_ref__isnull=False) &  # USANDO Q
-            ~Q(status='cancelada') &  # USANDO Q con negación
-            Q(created__range=[start_date, end_date])  # ✅ AÑADIDO: Mismo filtro de fecha
-        ).values(
-            'product_ref__name', 'product_ref__id'
-        ).annotate(
-            count=Count('id'),  # USANDO Count
-            revenue=Sum('total_price')  # USANDO Sum
-        ).order_by('-count')[:10]
-        
-        # Pedidos por día en el rango usando datetime y timedelta
-        daily_orders = []
-        current_date = start_date.date()
-        end_date_date = end_date.date()
-        
-        # USANDO datetime y timedelta para iterar sobre días
-        while current_date <= end_date_date:
-            day_orders = orders.filter(created__date=current_date).count()
-            daily_orders.append({
-                'date': current_date.strftime('%Y-%m-%d'),  # ✅ strftime correcto (solo un %)
-                'count': day_orders
-            })
-            current_date += timedelta(days=1)  # USANDO timedelta
+        if start_date > end_date:
+            return (
+                {'error': 'Fecha de inicio no puede ser mayor que fecha de fin'},
+                status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Granularidad de la serie: automática según el largo del rango para
+        # mantener una cantidad acotada de puntos (día, semana, mes o año)
+        first_day = timezone.localtime(start_date).date()
+        last_day = timezone.localtime(end_date).date()
+        if granularity == 'auto':
+            granularity = analytics.choose_granularity(first_day, last_day)
+        elif granularity not in analytics.BUCKETS:
+            return (
+                {'error': f"Granularidad no válida: usar auto, {', '.join(analytics.BUCKETS)}"},
+                status.HTTP_400_BAD_REQUEST
+            )
+        elif analytics.bucket_count(first_day, last_day, granularity) > analytics.MAX_SERIES_POINTS:
+            return (
+                {'error': f'La serie supera {analytics.MAX_SERIES_POINTS} puntos: usar una granularidad mayor'},
+                status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Filtrar pedidos por rango de fechas (consultas en MainApp/analytics.py)
+        orders = analytics.select_orders(date_from=start_date, date_to=end_date)
+        
+        # Totales en una sola consulta usando Count y Sum
+        totals = analytics.totals(orders)
+        
+        # Pedidos por estado y por plataforma usando Count
+        orders_by_status = analytics.counts_by(orders, 'status', count_key='count')
+        orders_by_platform = analytics.counts_by(orders, 'platform', count_key='count')
+        
+        # Productos más vendidos (sin cancelados) dentro del mismo rango de fechas
+        popular_products = analytics.popular_products(
+            orders, limit=10, count_key='count', revenue_key='revenue',
+            fields=('product_ref__name', 'product_ref__id'), exclude_cancelled=True,
+        )
+        
+        # Pedidos por período en el rango: un solo GROUP BY sobre Trunc
+        daily_orders = analytics.time_series(
+            orders, granularity, first_day, last_day,
+            label_key='date', count_key='count',
+        )
         
         # Datos para el serializer
         data = {
             'period': {
                 'start': start_date.strftime('%Y-%m-%d'),  # ✅ strftime correcto
                 'end': end_date.strftime('%Y-%m-%d'),      # ✅ strftime correcto
-                'days': days
+                'days': days,
+                'granularity': granularity
             },
             'totals': {
-                'orders': total_orders,
-                'revenue': float(total_revenue),
-                'avg_order_value': float(total_revenue / total_orders) if total_orders > 0 else 0
+                'orders': totals['orders'],
+                'revenue': float(totals['revenue']),
+                'avg_order_value': float(totals['avg_order_value'])
             },
-            'by_status': list(orders_by_status),
-            'by_platform': list(orders_by_platform),
-            'popular_products': list(popular_products),
+            'by_status': orders_by_status,
+            'by_platform': orders_by_platform,
+            'popular_products': popular_products,
             'daily_trend': daily_orders
         }
         
         serializer = self.get_serializer(data)
-        return Response(serializer.data, status=status.HTTP_200_OK)  # USANDO status
+        return dict(serializer.data), status.HTTP_200_OK  # USANDO status
 
-class DashboardStatsAPIView(generics.GenericAPIView):
+class DashboardStatsAPIView(QueryBudgetMixin, generics.GenericAPIView):
     """Estadísticas rápidas para dashboard usando funciones de agregación"""
     permission_classes = [IsAuthenticated]
+    query_budget = 'statistics'
     
     def get(self, request):
         """Obtener estadísticas rápidas usando Count, Sum, datetime, timedelta, timezone"""
-        now = timezone.now()  # USANDO timezone
+        now = timezone.localtime()  # USANDO timezone
         
-        # HOY usando datetime
+        # HOY, ESTA SEMANA y ESTE MES usando datetime y timedelta
         today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        today_orders = Order.objects.filter(created__gte=today_start)
-        
-        # ESTA SEMANA usando datetime y timedelta
-        week_start = now - timedelta(days=now.weekday())  # USANDO timedelta
-        week_start = week_start.replace(hour=0, minute=0, second=0, microsecond=0)
-        week_orders = Order.objects.filter(created__gte=week_start)
+        week_start = today_start - timedelta(days=now.weekday())  # USANDO timedelta
+        month_start = today_start.replace(day=1)
+        
+        # Todos los contadores en una sola consulta (agregación condicional)
+        orders = analytics.select_orders()
+        summary = analytics.period_summary(
+            orders,
+            {'today': today_start, 'this_week': week_start, 'this_month': month_start},
+            status_counts=('solicitado', 'en_proceso'),
+        )
         
-        # ESTE MES usando datetime
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        month_orders = Order.objects.filter(created__gte=month_start)
+        top_products = analytics.ranked_products(limit=1, count_key='count')
         
-        # Calcular usando Count y Sum
         stats = {
-            'today': {
-                'orders': today_orders.count(),  # USANDO Count
-                'revenue': today_orders.aggregate(total=Sum('total_price'))['total'] or 0  # USANDO Sum
-            },
-            'this_week': {
-                'orders': week_orders.count(),  # USANDO Count
-                'revenue': week_orders.aggregate(total=Sum('total_price'))['total'] or 0  # USANDO Sum
-            },
-            'this_month': {
-                'orders': month_orders.count(),  # USANDO Count
-                'revenue': month_orders.aggregate(total=Sum('total_price'))['total'] or 0  # USANDO Sum
-            },
-            'pending_orders': Order.objects.filter(Q(status='solicitado')).count(),  # USANDO Q y Count
-            'in_progress_orders': Order.objects.filter(Q(status='en_proceso')).count(),  # USANDO Q y Count
-            'top_product': Order.objects.filter(
-                Q(product_ref__isnull=False)  # USANDO Q
-            ).values(
-                'product_ref__name'
-            ).annotate(
-                count=Count('id')  # USANDO Count
-            ).order_by('-count').first()
+            'today': summary['today'],
+            'this_week': summary['this_week'],
+            'this_month': summary['this_month'],
+            'pending_orders': summary['by_status']['solicitado'],
+            'in_progress_orders': summary['by_status']['en_proceso'],
+            'top_product': top_products[0] if top_products else None
         }
         
         return Response(stats, status=status.HTTP_200_OK)  # USANDO status
 
+
+class LeadTimeAPIView(QueryBudgetMixin, generics.GenericAPIView):
+    """Percentiles del tiempo que pasan los pedidos en cada estado (por plataforma)"""
+    permission_classes = [IsAuthenticated]
+    query_budget = 'statistics'
+    
+    def get(self, request):
+        """Resumen precalculado desde OrderStatusChange (en caché, ver lead_times.py)"""
+        days = request.query_params.get('days')
+        try:
+            days = int(days) if days else None
+        except ValueError:
+            days = 0
+        if days is not None and not 1 <= days <= 3650:
+            return Response(
+                {'error': 'days debe ser un entero entre 1 y 3650'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        stats = lead_times.lead_time_stats(days)
+        return Response({
+            'window_days': stats['window_days'],
+            'generated': stats['generated'],
+            'statuses': stats['statuses'],
+        }, status=status.HTTP_200_OK)
+
 # ============================================================================
 # 4. VISTAS ADICIONALES PARA FUNCIONALIDAD ESPECÍFICA
 # ============================================================================
 
-class OrderByDateRangeAPIView(generics.ListAPIView):
+class OrderByDateRangeAPIView(OrderListMixin, SparseFieldsQuerysetMixin, generics.ListAPIView):
     """Obtener pedidos por rango de fechas específico usando datetime y timedelta"""
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
@@ -400,41 +682,48 @@ class OrderByDateRangeAPIView(generics.ListAPIView):
         start_date = timezone.make_aware(start_date)
         end_date = timezone.make_aware(end_date)
         
+        # Rangos históricos: también los pedidos archivados
+        if archive.reaches_archive(start_date):
+            self.archived_range = (start_date, end_date)
+        
         return Order.objects.filter(
             created__range=[start_date, end_date]
         ).order_by('-created')
+    
+    def get_archived_queryset(self):
+        date_range = getattr(self, 'archived_range', None)
+        if date_range is None:
+            return None
+        return ArchivedOrder.objects.filter(created__range=date_range).order_by('-created')
 
 
-class ProductInventoryAPIView(generics.GenericAPIView):
+class ProductInventoryAPIView(QueryBudgetMixin, generics.GenericAPIView):
     """Informe de inventario de productos relacionados con pedidos usando Count y Sum"""
     permission_classes = [IsAuthenticated]
+    query_budget = 'statistics'
     
     def get(self, request):
         """Obtener análisis de productos más pedidos"""
-        # Productos con más pedidos usando Count y Sum
-        top_products = Order.objects.filter(
-            Q(product_ref__isnull=False)  # USANDO Q
-        ).values(
-            'product_ref__id',
-            'product_ref__name',
-            'product_ref__price'
-        ).annotate(
-            order_count=Count('id'),  # USANDO Count
-            total_revenue=Sum('total_price'),  # USANDO Sum
-            avg_order_value=Sum('total_price') / Count('id')  # USANDO Sum y Count
-        ).order_by('-order_count')[:20]
-        
-        # Productos por categoría usando Count y Sum
-        products_by_category = Order.objects.filter(
-            Q(product_ref__isnull=False)  # USANDO Q
-        ).values(
-            'product_ref__category__name'
-        ).annotate(
-            order_count=Count('id'),  # USANDO Count
-            total_revenue=Sum('total_price')  # USANDO Sum
-        ).order_by('-order_count')
+        data = single_flight.coalesced(
+            single_flight.request_key('product-inventory', request.query_params),
+            self.compute,
+        )
+        return Response(data, status=status.HTTP_200_OK)  # USANDO status
+    
+    def compute(self):
+        # Productos con más pedidos (contadores ProductOrderStats)
+        top_products = analytics.ranked_products(
+            limit=20,
+            fields=('product_ref__id', 'product_ref__name', 'product_ref__price'),
+            count_key='order_count', revenue_key='total_revenue', avg_key='avg_order_value',
+        )
         
-        return Response({
-            'top_products': list(top_products),
-            'by_category': list(products_by_category)
-        }, status=status.HTTP_200_OK)  # USANDO status
\ No newline at end of file
+        # Productos por categoría (contadores CategoryOrderStats)
+        products_by_category = analytics.ranked_categories(
+            count_key='order_count', revenue_key='total_revenue',
+        )
+        
+        return {
+            'top_products': top_products,
+            'by_category': products_by_category
+        }
\ No newline at end of file
@@ -0,0 +1,169 @@
+# MainApp/archive.py
+#
+# Archivo de pedidos cerrados (ArchivedOrder / ArchivedOrderImage).
+#
+# Los pedidos entregados, finalizados o cancelados que no se modifican hace
+# ORDER_ARCHIVE['AFTER_MONTHS'] meses se mueven con sus imágenes a las tablas
+# de archivo (`manage.py archive_orders`). Así Order, que recorren el
+# dashboard, los filtros y el admin, solo tiene el trabajo vigente.
+#
+# Cada lote se mueve en una transacción con INSERT ... SELECT y DELETE
+# directos: no pasa por save()/delete(), por lo que las señales no se
+# disparan y los contadores de ProductOrderStats siguen incluyendo los
+# pedidos archivados (son totales históricos). El historial de estados
+# (OrderStatusChange) se queda donde está.
+#
+# Las lecturas que los necesitan los buscan también en el archivo:
+# find_order() para el seguimiento por token o el detalle por id (la API de
+# pedidos hace lo mismo en el detalle y en ?search=<token>), y
+# reaches_archive() para los rangos de fechas históricos y los reportes. El
+# archivo solo cambia al archivar, así que los resultados calculados sobre él
+# se guardan en caché con su versión (cache_key).
+
+import calendar
+import hashlib
+import time as _time
+from datetime import datetime, time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderImage, Order, OrderImage
+
+ARCHIVE_VERSION_KEY = 'order-archive:version'
+
+
+def _initial_version():
+    return _time.time_ns() // 1000
+
+
+def archive_version():
+    return cache.get_or_set(ARCHIVE_VERSION_KEY, _initial_version, None)
+
+
+def bump_archive_version():
+    """Invalidar los resultados en caché calculados sobre el archivo"""
+    try:
+        cache.incr(ARCHIVE_VERSION_KEY)
+    except ValueError:
+        cache.set(ARCHIVE_VERSION_KEY, _initial_version(), None)
+
+
+def cache_key(*parts):
+    """Clave de caché para un resultado calculado sobre el archivo"""
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return f'order-archive:{archive_version()}:{digest}'
+
+
+def newest_archived():
+    """Fecha de creación del pedido archivado más reciente (None si no hay)"""
+    key = cache_key('newest')
+    entry = cache.get(key)
+    if entry is None:
+        entry = (ArchivedOrder.objects.aggregate(newest=Max('created'))['newest'],)
+        cache.set(key, entry, settings.ORDER_ARCHIVE['CACHE_SECONDS'])
+    return entry[0]
+
+
+def reaches_archive(date_from=None):
+    """¿Un rango desde date_from (date, datetime o None = sin límite) incluye pedidos archivados?"""
+    newest = newest_archived()
+    if newest is None:
+        return False
+    if date_from is None:
+        return True
+    if not isinstance(date_from, datetime):
+        date_from = datetime.combine(date_from, time.min)
+    if timezone.is_naive(date_from):
+        date_from = timezone.make_aware(date_from)
+    return date_from <= newest
+
+
+def find_order(**lookup):
+    """Pedido activo o archivado (token=..., pk=...) con producto e imágenes, o None"""
+    for model in (Order, ArchivedOrder):
+        order = model.objects.select_related('product_ref').prefetch_related('images').filter(**lookup).first()
+        if order is not None:
+            return order
+    return None
+
+
+async def afind_order(**lookup):
+    for model in (Order, ArchivedOrder):
+        order = await model.objects.select_related('product_ref').prefetch_related('images').filter(**lookup).afirst()
+        if order is not None:
+            return order
+    return None
+
+
+# --- ARCHIVADO ---
+
+def months_ago(months, now=None):
+    """Misma fecha y hora de hace `months` meses (ajustando el día a fin de mes)"""
+    now = now or timezone.now()
+    year, month = divmod(now.year * 12 + now.month - 1 - months, 12)
+    month += 1
+    return now.replace(year=year, month=month, day=min(now.day, calendar.monthrange(year, month)[1]))
+
+
+def candidates(before, statuses=None):
+    """Pedidos cerrados sin modificaciones desde `before`"""
+    statuses = settings.ORDER_ARCHIVE['STATUSES'] if statuses is None else statuses
+    return Order.objects.filter(status__in=statuses, updated__lt=before)
+
+
+def _columns(model, exclude=()):
+    quote = connection.ops.quote_name
+    return ', '.join(quote(field.column) for field in model._meta.concrete_fields if field.name not in exclude)
+
+
+def archive_batch(ids, before, statuses=None):
+    """Mover al archivo los pedidos de `ids` que siguen cumpliendo el criterio; devuelve cuántos"""
+    quote = connection.ops.quote_name
+    orders, images = quote(Order._meta.db_table), quote(OrderImage._meta.db_table)
+    order_columns = _columns(ArchivedOrder, exclude=('archived',))
+    image_columns = _columns(ArchivedOrderImage)
+
+    with transaction.atomic():
+        # Volver a comprobar dentro de la transacción: el pedido pudo cambiar
+        ids = list(
+            candidates(before, statuses).select_for_update().filter(pk__in=ids)
+            .values_list('pk', flat=True)
+        )
+        if not ids:
+            return 0
+        in_ids = ', '.join(['%s'] * len(ids))
+        archived = connection.ops.adapt_datetimefield_value(timezone.now())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {quote(ArchivedOrder._meta.db_table)} ({order_columns}, {quote('archived')}) "
+                f"SELECT {order_columns}, %s FROM {orders} WHERE {quote('id')} IN ({in_ids})",
+                [archived, *ids],
+            )
+            cursor.execute(
+                f"INSERT INTO {quote(ArchivedOrderImage._meta.db_table)} ({image_columns}) "
+                f"SELECT {image_columns} FROM {images} WHERE {quote('order_id')} IN ({in_ids})",
+                ids,
+            )
+            cursor.execute(f"DELETE FROM {images} WHERE {quote('order_id')} IN ({in_ids})", ids)
+            cursor.execute(f"DELETE FROM {orders} WHERE {quote('id')} IN ({in_ids})", ids)
+    bump_archive_version()
+    return len(ids)
+
+
+def archive_orders(before, statuses=None, batch_size=None):
+    """Archivar por lotes de id; genera (último id del lote, pedidos movidos)"""
+    batch_size = batch_size or settings.ORDER_ARCHIVE['BATCH_SIZE']
+    last_id = 0
+    while True:
+        ids = list(
+            candidates(before, statuses).filter(pk__gt=last_id).order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        last_id = ids[-1]
+        yield last_id, archive_batch(ids, before, statuses)
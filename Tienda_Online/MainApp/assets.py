@@ -0,0 +1,43 @@
+# MainApp/assets.py
+#
+# Librerías de front-end servidas desde static/ en vez de un CDN.
+#
+# `python manage.py build_assets` las descarga en static/vendor/ y
+# collectstatic les agrega el hash al nombre y las comprime (gzip y brotli),
+# así WhiteNoise las sirve con caché inmutable. Si todavía no se descargaron,
+# la etiqueta {% vendor_url %} (templatetags/assets.py) usa la URL del CDN.
+
+CDN = 'https://cdn.jsdelivr.net/npm'
+
+# nombre -> (ruta dentro de static/, URL de origen)
+VENDOR_ASSETS = {
+    'bootstrap.css': (
+        'vendor/bootstrap/bootstrap.min.css',
+        f'{CDN}/bootstrap@5.3.3/dist/css/bootstrap.min.css',
+    ),
+    'bootstrap.js': (
+        'vendor/bootstrap/bootstrap.bundle.min.js',
+        f'{CDN}/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js',
+    ),
+    'bootstrap-icons.css': (
+        'vendor/bootstrap-icons/bootstrap-icons.min.css',
+        f'{CDN}/bootstrap-icons@1.11.0/font/bootstrap-icons.min.css',
+    ),
+    'chart.js': (
+        'vendor/chart.js/chart.umd.js',
+        f'{CDN}/chart.js@4.4.1/dist/chart.umd.js',
+    ),
+}
+
+# Archivos referenciados desde el CSS de arriba (fuentes de los íconos)
+VENDOR_FILES = {
+    'vendor/bootstrap-icons/fonts/bootstrap-icons.woff2': f'{CDN}/bootstrap-icons@1.11.0/font/fonts/bootstrap-icons.woff2',
+    'vendor/bootstrap-icons/fonts/bootstrap-icons.woff': f'{CDN}/bootstrap-icons@1.11.0/font/fonts/bootstrap-icons.woff',
+}
+
+
+def downloads():
+    """Todos los archivos a descargar: {ruta dentro de static/: URL}"""
+    files = {path: url for path, url in VENDOR_ASSETS.values()}
+    files.update(VENDOR_FILES)
+    return files
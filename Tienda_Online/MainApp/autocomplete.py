@@ -0,0 +1,118 @@
+# MainApp/autocomplete.py
+#
+# Índice de prefijos en memoria para el autocompletado de productos.
+#
+# Cada proceso arma una lista ordenada con las palabras del nombre y del slug
+# (sin tildes ni mayúsculas) y los productos que contienen cada una. Una
+# búsqueda es un bisect sobre esa lista, sin consultar la base de datos. El índice se
+# reconstruye solo cuando cambia la versión del catálogo (page_cache.py), que
+# se incrementa al guardar o borrar productos, categorías o imágenes.
+
+import heapq
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+
+from .models import Product
+from .page_cache import catalog_version
+
+WORD = re.compile(r'[^\W_]+')
+
+MAX_RESULTS = 20
+
+
+def fold(text):
+    """Minúsculas y sin tildes: 'Camión Ñandú' -> 'camion nandu'"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def words(text):
+    return WORD.findall(fold(text))
+
+
+class ProductIndex:
+    """Índice invertido de las palabras de nombre y slug, con búsqueda por prefijo"""
+
+    def __init__(self, products, version=None):
+        self.version = version
+        self.products = {}
+        postings = {}
+        for product in products:
+            self.products[product['id']] = product
+            product['folded'] = fold(product['name'])
+            for word in words(product['name']) + words(product['slug'].replace('-', ' ')):
+                postings.setdefault(word, set()).add(product['id'])
+        # Palabras ordenadas (para el bisect) y productos que contienen cada una
+        self.words = sorted(postings)
+        self.postings = {word: frozenset(ids) for word, ids in postings.items()}
+
+    @classmethod
+    def build(cls, version=None):
+        products = Product.objects.values('id', 'name', 'slug', 'price')
+        return cls(list(products), version)
+
+    def _prefix_matches(self, prefix):
+        matches = []
+        position = bisect_left(self.words, prefix)
+        while position < len(self.words) and self.words[position].startswith(prefix):
+            matches.append(self.postings[self.words[position]])
+            position += 1
+        if len(matches) == 1:
+            return matches[0]
+        return frozenset().union(*matches)
+
+    def matching_ids(self, query):
+        """Ids de los productos en los que cada término es prefijo de alguna palabra"""
+        terms = words(query)
+        if not terms:
+            return frozenset()
+
+        # Empezar por el término más largo: es el que menos coincidencias tiene
+        terms.sort(key=len, reverse=True)
+        ids = self._prefix_matches(terms[0])
+        for term in terms[1:]:
+            if not ids:
+                break
+            ids = ids & self._prefix_matches(term)
+        return ids
+
+    def search(self, query, limit=10):
+        """Productos que coinciden con la consulta, para mostrar como sugerencias"""
+        ids = self.matching_ids(query)
+        if not ids:
+            return []
+
+        folded_query = ' '.join(words(query))
+        # Primero los nombres que empiezan con la consulta, luego alfabético
+        matches = heapq.nsmallest(
+            limit,
+            (self.products[product_id] for product_id in ids),
+            key=lambda p: (not p['folded'].startswith(folded_query), p['folded']),
+        )
+        return [
+            {'id': p['id'], 'name': p['name'], 'slug': p['slug'], 'price': p['price']}
+            for p in matches
+        ]
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_index():
+    """Índice del proceso, reconstruido si cambió la versión del catálogo"""
+    global _index
+    version = catalog_version()
+    index = _index
+    if index is None or index.version != version:
+        with _lock:
+            if _index is None or _index.version != version:
+                _index = ProductIndex.build(version)
+            index = _index
+    return index
+
+
+def suggest(query, limit=10):
+    return get_index().search(query, min(limit, MAX_RESULTS))
@@ -0,0 +1,346 @@
+# MainApp/columnar.py
+#
+# Motor analítico en memoria (opcional) para los reportes de pedidos.
+#
+# Carga los hechos de Order en columnas NumPy compactas (estado, plataforma y
+# pago como códigos enteros pequeños, fecha como días desde epoch, precio como
+# entero) y responde con operaciones vectorizadas los mismos agrupamientos y
+# top-N que MainApp/analytics.py resuelve con SQL. Se refresca de forma
+# incremental con marcas de agua de id (pedidos nuevos) y de `updated`
+# (pedidos modificados); si detecta borrados recarga todo.
+#
+# Se activa con ORDER_COLUMNAR_ENGINE['ENABLED'] y requiere numpy; si no está
+# disponible, o si las columnas superan MAX_BYTES, los reportes usan SQL.
+
+import logging
+import threading
+import time
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Order, Product
+
+try:
+    import numpy as np
+except ImportError:  # numpy es opcional
+    np = None
+
+logger = logging.getLogger(__name__)
+
+STATUS_CODES = {value: code for code, (value, _) in enumerate(Order.STATUS_CHOICES)}
+PLATFORM_CODES = {value: code for code, (value, _) in enumerate(Order.PLATFORM_CHOICES)}
+PAYMENT_CODES = {value: code for code, (value, _) in enumerate(Order.PAYMENT_STATUS)}
+FIELD_CHOICES = {
+    'status': Order.STATUS_CHOICES,
+    'platform': Order.PLATFORM_CHOICES,
+    'payment_status': Order.PAYMENT_STATUS,
+}
+
+# Código para valores fuera de las opciones del modelo y para "sin producto"
+UNKNOWN = -1
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Bytes por pedido: id, created_ts, created_day, 3 códigos, precio, producto
+ROW_BYTES = 8 + 8 + 4 + 1 + 1 + 1 + 8 + 4
+
+LOAD_FIELDS = ('id', 'created', 'updated', 'status', 'platform', 'payment_status',
+               'total_price', 'product_ref_id')
+
+
+def _epoch_day(value):
+    """Día local (zona horaria del proyecto) como días desde 1970-01-01"""
+    return timezone.localtime(value).date().toordinal() - EPOCH_ORDINAL
+
+
+class OrderColumns:
+    """Instantánea inmutable de las columnas de pedidos (ordenadas por id)"""
+
+    __slots__ = ('ids', 'created_ts', 'created_day', 'status', 'platform',
+                 'payment_status', 'price', 'product')
+
+    def __init__(self, rows):
+        n = len(rows)
+        self.ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=n)
+        self.created_ts = np.fromiter((r[1].timestamp() for r in rows), dtype=np.int64, count=n)
+        self.created_day = np.fromiter((_epoch_day(r[1]) for r in rows), dtype=np.int32, count=n)
+        self.status = np.fromiter((STATUS_CODES.get(r[3], UNKNOWN) for r in rows), dtype=np.int8, count=n)
+        self.platform = np.fromiter((PLATFORM_CODES.get(r[4], UNKNOWN) for r in rows), dtype=np.int8, count=n)
+        self.payment_status = np.fromiter((PAYMENT_CODES.get(r[5], UNKNOWN) for r in rows), dtype=np.int8, count=n)
+        self.price = np.fromiter((r[6] for r in rows), dtype=np.int64, count=n)
+        self.product = np.fromiter(
+            (r[7] if r[7] is not None else UNKNOWN for r in rows), dtype=np.int32, count=n
+        )
+
+    @classmethod
+    def empty(cls):
+        return cls([])
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.__slots__)
+
+    def merged(self, rows):
+        """Nueva instantánea con las filas nuevas añadidas y las modificadas reemplazadas"""
+        if not rows:
+            return self
+        changes = OrderColumns(rows)
+        positions = np.searchsorted(self.ids, changes.ids)
+        if len(self.ids):
+            existing = self.ids[np.minimum(positions, len(self.ids) - 1)] == changes.ids
+        else:
+            existing = np.zeros(len(changes), dtype=bool)
+
+        result = OrderColumns.empty()
+        for name in self.__slots__:
+            column = getattr(self, name).copy()
+            new_values = getattr(changes, name)
+            column[positions[existing]] = new_values[existing]
+            setattr(result, name, np.concatenate([column, new_values[~existing]]))
+
+        if (~existing).any():
+            order = np.argsort(result.ids, kind='stable')
+            for name in self.__slots__:
+                setattr(result, name, getattr(result, name)[order])
+        return result
+
+
+class OrderSlice:
+    """Subconjunto filtrado de las columnas (equivalente a un QuerySet de Order)"""
+
+    def __init__(self, columns, mask=None):
+        self.columns = columns
+        self.mask = np.ones(len(columns), dtype=bool) if mask is None else mask
+
+    def filter(self, status=None, platform=None, date_from=None, date_to=None, exclude_status=None):
+        c = self.columns
+        mask = self.mask.copy()
+        if status:
+            mask &= c.status == STATUS_CODES.get(status, UNKNOWN - 1)
+        if exclude_status:
+            mask &= c.status != STATUS_CODES.get(exclude_status, UNKNOWN - 1)
+        if platform:
+            mask &= c.platform == PLATFORM_CODES.get(platform, UNKNOWN - 1)
+        if date_from:
+            if isinstance(date_from, datetime):
+                mask &= c.created_ts >= int(date_from.timestamp())
+            else:
+                mask &= c.created_day >= date_from.toordinal() - EPOCH_ORDINAL
+        if date_to:
+            if isinstance(date_to, datetime):
+                mask &= c.created_ts <= int(date_to.timestamp())
+            else:
+                mask &= c.created_day <= date_to.toordinal() - EPOCH_ORDINAL
+        return OrderSlice(c, mask)
+
+    def count(self):
+        return int(self.mask.sum())
+
+    def totals(self):
+        count = self.count()
+        revenue = int(self.columns.price[self.mask].sum())
+        return {
+            'orders': count,
+            'revenue': revenue,
+            'avg_order_value': revenue / count if count else 0,
+        }
+
+    def counts_by(self, field, count_key='total'):
+        codes = getattr(self.columns, field)[self.mask]
+        labels = [value for value, _ in FIELD_CHOICES[field]]
+        counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+        order = np.argsort(-counts, kind='stable')
+        return [{field: labels[i], count_key: int(counts[i])} for i in order if counts[i] > 0]
+
+    def product_totals(self):
+        """(ids de producto, pedidos, ingresos) de los pedidos con producto"""
+        products = self.columns.product[self.mask]
+        prices = self.columns.price[self.mask]
+        has_product = products != UNKNOWN
+        ids, inverse, counts = np.unique(products[has_product], return_inverse=True, return_counts=True)
+        revenue = np.bincount(inverse, weights=prices[has_product], minlength=len(ids))
+        return ids, counts, revenue
+
+    def grouped_products(self, fields, limit=None, count_key='total_orders', revenue_key=None,
+                         avg_key=None):
+        """Top-N agrupado por campos de product_ref (mismo formato que values().annotate())"""
+        ids, counts, revenue = self.product_totals()
+        lookups = [field.replace('product_ref__', '', 1) for field in fields]
+        info = {
+            row['id']: row
+            for row in Product.objects.filter(id__in=ids.tolist()).values(*{'id', *lookups})
+        }
+
+        groups = {}
+        for product_id, n, amount in zip(ids.tolist(), counts.tolist(), revenue.tolist()):
+            row = info.get(product_id)
+            if row is None:
+                continue
+            key = tuple(row[lookup] for lookup in lookups)
+            group = groups.setdefault(key, [0, 0])
+            group[0] += n
+            group[1] += int(amount)
+
+        ranked = sorted(groups.items(), key=lambda item: -item[1][0])
+        if limit is not None:
+            ranked = ranked[:limit]
+
+        result = []
+        for key, (n, amount) in ranked:
+            item = dict(zip(fields, key))
+            item[count_key] = n
+            if revenue_key:
+                item[revenue_key] = amount
+            if avg_key:
+                item[avg_key] = amount // n if n else None
+            result.append(item)
+        return result
+
+    def time_series(self, bucket, start, end, label_key='period', count_key='total', revenue_key=None):
+        start_day = start.toordinal() - EPOCH_ORDINAL
+        end_day = end.toordinal() - EPOCH_ORDINAL
+        narrowed = self.filter(date_from=start, date_to=end)
+        days = self.columns.created_day[narrowed.mask]
+        prices = self.columns.price[narrowed.mask]
+
+        if bucket in ('month', 'year'):
+            unit = 'M' if bucket == 'month' else 'Y'
+            to_bucket = lambda d: np.asarray(d, dtype='datetime64[D]').astype(f'datetime64[{unit}]').astype(np.int64)
+            first, last = int(to_bucket(start_day)), int(to_bucket(end_day))
+            label = lambda i: str(np.datetime64(i, unit))
+        elif bucket == 'week':
+            # 1970-01-01 fue jueves: las semanas ISO empiezan 3 días antes
+            to_bucket = lambda d: (np.asarray(d, dtype=np.int64) + 3) // 7
+            first, last = int(to_bucket(start_day)), int(to_bucket(end_day))
+            label = lambda i: str(np.datetime64(i * 7 - 3, 'D'))
+        else:
+            to_bucket = lambda d: np.asarray(d, dtype=np.int64)
+            first, last = start_day, end_day
+            label = lambda i: str(np.datetime64(i, 'D'))
+
+        index = to_bucket(days) - first
+        size = last - first + 1
+        counts = np.bincount(index, minlength=size)
+        revenue = np.bincount(index, weights=prices, minlength=size) if revenue_key else None
+
+        series = []
+        for i in range(size):
+            item = {label_key: label(first + i), count_key: int(counts[i])}
+            if revenue_key:
+                item[revenue_key] = int(revenue[i])
+            series.append(item)
+        return series
+
+    def period_summary(self, periods, status_counts=()):
+        c = self.columns
+        summary = {}
+        for name, since in periods.items():
+            mask = self.mask & (c.created_ts >= int(since.timestamp()))
+            summary[name] = {'orders': int(mask.sum()), 'revenue': int(c.price[mask].sum())}
+        summary['by_status'] = {
+            status: int((self.mask & (c.status == STATUS_CODES.get(status, UNKNOWN - 1))).sum())
+            for status in status_counts
+        }
+        return summary
+
+
+class ColumnarEngine:
+    """Columnas de pedidos de este proceso con refresco incremental"""
+
+    def __init__(self, max_bytes, refresh_interval):
+        self.max_bytes = max_bytes
+        self.refresh_interval = refresh_interval
+        self.columns = OrderColumns.empty()
+        self.max_id = 0
+        self.updated_watermark = None
+        self.last_refresh = 0.0
+        self.over_budget = False
+        self._lock = threading.Lock()
+
+    def _fetch(self, queryset):
+        return list(queryset.order_by('id').values_list(*LOAD_FIELDS))
+
+    def reload(self):
+        self.columns = OrderColumns.empty()
+        self.max_id = 0
+        self.updated_watermark = None
+        # Comprobar el presupuesto antes de cargar nada
+        if Order.objects.count() * ROW_BYTES > self.max_bytes:
+            return
+        rows = self._fetch(Order.objects.all())
+        self.columns = OrderColumns(rows)
+        self._advance(rows)
+
+    def _advance(self, rows):
+        if rows:
+            self.max_id = max(self.max_id, max(r[0] for r in rows))
+            newest = max(r[2] for r in rows)
+            if self.updated_watermark is None or newest > self.updated_watermark:
+                self.updated_watermark = newest
+
+    def refresh(self, force=False):
+        """Traer pedidos nuevos/modificados desde las marcas de agua (como mucho cada refresh_interval)"""
+        now = time.monotonic()
+        if not force and now - self.last_refresh < self.refresh_interval:
+            return
+        with self._lock:
+            if not force and now - self.last_refresh < self.refresh_interval:
+                return
+
+            if self.updated_watermark is None:
+                self.reload()
+            else:
+                changed = Q(id__gt=self.max_id) | Q(updated__gte=self.updated_watermark)
+                rows = self._fetch(Order.objects.filter(changed))
+                columns = self.columns.merged(rows)
+                if Order.objects.count() != len(columns):
+                    # Hubo borrados: recargar todo
+                    self.reload()
+                else:
+                    self.columns = columns
+                    self._advance(rows)
+
+            self.last_refresh = time.monotonic()
+            over_budget = self.updated_watermark is None and Order.objects.exists() \
+                or self.columns.nbytes > self.max_bytes
+            if over_budget and not self.over_budget:
+                logger.warning(
+                    "Motor columnar desactivado: los pedidos superan el presupuesto de %s bytes",
+                    self.max_bytes,
+                )
+            self.over_budget = over_budget
+            if over_budget:
+                self.columns = OrderColumns.empty()
+                self.updated_watermark = None
+                self.max_id = 0
+
+    def slice(self):
+        return OrderSlice(self.columns)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Motor del proceso ya refrescado, o None si está desactivado o no disponible"""
+    global _engine
+    config = settings.ORDER_COLUMNAR_ENGINE
+    if not config['ENABLED'] or np is None:
+        return None
+
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = ColumnarEngine(config['MAX_BYTES'], config['REFRESH_INTERVAL'])
+
+    if _engine.over_budget and time.monotonic() - _engine.last_refresh < _engine.refresh_interval:
+        return None
+    _engine.refresh()
+    return None if _engine.over_budget else _engine
@@ -0,0 +1,157 @@
+# MainApp/counters.py
+#
+# Contadores de pedidos por producto y por categoría (ProductOrderStats y
+# CategoryOrderStats). Se mantienen desde signals.py dentro de la misma
+# transacción que el pedido, así los rankings de "más solicitados" son un
+# ORDER BY ... LIMIT indexado sobre una tabla pequeña en vez de un GROUP BY
+# sobre todos los pedidos. reconcile_order_stats los recalcula desde cero.
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import ArchivedOrder, CategoryOrderStats, Order, Product, ProductOrderStats
+
+COUNTER_FIELDS = ('order_count', 'active_count', 'revenue')
+
+
+def _contribution(values):
+    """(producto, cuenta como activo, precio) de un pedido, o None si no suma"""
+    if not values or values.get('product_ref_id') is None:
+        return None
+    return (values['product_ref_id'], values['status'] != 'cancelada', values['total_price'] or 0)
+
+
+def _bump(model, lookup, orders, active, revenue):
+    changes = {}
+    if orders:
+        changes['order_count'] = F('order_count') + orders
+    if active:
+        changes['active_count'] = F('active_count') + active
+    if revenue:
+        changes['revenue'] = F('revenue') + revenue
+    if not changes:
+        return
+    if not model.objects.filter(**lookup).update(**changes):
+        model.objects.get_or_create(**lookup)
+        model.objects.filter(**lookup).update(**changes)
+
+
+def orders_changed(changes):
+    """
+    Ajustar los contadores de varios pedidos a la vez.
+
+    changes: pares (old, new) de diccionarios con Order.TRACKED_FIELDS
+    (None = no existía / ya no existe). Se acumulan las diferencias y se
+    aplica un UPDATE por producto y por categoría afectados.
+    """
+    deltas = {}
+    for old, new in changes:
+        for contribution, sign in ((_contribution(old), -1), (_contribution(new), 1)):
+            if contribution is None:
+                continue
+            product_id, active, price = contribution
+            delta = deltas.setdefault(product_id, [0, 0, 0])
+            delta[0] += sign
+            delta[1] += sign if active else 0
+            delta[2] += sign * price
+
+    deltas = {product_id: delta for product_id, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+
+    categories = dict(Product.objects.filter(pk__in=deltas).values_list('id', 'category_id'))
+    category_deltas = {}
+    with transaction.atomic():
+        for product_id, delta in deltas.items():
+            _bump(ProductOrderStats, {'product_id': product_id}, *delta)
+            category_id = categories.get(product_id)
+            if category_id is not None:
+                total = category_deltas.setdefault(category_id, [0, 0, 0])
+                for i, value in enumerate(delta):
+                    total[i] += value
+        for category_id, delta in category_deltas.items():
+            _bump(CategoryOrderStats, {'category_id': category_id}, *delta)
+
+
+def order_changed(old, new):
+    """
+    Ajustar los contadores cuando un pedido pasa de `old` a `new`.
+
+    old/new: diccionarios con Order.TRACKED_FIELDS (None = no existía / ya no existe).
+    """
+    orders_changed([(old, new)])
+
+
+def product_category_changed(product_id, old_category_id, new_category_id):
+    """Mover los contadores de un producto a su nueva categoría"""
+    stats = ProductOrderStats.objects.filter(product_id=product_id).first()
+    if stats is None:
+        return
+    with transaction.atomic():
+        if old_category_id is not None:
+            _bump(CategoryOrderStats, {'category_id': old_category_id},
+                  -stats.order_count, -stats.active_count, -stats.revenue)
+        if new_category_id is not None:
+            _bump(CategoryOrderStats, {'category_id': new_category_id},
+                  stats.order_count, stats.active_count, stats.revenue)
+
+
+def product_deleted(product_id, category_id):
+    """Quitar de la categoría lo que aportaba un producto eliminado"""
+    product_category_changed(product_id, category_id, None)
+
+
+def expected_counters():
+    """Contadores recalculados desde Order y ArchivedOrder: ({product_id: (...)}, {category_id: (...)})"""
+    products, categories = {}, {}
+    # Los pedidos archivados siguen contando (ver archive.py)
+    for model in (Order, ArchivedOrder):
+        rows = (
+            model.objects.filter(product_ref__isnull=False)
+            .values('product_ref_id', 'product_ref__category_id')
+            .annotate(
+                order_count=Count('id'),
+                active_count=Count('id', filter=~Q(status='cancelada')),
+                revenue=Sum('total_price'),
+            )
+        )
+        for row in rows:
+            values = (row['order_count'], row['active_count'], row['revenue'] or 0)
+            product = products.setdefault(row['product_ref_id'], [0, 0, 0])
+            category = categories.setdefault(row['product_ref__category_id'], [0, 0, 0])
+            for i, value in enumerate(values):
+                product[i] += value
+                category[i] += value
+    return (
+        {key: tuple(value) for key, value in products.items()},
+        {key: tuple(value) for key, value in categories.items()},
+    )
+
+
+def current_counters():
+    products = {
+        row[0]: tuple(row[1:])
+        for row in ProductOrderStats.objects.values_list('product_id', *COUNTER_FIELDS)
+    }
+    categories = {
+        row[0]: tuple(row[1:])
+        for row in CategoryOrderStats.objects.values_list('category_id', *COUNTER_FIELDS)
+    }
+    return products, categories
+
+
+def rebuild():
+    """Reescribir ambas tablas de contadores desde los pedidos"""
+    products, categories = expected_counters()
+    with transaction.atomic():
+        ProductOrderStats.objects.all().delete()
+        CategoryOrderStats.objects.all().delete()
+        ProductOrderStats.objects.bulk_create(
+            ProductOrderStats(product_id=key, **dict(zip(COUNTER_FIELDS, values)))
+            for key, values in products.items()
+        )
+        CategoryOrderStats.objects.bulk_create(
+            CategoryOrderStats(category_id=key, **dict(zip(COUNTER_FIELDS, values)))
+            for key, values in categories.items()
+        )
+    return products, categories
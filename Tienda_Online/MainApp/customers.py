@@ -0,0 +1,132 @@
+# MainApp/customers.py
+#
+# Claves normalizadas de cliente para buscar pedidos con índice en vez de
+# icontains: email en minúsculas, solo los dígitos del teléfono y el usuario
+# de red social. Order.save() las completa; los pedidos anteriores a las
+# columnas los llena la migración 0016 (con su propia copia de estas
+# funciones); backfill_keys() lo repite con `manage.py backfill_customer_keys`.
+#
+# El campo Order.phone es libre ("Teléfono / Red social"): puede traer un
+# número en cualquier formato, un @usuario o el enlace a un perfil.
+
+import re
+
+from django.db import connections, transaction
+
+# Código de país que se quita para que '+56 9 1234 5678' y '9 1234 5678' coincidan
+PHONE_COUNTRY_CODE = '56'
+PHONE_NATIONAL_DIGITS = 9
+
+MIN_PHONE_DIGITS = 6
+
+# Columnas de Order y ArchivedOrder (Order.CUSTOMER_KEY_FIELDS)
+KEY_FIELDS = ('email_normalized', 'phone_digits', 'social_handle')
+
+_profile_url = re.compile(
+    r'^(?:https?://)?(?:www\.|m\.)?'
+    r'(?:instagram\.com|facebook\.com|fb\.com|tiktok\.com/@?|twitter\.com|x\.com|t\.me)/'
+    r'@?([\w.]+)', re.IGNORECASE,
+)
+_handle = re.compile(r'^@?([A-Za-z0-9_.]{2,60})$')
+_letters = re.compile(r'[^\W\d_]')
+
+
+def normalize_email(value):
+    return (value or '').strip().lower()
+
+
+def normalize_phone(value):
+    """Dígitos del teléfono sin código de país ('' si el texto no es un teléfono)"""
+    value = (value or '').strip()
+    if not value or _letters.search(value):
+        return ''
+    digits = re.sub(r'\D', '', value)
+    if digits.startswith('00'):
+        digits = digits[2:]
+    if len(digits) == len(PHONE_COUNTRY_CODE) + PHONE_NATIONAL_DIGITS and digits.startswith(PHONE_COUNTRY_CODE):
+        digits = digits[len(PHONE_COUNTRY_CODE):]
+    return digits if len(digits) >= MIN_PHONE_DIGITS else ''
+
+
+def normalize_handle(value):
+    """Usuario de red social en minúsculas y sin '@' ('' si el texto no lo es)"""
+    value = (value or '').strip()
+    match = _profile_url.match(value)
+    if match:
+        return match[1].strip('.').lower()
+    match = _handle.match(value)
+    if match and _letters.search(value):
+        return match[1].lower()
+    return ''
+
+
+def customer_keys(email, phone):
+    """Valores de Order.email_normalized, phone_digits y social_handle"""
+    return {
+        'email_normalized': normalize_email(email),
+        'phone_digits': normalize_phone(phone),
+        'social_handle': normalize_handle(phone),
+    }
+
+
+def lookup_from_params(params):
+    """
+    Filtro de historial de cliente desde email/phone/handle ({} si no hay ninguno).
+
+    Con varios parámetros se combinan con OR: cualquier pedido que coincida en
+    alguna de las claves pertenece al cliente.
+    """
+    lookup = {}
+    email = normalize_email(params.get('email'))
+    if email:
+        lookup['email_normalized'] = email
+    phone = normalize_phone(params.get('phone'))
+    if phone:
+        lookup['phone_digits'] = phone
+    handle = normalize_handle(params.get('handle'))
+    if handle:
+        lookup['social_handle'] = handle
+    return lookup
+
+
+def backfill_keys(model, batch_size=5000, dry_run=False, using='default'):
+    """
+    Recalcular las claves de `model` (Order o ArchivedOrder) por rangos de id,
+    escribiendo solo las filas que cambian. Genera (último id del lote,
+    revisados, a actualizar).
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    meta = model._meta
+    # UPDATE ... WHERE id = %s con executemany: bulk_update arma un CASE por
+    # fila y en tablas grandes es ~25 veces más lento
+    update_sql = (
+        f"UPDATE {quote(meta.db_table)} "
+        f"SET {', '.join(f'{quote(meta.get_field(name).column)} = %s' for name in KEY_FIELDS)} "
+        f"WHERE {quote(meta.pk.column)} = %s"
+    )
+    last_id, scanned, changed = 0, 0, 0
+
+    while True:
+        rows = list(
+            model._default_manager.using(using).filter(pk__gt=last_id).order_by('pk')
+            .values_list('pk', 'email', 'phone', *KEY_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        scanned += len(rows)
+
+        updates = []
+        for pk, email, phone, *stored in rows:
+            keys = customer_keys(email, phone)
+            values = [keys[name] for name in KEY_FIELDS]
+            if values != stored:
+                updates.append((*values, pk))
+
+        changed += len(updates)
+        if updates and not dry_run:
+            # Sin save() ni señales: los contadores y eventos no cambian
+            with transaction.atomic(using=using), connection.cursor() as cursor:
+                cursor.executemany(update_sql, updates)
+        yield last_id, scanned, changed
@@ -0,0 +1,190 @@
+# MainApp/events.py
+#
+# Eventos en vivo de pedidos (server-sent events).
+#
+# Cada cambio de estado se guarda como una fila OrderEvent. En cada worker un
+# único broker consulta esa tabla por marca de agua de id (una consulta por
+# intervalo, sin importar cuántos clientes estén conectados) y reparte los
+# eventos a las colas de los streams SSE abiertos en ese worker.
+#
+# Los streams son infinitos: solo se publican con el perfil ASGI
+# (settings.ASYNC_VIEWS, ver urls.py). Bajo WSGI cada uno retendría un hilo
+# para siempre; ahí las páginas sondean order_status cada
+# ORDER_EVENTS_FALLBACK_POLL_SECONDS.
+
+import asyncio
+import json
+import logging
+import weakref
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Order, OrderEvent
+
+logger = logging.getLogger(__name__)
+
+# Tópico con todos los pedidos (dashboard del personal)
+ALL_ORDERS = 'orders'
+
+# Cada cuántas consultas se eliminan los eventos antiguos
+PRUNE_EVERY = 300
+
+STATUS_LABELS = dict(Order.STATUS_CHOICES)
+PAYMENT_LABELS = dict(Order.PAYMENT_STATUS)
+
+
+def order_topic(token):
+    """Tópico de un pedido concreto (página de seguimiento)"""
+    return f'order:{token}'
+
+
+def publish_order_change(order):
+    """Publicar el estado actual del pedido para los streams de todos los workers"""
+    OrderEvent.objects.create(
+        order_id=order.pk,
+        token=order.token,
+        status=order.status,
+        payment_status=order.payment_status,
+    )
+
+
+def publish_order_changes(orders):
+    """publish_order_change() para varios pedidos (diccionarios con id, token, status, payment_status)"""
+    OrderEvent.objects.bulk_create([
+        OrderEvent(
+            order_id=order['id'],
+            token=order['token'],
+            status=order['status'],
+            payment_status=order['payment_status'],
+        )
+        for order in orders
+    ])
+
+
+def event_payload(obj):
+    """Datos enviados al cliente (acepta un OrderEvent o un Order)"""
+    order_id = obj.order_id if isinstance(obj, OrderEvent) else obj.pk
+    return {
+        'order_id': order_id,
+        'token': str(obj.token),
+        'status': obj.status,
+        'status_display': STATUS_LABELS.get(obj.status, obj.status),
+        'payment_status': obj.payment_status,
+        'payment_status_display': PAYMENT_LABELS.get(obj.payment_status, obj.payment_status),
+    }
+
+
+def format_sse(event, data):
+    """Serializar un mensaje en formato text/event-stream"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class _LoopState:
+    """Suscriptores, tarea de sondeo y marca de agua de un event loop"""
+
+    def __init__(self):
+        self.subscribers = {}
+        self.task = None
+        self.last_id = None
+
+
+class OrderEventBroker:
+    """
+    Reparte los eventos de pedidos a los suscriptores SSE de este worker.
+
+    Las colas y la tarea de sondeo pertenecen al event loop que las creó.
+    Bajo ASGI hay uno por worker; si otro loop se suscribe (por ejemplo un
+    async_to_sync) tiene su propio estado y no descarta el de los demás.
+    """
+
+    def __init__(self):
+        self._states = weakref.WeakKeyDictionary()
+
+    def _state(self):
+        loop = asyncio.get_running_loop()
+        state = self._states.get(loop)
+        if state is None:
+            state = self._states[loop] = _LoopState()
+        return loop, state
+
+    def subscribe(self, topic):
+        """Registrar una cola para el tópico y arrancar el sondeo si hace falta"""
+        loop, state = self._state()
+        queue = asyncio.Queue(maxsize=100)
+        state.subscribers.setdefault(topic, set()).add(queue)
+
+        if state.task is None or state.task.done():
+            state.task = loop.create_task(self._poll(state))
+        return queue
+
+    def unsubscribe(self, topic, queue):
+        _, state = self._state()
+        queues = state.subscribers.get(topic)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del state.subscribers[topic]
+
+    async def _poll(self, state):
+        if state.last_id is None:
+            last_id = await OrderEvent.objects.order_by('-id').values_list('id', flat=True).afirst()
+            state.last_id = last_id or 0
+
+        polls = 0
+        while state.subscribers:
+            try:
+                async for event in OrderEvent.objects.filter(id__gt=state.last_id).order_by('id')[:500]:
+                    state.last_id = event.id
+                    self._dispatch(state, event)
+
+                polls += 1
+                if polls % PRUNE_EVERY == 0:
+                    await self._prune()
+            except Exception:
+                logger.exception("Error consultando eventos de pedidos")
+
+            await asyncio.sleep(settings.ORDER_EVENTS_POLL_INTERVAL)
+
+        # Sin suscriptores: el próximo stream vuelve a tomar la marca de agua actual
+        # (y el estado deja de referenciar al loop, que puede liberarse)
+        state.last_id = None
+        state.task = None
+
+    def _dispatch(self, state, event):
+        payload = event_payload(event)
+        for topic in (order_topic(event.token), ALL_ORDERS):
+            for queue in state.subscribers.get(topic, ()):
+                try:
+                    queue.put_nowait(payload)
+                except asyncio.QueueFull:
+                    # Cliente demasiado lento: recibirá el siguiente cambio
+                    pass
+
+    async def _prune(self):
+        cutoff = timezone.now() - timedelta(minutes=settings.ORDER_EVENTS_RETENTION_MINUTES)
+        await OrderEvent.objects.filter(created__lt=cutoff).adelete()
+
+
+broker = OrderEventBroker()
+
+
+async def event_stream(topic, initial=None):
+    """Generador async de un stream SSE para el tópico dado"""
+    queue = broker.subscribe(topic)
+    try:
+        yield "retry: 5000\n\n"
+        if initial is not None:
+            yield format_sse('status', initial)
+
+        while True:
+            try:
+                payload = await asyncio.wait_for(queue.get(), settings.ORDER_EVENTS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                # Comentario SSE para mantener viva la conexión
+                yield ": ping\n\n"
+                continue
+            yield format_sse('status', payload)
+    finally:
+        broker.unsubscribe(topic, queue)
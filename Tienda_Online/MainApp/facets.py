@@ -0,0 +1,126 @@
+# MainApp/facets.py
+#
+# Conteos por faceta del catálogo (categoría, rango de precio y destacados)
+# para la búsqueda y los filtros actuales.
+#
+# Todo sale de una sola consulta agregada: los productos que cumplen la
+# búsqueda de texto se agrupan por (categoría, tramo de precio, destacado,
+# dentro del rango de precio pedido) y las facetas se suman en Python. Cada
+# faceta ignora su propio filtro (las categorías se cuentan con el filtro de
+# precio y sin el de categoría, y los tramos al revés), así la barra lateral
+# muestra cuántos productos habría al cambiar de categoría o de tramo.
+#
+# El resultado se guarda en caché con la versión del catálogo (ver
+# page_cache.py): cualquier cambio en productos o categorías lo invalida.
+
+import hashlib
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import BooleanField, Case, Count, IntegerField, Q, Value, When
+
+from .page_cache import catalog_version
+
+# Los precios tienen dos decimales: [desde, hasta) == [desde, hasta - 0.01]
+PRICE_STEP = Decimal('0.01')
+
+
+def parse_price(value):
+    """Precio de un parámetro de la URL, o None si falta o no es un número"""
+    if not value:
+        return None
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        return None
+    return price if price.is_finite() else None
+
+
+def price_filter(min_price=None, max_price=None):
+    condition = Q()
+    if min_price is not None:
+        condition &= Q(price__gte=min_price)
+    if max_price is not None:
+        condition &= Q(price__lte=max_price)
+    return condition
+
+
+def price_buckets():
+    """Tramos de precio como (desde, hasta) inclusivos; None = sin límite"""
+    edges = [Decimal(str(edge)) for edge in settings.CATALOG_FACETS['PRICE_BUCKETS']]
+    lows = [None, *edges]
+    highs = [edge - PRICE_STEP for edge in edges] + [None]
+    return list(zip(lows, highs))
+
+
+def _bucket_expression():
+    edges = settings.CATALOG_FACETS['PRICE_BUCKETS']
+    return Case(
+        *[When(price__lt=edge, then=Value(index)) for index, edge in enumerate(edges)],
+        default=Value(len(edges)),
+        output_field=IntegerField(),
+    )
+
+
+def compute_facets(products, category=None, min_price=None, max_price=None):
+    """
+    Facetas de `products` (ya filtrado por texto) para la categoría (slug) y
+    el rango de precio seleccionados. Una consulta.
+    """
+    in_price = price_filter(min_price, max_price)
+    if in_price:
+        in_price = Case(When(in_price, then=Value(True)), default=Value(False), output_field=BooleanField())
+    else:
+        in_price = Value(True, output_field=BooleanField())
+    rows = (
+        products.order_by()
+        .annotate(facet_bucket=_bucket_expression(), facet_in_price=in_price)
+        .values('category__slug', 'category__name', 'featured', 'facet_bucket', 'facet_in_price')
+        .annotate(count=Count('pk'))
+    )
+
+    categories = {}
+    buckets = [0] * len(price_buckets())
+    total = featured = 0
+    for row in rows:
+        slug, count = row['category__slug'], row['count']
+        entry = categories.setdefault(slug, {'slug': slug, 'name': row['category__name'], 'count': 0})
+        in_category = category is None or slug == category
+        if row['facet_in_price']:
+            entry['count'] += count
+        if in_category:
+            buckets[row['facet_bucket']] += count
+        if in_category and row['facet_in_price']:
+            total += count
+            if row['featured']:
+                featured += count
+
+    return {
+        'total': total,
+        'featured': featured,
+        'categories': sorted(categories.values(), key=lambda entry: entry['name']),
+        'price': [
+            {
+                'min': None if low is None else str(low),
+                'max': None if high is None else str(high),
+                'count': count,
+            }
+            for (low, high), count in zip(price_buckets(), buckets)
+        ],
+    }
+
+
+def catalog_facets(products, *key_parts, category=None, min_price=None, max_price=None):
+    """
+    compute_facets() en caché. `key_parts` identifica el filtro de texto
+    aplicado a `products` (por ejemplo ('q', 'mesa')).
+    """
+    parts = (*key_parts, category, min_price, max_price)
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    key = f'facets:{catalog_version()}:{digest}'
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(products, category, min_price, max_price)
+        cache.set(key, facets, settings.CATALOG_FACETS['CACHE_SECONDS'])
+    return facets
@@ -1,5 +1,30 @@
 from django import forms
-from .models import Order
+from django.urls import reverse_lazy
+from .models import Order, Product
+
+
+class ProductAutocompleteWidget(forms.Widget):
+    """
+    Campo de texto con sugerencias (ProductViewSet.autocomplete) y un input
+    oculto con el id. A diferencia de un <select>, no renderiza todo el
+    catálogo: el HTML del formulario no crece con la cantidad de productos.
+    """
+    template_name = 'MainApp/widgets/product_autocomplete.html'
+
+    class Media:
+        js = ['MainApp/js/autocomplete.js']
+
+    def __init__(self, attrs=None, url=reverse_lazy('product-autocomplete')):
+        super().__init__(attrs)
+        self.url = url
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        label = ''
+        if value:
+            label = Product.objects.filter(pk=value).values_list('name', flat=True).first() or ''
+        context['widget'].update({'label': label, 'url': str(self.url)})
+        return context
 
 class OrderRequestForm(forms.ModelForm):
     # Campo de subida de varias imágenes
@@ -27,7 +52,7 @@ class OrderRequestForm(forms.ModelForm):
             'customer_name': forms.TextInput(attrs={'class': 'form-control'}),
             'email': forms.EmailInput(attrs={'class': 'form-control'}),
             'phone': forms.TextInput(attrs={'class': 'form-control'}),
-            'product_ref': forms.Select(attrs={'class': 'form-select'}),
+            'product_ref': ProductAutocompleteWidget(attrs={'class': 'form-control'}),
         }
 
     def clean_reference_images(self):
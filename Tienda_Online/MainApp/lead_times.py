@@ -0,0 +1,195 @@
+# MainApp/lead_times.py
+#
+# Historial de estados de pedidos (OrderStatusChange) y tiempos por estado.
+#
+# Cada cambio de estado guarda cuánto estuvo el pedido en el estado que deja
+# (duration_seconds), así los percentiles por estado y plataforma solo leen
+# esa columna en vez de reconstruir el historial. El resumen se guarda en la
+# caché y de sus medianas salen las fechas estimadas de OrderSerializer.
+
+from datetime import timedelta
+from math import ceil
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max, OuterRef, Subquery
+from django.utils import timezone
+
+from . import single_flight
+from .models import Order, OrderStatusChange
+
+# Estados que recorre un pedido hasta quedar realizado
+STATUS_FLOW = ('solicitado', 'aprobado', 'en_proceso', 'realizada')
+
+PERCENTILES = (50, 75, 90)
+
+STATUS_LABELS = dict(Order.STATUS_CHOICES)
+STATUS_ORDER = {status: index for index, status in enumerate(STATUS_LABELS)}
+
+
+def record_status_change(order, previous_status=''):
+    """Registrar el estado actual del pedido y el tiempo pasado en previous_status"""
+    # No order.updated: cualquier otro cambio del pedido también lo mueve
+    changed = timezone.now() if previous_status else (order.created or timezone.now())
+    duration = None
+    if previous_status:
+        entered = (
+            OrderStatusChange.objects.filter(order_id=order.pk)
+            .order_by('-changed', '-id')
+            .values_list('changed', flat=True)
+            .first()
+        ) or order.created
+        duration = max(int((changed - entered).total_seconds()), 0)
+
+    # Mantener al día la anotación de with_status_entered() (p. ej. tras un PUT)
+    order.status_entered = changed
+    return OrderStatusChange.objects.create(
+        order_id=order.pk,
+        from_status=previous_status,
+        to_status=order.status,
+        platform=order.platform,
+        changed=changed,
+        duration_seconds=duration,
+    )
+
+
+def record_status_changes(orders, new_status, changed):
+    """
+    record_status_change() para varios pedidos (actualizaciones masivas).
+
+    orders: diccionarios con id, status (el anterior), platform y created.
+    Dos consultas en total: la última entrada de cada pedido y el bulk_create.
+    """
+    ids = [order['id'] for order in orders]
+    entered = dict(
+        OrderStatusChange.objects.filter(order_id__in=ids)
+        .values('order_id')
+        .annotate(last=Max('changed'))
+        .values_list('order_id', 'last')
+    )
+    return OrderStatusChange.objects.bulk_create([
+        OrderStatusChange(
+            order_id=order['id'],
+            from_status=order['status'],
+            to_status=new_status,
+            platform=order['platform'],
+            changed=changed,
+            duration_seconds=max(
+                int((changed - (entered.get(order['id']) or order['created'])).total_seconds()), 0
+            ),
+        )
+        for order in orders
+    ])
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano de una lista ordenada"""
+    index = max(ceil(pct / 100 * len(values)) - 1, 0)
+    return values[index]
+
+
+def _summary(durations):
+    durations.sort()
+    summary = {'count': len(durations)}
+    for pct in PERCENTILES:
+        summary[f'p{pct}_seconds'] = percentile(durations, pct)
+    return summary
+
+
+def compute_lead_times(days):
+    """Percentiles del tiempo en cada estado, en general y por plataforma"""
+    since = timezone.now() - timedelta(days=days)
+    rows = (
+        OrderStatusChange.objects
+        .filter(changed__gte=since, duration_seconds__isnull=False)
+        .values_list('from_status', 'platform', 'duration_seconds')
+    )
+
+    by_status, by_platform = {}, {}
+    for status, platform, seconds in rows.iterator(chunk_size=5000):
+        by_status.setdefault(status, []).append(seconds)
+        by_platform.setdefault((status, platform), []).append(seconds)
+
+    statuses, medians = [], {}
+    for status in sorted(by_status, key=lambda s: STATUS_ORDER.get(s, len(STATUS_ORDER))):
+        item = {'status': status, 'status_display': STATUS_LABELS.get(status, status)}
+        item.update(_summary(by_status[status]))
+        medians[status] = item['p50_seconds']
+
+        item['platforms'] = []
+        for (key, platform), durations in sorted(by_platform.items()):
+            if key == status:
+                row = {'platform': platform, **_summary(durations)}
+                medians[f'{status}:{platform}'] = row['p50_seconds']
+                item['platforms'].append(row)
+        statuses.append(item)
+
+    return {
+        'window_days': days,
+        'generated': timezone.now().isoformat(),
+        'statuses': statuses,
+        'medians': medians,
+    }
+
+
+def lead_time_stats(days=None):
+    """compute_lead_times() guardado en la caché por ORDER_LEAD_TIMES['CACHE_SECONDS']"""
+    config = settings.ORDER_LEAD_TIMES
+    days = days or config['WINDOW_DAYS']
+    key = f'order-lead-times:{days}'
+    stats = cache.get(key)
+    if stats is None:
+        # Misses simultáneos (varias peticiones o workers) recorren el historial una sola vez
+        stats = single_flight.coalesced(f'singleflight:{key}', lambda: compute_lead_times(days))
+        cache.set(key, stats, config['CACHE_SECONDS'])
+    return stats
+
+
+def with_status_entered(queryset):
+    """Anotar status_entered: cuándo entró cada pedido a su estado actual (una subconsulta)"""
+    entered = (
+        OrderStatusChange.objects
+        .filter(order_id=OuterRef('pk'), to_status=OuterRef('status'))
+        .order_by('-changed', '-id')
+        .values('changed')[:1]
+    )
+    return queryset.annotate(status_entered=Subquery(entered))
+
+
+def status_entered(order):
+    """Último cambio al estado actual del pedido (anotado o consultado); su creación si no hay"""
+    if hasattr(order, 'status_entered'):
+        entered = order.status_entered
+    else:
+        entered = (
+            OrderStatusChange.objects.filter(order_id=order.pk, to_status=order.status)
+            .order_by('-changed', '-id')
+            .values_list('changed', flat=True)
+            .first()
+        )
+    return entered or order.created
+
+
+def estimated_completion(order, medians=None):
+    """
+    Fecha estimada en que el pedido quedará 'realizada'.
+
+    Suma las medianas (de su plataforma si hay datos) de los estados que le
+    faltan, contando desde que entró a su estado actual (status_entered). None
+    si no hay datos. Para muchos pedidos, pasar `medians`
+    (lead_time_stats()['medians']) leído una sola vez y anotar el queryset con
+    with_status_entered().
+    """
+    if order.status not in STATUS_FLOW[:-1]:
+        return None
+
+    if medians is None:
+        medians = lead_time_stats()['medians']
+    remaining = 0
+    for status in STATUS_FLOW[STATUS_FLOW.index(order.status):-1]:
+        median = medians.get(f'{status}:{order.platform}', medians.get(status))
+        if median is None:
+            return None
+        remaining += median
+
+    return max(status_entered(order) + timedelta(seconds=remaining), timezone.now())
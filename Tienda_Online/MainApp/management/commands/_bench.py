@@ -0,0 +1,62 @@
+# Utilidades compartidas por los comandos bench_* (no es un comando).
+
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.utils import timezone
+
+from MainApp.models import Order, Product
+
+
+def timed(func, repeat):
+    """Ejecutar func `repeat` veces y devolver (mediana en ms, último resultado)"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+def seed_orders(count, days=730, batch_size=5000):
+    """
+    Insertar `count` pedidos sintéticos repartidos en los últimos `days` días.
+
+    Escribe en la base de datos configurada: usar solo en bases de prueba.
+    """
+    product_ids = list(Product.objects.values_list('id', flat=True)) or [None]
+    statuses = [value for value, _ in Order.STATUS_CHOICES]
+    platforms = [value for value, _ in Order.PLATFORM_CHOICES]
+    payments = [value for value, _ in Order.PAYMENT_STATUS]
+    now = timezone.now()
+    rng = random.Random(42)
+
+    created = 0
+    while created < count:
+        batch = []
+        for i in range(min(batch_size, count - created)):
+            n = created + i
+            batch.append(Order(
+                customer_name=f"Cliente {n % 5000}",
+                email=f"cliente{n % 5000}@example.com",
+                phone=f"+56 9 {n % 10000:04d} {n % 7919:04d}",
+                product_ref_id=rng.choice(product_ids + [None]),
+                platform=rng.choice(platforms),
+                status=rng.choice(statuses),
+                payment_status=rng.choice(payments),
+                total_price=rng.randint(1000, 90000),
+            ))
+            batch[-1].fill_customer_keys()
+        objs = Order.objects.bulk_create(batch)
+        # auto_now_add ignora valores explícitos: repartir las fechas después
+        for obj in objs:
+            if obj.pk is None:
+                break
+            obj.created = now - timedelta(days=rng.randint(0, days), seconds=rng.randint(0, 86399))
+        if objs and objs[0].pk is not None:
+            Order.objects.bulk_update(objs, ['created'], batch_size=batch_size)
+        created += len(batch)
+    return created
@@ -0,0 +1,41 @@
+"""
+Mover los pedidos cerrados antiguos (y sus imágenes) a las tablas de archivo.
+
+    python manage.py archive_orders                  # según ORDER_ARCHIVE
+    python manage.py archive_orders --months 6 --batch-size 500
+    python manage.py archive_orders --dry-run        # solo contar
+
+Solo se archivan los pedidos con estado en ORDER_ARCHIVE['STATUSES'] que no
+se modificaron en los últimos --months meses. Se puede interrumpir y volver
+a ejecutar: cada lote es una transacción.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from MainApp import archive
+
+
+class Command(BaseCommand):
+    help = "Archiva los pedidos cerrados sin cambios hace más de N meses"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=settings.ORDER_ARCHIVE['AFTER_MONTHS'])
+        parser.add_argument('--batch-size', type=int, default=settings.ORDER_ARCHIVE['BATCH_SIZE'])
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Contar los pedidos a archivar sin modificar la base de datos")
+
+    def handle(self, *args, **options):
+        before = archive.months_ago(options['months'])
+        self.stdout.write(f"Pedidos {', '.join(settings.ORDER_ARCHIVE['STATUSES'])} sin cambios desde {before:%Y-%m-%d}")
+
+        if options['dry_run']:
+            count = archive.candidates(before).count()
+            self.stdout.write(self.style.WARNING(f"{count} pedidos a archivar (--dry-run)"))
+            return
+
+        moved = 0
+        for last_id, count in archive.archive_orders(before, batch_size=options['batch_size']):
+            moved += count
+            self.stdout.write(f"  hasta id {last_id}: {moved} archivados")
+        self.stdout.write(self.style.SUCCESS(f"{moved} pedidos archivados"))
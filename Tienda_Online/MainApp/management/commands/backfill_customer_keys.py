@@ -0,0 +1,38 @@
+"""
+Completar las claves normalizadas de cliente (email_normalized, phone_digits,
+social_handle) de los pedidos existentes, activos y archivados. La migración
+0016 ya lo hace una vez; el comando sirve para repetirlo.
+
+    python manage.py backfill_customer_keys
+    python manage.py backfill_customer_keys --batch-size 2000 --dry-run
+
+Recorre la tabla por rangos de id y solo escribe las filas cuyo valor cambia,
+así puede repetirse sin costo (por ejemplo, después de un bulk_create o de
+cambiar las reglas de customers.py).
+"""
+
+from django.core.management.base import BaseCommand
+
+from MainApp.customers import backfill_keys
+from MainApp.models import ArchivedOrder, Order
+
+
+class Command(BaseCommand):
+    help = "Calcula las claves normalizadas de email, teléfono y red social de los pedidos"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Contar los pedidos a actualizar sin modificar la base de datos")
+
+    def handle(self, *args, **options):
+        for model in (Order, ArchivedOrder):
+            self.stdout.write(f"{model._meta.verbose_name_plural}:")
+            scanned = changed = 0
+            for last_id, scanned, changed in backfill_keys(model, options['batch_size'], options['dry_run']):
+                self.stdout.write(f"  hasta id {last_id}: {scanned} revisados, {changed} a actualizar")
+
+            if options['dry_run']:
+                self.stdout.write(self.style.WARNING(f"{changed} de {scanned} sin actualizar (--dry-run)"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{changed} de {scanned} actualizados"))
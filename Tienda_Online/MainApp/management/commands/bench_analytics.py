@@ -0,0 +1,66 @@
+"""
+Benchmark de los reportes: SQL (MainApp/analytics.py) contra el motor columnar.
+
+    python manage.py bench_analytics --repeat 20
+    python manage.py bench_analytics --seed 200000   # solo en bases de prueba
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from MainApp import analytics, columnar
+from MainApp.models import Order
+
+from ._bench import seed_orders, timed
+
+
+class Command(BaseCommand):
+    help = "Compara los agrupamientos de reportes en SQL y en el motor columnar NumPy"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0,
+                            help="Insertar N pedidos sintéticos antes de medir (¡escribe en la BD!)")
+
+    def handle(self, *args, **options):
+        if columnar.np is None:
+            raise CommandError("numpy no está instalado: el motor columnar no está disponible")
+
+        if options['seed']:
+            self.stdout.write(f"Insertando {options['seed']} pedidos sintéticos...")
+            seed_orders(options['seed'])
+
+        config = settings.ORDER_COLUMNAR_ENGINE
+        engine = columnar.ColumnarEngine(config['MAX_BYTES'], refresh_interval=0)
+        load_ms, _ = timed(lambda: engine.refresh(force=True), 1)
+        if engine.over_budget:
+            raise CommandError(f"Los pedidos superan ORDER_COLUMNAR_ENGINE['MAX_BYTES'] ({config['MAX_BYTES']})")
+
+        today = timezone.localdate()
+        start = analytics.last_months_start(24, today)
+        widgets = {
+            'totales': lambda o: analytics.totals(o),
+            'por estado': lambda o: analytics.counts_by(o, 'status'),
+            'por plataforma': lambda o: analytics.counts_by(o, 'platform'),
+            'top 10 productos': lambda o: analytics.popular_products(o, limit=10),
+            'por categoría': lambda o: analytics.popular_products(
+                o, limit=None, fields=('product_ref__category__name',), count_key='order_count'),
+            'serie mensual 24m': lambda o: analytics.time_series(o, 'month', start, today),
+            'serie diaria 24m': lambda o: analytics.time_series(o, 'day', start, today),
+            'estados (solo web)': lambda o: analytics.counts_by(
+                analytics.filter_orders(o, platform='web'), 'status'),
+        }
+
+        self.stdout.write(f"Pedidos: {Order.objects.count()}")
+        self.stdout.write(
+            f"Carga columnar: {load_ms:.1f} ms, {engine.columns.nbytes / 1024:.0f} KiB "
+            f"(presupuesto {config['MAX_BYTES'] / 1024 / 1024:.0f} MiB)"
+        )
+        self.stdout.write(f"{'consulta':<22}{'SQL ms':>10}{'NumPy ms':>10}{'x':>8}")
+
+        for name, widget in widgets.items():
+            sql_ms, _ = timed(lambda: widget(analytics.filter_orders()), options['repeat'])
+            np_ms, _ = timed(lambda: widget(engine.slice()), options['repeat'])
+            speedup = sql_ms / np_ms if np_ms else float('inf')
+            self.stdout.write(f"{name:<22}{sql_ms:>10.2f}{np_ms:>10.2f}{speedup:>8.1f}")
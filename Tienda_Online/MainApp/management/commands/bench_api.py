@@ -0,0 +1,77 @@
+"""
+Benchmark de la respuesta de la API de pedidos: serialización JSON (DRF
+contra orjson) y compresión (gzip contra brotli) de un listado de OrderSerializer.
+
+    python manage.py bench_api --orders 1000 --repeat 10
+    python manage.py bench_api --seed 5000     # solo en bases de prueba
+"""
+
+import io
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.text import compress_string
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from MainApp import renderers
+from MainApp.middleware import brotli
+from MainApp.models import Order
+from MainApp.serializers import OrderSerializer
+
+from ._bench import seed_orders, timed
+
+
+class Command(BaseCommand):
+    help = "Mide CPU y bytes de un listado grande de OrderSerializer según renderer y compresión"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=1000, help="Pedidos en el listado")
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0,
+                            help="Insertar N pedidos sintéticos antes de medir (¡escribe en la BD!)")
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.stdout.write(f"Insertando {options['seed']} pedidos sintéticos...")
+            seed_orders(options['seed'])
+
+        orders = list(
+            Order.objects.select_related('product_ref__category')
+            .prefetch_related('images', 'product_ref__images')
+            .order_by('-created')[:options['orders']]
+        )
+        if not orders:
+            raise CommandError("No hay pedidos: usar --seed en una base de prueba")
+
+        repeat = options['repeat']
+        serialize_ms, data = timed(lambda: OrderSerializer(orders, many=True).data, 1)
+        self.stdout.write(f"Pedidos: {len(orders)} (serializer: {serialize_ms:.1f} ms)")
+
+        self.stdout.write(f"\n{'renderer':<22}{'ms':>10}{'KiB':>10}{'parse ms':>10}")
+        default_ms, body = timed(lambda: JSONRenderer().render(data), repeat)
+        parse_ms, _ = timed(lambda: JSONParser().parse(io.BytesIO(body)), repeat)
+        self.stdout.write(f"{'DRF (json)':<22}{default_ms:>10.2f}{len(body) / 1024:>10.1f}{parse_ms:>10.2f}")
+
+        if renderers.orjson is None:
+            self.stdout.write("orjson no está instalado: ORJSONRenderer usa el renderer de DRF")
+        else:
+            fast_ms, fast_body = timed(lambda: renderers.ORJSONRenderer().render(data), repeat)
+            parse_ms, _ = timed(lambda: renderers.ORJSONParser().parse(io.BytesIO(fast_body)), repeat)
+            self.stdout.write(
+                f"{'orjson':<22}{fast_ms:>10.2f}{len(fast_body) / 1024:>10.1f}{parse_ms:>10.2f}"
+                f"   x{default_ms / fast_ms if fast_ms else float('inf'):.1f}"
+                f"   {'(idéntico)' if fast_body == body else '(difiere de DRF)'}"
+            )
+
+        encoders = {'gzip': compress_string}
+        if brotli is not None:
+            quality = settings.RESPONSE_COMPRESSION['BROTLI_QUALITY']
+            encoders[f'brotli q{quality}'] = lambda content: brotli.compress(content, quality=quality)
+
+        self.stdout.write(f"\n{'compresión':<22}{'ms':>10}{'KiB':>10}{'ratio':>10}")
+        for name, encode in encoders.items():
+            ms, compressed = timed(lambda: encode(body), max(1, repeat // 2))
+            self.stdout.write(
+                f"{name:<22}{ms:>10.2f}{len(compressed) / 1024:>10.1f}{len(body) / len(compressed):>10.1f}"
+            )
@@ -0,0 +1,110 @@
+"""
+Benchmark de concurrencia con clientes lentos contra un servidor en marcha.
+
+Sirve para comparar el perfil WSGI (vistas síncronas) con el perfil ASGI
+(vistas async) bajo muchos clientes que leen la respuesta despacio:
+
+    gunicorn Tienda_Online.wsgi -w 1 --threads 4
+    python manage.py bench_concurrency --url http://127.0.0.1:8000/ --clients 200
+
+    gunicorn -c gunicorn_asgi.conf.py -w 1 Tienda_Online.asgi:application
+    python manage.py bench_concurrency --url http://127.0.0.1:8000/ --clients 200
+"""
+
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano (values ya ordenados)"""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = "Mide latencia y throughput con N clientes lentos concurrentes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', required=True, help="URL a consultar (http://host:puerto/ruta)")
+        parser.add_argument('--clients', type=int, default=100, help="Clientes concurrentes")
+        parser.add_argument('--requests', type=int, default=5, help="Peticiones por cliente")
+        parser.add_argument('--chunk', type=int, default=1024,
+                            help="Bytes leídos por cada lectura del cliente lento")
+        parser.add_argument('--read-delay', type=float, default=0.05,
+                            help="Pausa en segundos entre lecturas (simula red móvil)")
+        parser.add_argument('--timeout', type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError("Solo se admiten URLs http://host[:puerto]/ruta")
+
+        latencies, errors, elapsed = asyncio.run(self._run(url, options))
+        latencies.sort()
+        total = len(latencies) + errors
+
+        self.stdout.write(f"URL:          {options['url']}")
+        self.stdout.write(f"Clientes:     {options['clients']} x {options['requests']} peticiones")
+        self.stdout.write(f"Completadas:  {len(latencies)}/{total} (errores: {errors})")
+        self.stdout.write(f"Duración:     {elapsed:.2f} s")
+        self.stdout.write(f"Throughput:   {len(latencies) / elapsed:.1f} req/s")
+        if latencies:
+            self.stdout.write(
+                "Latencia ms:  "
+                f"media={statistics.mean(latencies) * 1000:.1f} "
+                f"p50={percentile(latencies, 50) * 1000:.1f} "
+                f"p95={percentile(latencies, 95) * 1000:.1f} "
+                f"p99={percentile(latencies, 99) * 1000:.1f} "
+                f"max={latencies[-1] * 1000:.1f}"
+            )
+
+    async def _run(self, url, options):
+        latencies = []
+        errors = 0
+        started = time.perf_counter()
+
+        async def client():
+            nonlocal errors
+            for _ in range(options['requests']):
+                t0 = time.perf_counter()
+                try:
+                    await asyncio.wait_for(self._slow_get(url, options), options['timeout'])
+                except (OSError, asyncio.TimeoutError, ValueError):
+                    errors += 1
+                else:
+                    latencies.append(time.perf_counter() - t0)
+
+        await asyncio.gather(*(client() for _ in range(options['clients'])))
+        return latencies, errors, time.perf_counter() - started
+
+    async def _slow_get(self, url, options):
+        """GET HTTP/1.1 leyendo el cuerpo en trozos pequeños con pausas"""
+        reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+        try:
+            path = url.path or '/'
+            if url.query:
+                path = f"{path}?{url.query}"
+            writer.write(
+                f"GET {path} HTTP/1.1\r\nHost: {url.netloc}\r\n"
+                "User-Agent: bench_concurrency\r\nConnection: close\r\n\r\n".encode()
+            )
+            await writer.drain()
+
+            status_line = await reader.readline()
+            parts = status_line.split()
+            if len(parts) < 2 or parts[1][:1] not in (b'2', b'3'):
+                raise ValueError(f"Respuesta inesperada: {status_line!r}")
+
+            while True:
+                data = await reader.read(options['chunk'])
+                if not data:
+                    break
+                await asyncio.sleep(options['read_delay'])
+        finally:
+            writer.close()
@@ -0,0 +1,84 @@
+"""
+Benchmark de arranque de un worker y latencia de las primeras peticiones,
+sin calentamiento y con MainApp/warmup.py (lo que hace post_fork en
+gunicorn.conf.py).
+
+    python manage.py bench_startup
+    python manage.py bench_startup --path / --path /api/products/ --runs 5
+
+Cada corrida es un proceso Python nuevo (como un worker recién creado). Con
+una caché compartida (REDIS_URL) las corridas sin calentamiento pueden
+encontrar páginas guardadas por las anteriores: medir con la caché en memoria.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Se ejecuta en el proceso hijo: argv = [warm-up 0/1, rutas...]
+WORKER_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+result = {'setup': (time.perf_counter() - started) * 1000, 'warmup': 0.0, 'paths': {}}
+if sys.argv[1] == '1':
+    from MainApp.warmup import warm_up
+    result['warmup'] = sum(warm_up().values())
+from django.test import RequestFactory
+factory = RequestFactory()
+for path in sys.argv[2:]:
+    samples = []
+    for _ in range(2):
+        started = time.perf_counter()
+        response = application.get_response(factory.get(path))
+        response.close()
+        samples.append((time.perf_counter() - started) * 1000)
+    result['paths'][path] = [response.status_code, *samples]
+print(json.dumps(result))
+"""
+
+
+class Command(BaseCommand):
+    help = "Mide el arranque de un worker y sus primeras peticiones con y sin calentamiento"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', action='append', dest='paths',
+                            help="Ruta a medir (repetible; por defecto catálogo y API de productos)")
+        parser.add_argument('--runs', type=int, default=3, help="Procesos por modo (se informa la mediana)")
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/', '/api/products/', '/api/categories/']
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'Tienda_Online.settings')}
+
+        self.stdout.write(f"{'modo':<16}{'arranque ms':>13}{'warm-up ms':>12}  "
+                          + ''.join(f"{path[:22]:>24}" for path in paths))
+        self.stdout.write(f"{'':<41}" + ''.join(f"{'1ª / 2ª ms':>24}" for _ in paths))
+        for label, warm in (('sin warm-up', '0'), ('con warm-up', '1')):
+            runs = [self._run(warm, paths, env) for _ in range(options['runs'])]
+            setup = statistics.median(run['setup'] for run in runs)
+            warmup = statistics.median(run['warmup'] for run in runs)
+            cells = []
+            for path in paths:
+                status = runs[-1]['paths'][path][0]
+                first = statistics.median(run['paths'][path][1] for run in runs)
+                second = statistics.median(run['paths'][path][2] for run in runs)
+                cell = f"{first:.1f} / {second:.1f}"
+                cells.append(f"{cell if status == 200 else f'{cell} ({status})':>24}")
+            self.stdout.write(f"{label:<16}{setup:>13.1f}{warmup:>12.1f}  " + ''.join(cells))
+
+    def _run(self, warm, paths, env):
+        completed = subprocess.run(
+            [sys.executable, '-c', WORKER_SCRIPT, warm, *paths],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            raise CommandError(completed.stderr.strip().splitlines()[-1] if completed.stderr else "El proceso falló")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
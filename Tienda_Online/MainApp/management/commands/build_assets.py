@@ -0,0 +1,60 @@
+"""
+Descargar las librerías de front-end (MainApp/assets.py) en static/vendor/.
+
+    python manage.py build_assets
+    python manage.py collectstatic --noinput   # hash en el nombre + gzip/brotli
+
+Pensado para el paso de build del despliegue: en producción el navegador ya
+no consulta ningún CDN y todo se sirve con caché inmutable.
+"""
+
+import re
+from pathlib import Path
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from MainApp import assets
+
+# Comentarios de source maps: los .map no se distribuyen
+SOURCE_MAP = re.compile(rb'\n?/[*/]# sourceMappingURL=[^\n]*?(\*/)?\s*$')
+
+
+class Command(BaseCommand):
+    help = "Descarga Bootstrap, Bootstrap Icons y Chart.js en static/vendor/"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help="Volver a descargar aunque el archivo ya exista")
+        parser.add_argument('--timeout', type=int, default=30)
+        parser.add_argument('--collect', action='store_true',
+                            help="Ejecutar collectstatic al terminar")
+
+    def handle(self, *args, **options):
+        root = Path(settings.STATIC_DIR)
+
+        for path, url in assets.downloads().items():
+            target = root / path
+            if target.exists() and not options['force']:
+                self.stdout.write(f"  {path} (ya existe)")
+                continue
+
+            try:
+                with urlopen(url, timeout=options['timeout']) as response:
+                    content = response.read()
+            except OSError as exc:
+                raise CommandError(f"No se pudo descargar {url}: {exc}")
+
+            if path.endswith(('.css', '.js')):
+                content = SOURCE_MAP.sub(b'\n', content)
+
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(content)
+            self.stdout.write(f"  {path} ({len(content) / 1024:.0f} KiB)")
+
+        self.stdout.write(self.style.SUCCESS(f"Librerías guardadas en {root / 'vendor'}"))
+
+        if options['collect']:
+            call_command('collectstatic', interactive=False, verbosity=options['verbosity'])
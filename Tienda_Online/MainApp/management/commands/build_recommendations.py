@@ -0,0 +1,40 @@
+"""
+Recalcular las recomendaciones "frecuentemente pedidos juntos".
+
+    python manage.py build_recommendations                 # según RECOMMENDATIONS
+    python manage.py build_recommendations --top-k 4 --min-customers 3
+
+Lee todo el historial de pedidos (activo y archivado) y reemplaza la tabla
+ProductRecommendation en una transacción. Pensado para ejecutarse de forma
+periódica (cron) fuera de las horas de más tráfico. Requiere numpy.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from MainApp import recommendations
+
+
+class Command(BaseCommand):
+    help = "Calcula los productos que los mismos clientes piden juntos"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=settings.RECOMMENDATIONS['TOP_K'],
+                            help="Recomendaciones por producto")
+        parser.add_argument('--min-customers', type=int, default=settings.RECOMMENDATIONS['MIN_CUSTOMERS'],
+                            help="Clientes en común necesarios para recomendar un par")
+
+    def handle(self, *args, **options):
+        if recommendations.np is None:
+            raise CommandError("Las recomendaciones requieren numpy (pip install numpy)")
+        if options['top_k'] < 1:
+            raise CommandError("--top-k debe ser al menos 1")
+
+        started = time.perf_counter()
+        products, rows = recommendations.build(options['top_k'], options['min_customers'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{rows} recomendaciones para {products} productos en {elapsed:.1f} s"
+        ))
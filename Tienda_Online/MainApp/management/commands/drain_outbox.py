@@ -0,0 +1,56 @@
+"""
+Entregar las notificaciones pendientes de pedidos (email y webhook).
+
+    python manage.py drain_outbox                 # vaciar la cola y salir
+    python manage.py drain_outbox --loop          # proceso permanente (systemd, supervisor...)
+    python manage.py drain_outbox --batch-size 50
+
+Cada lote usa una sola conexión SMTP. Los mensajes que fallan vuelven a la
+cola con backoff exponencial (OUTBOX en settings). Se pueden ejecutar varios
+procesos a la vez: cada lote queda reservado por el que lo tomó.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from MainApp import outbox
+
+# Lotes entre cada limpieza de mensajes antiguos (--loop)
+PRUNE_EVERY = 1000
+
+
+class Command(BaseCommand):
+    help = "Envía las notificaciones de pedidos de la bandeja de salida"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX['BATCH_SIZE'])
+        parser.add_argument('--loop', action='store_true',
+                            help="No terminar: esperar nuevos mensajes (OUTBOX['POLL_INTERVAL'])")
+
+    def handle(self, *args, **options):
+        outbox.prune()
+        batches = 0
+        totals = [0, 0]
+        try:
+            while True:
+                claimed, sent, failed = outbox.drain_batch(options['batch_size'])
+                totals[0] += sent
+                totals[1] += failed
+                if claimed:
+                    batches += 1
+                    self.stdout.write(f"  lote: {sent} enviados, {failed} con error")
+                    if batches % PRUNE_EVERY == 0:
+                        outbox.prune()
+                if options['loop']:
+                    if not claimed:
+                        close_old_connections()
+                        time.sleep(settings.OUTBOX['POLL_INTERVAL'])
+                elif claimed < options['batch_size'] or failed == claimed:
+                    # Cola vacía, o todo el lote falló (se reintentará con backoff)
+                    break
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"{totals[0]} notificaciones enviadas, {totals[1]} con error"))
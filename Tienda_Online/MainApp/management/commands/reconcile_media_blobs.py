@@ -0,0 +1,76 @@
+"""
+Recalcular las referencias de StoredBlob desde las imágenes que las usan.
+
+    python manage.py reconcile_media_blobs            # corrige referencias y borra blobs sin uso
+    python manage.py reconcile_media_blobs --dry-run  # solo informa diferencias
+
+Útil después de borrar imágenes con QuerySet.update()/delete() en SQL directo
+o de copiar la base de datos entre entornos: las referencias solo se
+mantienen al guardar y borrar imágenes una por una.
+"""
+
+from collections import Counter
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from MainApp.media import uses_cloudinary
+from MainApp.models import ArchivedOrderImage, OrderImage, ProductImage, StoredBlob
+from MainApp.storage import blob_digest
+
+
+def expected_refs():
+    refs = Counter()
+    for model in (ProductImage, OrderImage, ArchivedOrderImage):
+        for image in model.objects.values_list('image', flat=True).iterator():
+            digest = blob_digest(str(image))
+            if digest is not None:
+                refs[digest] += 1
+    return refs
+
+
+class Command(BaseCommand):
+    help = "Compara y corrige las referencias de los archivos de media deduplicados"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Mostrar las diferencias sin modificar nada")
+
+    def handle(self, *args, **options):
+        if uses_cloudinary():
+            raise CommandError("STORAGES['default'] es Cloudinary: no hay blobs locales (MEDIA_STORAGE=local)")
+
+        expected = expected_refs()
+        stored = dict(StoredBlob.objects.values_list('digest', 'refs'))
+
+        drift = []
+        for digest in sorted(set(expected) | set(stored)):
+            want, have = expected.get(digest, 0), stored.get(digest)
+            if have is None:
+                self.stdout.write(self.style.ERROR(f"  {digest}: {want} imágenes sin registro del blob"))
+            elif want != have:
+                drift.append((digest, want))
+                self.stdout.write(f"  {digest}: guardado {have}, esperado {want}")
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Las referencias están al día"))
+            return
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"{len(drift)} blobs desfasados (sin cambios: --dry-run)"))
+            return
+
+        removed = 0
+        for digest, refs in drift:
+            with transaction.atomic():
+                blob = StoredBlob.objects.select_for_update().filter(digest=digest).first()
+                if blob is None:
+                    continue
+                if refs:
+                    StoredBlob.objects.filter(digest=digest).update(refs=refs)
+                else:
+                    blob.delete()
+                    default_storage.delete(blob.name)
+                    removed += 1
+        self.stdout.write(self.style.SUCCESS(f"{len(drift)} blobs corregidos ({removed} sin uso borrados)"))
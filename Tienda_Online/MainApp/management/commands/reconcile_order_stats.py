@@ -0,0 +1,45 @@
+"""
+Recalcular ProductOrderStats y CategoryOrderStats desde los pedidos.
+
+    python manage.py reconcile_order_stats            # reescribe los contadores
+    python manage.py reconcile_order_stats --dry-run  # solo informa diferencias
+
+Útil después de cargas masivas con QuerySet.update()/bulk_create(), que no
+disparan las señales que mantienen los contadores.
+"""
+
+from django.core.management.base import BaseCommand
+
+from MainApp import counters
+
+
+class Command(BaseCommand):
+    help = "Compara y reconstruye los contadores de pedidos por producto y categoría"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Mostrar las diferencias sin modificar la base de datos")
+
+    def handle(self, *args, **options):
+        expected = counters.expected_counters()
+        current = counters.current_counters()
+
+        drift = 0
+        for label, want, have in zip(('producto', 'categoría'), expected, current):
+            for key in sorted(set(want) | set(have)):
+                wanted = want.get(key, (0, 0, 0))
+                stored = have.get(key, (0, 0, 0))
+                if wanted != stored:
+                    drift += 1
+                    self.stdout.write(f"  {label} {key}: guardado {stored}, esperado {wanted}")
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Los contadores están al día"))
+            return
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"{drift} contadores desfasados (sin cambios: --dry-run)"))
+            return
+
+        counters.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"{drift} contadores corregidos"))
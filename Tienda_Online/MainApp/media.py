@@ -0,0 +1,115 @@
+# MainApp/media.py
+#
+# Campo de imagen que funciona con Cloudinary o con el almacenamiento local.
+#
+# CloudinaryField sube los archivos directamente con la API de Cloudinary,
+# sin pasar por el almacenamiento de Django. MediaField hace lo mismo cuando
+# STORAGES['default'] es Cloudinary; con cualquier otro backend (por ejemplo
+# ContentAddressedStorage, MEDIA_STORAGE=local) guarda el archivo con
+# default_storage y la columna queda con el nombre que éste devuelve.
+#
+# Se acepta cualquier django.core.files.File como valor nuevo: subidas de un
+# formulario, ContentFile o File(open(...)) desde comandos y el shell. Un
+# nombre ya guardado (texto, StoredMedia o recurso de Cloudinary) se deja
+# tal cual.
+#
+# En la base de datos conviven ambos valores: los nombres de blob locales se
+# leen como StoredMedia y el resto como recursos de Cloudinary, así que las
+# imágenes subidas antes de cambiar de backend se siguen mostrando. Las
+# plantillas y serializadores usan `.url` en los dos casos.
+
+import os
+
+from cloudinary.models import CloudinaryField
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+
+from .storage import blob_digest
+
+
+def uses_cloudinary():
+    return settings.STORAGES['default']['BACKEND'].startswith('cloudinary_storage.')
+
+
+class StoredMedia:
+    """Archivo guardado en el almacenamiento de Django (misma interfaz que CloudinaryResource para leerlo)"""
+
+    def __init__(self, name):
+        self.name = name
+
+    @property
+    def url(self):
+        return default_storage.url(self.name)
+
+    def build_url(self, **options):
+        return self.url
+
+    def get_prep_value(self):
+        return self.name
+
+    def __str__(self):
+        return self.name
+
+    def __eq__(self, other):
+        return isinstance(other, StoredMedia) and other.name == self.name
+
+    def __hash__(self):
+        return hash(self.name)
+
+
+class MediaField(CloudinaryField):
+    description = "Imagen en Cloudinary o en el almacenamiento de Django"
+
+    def __init__(self, *args, upload_to='', **kwargs):
+        self.upload_to = upload_to
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.upload_to:
+            kwargs['upload_to'] = self.upload_to
+        return name, path, args, kwargs
+
+    def _parse(self, value):
+        if blob_digest(value) is not None:
+            return StoredMedia(value)
+        return self.parse_cloudinary_resource(value)
+
+    def from_db_value(self, value, expression, connection, *args, **kwargs):
+        if value is not None:
+            return self._parse(value)
+
+    def to_python(self, value):
+        if isinstance(value, StoredMedia):
+            return value
+        if isinstance(value, str) and value:
+            return self._parse(value)
+        return super().to_python(value)
+
+    def pre_save(self, model_instance, add):
+        value = getattr(model_instance, self.attname)
+        if not isinstance(value, File):
+            return super().pre_save(model_instance, add)
+        filename = os.path.basename(value.name or '') or 'upload'
+        if uses_cloudinary():
+            # CloudinaryField solo sube UploadedFile
+            if not isinstance(value, UploadedFile):
+                setattr(model_instance, self.attname, UploadedFile(value, name=filename))
+            return super().pre_save(model_instance, add)
+        name = default_storage.save(os.path.join(self.upload_to, filename), value)
+        setattr(model_instance, self.attname, StoredMedia(name))
+        return name
+
+    def get_prep_value(self, value):
+        if isinstance(value, StoredMedia):
+            return value.name
+        return super().get_prep_value(value)
+
+
+def release(value):
+    """Soltar la referencia de una imagen local al confirmarse la transacción"""
+    if isinstance(value, StoredMedia) and not uses_cloudinary():
+        transaction.on_commit(lambda: default_storage.delete(value.name))
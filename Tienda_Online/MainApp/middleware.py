@@ -0,0 +1,221 @@
+# MainApp/middleware.py
+
+import re
+import threading
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+from . import profiling
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: solo gzip
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'application/javascript',
+    'application/json',
+    'application/xml',
+    'image/svg+xml',
+)
+
+# Relleno aleatorio del gzip de las páginas HTML (mitigación de BREACH, como
+# GZipMiddleware): llevan el token CSRF
+HTML_RANDOM_BYTES = 100
+
+_coding_re = re.compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$')
+
+
+def accepted_encodings(header):
+    """{'br': 1.0, 'gzip': 0.5, ...} a partir de Accept-Encoding (q=0 = no aceptada)"""
+    encodings = {}
+    for part in header.split(','):
+        match = _coding_re.match(part)
+        if not match:
+            continue
+        try:
+            quality = float(match[2]) if match[2] else 1.0
+        except ValueError:
+            continue
+        encodings[match[1].lower()] = quality
+    return encodings
+
+
+def is_compressible(content_type):
+    media_type = content_type.split(';', 1)[0].strip().lower()
+    return (
+        media_type.startswith('text/')
+        or media_type in COMPRESSIBLE_TYPES
+        or media_type.endswith('+json')
+    )
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Comprime con brotli o gzip (según Accept-Encoding) las respuestas de la
+    API y las páginas que superan RESPONSE_COMPRESSION['MIN_BYTES'].
+
+    Las respuestas en streaming no se tocan: comprimir un text/event-stream
+    retendría los eventos en el buffer del compresor, y los archivos estáticos
+    ya los sirve WhiteNoise precomprimidos. El HTML va siempre en gzip con
+    relleno aleatorio (BREACH); brotli queda para JSON, CSS, JS, etc.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if not is_compressible(response.get('Content-Type', '')):
+            return response
+        if len(response.content) < settings.RESPONSE_COMPRESSION['MIN_BYTES']:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encodings = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        is_html = response.get('Content-Type', '').startswith('text/html')
+        if brotli is not None and not is_html and encodings.get('br', 0) > 0:
+            encoding = 'br'
+            compressed = brotli.compress(
+                response.content, quality=settings.RESPONSE_COMPRESSION['BROTLI_QUALITY']
+            )
+        elif encodings.get('gzip', encodings.get('*', 0)) > 0:
+            encoding = 'gzip'
+            compressed = compress_string(
+                response.content, max_random_bytes=HTML_RANDOM_BYTES if is_html else None
+            )
+        else:
+            return response
+
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        response.headers['Content-Encoding'] = encoding
+
+        # El ETag fuerte describe el cuerpo sin comprimir (igual que GZipMiddleware)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
+
+
+class LoadSheddingMiddleware:
+    """
+    Rechaza con 503 (y Retry-After) cuando este worker ya tiene
+    LOAD_SHEDDING['MAX_IN_FLIGHT'] peticiones en curso, en vez de encolarlas:
+    la latencia de las que sí se atienden se mantiene acotada.
+
+    Una respuesta en streaming (SSE) deja de contar al devolverse, no al
+    cerrarse el stream. Las rutas de EXEMPT_PATHS (admin) nunca se rechazan.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = settings.LOAD_SHEDDING
+        if not config['MAX_IN_FLIGHT']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.max_in_flight = config['MAX_IN_FLIGHT']
+        self.retry_after = config['RETRY_AFTER']
+        self.exempt_paths = tuple(config['EXEMPT_PATHS'])
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _enter(self, request):
+        """Registrar la petición; False si hay que rechazarla"""
+        if request.path.startswith(self.exempt_paths):
+            with self._lock:
+                self.in_flight += 1
+            return True
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                return False
+            self.in_flight += 1
+            return True
+
+    def _leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _overloaded(self):
+        response = HttpResponse(
+            "Servicio sobrecargado. Intenta nuevamente en unos segundos.",
+            status=503, content_type='text/plain; charset=utf-8',
+        )
+        response['Retry-After'] = str(self.retry_after)
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self._enter(request):
+            return self._overloaded()
+        try:
+            return self.get_response(request)
+        finally:
+            self._leave()
+
+    async def __acall__(self, request):
+        if not self._enter(request):
+            return self._overloaded()
+        try:
+            return await self.get_response(request)
+        finally:
+            self._leave()
+
+
+class ProfilingMiddleware:
+    """
+    Perfila bajo demanda la petición completa (vista, serializadores,
+    plantillas y SQL) y guarda el informe en PROFILING['DIR'] (ver
+    MainApp/profiling.py). Va después de AuthenticationMiddleware.
+
+    Con PROFILING['ENABLED'] apagado no se instala. Encendido, una petición
+    sin ?profile ni X-Profile solo paga la resolución de la URL si hay
+    muestreo configurado.
+    """
+
+    def __init__(self, get_response):
+        config = settings.PROFILING
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.query_param = config['QUERY_PARAM']
+        self.sample = config['SAMPLE']
+
+    def _reason(self, request):
+        """Motivo para perfilar la petición, o None"""
+        token = request.META.get('HTTP_X_PROFILE')
+        if token and profiling.valid_token(token):
+            return 'token'
+        if request.GET.get(self.query_param) == '1':
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_staff:
+                return 'staff'
+        if self.sample:
+            try:
+                url_name = resolve(request.path_info, getattr(request, 'urlconf', None)).url_name
+            except Resolver404:
+                return None
+            if profiling.sampled(url_name):
+                return f"muestreo 1/{self.sample[url_name]}"
+        return None
+
+    def __call__(self, request):
+        reason = self._reason(request)
+        if reason is None:
+            return self.get_response(request)
+        return profiling.run(request, self.get_response, reason)
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:23
+
+import cloudinary.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainApp', '0004_alter_order_total_price'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='orderimage',
+            name='image',
+            field=cloudinary.models.CloudinaryField(max_length=255, verbose_name='image'),
+        ),
+        migrations.AlterField(
+            model_name='productimage',
+            name='image',
+            field=cloudinary.models.CloudinaryField(max_length=255, verbose_name='image'),
+        ),
+    ]
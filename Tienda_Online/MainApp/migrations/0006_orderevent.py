@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainApp', '0005_alter_orderimage_image_alter_productimage_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.BigIntegerField()),
+                ('token', models.UUIDField()),
+                ('status', models.CharField(max_length=30)),
+                ('payment_status', models.CharField(max_length=20)),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Evento de pedido',
+                'verbose_name_plural': 'Eventos de pedidos',
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:26
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+
+def backfill_updated(apps, schema_editor):
+    """
+    Última modificación conocida de los pedidos existentes.
+
+    AddField deja en todos la fecha de la migración. Se usa la creación o, si
+    es posterior, el último evento de estado (OrderEvent) o la última imagen.
+    """
+    Order = apps.get_model('MainApp', 'Order')
+    OrderEvent = apps.get_model('MainApp', 'OrderEvent')
+    OrderImage = apps.get_model('MainApp', 'OrderImage')
+
+    def latest(model, field):
+        rows = model.objects.filter(**{field: OuterRef('pk')}).order_by().values(field)
+        return Coalesce(Subquery(rows.annotate(last=Max('created')).values('last')), 'created')
+
+    # update() no aplica auto_now
+    Order.objects.update(updated=Greatest(
+        'created', latest(OrderEvent, 'order_id'), latest(OrderImage, 'order'),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainApp', '0006_orderevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.RunPython(backfill_updated, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_order_stats(apps, schema_editor):
+    """Calcular los contadores iniciales desde los pedidos existentes"""
+    Order = apps.get_model('MainApp', 'Order')
+    ProductOrderStats = apps.get_model('MainApp', 'ProductOrderStats')
+    CategoryOrderStats = apps.get_model('MainApp', 'CategoryOrderStats')
+
+    rows = (
+        Order.objects.filter(product_ref__isnull=False)
+        .values('product_ref_id', 'product_ref__category_id')
+        .annotate(
+            order_count=Count('id'),
+            active_count=Count('id', filter=~Q(status='cancelada')),
+            revenue=Sum('total_price'),
+        )
+    )
+    categories = {}
+    products = []
+    for row in rows:
+        values = {
+            'order_count': row['order_count'],
+            'active_count': row['active_count'],
+            'revenue': row['revenue'] or 0,
+        }
+        products.append(ProductOrderStats(product_id=row['product_ref_id'], **values))
+        category = categories.setdefault(row['product_ref__category_id'], dict.fromkeys(values, 0))
+        for key, value in values.items():
+            category[key] += value
+
+    ProductOrderStats.objects.bulk_create(products, batch_size=500)
+    CategoryOrderStats.objects.bulk_create(
+        [CategoryOrderStats(category_id=key, **values) for key, values in categories.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainApp', '0007_order_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryOrderStats',
+            fields=[
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='order_stats', serialize=False, to='MainApp.category')),
+                ('order_count', models.IntegerField(default=0, verbose_name='Pedidos')),
+                ('active_count', models.IntegerField(default=0, verbose_name='Pedidos no cancelados')),
+                ('revenue', models.BigIntegerField(default=0, verbose_name='Ingresos')),
+            ],
+            options={
+                'verbose_name': 'Estadística de categoría',
+                'verbose_name_plural': 'Estadísticas de categorías',
+                'indexes': [models.Index(fields=['-order_count'], name='category_stats_orders_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductOrderStats',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='order_stats', serialize=False, to='MainApp.product')),
+                ('order_count', models.IntegerField(default=0, verbose_name='Pedidos')),
+                ('active_count', models.IntegerField(default=0, verbose_name='Pedidos no cancelados')),
+                ('revenue', models.BigIntegerField(default=0, verbose_name='Ingresos')),
+            ],
+            options={
+                'verbose_name': 'Estadística de producto',
+                'verbose_name_plural': 'Estadísticas de productos',
+                'indexes': [models.Index(fields=['-order_count'], name='product_stats_orders_idx'), models.Index(fields=['-active_count'], name='product_stats_active_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_order_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:35
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_current_status(apps, schema_editor):
+    """
+    Un registro inicial por pedido existente: su estado actual desde que entró a él.
+
+    Esa fecha sale de los OrderEvent (el primero de la última racha con ese
+    estado; también se publican por cambios de pago); sin eventos, de la
+    creación del pedido (no de updated, que cambia con cualquier guardado).
+    """
+    Order = apps.get_model('MainApp', 'Order')
+    OrderEvent = apps.get_model('MainApp', 'OrderEvent')
+    OrderStatusChange = apps.get_model('MainApp', 'OrderStatusChange')
+
+    entered = {}
+    events = OrderEvent.objects.order_by('created', 'id').values_list('order_id', 'status', 'created')
+    for order_id, status, created in events.iterator(chunk_size=5000):
+        if entered.get(order_id, (None,))[0] != status:
+            entered[order_id] = (status, created)
+
+    batch = []
+    rows = Order.objects.values_list('id', 'status', 'platform', 'created')
+    for order_id, status, platform, created in rows.iterator(chunk_size=5000):
+        last_status, entered_at = entered.get(order_id, (None, None))
+        batch.append(OrderStatusChange(
+            order_id=order_id,
+            to_status=status,
+            platform=platform,
+            changed=entered_at if last_status == status and status != 'solicitado' else created,
+        ))
+        if len(batch) >= 5000:
+            OrderStatusChange.objects.bulk_create(batch)
+            batch = []
+    OrderStatusChange.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainApp', '0008_order_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, max_length=30, verbose_name='Estado anterior')),
+                ('to_status', models.CharField(max_length=30, verbose_name='Estado nuevo')),
+                ('platform', models.CharField(max_length=50, verbose_name='Plataforma')),
+                ('changed', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha del cambio')),
+                ('duration_seconds', models.PositiveIntegerField(blank=True, null=True, verbose_name='Segundos en el estado anterior')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_changes', to='MainApp.order')),
+            ],
+            options={
+                'verbose_name': 'Cambio de estado',
+                'verbose_name_plural': 'Historial de estados',
+                'ordering': ['changed', 'id'],
+                'indexes': [models.Index(fields=['order', '-changed'], name='status_change_order_idx'), models.Index(fields=['from_status', 'platform', 'changed'], name='status_change_lead_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_current_status, migrations.RunPython.noop),
+    ]
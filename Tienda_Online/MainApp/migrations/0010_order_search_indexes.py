@@ -0,0 +1,45 @@
+# Índices para la búsqueda del admin de pedidos (OrderAdmin.get_search_results):
+# prefijo sin distinguir mayúsculas del nombre, email exacto y prefijo del
+# teléfono. Dependen del motor, por eso se crean con SQL propio.
+
+from django.db import migrations
+
+SEARCH_COLUMNS = {
+    'order_customer_prefix_idx': 'customer_name',
+    'order_email_prefix_idx': 'email',
+    'order_phone_prefix_idx': 'phone',
+}
+
+
+def create_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    table = connection.ops.quote_name('MainApp_order')
+    for name, column in SEARCH_COLUMNS.items():
+        column = connection.ops.quote_name(column)
+        if connection.vendor == 'postgresql':
+            # istartswith/iexact compilan a UPPER(col::text) LIKE UPPER(%s)
+            expression = f'(UPPER({column}::text) text_pattern_ops)'
+        elif connection.vendor == 'sqlite':
+            # LIKE de SQLite no distingue mayúsculas: necesita un índice NOCASE
+            expression = f'({column} COLLATE NOCASE)'
+        else:
+            continue
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} {expression}')
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor not in ('postgresql', 'sqlite'):
+        return
+    for name in SEARCH_COLUMNS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainApp', '0009_order_status_change'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainApp', '0010_order_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='email_normalized',
+            field=models.CharField(blank=True, default='', editable=False, max_length=254),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='phone_digits',
+            field=models.CharField(blank=True, default='', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='social_handle',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['email_normalized', '-created'], name='order_customer_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['phone_digits', '-created'], name='order_customer_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['social_handle', '-created'], name='order_customer_handle_idx'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:02
+
+import cloudinary.models
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainApp', '0011_order_customer_keys'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='orderstatuschange',
+            name='order',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='status_changes', to='MainApp.order'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('token', models.UUIDField(unique=True)),
+                ('customer_name', models.CharField(max_length=200, verbose_name='Nombre cliente')),
+                ('email', models.EmailField(blank=True, max_length=254, verbose_name='Email')),
+                ('phone', models.CharField(blank=True, max_length=100, verbose_name='Teléfono / Red social')),
+                ('description', models.TextField(blank=True, verbose_name='Descripción del pedido')),
+                ('platform', models.CharField(choices=[('facebook', 'Facebook'), ('instagram', 'Instagram'), ('whatsapp', 'WhatsApp'), ('presencial', 'Presencial'), ('web', 'Sitio Web'), ('otro', 'Otro')], max_length=50, verbose_name='Plataforma')),
+                ('requested_date', models.DateField(blank=True, null=True, verbose_name='Fecha requerida')),
+                ('created', models.DateTimeField(db_index=True)),
+                ('updated', models.DateTimeField()),
+                ('status', models.CharField(choices=[('solicitado', 'Solicitado'), ('aprobado', 'Aprobado'), ('en_proceso', 'En proceso'), ('realizada', 'Realizada'), ('entregada', 'Entregada'), ('finalizada', 'Finalizada'), ('cancelada', 'Cancelada')], max_length=30, verbose_name='Estado')),
+                ('payment_status', models.CharField(choices=[('pendiente', 'Pendiente'), ('parcial', 'Parcial'), ('pagado', 'Pagado')], max_length=20, verbose_name='Estado de pago')),
+                ('total_price', models.PositiveIntegerField(default=0, verbose_name='Precio final')),
+                ('email_normalized', models.CharField(blank=True, default='', max_length=254)),
+                ('phone_digits', models.CharField(blank=True, default='', max_length=20)),
+                ('social_handle', models.CharField(blank=True, default='', max_length=64)),
+                ('archived', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Archivado')),
+                ('product_ref', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='MainApp.product')),
+            ],
+            options={
+                'verbose_name': 'Pedido archivado',
+                'verbose_name_plural': 'Pedidos archivados',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderImage',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('image', cloudinary.models.CloudinaryField(max_length=255, verbose_name='image')),
+                ('created', models.DateTimeField()),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='MainApp.archivedorder')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['email_normalized', '-created'], name='archived_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['phone_digits', '-created'], name='archived_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['social_handle', '-created'], name='archived_handle_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:12
+
+import MainApp.media
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainApp', '0012_archived_orders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='SHA-256')),
+                ('name', models.CharField(max_length=255, verbose_name='Archivo')),
+                ('size', models.PositiveBigIntegerField(verbose_name='Tamaño (bytes)')),
+                ('refs', models.PositiveIntegerField(default=0, verbose_name='Referencias')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archivo de media',
+                'verbose_name_plural': 'Archivos de media',
+            },
+        ),
+        migrations.AlterField(
+            model_name='archivedorderimage',
+            name='image',
+            field=MainApp.media.MediaField(max_length=255, upload_to='orders/', verbose_name='image'),
+        ),
+        migrations.AlterField(
+            model_name='orderimage',
+            name='image',
+            field=MainApp.media.MediaField(max_length=255, upload_to='orders/', verbose_name='image'),
+        ),
+        migrations.AlterField(
+            model_name='productimage',
+            name='image',
+            field=MainApp.media.MediaField(max_length=255, upload_to='products/', verbose_name='image'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainApp', '0013_stored_blobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Posición')),
+                ('score', models.FloatField(verbose_name='Puntaje')),
+                ('customers', models.PositiveIntegerField(verbose_name='Clientes en común')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='MainApp.product')),
+                ('recommended', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='MainApp.product')),
+            ],
+            options={
+                'verbose_name': 'Recomendación de producto',
+                'verbose_name_plural': 'Recomendaciones de productos',
+                'ordering': ['product', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('product', 'rank'), name='recommendation_product_rank_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:18
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainApp', '0014_product_recommendations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('channel', models.CharField(choices=[('email', 'Email'), ('webhook', 'Webhook')], max_length=20, verbose_name='Canal')),
+                ('dedup_key', models.CharField(max_length=100)),
+                ('order_id', models.BigIntegerField(verbose_name='Pedido')),
+                ('payload', models.JSONField()),
+                ('state', models.CharField(choices=[('pending', 'Pendiente'), ('sending', 'Enviando'), ('sent', 'Enviado'), ('failed', 'Fallido'), ('superseded', 'Reemplazado')], default='pending', max_length=20, verbose_name='Estado')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próximo intento')),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, verbose_name='Último error')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Enviado')),
+            ],
+            options={
+                'verbose_name': 'Notificación pendiente',
+                'verbose_name_plural': 'Bandeja de salida',
+                'indexes': [models.Index(fields=['state', 'available_at'], name='outbox_state_available_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('state', 'pending')), fields=('dedup_key',), name='outbox_pending_dedup_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,101 @@
+# Claves normalizadas de cliente de los pedidos anteriores a 0011 (y de los
+# que el archivado copió vacíos a ArchivedOrder)
+#
+# Las funciones de normalización son una copia de MainApp/customers.py tal
+# como estaba al escribir esta migración: los cambios posteriores a ese módulo
+# no deben cambiar lo que hace (ni romper) una migración ya aplicada.
+
+import re
+
+from django.db import migrations, transaction
+
+PHONE_COUNTRY_CODE = '56'
+PHONE_NATIONAL_DIGITS = 9
+MIN_PHONE_DIGITS = 6
+
+KEY_FIELDS = ('email_normalized', 'phone_digits', 'social_handle')
+
+BATCH_SIZE = 5000
+
+_profile_url = re.compile(
+    r'^(?:https?://)?(?:www\.|m\.)?'
+    r'(?:instagram\.com|facebook\.com|fb\.com|tiktok\.com/@?|twitter\.com|x\.com|t\.me)/'
+    r'@?([\w.]+)', re.IGNORECASE,
+)
+_handle = re.compile(r'^@?([A-Za-z0-9_.]{2,60})$')
+_letters = re.compile(r'[^\W\d_]')
+
+
+def normalize_email(value):
+    return (value or '').strip().lower()
+
+
+def normalize_phone(value):
+    value = (value or '').strip()
+    if not value or _letters.search(value):
+        return ''
+    digits = re.sub(r'\D', '', value)
+    if digits.startswith('00'):
+        digits = digits[2:]
+    if len(digits) == len(PHONE_COUNTRY_CODE) + PHONE_NATIONAL_DIGITS and digits.startswith(PHONE_COUNTRY_CODE):
+        digits = digits[len(PHONE_COUNTRY_CODE):]
+    return digits if len(digits) >= MIN_PHONE_DIGITS else ''
+
+
+def normalize_handle(value):
+    value = (value or '').strip()
+    match = _profile_url.match(value)
+    if match:
+        return match[1].strip('.').lower()
+    match = _handle.match(value)
+    if match and _letters.search(value):
+        return match[1].lower()
+    return ''
+
+
+def backfill_model(model, connection):
+    """Por rangos de id, escribiendo solo las filas que cambian (UPDATE con executemany)"""
+    quote = connection.ops.quote_name
+    meta = model._meta
+    update_sql = (
+        f"UPDATE {quote(meta.db_table)} "
+        f"SET {', '.join(f'{quote(meta.get_field(name).column)} = %s' for name in KEY_FIELDS)} "
+        f"WHERE {quote(meta.pk.column)} = %s"
+    )
+    last_id = 0
+    while True:
+        rows = list(
+            model._default_manager.using(connection.alias).filter(pk__gt=last_id).order_by('pk')
+            .values_list('pk', 'email', 'phone', *KEY_FIELDS)[:BATCH_SIZE]
+        )
+        if not rows:
+            return
+        last_id = rows[-1][0]
+
+        updates = []
+        for pk, email, phone, *stored in rows:
+            values = [normalize_email(email), normalize_phone(phone), normalize_handle(phone)]
+            if values != stored:
+                updates.append((*values, pk))
+        if updates:
+            with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+                cursor.executemany(update_sql, updates)
+
+
+def backfill(apps, schema_editor):
+    for name in ('Order', 'ArchivedOrder'):
+        backfill_model(apps.get_model('MainApp', name), schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    # Cada lote se confirma por separado (tablas grandes); repetirlo es inocuo
+    atomic = False
+
+    dependencies = [
+        ('MainApp', '0015_order_outbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 import uuid
-from cloudinary.models import CloudinaryField
+from django.utils import timezone
+
+from .customers import KEY_FIELDS, customer_keys
+from .media import MediaField
 
 
 class Category(models.Model):
@@ -34,7 +37,7 @@ class Product(models.Model):
 
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, related_name='images', on_delete=models.CASCADE)
-    image = CloudinaryField('image')   # ✅ CAMBIO CLAVE
+    image = MediaField('image', upload_to='products/')   # ✅ CAMBIO CLAVE
     order = models.PositiveSmallIntegerField(default=0)
 
     def __str__(self):
@@ -92,21 +95,63 @@ class Order(models.Model):
     platform = models.CharField("Plataforma", max_length=50, choices=PLATFORM_CHOICES, default='web')
     requested_date = models.DateField("Fecha requerida", null=True, blank=True)
     created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True, db_index=True)
     status = models.CharField("Estado", max_length=30, choices=STATUS_CHOICES, default='solicitado')
     payment_status = models.CharField("Estado de pago", max_length=20, choices=PAYMENT_STATUS, default='pendiente')
     total_price = models.PositiveIntegerField("Precio final", default=0)
 
+    # Claves normalizadas del cliente para el historial (ver customers.py)
+    email_normalized = models.CharField(max_length=254, blank=True, default='', editable=False)
+    phone_digits = models.CharField(max_length=20, blank=True, default='', editable=False)
+    social_handle = models.CharField(max_length=64, blank=True, default='', editable=False)
+
+    # Campos cuyo valor guardado se recuerda para detectar cambios (ver signals.py)
+    TRACKED_FIELDS = ('product_ref_id', 'status', 'payment_status', 'total_price')
+    CUSTOMER_KEY_FIELDS = KEY_FIELDS
+
+    is_archived = False  # ver ArchivedOrder
+
     class Meta:
         verbose_name = "Pedido"
         verbose_name_plural = "Pedidos"
+        indexes = [
+            models.Index(fields=['email_normalized', '-created'], name='order_customer_email_idx'),
+            models.Index(fields=['phone_digits', '-created'], name='order_customer_phone_idx'),
+            models.Index(fields=['social_handle', '-created'], name='order_customer_handle_idx'),
+        ]
 
     def __str__(self):
         return f"Pedido {self.id} - {self.customer_name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: instance.__dict__[name] for name in cls.TRACKED_FIELDS if name in instance.__dict__
+        }
+        return instance
+
+    def fill_customer_keys(self):
+        for name, value in customer_keys(self.email, self.phone).items():
+            setattr(self, name, value)
+
+    def save(self, *args, **kwargs):
+        self.fill_customer_keys()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'email', 'phone'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, *self.CUSTOMER_KEY_FIELDS}
+        # El pedido y sus datos derivados (contadores, etc.) en la misma transacción
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._loaded_values = self.tracked_values()
+
+    def tracked_values(self):
+        return {name: getattr(self, name) for name in self.TRACKED_FIELDS}
+
 
 class OrderImage(models.Model):
     order = models.ForeignKey(Order, related_name='images', on_delete=models.CASCADE)
-    image = CloudinaryField('image')   # ✅ CAMBIO CLAVE
+    image = MediaField('image', upload_to='orders/')   # ✅ CAMBIO CLAVE
     created = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -117,3 +162,214 @@ class OrderImage(models.Model):
         return f"Imagen pedido {self.order.id}"
 
 
+class ArchivedOrder(models.Model):
+    """
+    Pedido cerrado movido fuera de Order por `manage.py archive_orders` (ver
+    archive.py). Tiene los mismos campos y relaciones (product_ref, images)
+    que Order para que plantillas y serializers lo muestren igual; es solo
+    de lectura y conserva el id original.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    token = models.UUIDField(unique=True)
+    customer_name = models.CharField("Nombre cliente", max_length=200)
+    email = models.EmailField("Email", blank=True)
+    phone = models.CharField("Teléfono / Red social", max_length=100, blank=True)
+    product_ref = models.ForeignKey(Product, null=True, blank=True, related_name='+', on_delete=models.SET_NULL)
+    description = models.TextField("Descripción del pedido", blank=True)
+    platform = models.CharField("Plataforma", max_length=50, choices=Order.PLATFORM_CHOICES)
+    requested_date = models.DateField("Fecha requerida", null=True, blank=True)
+    created = models.DateTimeField(db_index=True)
+    updated = models.DateTimeField()
+    status = models.CharField("Estado", max_length=30, choices=Order.STATUS_CHOICES)
+    payment_status = models.CharField("Estado de pago", max_length=20, choices=Order.PAYMENT_STATUS)
+    total_price = models.PositiveIntegerField("Precio final", default=0)
+    email_normalized = models.CharField(max_length=254, blank=True, default='')
+    phone_digits = models.CharField(max_length=20, blank=True, default='')
+    social_handle = models.CharField(max_length=64, blank=True, default='')
+    archived = models.DateTimeField("Archivado", default=timezone.now)
+
+    is_archived = True
+
+    class Meta:
+        verbose_name = "Pedido archivado"
+        verbose_name_plural = "Pedidos archivados"
+        indexes = [
+            models.Index(fields=['email_normalized', '-created'], name='archived_email_idx'),
+            models.Index(fields=['phone_digits', '-created'], name='archived_phone_idx'),
+            models.Index(fields=['social_handle', '-created'], name='archived_handle_idx'),
+        ]
+
+    def __str__(self):
+        return f"Pedido {self.id} - {self.customer_name} (archivado)"
+
+
+class ArchivedOrderImage(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, related_name='images', on_delete=models.CASCADE)
+    image = MediaField('image', upload_to='orders/')
+    created = models.DateTimeField()
+
+    def __str__(self):
+        return f"Imagen pedido {self.order_id} (archivado)"
+
+
+class OrderEvent(models.Model):
+    """Cambio de estado publicado para los streams SSE (entrega entre workers)"""
+    order_id = models.BigIntegerField()
+    token = models.UUIDField()
+    status = models.CharField(max_length=30)
+    payment_status = models.CharField(max_length=20)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Evento de pedido"
+        verbose_name_plural = "Eventos de pedidos"
+
+    def __str__(self):
+        return f"Evento {self.id} - pedido {self.order_id} ({self.status})"
+
+
+class ProductOrderStats(models.Model):
+    """Contadores de pedidos por producto (rankings de popularidad sin GROUP BY)"""
+    product = models.OneToOneField(Product, primary_key=True, related_name='order_stats', on_delete=models.CASCADE)
+    order_count = models.IntegerField("Pedidos", default=0)
+    active_count = models.IntegerField("Pedidos no cancelados", default=0)
+    revenue = models.BigIntegerField("Ingresos", default=0)
+
+    class Meta:
+        verbose_name = "Estadística de producto"
+        verbose_name_plural = "Estadísticas de productos"
+        indexes = [
+            models.Index(fields=['-order_count'], name='product_stats_orders_idx'),
+            models.Index(fields=['-active_count'], name='product_stats_active_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.order_count} pedidos"
+
+
+class CategoryOrderStats(models.Model):
+    """Contadores de pedidos por categoría"""
+    category = models.OneToOneField(Category, primary_key=True, related_name='order_stats', on_delete=models.CASCADE)
+    order_count = models.IntegerField("Pedidos", default=0)
+    active_count = models.IntegerField("Pedidos no cancelados", default=0)
+    revenue = models.BigIntegerField("Ingresos", default=0)
+
+    class Meta:
+        verbose_name = "Estadística de categoría"
+        verbose_name_plural = "Estadísticas de categorías"
+        indexes = [
+            models.Index(fields=['-order_count'], name='category_stats_orders_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.category_id}: {self.order_count} pedidos"
+
+
+class ProductRecommendation(models.Model):
+    """Productos que los mismos clientes piden junto a `product` (manage.py build_recommendations)"""
+    product = models.ForeignKey(Product, related_name='recommendations', on_delete=models.CASCADE)
+    recommended = models.ForeignKey(Product, related_name='+', on_delete=models.CASCADE)
+    rank = models.PositiveSmallIntegerField("Posición")
+    score = models.FloatField("Puntaje")
+    customers = models.PositiveIntegerField("Clientes en común")
+
+    class Meta:
+        verbose_name = "Recomendación de producto"
+        verbose_name_plural = "Recomendaciones de productos"
+        ordering = ['product', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'rank'], name='recommendation_product_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.recommended_id} (#{self.rank})"
+
+
+class OrderStatusChange(models.Model):
+    """Historial de estados de un pedido con el tiempo que pasó en el estado anterior"""
+    # Sin restricción en la BD: el historial se conserva al archivar el pedido
+    order = models.ForeignKey(Order, related_name='status_changes', on_delete=models.CASCADE,
+                              db_constraint=False)
+    from_status = models.CharField("Estado anterior", max_length=30, blank=True)
+    to_status = models.CharField("Estado nuevo", max_length=30)
+    platform = models.CharField("Plataforma", max_length=50)
+    changed = models.DateTimeField("Fecha del cambio", default=timezone.now)
+    duration_seconds = models.PositiveIntegerField("Segundos en el estado anterior", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Cambio de estado"
+        verbose_name_plural = "Historial de estados"
+        ordering = ['changed', 'id']
+        indexes = [
+            models.Index(fields=['order', '-changed'], name='status_change_order_idx'),
+            models.Index(fields=['from_status', 'platform', 'changed'], name='status_change_lead_idx'),
+        ]
+
+    def __str__(self):
+        return f"Pedido {self.order_id}: {self.from_status or '-'} -> {self.to_status}"
+
+
+class StoredBlob(models.Model):
+    """Archivo de media guardado una sola vez por contenido (ver ContentAddressedStorage)"""
+    digest = models.CharField("SHA-256", max_length=64, primary_key=True)
+    name = models.CharField("Archivo", max_length=255)
+    size = models.PositiveBigIntegerField("Tamaño (bytes)")
+    refs = models.PositiveIntegerField("Referencias", default=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Archivo de media"
+        verbose_name_plural = "Archivos de media"
+
+    def __str__(self):
+        return f"{self.name} ({self.refs} referencias)"
+
+
+class OutboxMessage(models.Model):
+    """
+    Notificación pendiente de un pedido (email al cliente o webhook), escrita
+    en la misma transacción que el cambio del pedido y enviada por
+    `manage.py drain_outbox` (ver outbox.py).
+    """
+    CHANNEL_CHOICES = [
+        ('email', 'Email'),
+        ('webhook', 'Webhook'),
+    ]
+
+    STATE_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('sending', 'Enviando'),
+        ('sent', 'Enviado'),
+        ('failed', 'Fallido'),
+        ('superseded', 'Reemplazado'),
+    ]
+
+    # Clave de idempotencia: el receptor puede descartar reintentos del mismo mensaje
+    key = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    channel = models.CharField("Canal", max_length=20, choices=CHANNEL_CHOICES)
+    # Mensajes pendientes con la misma clave se fusionan (solo se envía el último estado)
+    dedup_key = models.CharField(max_length=100)
+    order_id = models.BigIntegerField("Pedido")
+    payload = models.JSONField()
+    state = models.CharField("Estado", max_length=20, choices=STATE_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField("Intentos", default=0)
+    available_at = models.DateTimeField("Próximo intento", default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField("Último error", blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField("Enviado", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Notificación pendiente"
+        verbose_name_plural = "Bandeja de salida"
+        indexes = [
+            models.Index(fields=['state', 'available_at'], name='outbox_state_available_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['dedup_key'], condition=models.Q(state='pending'),
+                                    name='outbox_pending_dedup_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_channel_display()} pedido {self.order_id} ({self.state})"
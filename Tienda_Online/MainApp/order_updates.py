@@ -0,0 +1,167 @@
+# MainApp/order_updates.py
+#
+# Cambios masivos de estado y de pago (API y admin).
+#
+# En vez de un order.save() por pedido, se leen todos los pedidos con una
+# consulta, se validan las transiciones en Python y se aplica un único UPDATE
+# sobre los aceptados. Como QuerySet.update() no dispara las señales, aquí
+# mismo se actualizan los datos derivados: contadores (counters.py), historial
+# de estados (lead_times.py), eventos SSE (events.py) y notificaciones
+# (outbox.py).
+
+import uuid
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import counters, lead_times, outbox
+from .events import publish_order_changes
+from .models import Order
+
+# Estados a los que puede pasar un pedido desde cada estado
+ALLOWED_TRANSITIONS = {
+    'solicitado': {'aprobado', 'cancelada'},
+    'aprobado': {'en_proceso', 'cancelada'},
+    'en_proceso': {'realizada', 'cancelada'},
+    'realizada': {'entregada'},
+    'entregada': {'finalizada'},
+    'finalizada': set(),
+    'cancelada': {'solicitado'},
+}
+
+# Estados de pago a los que se puede pasar desde cada estado de pago
+ALLOWED_PAYMENT_TRANSITIONS = {
+    'pendiente': {'parcial', 'pagado'},
+    'parcial': {'pagado'},
+    'pagado': set(),
+}
+
+# Máximo de pedidos por solicitud
+MAX_BULK_ORDERS = 500
+
+# Resultados posibles por pedido
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+NOT_FOUND = 'not_found'
+INVALID = 'invalid_transition'
+
+FIELDS = ('id', 'token', 'status', 'payment_status', 'platform', 'created', 'customer_name', 'email') + Order.TRACKED_FIELDS
+
+
+def parse_identifier(value):
+    """Un id numérico o un token UUID ('id', valor) / ('token', valor); None si no es ninguno"""
+    value = str(value).strip()
+    if value.isdigit():
+        return 'id', int(value)
+    try:
+        return 'token', uuid.UUID(value)
+    except ValueError:
+        return None
+
+
+def check_transition(order, status=None, payment_status=None):
+    """Motivo por el que el cambio no está permitido, o None si es válido"""
+    if status and status != order['status'] and status not in ALLOWED_TRANSITIONS.get(order['status'], ()):
+        return f"No se puede pasar de '{order['status']}' a '{status}'"
+    if (payment_status and payment_status != order['payment_status']
+            and payment_status not in ALLOWED_PAYMENT_TRANSITIONS.get(order['payment_status'], ())):
+        return f"No se puede pasar el pago de '{order['payment_status']}' a '{payment_status}'"
+    return None
+
+
+def bulk_update_orders(identifiers, status=None, payment_status=None):
+    """
+    Aplicar status y/o payment_status a varios pedidos (ids o tokens).
+
+    Devuelve una lista con el resultado de cada identificador, en el mismo
+    orden: updated, unchanged, not_found o invalid_transition (con error).
+    """
+    parsed = [parse_identifier(value) for value in identifiers]
+    lookups = {'id': set(), 'token': set()}
+    for kind_value in parsed:
+        if kind_value:
+            lookups[kind_value[0]].add(kind_value[1])
+
+    now = timezone.now()
+    with transaction.atomic():
+        rows = (
+            Order.objects.select_for_update()
+            .filter(Q(id__in=lookups['id']) | Q(token__in=lookups['token']))
+            .values(*FIELDS)
+        )
+        by_id, by_token = {}, {}
+        for row in rows:
+            by_id[row['id']] = row
+            by_token[row['token']] = row
+
+        results, to_update = [], {}
+        for value, kind_value in zip(identifiers, parsed):
+            order = None
+            if kind_value:
+                kind, key = kind_value
+                order = (by_id if kind == 'id' else by_token).get(key)
+            if order is None:
+                results.append({'order': value, 'result': NOT_FOUND})
+                continue
+
+            result = {'order': value, 'id': order['id'], 'token': str(order['token'])}
+            error = check_transition(order, status, payment_status)
+            if error:
+                result.update(result=INVALID, error=error)
+            elif ((status or order['status']) == order['status']
+                    and (payment_status or order['payment_status']) == order['payment_status']):
+                result['result'] = UNCHANGED
+            else:
+                result['result'] = UPDATED
+                to_update[order['id']] = order
+            result['status'] = order['status']
+            result['payment_status'] = order['payment_status']
+            results.append(result)
+
+        if to_update:
+            changes = {'updated': now}
+            if status:
+                changes['status'] = status
+            if payment_status:
+                changes['payment_status'] = payment_status
+            Order.objects.filter(id__in=to_update).update(**changes)
+            _after_update(list(to_update.values()), changes, now)
+
+    for result in results:
+        if result['result'] == UPDATED:
+            result['status'] = status or result['status']
+            result['payment_status'] = payment_status or result['payment_status']
+    return results
+
+
+def _after_update(orders, changes, now):
+    """Lo que harían las señales de post_save para cada pedido actualizado"""
+    new_status = changes.get('status')
+    moved = [order for order in orders if new_status and order['status'] != new_status]
+
+    counters.orders_changed(
+        ({name: order[name] for name in Order.TRACKED_FIELDS},
+         {name: changes.get(name, order[name]) for name in Order.TRACKED_FIELDS})
+        for order in moved
+    )
+    if moved:
+        lead_times.record_status_changes(moved, new_status, now)
+
+    updated = [
+        {**order, 'status': changes.get('status', order['status']),
+         'payment_status': changes.get('payment_status', order['payment_status'])}
+        for order in orders
+    ]
+    publish_order_changes(updated)
+    # Notificaciones al cliente (email/webhook) solo por cambio de estado
+    moved_ids = {order['id'] for order in moved}
+    outbox.notify_orders(order for order in updated if order['id'] in moved_ids)
+
+
+def summarize(results):
+    """Cantidad de pedidos por resultado"""
+    summary = {UPDATED: 0, UNCHANGED: 0, NOT_FOUND: 0, INVALID: 0}
+    for result in results:
+        summary[result['result']] += 1
+    return summary
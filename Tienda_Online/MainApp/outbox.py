@@ -0,0 +1,287 @@
+# MainApp/outbox.py
+#
+# Bandeja de salida transaccional para las notificaciones de pedidos.
+#
+# Cuando un pedido se crea o cambia de estado (Order.save() vía signals.py,
+# o los cambios masivos de order_updates.py) se escribe un OutboxMessage por
+# canal en la misma transacción: si el cambio se revierte, la notificación
+# también. Nada se envía durante la petición.
+#
+# `manage.py drain_outbox` toma lotes de mensajes listos y los entrega:
+#
+# - email al cliente con una sola conexión SMTP por lote;
+# - webhook (OUTBOX['WEBHOOK_URL']) para los estados de WEBHOOK_STATUSES, con
+#   la clave del mensaje en Idempotency-Key.
+#
+# Un mensaje que falla se reintenta con backoff exponencial hasta
+# MAX_ATTEMPTS veces. Mientras un mensaje está pendiente, un cambio posterior
+# del mismo pedido lo reemplaza (dedup_key) en vez de agregar otro: el
+# cliente recibe un solo correo con el último estado. Cada lote se reserva
+# por LEASE_SECONDS; si el proceso muere, otro lo retoma al vencer.
+
+import json
+import logging
+import random
+import urllib.error
+import urllib.request
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Order, OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+PENDING, SENDING, SENT, FAILED, SUPERSEDED = 'pending', 'sending', 'sent', 'failed', 'superseded'
+
+STATUS_LABELS = dict(Order.STATUS_CHOICES)
+PAYMENT_LABELS = dict(Order.PAYMENT_STATUS)
+
+
+def tracking_url(token):
+    return settings.OUTBOX['SITE_URL'].rstrip('/') + reverse('order_track', kwargs={'token': token})
+
+
+def order_payload(order, created=False):
+    """Datos de la notificación (acepta un Order o un diccionario con sus campos)"""
+    get = order.get if isinstance(order, dict) else lambda name: getattr(order, name)
+    status = get('status')
+    return {
+        'event': 'order.created' if created else 'order.status_changed',
+        'order_id': get('id'),
+        'token': str(get('token')),
+        'customer_name': get('customer_name'),
+        'email': get('email'),
+        'status': status,
+        'status_display': STATUS_LABELS.get(status, status),
+        'payment_status': get('payment_status'),
+        'payment_status_display': PAYMENT_LABELS.get(get('payment_status'), get('payment_status')),
+        'total_price': get('total_price'),
+        'tracking_url': tracking_url(get('token')),
+    }
+
+
+def _messages_for(payload):
+    config = settings.OUTBOX
+    kind = 'created' if payload['event'] == 'order.created' else 'status'
+    if payload['email']:
+        yield 'email', f"email:{payload['order_id']}:{kind}"
+    if config['WEBHOOK_URL'] and payload['status'] in config['WEBHOOK_STATUSES']:
+        yield 'webhook', f"webhook:{payload['order_id']}:{kind}"
+
+
+def enqueue(payloads):
+    """
+    Escribir las notificaciones de `payloads` (ver order_payload). Debe
+    llamarse dentro de la transacción del cambio del pedido.
+    """
+    messages = {}
+    for payload in payloads:
+        for channel, dedup_key in _messages_for(payload):
+            messages[dedup_key] = (channel, payload)
+    if not messages:
+        return
+
+    # Pendientes del mismo pedido: se actualizan con el último estado
+    pending = set(
+        OutboxMessage.objects.filter(state=PENDING, dedup_key__in=messages)
+        .values_list('dedup_key', flat=True)
+    )
+    new = []
+    for dedup_key, (channel, payload) in messages.items():
+        if dedup_key in pending and OutboxMessage.objects.filter(
+            state=PENDING, dedup_key=dedup_key,
+        ).update(payload=payload):
+            continue
+        # No había o el worker lo acaba de tomar: mensaje nuevo
+        new.append(OutboxMessage(
+            channel=channel, dedup_key=dedup_key, order_id=payload['order_id'], payload=payload,
+        ))
+    if new:
+        _insert(new)
+
+
+def _insert(messages):
+    """
+    Insertar mensajes nuevos. Si otra transacción dejó entretanto un pendiente
+    con la misma dedup_key (outbox_pending_dedup_uniq), se actualiza ese: el
+    error queda en un savepoint y no revierte el cambio del pedido.
+    """
+    try:
+        with transaction.atomic():
+            OutboxMessage.objects.bulk_create(messages)
+        return
+    except IntegrityError:
+        pass
+    # Uno por uno; si el pendiente ajeno se toma antes de actualizarlo, se reintenta el insert
+    for message in messages:
+        for attempt in range(3):
+            try:
+                with transaction.atomic():
+                    message.save(force_insert=True)
+                break
+            except IntegrityError:
+                if OutboxMessage.objects.filter(state=PENDING, dedup_key=message.dedup_key).update(
+                    payload=message.payload,
+                ):
+                    break
+                if attempt == 2:
+                    raise
+
+
+def notify_order(order, created=False):
+    enqueue([order_payload(order, created)])
+
+
+def notify_orders(orders):
+    """Cambios de estado de varios pedidos (diccionarios con los campos de Order)"""
+    enqueue(order_payload(order) for order in orders)
+
+
+# --- ENVÍO ---
+
+def backoff(attempts):
+    """Segundos hasta el próximo intento (exponencial con jitter)"""
+    config = settings.OUTBOX
+    delay = min(config['BACKOFF_SECONDS'] * 2 ** (attempts - 1), config['BACKOFF_MAX_SECONDS'])
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim(batch_size=None):
+    """Reservar el próximo lote (pendientes listos y envíos abandonados)"""
+    batch_size = batch_size or settings.OUTBOX['BATCH_SIZE']
+    now = timezone.now()
+    ready = Q(state=PENDING, available_at__lte=now) | Q(state=SENDING, locked_until__lt=now)
+    lease = now + timedelta(seconds=settings.OUTBOX['LEASE_SECONDS'])
+    with transaction.atomic():
+        queryset = OutboxMessage.objects.filter(ready).order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            # Varios workers en paralelo no se bloquean entre sí
+            queryset = queryset.select_for_update(skip_locked=True)
+        ids = list(queryset.values_list('id', flat=True)[:batch_size])
+        # Volver a comprobar al reservar: sin skip_locked otro worker pudo tomarlos
+        OutboxMessage.objects.filter(ready, id__in=ids).update(
+            state=SENDING, attempts=F('attempts') + 1, locked_until=lease,
+        )
+    return list(OutboxMessage.objects.filter(id__in=ids, state=SENDING, locked_until=lease).order_by('id'))
+
+
+def build_email(message, email_connection):
+    payload = message.payload
+    context = {**payload, 'site_name': settings.OUTBOX['SITE_NAME']}
+    subject = render_to_string('MainApp/emails/order_subject.txt', context).strip()
+    return EmailMultiAlternatives(
+        subject, render_to_string('MainApp/emails/order_notification.txt', context),
+        to=[payload['email']], connection=email_connection,
+        headers={'X-Idempotency-Key': str(message.key)},
+    )
+
+
+def send_emails(messages):
+    """Enviar los correos del lote por una sola conexión; devuelve {id: error o None}"""
+    results = {}
+    try:
+        with get_connection() as email_connection:
+            for message in messages:
+                try:
+                    build_email(message, email_connection).send()
+                    results[message.id] = None
+                except Exception as exc:
+                    results[message.id] = f"{type(exc).__name__}: {exc}"
+    except Exception as exc:
+        # No se pudo abrir (o cerrar) la conexión: se reintenta todo lo no enviado
+        error = f"{type(exc).__name__}: {exc}"
+        for message in messages:
+            results.setdefault(message.id, error)
+    return results
+
+
+def send_webhook(message):
+    config = settings.OUTBOX
+    request = urllib.request.Request(
+        config['WEBHOOK_URL'], data=json.dumps(message.payload).encode(), method='POST',
+        headers={'Content-Type': 'application/json', 'Idempotency-Key': str(message.key)},
+    )
+    with urllib.request.urlopen(request, timeout=config['WEBHOOK_TIMEOUT']) as response:
+        response.read()
+
+
+def send_webhooks(messages):
+    results = {}
+    for message in messages:
+        try:
+            send_webhook(message)
+            results[message.id] = None
+        except urllib.error.HTTPError as exc:
+            results[message.id] = f"HTTP {exc.code}"
+        except Exception as exc:
+            results[message.id] = f"{type(exc).__name__}: {exc}"
+    return results
+
+
+SENDERS = {
+    'email': send_emails,
+    'webhook': send_webhooks,
+}
+
+
+def _finish(messages, results):
+    now = timezone.now()
+    sent = [message.id for message in messages if results.get(message.id) is None]
+    OutboxMessage.objects.filter(id__in=sent).update(
+        state=SENT, sent_at=now, locked_until=None, last_error='',
+    )
+
+    failed = [message for message in messages if results.get(message.id) is not None]
+    if not failed:
+        return len(sent), 0
+    # Si mientras tanto llegó un mensaje más nuevo del mismo pedido, reemplaza al fallido
+    newer = set(
+        OutboxMessage.objects.filter(state=PENDING, dedup_key__in=[m.dedup_key for m in failed])
+        .values_list('dedup_key', flat=True)
+    )
+    for message in failed:
+        error = results[message.id]
+        if message.dedup_key in newer:
+            state, available_at = SUPERSEDED, message.available_at
+        elif message.attempts >= settings.OUTBOX['MAX_ATTEMPTS']:
+            state, available_at = FAILED, message.available_at
+            logger.error("Notificación %s del pedido %s descartada tras %s intentos: %s",
+                         message.channel, message.order_id, message.attempts, error)
+        else:
+            state, available_at = PENDING, now + timedelta(seconds=backoff(message.attempts))
+            logger.warning("Notificación %s del pedido %s falló (intento %s): %s",
+                           message.channel, message.order_id, message.attempts, error)
+        OutboxMessage.objects.filter(id=message.id).update(
+            state=state, available_at=available_at, locked_until=None, last_error=error[:2000],
+        )
+    return len(sent), len(failed)
+
+
+def drain_batch(batch_size=None):
+    """Entregar un lote; devuelve (reservados, enviados, fallidos)"""
+    messages = claim(batch_size)
+    sent = failed = 0
+    for channel, sender in SENDERS.items():
+        group = [message for message in messages if message.channel == channel]
+        if group:
+            done, errors = _finish(group, sender(group))
+            sent += done
+            failed += errors
+    return len(messages), sent, failed
+
+
+def prune(days=None):
+    """Borrar los mensajes enviados o descartados más antiguos que RETENTION_DAYS"""
+    days = settings.OUTBOX['RETENTION_DAYS'] if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = OutboxMessage.objects.filter(
+        state__in=(SENT, FAILED, SUPERSEDED), created__lt=cutoff,
+    ).delete()
+    return deleted
@@ -0,0 +1,110 @@
+# MainApp/page_cache.py
+#
+# Caché de páginas y fragmentos del catálogo para visitantes anónimos.
+#
+# Todas las claves llevan el número de versión del catálogo. Cualquier cambio
+# en Product, Category o ProductImage (ver signals.py) incrementa la versión,
+# así las entradas anteriores dejan de usarse sin tener que buscarlas y
+# borrarlas; caducan solas por su timeout.
+
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def _initial_version():
+    # Basada en la hora: si la clave se pierde (reinicio, desalojo) no se
+    # reutiliza un número de versión con páginas viejas todavía en la caché.
+    return time.time_ns() // 1000
+
+
+def catalog_version():
+    """Versión actual del catálogo (se agrega a las claves de página y fragmento)"""
+    return cache.get_or_set(CATALOG_VERSION_KEY, _initial_version, None)
+
+
+def bump_catalog_version():
+    """Invalidar todas las páginas y fragmentos del catálogo"""
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, _initial_version(), None)
+
+
+def page_key(request, version):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'page:{version}:{request.method}:{path}'
+
+
+def _cacheable_request(request, is_authenticated):
+    """Solo GET/HEAD anónimos y sin mensajes flash pendientes"""
+    if request.method not in ('GET', 'HEAD') or is_authenticated:
+        return False
+    # len() no marca los mensajes como leídos: la página los seguirá mostrando
+    return not len(get_messages(request))
+
+
+def _store(key, response):
+    if response.status_code != 200 or response.streaming:
+        return
+    if hasattr(response, 'render') and not response.is_rendered:
+        response.render()
+    cache.set(key, (response.content, response['Content-Type']), settings.STOREFRONT_CACHE['PAGE_SECONDS'])
+
+
+def _cached_response(entry):
+    content, content_type = entry
+    response = HttpResponse(content, content_type=content_type)
+    response['X-Page-Cache'] = 'hit'
+    return response
+
+
+def cache_anonymous_page(view):
+    """
+    Guardar la respuesta completa de la vista para visitantes anónimos.
+
+    El personal autenticado y las páginas con mensajes flash siempre se
+    renderizan. Sirve para vistas síncronas y asíncronas.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+            cacheable = await sync_to_async(_cacheable_request)(request, is_authenticated)
+            if not cacheable:
+                return await view(request, *args, **kwargs)
+
+            key = page_key(request, await sync_to_async(catalog_version)())
+            entry = await cache.aget(key)
+            if entry is not None:
+                return _cached_response(entry)
+
+            response = await view(request, *args, **kwargs)
+            await sync_to_async(_store)(key, response)
+            response['X-Page-Cache'] = 'miss'
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _cacheable_request(request, request.user.is_authenticated):
+            return view(request, *args, **kwargs)
+
+        key = page_key(request, catalog_version())
+        entry = cache.get(key)
+        if entry is not None:
+            return _cached_response(entry)
+
+        response = view(request, *args, **kwargs)
+        _store(key, response)
+        response['X-Page-Cache'] = 'miss'
+        return response
+    return wrapper
@@ -0,0 +1,47 @@
+# MainApp/paginators.py
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# Por debajo de esta cantidad de filas se usa el COUNT(*) exacto
+ESTIMATE_THRESHOLD = 100_000
+
+
+def estimated_row_count(model, using='default'):
+    """Filas aproximadas de la tabla según las estadísticas del motor (None si no hay)"""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+                           [connection.ops.quote_name(table)])
+        elif connection.vendor == 'mysql':
+            cursor.execute("SELECT table_rows FROM information_schema.tables "
+                           "WHERE table_schema = DATABASE() AND table_name = %s", [table])
+        elif connection.vendor == 'sqlite':
+            # rowid máximo: O(log n), sobreestima si hubo borrados
+            cursor.execute(f"SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}")
+        else:
+            return None
+        row = cursor.fetchone()
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator para el admin: en un listado sin filtros ni búsqueda sobre una
+    tabla grande usa el conteo estimado en vez de un COUNT(*) completo.
+    Con filtros el conteo es exacto (y lo acotan los índices).
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if hasattr(queryset, 'query') and not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
@@ -0,0 +1,303 @@
+# MainApp/profiling.py
+#
+# Perfilado bajo demanda de peticiones reales (ProfilingMiddleware en
+# middleware.py, PROFILING en settings).
+#
+# Una petición se perfila cuando:
+#
+# - la hace el personal con ?profile=1 (sesión de staff);
+# - trae la cabecera X-Profile con un token firmado (se genera en la página
+#   de perfiles; sirve para la API con token o para ver una página como
+#   visitante anónimo), o
+# - le toca por muestreo: 1 de cada N peticiones a una URL con nombre
+#   (PROFILING['SAMPLE'] = {'product-list': 100}).
+#
+# La petición corre bajo cProfile y además se mide cada sentencia SQL con
+# connection.execute_wrapper. Se escriben dos archivos en PROFILING['DIR']:
+# el .prof (pstats, para snakeviz o `python -m pstats`) y un informe de texto
+# con el resumen (SQL, plantillas, SerializerMethodField), las consultas más
+# lentas, las funciones más costosas y el árbol de llamadas. La primera línea
+# del informe es un JSON con los datos del listado (/dashboard/perfiles/).
+#
+# Con PROFILING['ENABLED'] apagado el middleware no se instala: costo cero.
+# Hay un solo perfil a la vez por proceso (cProfile no admite dos activos
+# desde Python 3.12); si otra petición ya se está perfilando, esta sigue sin
+# perfilar.
+
+import cProfile
+import io
+import itertools
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+from django.template.base import Template
+from django.utils import timezone
+from rest_framework.fields import SerializerMethodField
+
+logger = logging.getLogger(__name__)
+
+TOKEN_SALT = 'MainApp.profiling'
+REPORT_SUFFIX = '.txt'
+STATS_SUFFIX = '.prof'
+
+# Nodos del árbol: se omiten los que pesan menos que esto del total
+TREE_MIN_FRACTION = 0.01
+TREE_MAX_DEPTH = 30
+
+_active = threading.Lock()
+_counters = {}
+_counters_lock = threading.Lock()
+
+
+def _code_key(function):
+    code = function.__code__
+    return code.co_filename, code.co_firstlineno, code.co_name
+
+
+TEMPLATE_RENDER = _code_key(Template.render)
+METHOD_FIELD = _code_key(SerializerMethodField.to_representation)
+
+
+def profile_dir():
+    return Path(settings.PROFILING['DIR'])
+
+
+# --- CUÁNDO PERFILAR ---
+
+def make_token():
+    """Token para la cabecera X-Profile (vence a los TOKEN_MAX_AGE segundos)"""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign('profile')
+
+
+def valid_token(token):
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=settings.PROFILING['TOKEN_MAX_AGE'])
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def sampled(url_name):
+    """¿Le toca a esta petición el muestreo 1 de cada N de su URL?"""
+    every = settings.PROFILING['SAMPLE'].get(url_name)
+    if not every:
+        return False
+    with _counters_lock:
+        counter = _counters.setdefault(url_name, itertools.count(1))
+        return next(counter) % every == 0
+
+
+# --- EJECUCIÓN ---
+
+class SqlTimer:
+    """execute_wrapper que mide cada sentencia"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(((time.perf_counter() - start) * 1000, sql))
+
+
+def run(request, get_response, reason):
+    """
+    Ejecutar get_response(request) perfilado; devuelve la respuesta. Si ya
+    hay otro perfil en curso la petición sigue sin perfilar.
+    """
+    if not _active.acquire(blocking=False):
+        return get_response(request)
+    try:
+        sql = SqlTimer()
+        profiler = cProfile.Profile()
+        started = timezone.now()
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(sql))
+            response = profiler.runcall(get_response, request)
+        wall = (time.perf_counter() - wall_start) * 1000
+        cpu = (time.process_time() - cpu_start) * 1000
+    finally:
+        _active.release()
+
+    meta = {
+        'id': f"{started:%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}",
+        'created': started.isoformat(),
+        'method': request.method,
+        'path': request.get_full_path(),
+        'view': _view_name(request),
+        'status': response.status_code,
+        'reason': reason,
+        'wall_ms': round(wall, 1),
+        'cpu_ms': round(cpu, 1),
+    }
+    try:
+        write_report(meta, profiler, sql.queries)
+    except OSError:
+        # El perfil es prescindible: la respuesta sale igual
+        logger.exception("No se pudo guardar el perfil de %s", meta['path'])
+    return response
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return ''
+    return match.view_name or match._func_path
+
+
+# --- INFORME ---
+
+def _label(key):
+    filename, line, name = key
+    if filename == '~':
+        return name
+    parts = Path(filename).parts
+    # Ruta corta: desde el paquete (django/..., MainApp/..., rest_framework/...)
+    for marker in ('site-packages', 'Tienda_Online', 'lib'):
+        if marker in parts:
+            parts = parts[len(parts) - parts[::-1].index(marker):]
+            break
+    return f"{'/'.join(parts)}:{line}({name})"
+
+
+def summary(stats, queries):
+    """Tiempos de SQL, plantillas y SerializerMethodField (ms)"""
+    entries = stats.stats
+    template_ms = entries[TEMPLATE_RENDER][3] * 1000 if TEMPLATE_RENDER in entries else 0.0
+    method_fields = {}
+    method_ms = 0.0
+    if METHOD_FIELD in entries:
+        method_ms = entries[METHOD_FIELD][3] * 1000
+        # Los get_<campo> que llamó SerializerMethodField.to_representation
+        for key, (_, _, _, _, callers) in entries.items():
+            edge = callers.get(METHOD_FIELD)
+            if edge and key[0] != '~':
+                method_fields[_label(key)] = {'calls': edge[1], 'ms': round(edge[3] * 1000, 2)}
+    return {
+        'sql_count': len(queries),
+        'sql_ms': round(sum(ms for ms, _ in queries), 2),
+        'template_ms': round(template_ms, 2),
+        'method_field_ms': round(method_ms, 2),
+        'method_fields': dict(sorted(method_fields.items(), key=lambda item: -item[1]['ms'])),
+    }
+
+
+def call_tree(stats, out):
+    """
+    Árbol de llamadas por tiempo acumulado (desde la vista hacia abajo).
+    pstats guarda los tiempos por par llamador-llamado, no por camino: bajo
+    una función llamada desde varios lugares, sus hijos se reparten en
+    proporción al tiempo de esta rama.
+    """
+    entries = stats.stats
+    callees = {}
+    for key, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((edge[3], edge[1], key))
+    functions = [key for key in entries if key[0] != '~']
+    if not functions:
+        return
+    # Raíz: la de mayor tiempo acumulado (la cadena de middlewares es recursiva,
+    # así que no hay una función sin llamadores)
+    root = max(functions, key=lambda key: entries[key][3])
+    total = entries[root][3] or 1
+    threshold = total * TREE_MIN_FRACTION
+
+    def walk(key, cumulative, calls, depth, path):
+        out.write(f"{'  ' * depth}{cumulative * 1000:9.2f} ms {calls:>6}x  {_label(key)}\n")
+        if depth >= TREE_MAX_DEPTH:
+            return
+        share = cumulative / entries[key][3] if entries[key][3] else 0
+        for child_time, child_calls, child in sorted(callees.get(key, ()), key=lambda item: -item[0]):
+            if child_time * share < threshold or child in path:
+                continue
+            walk(child, child_time * share, child_calls, depth + 1, path | {child})
+
+    walk(root, entries[root][3], entries[root][1], 0, {root})
+
+
+def write_report(meta, profiler, queries):
+    config = settings.PROFILING
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    stats = pstats.Stats(profiler)
+    meta.update(summary(stats, queries))
+
+    out = io.StringIO()
+    out.write(json.dumps(meta) + '\n\n')
+    out.write(f"{meta['method']} {meta['path']} -> {meta['status']}\n")
+    out.write(f"Vista: {meta['view'] or '-'}    motivo: {meta['reason']}    {meta['created']}\n")
+    out.write(f"Total: {meta['wall_ms']} ms (CPU {meta['cpu_ms']} ms)\n")
+    out.write(f"SQL: {meta['sql_count']} sentencias, {meta['sql_ms']} ms\n")
+    out.write(f"Plantillas: {meta['template_ms']} ms\n")
+    out.write(f"SerializerMethodField: {meta['method_field_ms']} ms\n")
+    for label, field in meta['method_fields'].items():
+        out.write(f"  {field['ms']:9.2f} ms {field['calls']:>6}x  {label}\n")
+
+    out.write("\n== Sentencias SQL más lentas ==\n")
+    for ms, sql in sorted(queries, key=lambda query: -query[0])[:config['TOP_QUERIES']]:
+        out.write(f"{ms:9.2f} ms  {' '.join(sql.split())[:500]}\n")
+
+    out.write("\n== Funciones (tiempo acumulado) ==\n")
+    stats.stream = out
+    stats.sort_stats('cumulative').print_stats(config['TOP_FUNCTIONS'])
+
+    out.write("\n== Árbol de llamadas ==\n")
+    call_tree(stats, out)
+
+    stats.dump_stats(directory / f"{meta['id']}{STATS_SUFFIX}")
+    (directory / f"{meta['id']}{REPORT_SUFFIX}").write_text(out.getvalue(), encoding='utf-8')
+    prune(config['KEEP'])
+
+
+# --- LISTADO ---
+
+def recent_profiles(limit=None):
+    """Metadatos de los perfiles guardados, del más reciente al más antiguo"""
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    reports = sorted(directory.glob(f'*{REPORT_SUFFIX}'), key=os.path.getmtime, reverse=True)
+    profiles = []
+    for path in reports[:limit]:
+        try:
+            with path.open(encoding='utf-8') as report:
+                profiles.append(json.loads(report.readline()))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def profile_path(profile_id, suffix):
+    """Ruta del archivo de un perfil, o None si el id no es válido o no existe"""
+    if not profile_id or Path(profile_id).name != profile_id or profile_id.startswith('.'):
+        return None
+    path = profile_dir() / f'{profile_id}{suffix}'
+    return path if path.is_file() else None
+
+
+def prune(keep):
+    """Conservar solo los `keep` perfiles más recientes"""
+    directory = profile_dir()
+    reports = sorted(directory.glob(f'*{REPORT_SUFFIX}'), key=os.path.getmtime, reverse=True)
+    for path in reports[keep:]:
+        for suffix in (REPORT_SUFFIX, STATS_SUFFIX):
+            try:
+                path.with_suffix(suffix).unlink()
+            except FileNotFoundError:
+                pass
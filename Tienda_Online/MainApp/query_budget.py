@@ -0,0 +1,199 @@
+# MainApp/query_budget.py
+#
+# Presupuestos de consulta por endpoint (QUERY_BUDGETS en settings), para que
+# una petición mal formada o demasiado amplia no retenga un worker minutos:
+#
+# - Tiempo máximo por sentencia SQL. En PostgreSQL con statement_timeout; en
+#   SQLite con un progress handler que interrumpe la sentencia al vencer el
+#   plazo (se reinicia en cada sentencia con connection.execute_wrapper y
+#   cubre también la lectura de sus filas). Al cortarse se responde 503 con
+#   Retry-After.
+# - Listados de pedidos paginados (BudgetPagination): PAGE_SIZE filas por
+#   página y nunca más de MAX_ROWS aunque se pida ?page_size= mayor. Los que
+#   intercalan pedidos archivados solo se recorren hasta la fila MAX_ROWS; más
+#   allá se responde 400 pidiendo acotar los filtros.
+#
+# Cada corte queda registrado en el logger 'MainApp.query_budget' con la ruta,
+# los parámetros, el usuario y la IP.
+
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.pagination import PageNumberPagination
+
+from .throttling import client_ip
+
+logger = logging.getLogger(__name__)
+
+# Instrucciones de la VM de SQLite entre llamadas al progress handler
+SQLITE_PROGRESS_STEPS = 10000
+
+# SQLSTATE query_canceled de PostgreSQL
+PG_QUERY_CANCELED = '57014'
+
+
+class QueryTimeout(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "La consulta tardó demasiado. Acota los filtros o intenta nuevamente."
+    default_code = 'query_timeout'
+
+
+class TooManyRows(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_code = 'too_many_rows'
+
+    def __init__(self, max_rows):
+        super().__init__(
+            f"Solo se recorren los primeros {max_rows} pedidos de esta consulta: acota los filtros o el rango de fechas."
+        )
+
+
+def timeout_ms(scope):
+    budgets = settings.QUERY_BUDGETS['TIMEOUT_MS']
+    return budgets.get(scope, budgets['default'])
+
+
+def max_rows():
+    return settings.QUERY_BUDGETS['MAX_ROWS']
+
+
+def is_timeout(exc):
+    """¿La excepción (o su causa) es una sentencia cortada por el presupuesto?"""
+    while exc is not None:
+        if isinstance(exc, QueryTimeout):
+            return True
+        if isinstance(exc, sqlite3.OperationalError) and str(exc) == 'interrupted':
+            return True
+        if getattr(exc, 'pgcode', None) == PG_QUERY_CANCELED or getattr(exc, 'sqlstate', None) == PG_QUERY_CANCELED:
+            return True
+        exc = exc.__cause__
+    return False
+
+
+@contextmanager
+def _sqlite_budget(connection, seconds):
+    deadline = [None]
+
+    def progress():
+        # Distinto de cero interrumpe la sentencia en curso
+        return deadline[0] is not None and time.monotonic() > deadline[0]
+
+    def start_statement(execute, sql, params, many, context):
+        deadline[0] = time.monotonic() + seconds
+        return execute(sql, params, many, context)
+
+    connection.ensure_connection()
+    raw = connection.connection
+    raw.set_progress_handler(progress, SQLITE_PROGRESS_STEPS)
+    try:
+        with connection.execute_wrapper(start_statement):
+            yield
+    finally:
+        raw.set_progress_handler(None, SQLITE_PROGRESS_STEPS)
+
+
+@contextmanager
+def _postgresql_budget(connection, ms):
+    with connection.cursor() as cursor:
+        cursor.execute('SET statement_timeout = %s', [ms])
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('RESET statement_timeout')
+
+
+@contextmanager
+def statement_timeout(ms, using='default'):
+    """Limitar cada sentencia SQL dentro del bloque a `ms` milisegundos (0 = sin límite)"""
+    connection = connections[using]
+    active = getattr(connection, '_query_budget_ms', None)
+    if not ms or active is not None or connection.vendor not in ('sqlite', 'postgresql'):
+        # Sin límite, motor sin soporte o ya dentro de otro presupuesto
+        yield
+        return
+
+    connection._query_budget_ms = ms
+    try:
+        if connection.vendor == 'sqlite':
+            with _sqlite_budget(connection, ms / 1000):
+                yield
+        else:
+            with _postgresql_budget(connection, ms):
+                yield
+    finally:
+        connection._query_budget_ms = None
+
+
+def log_rejection(request, scope, reason):
+    user = getattr(request, 'user', None)
+    logger.warning(
+        "Consulta rechazada (%s, presupuesto '%s'): %s %s usuario=%s ip=%s",
+        reason, scope, request.method, request.get_full_path(),
+        user.get_username() if user is not None and user.is_authenticated else '-',
+        client_ip(request),
+    )
+
+
+def service_unavailable():
+    response = HttpResponse(
+        QueryTimeout.default_detail, status=503, content_type='text/plain; charset=utf-8',
+    )
+    response['Retry-After'] = str(settings.QUERY_BUDGETS['RETRY_AFTER'])
+    return response
+
+
+def query_budget(scope):
+    """Aplicar el presupuesto de tiempo de `scope` a una vista de Django (síncrona)"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                with statement_timeout(timeout_ms(scope)):
+                    return view(request, *args, **kwargs)
+            except Exception as exc:
+                if not is_timeout(exc):
+                    raise
+                log_rejection(request, scope, f"más de {timeout_ms(scope)} ms")
+                return service_unavailable()
+        return wrapper
+    return decorator
+
+
+class BudgetPagination(PageNumberPagination):
+    """Páginas de QUERY_BUDGETS['PAGE_SIZE'] filas; ?page_size= hasta MAX_ROWS"""
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        # Leídos en cada petición (los settings pueden cambiar en las pruebas)
+        self.page_size = settings.QUERY_BUDGETS['PAGE_SIZE']
+        self.max_page_size = max_rows()
+        return min(super().get_page_size(request), self.max_page_size)
+
+
+class QueryBudgetMixin:
+    """Presupuesto de tiempo para vistas de DRF (QUERY_BUDGETS['TIMEOUT_MS'][query_budget])"""
+    query_budget = 'default'
+
+    def dispatch(self, request, *args, **kwargs):
+        with statement_timeout(timeout_ms(self.query_budget)):
+            return super().dispatch(request, *args, **kwargs)
+
+    def handle_exception(self, exc):
+        if is_timeout(exc):
+            log_rejection(self.request, self.query_budget, f"más de {timeout_ms(self.query_budget)} ms")
+            exc = QueryTimeout()
+        elif isinstance(exc, TooManyRows):
+            log_rejection(self.request, self.query_budget, f"más de {max_rows()} filas")
+        response = super().handle_exception(exc)
+        if isinstance(exc, QueryTimeout):
+            response['Retry-After'] = str(settings.QUERY_BUDGETS['RETRY_AFTER'])
+        return response
@@ -0,0 +1,162 @@
+# MainApp/recommendations.py
+#
+# "Frecuentemente pedidos juntos": productos que los mismos clientes piden.
+#
+# build() se ejecuta fuera de línea (`manage.py build_recommendations`):
+#
+# 1. Lee los pares distintos (cliente, producto) del historial, activo y
+#    archivado. Un cliente es el grupo de pedidos que comparten email,
+#    teléfono o usuario de red social (las mismas claves que el historial
+#    de cliente, ver customers.py), unidos con union-find.
+# 2. Arma la matriz de co-ocurrencia producto x producto con NumPy
+#    (B^T B sobre la matriz cliente x producto, por bloques de clientes).
+# 3. Puntúa cada par con similitud coseno: clientes en común / sqrt(clientes
+#    de cada producto), para que los productos más vendidos no aparezcan
+#    recomendados en todas partes.
+# 4. Guarda los TOP_K mejores de cada producto en ProductRecommendation.
+#
+# Las vistas solo leen esa tabla por (product, rank): una consulta por índice.
+# Requiere numpy (opcional para el resto del proyecto).
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import ArchivedOrder, Order, ProductRecommendation
+from .page_cache import bump_catalog_version
+
+try:
+    import numpy as np
+except ImportError:  # numpy es opcional
+    np = None
+
+CUSTOMER_KEYS = ('email_normalized', 'phone_digits', 'social_handle')
+
+
+def recommended_products(product, limit=None):
+    """Recomendaciones guardadas de `product` (QuerySet perezoso, con el producto recomendado)"""
+    limit = limit or settings.RECOMMENDATIONS['TOP_K']
+    return (
+        ProductRecommendation.objects.filter(product=product)
+        .select_related('recommended').order_by('rank')[:limit]
+    )
+
+
+def _find(parents, key):
+    root = key
+    while parents[root] != root:
+        root = parents[root]
+    while parents[key] != root:
+        parents[key], key = root, parents[key]
+    return root
+
+
+def customer_products(exclude_statuses=None):
+    """Pares (cliente, producto) distintos como dos arrays de índices, y la lista de ids de producto"""
+    exclude_statuses = settings.RECOMMENDATIONS['EXCLUDE_STATUSES'] if exclude_statuses is None else exclude_statuses
+    rows = set()
+    for model in (Order, ArchivedOrder):
+        rows.update(
+            model.objects.filter(product_ref__isnull=False).exclude(status__in=exclude_statuses)
+            .values_list(*CUSTOMER_KEYS, 'product_ref_id').distinct().iterator()
+        )
+
+    # Union-find sobre las claves: dos pedidos con alguna clave igual son del mismo cliente
+    parents = {}
+    pairs = []
+    for *keys, product_id in rows:
+        keys = [(name, value) for name, value in zip(CUSTOMER_KEYS, keys) if value]
+        if not keys:
+            continue
+        for key in keys:
+            parents.setdefault(key, key)
+        root = _find(parents, keys[0])
+        for key in keys[1:]:
+            other = _find(parents, key)
+            if other != root:
+                parents[other] = root
+        pairs.append((keys[0], product_id))
+
+    customer_index, product_index = {}, {}
+    customers = np.empty(len(pairs), dtype=np.int64)
+    products = np.empty(len(pairs), dtype=np.int64)
+    for i, (key, product_id) in enumerate(pairs):
+        customers[i] = customer_index.setdefault(_find(parents, key), len(customer_index))
+        products[i] = product_index.setdefault(product_id, len(product_index))
+
+    # Un cliente pudo pedir el mismo producto con claves distintas
+    n_products = max(len(product_index), 1)
+    unique = np.unique(customers * n_products + products)
+    return unique // n_products, unique % n_products, list(product_index)
+
+
+def cooccurrence(customers, products, n_products, chunk_customers=None):
+    """Matriz producto x producto de clientes en común (la diagonal: clientes de cada producto)"""
+    chunk_customers = chunk_customers or settings.RECOMMENDATIONS['CHUNK_CUSTOMERS']
+    matrix = np.zeros((n_products, n_products), dtype=np.float32)
+
+    # Los clientes con un solo producto no aportan pares
+    keep = np.bincount(customers)[customers] > 1
+    _, pair_customers = np.unique(customers[keep], return_inverse=True)
+    pair_products = products[keep]
+    order = np.argsort(pair_customers, kind='stable')
+    pair_customers, pair_products = pair_customers[order], pair_products[order]
+
+    # float32 representa exactos hasta 2^24 clientes en común
+    n_customers = int(pair_customers[-1]) + 1 if len(pair_customers) else 0
+    for start in range(0, n_customers, chunk_customers):
+        low, high = np.searchsorted(pair_customers, [start, start + chunk_customers])
+        block = np.zeros((min(chunk_customers, n_customers - start), n_products), dtype=np.float32)
+        block[pair_customers[low:high] - start, pair_products[low:high]] = 1
+        matrix += block.T @ block
+
+    np.fill_diagonal(matrix, np.bincount(products, minlength=n_products))
+    return matrix
+
+
+def top_related(matrix, top_k, min_customers):
+    """Por producto: [(índice, puntaje, clientes en común)] de mayor a menor puntaje"""
+    norms = np.sqrt(matrix.diagonal().astype(np.float64))
+    k = min(top_k, max(len(matrix) - 1, 0))
+    result = []
+    # Fila por fila: no hace falta otra matriz producto x producto en float64
+    for i, row_shared in enumerate(matrix):
+        row_shared = row_shared.astype(np.float64)
+        row_shared[i] = 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = row_shared / (norms[i] * norms)
+        scores[(row_shared < min_customers) | ~np.isfinite(scores)] = 0
+        if not k:
+            result.append([])
+            continue
+        best = np.argpartition(-scores, k - 1)[:k]
+        # Empates: el producto con más clientes en común primero
+        best = best[np.lexsort((-row_shared[best], -scores[best]))]
+        result.append([(int(j), float(scores[j]), int(row_shared[j])) for j in best if scores[j] > 0])
+    return result
+
+
+def build(top_k=None, min_customers=None):
+    """Recalcular todas las recomendaciones; devuelve (productos con recomendaciones, filas guardadas)"""
+    if np is None:
+        raise RuntimeError("Las recomendaciones requieren numpy")
+    config = settings.RECOMMENDATIONS
+    top_k = top_k or config['TOP_K']
+    min_customers = config['MIN_CUSTOMERS'] if min_customers is None else min_customers
+
+    customers, products, product_ids = customer_products()
+    related = top_related(cooccurrence(customers, products, len(product_ids)), top_k, min_customers)
+
+    objects = [
+        ProductRecommendation(
+            product_id=product_ids[i], recommended_id=product_ids[j],
+            rank=rank, score=round(score, 6), customers=shared,
+        )
+        for i, entries in enumerate(related)
+        for rank, (j, score, shared) in enumerate(entries, start=1)
+    ]
+    with transaction.atomic():
+        ProductRecommendation.objects.all().delete()
+        ProductRecommendation.objects.bulk_create(objects, batch_size=1000)
+    # Las páginas de producto en caché muestran las recomendaciones
+    bump_catalog_version()
+    return len({obj.product_id for obj in objects}), len(objects)
@@ -0,0 +1,40 @@
+# MainApp/search_indexes.py
+#
+# Índices de expresión para la búsqueda del admin de pedidos (prefijo sin
+# distinguir mayúsculas del nombre, email exacto y prefijo del teléfono).
+#
+# Los crea la migración 0010 con SQL propio, pero en SQLite cualquier
+# migración posterior que rehace la tabla (AddField, AlterField...) los
+# pierde, porque Django no los conoce. Por eso se vuelven a asegurar después
+# de cada `migrate` (señal post_migrate en signals.py).
+
+SEARCH_COLUMNS = {
+    'order_customer_prefix_idx': 'customer_name',
+    'order_email_prefix_idx': 'email',
+    'order_phone_prefix_idx': 'phone',
+}
+
+
+def _index_expression(connection, column):
+    column = connection.ops.quote_name(column)
+    if connection.vendor == 'postgresql':
+        # istartswith/iexact compilan a UPPER(col::text) LIKE UPPER(%s)
+        return f'(UPPER({column}::text) text_pattern_ops)'
+    if connection.vendor == 'sqlite':
+        # LIKE de SQLite no distingue mayúsculas: necesita un índice NOCASE
+        return f'({column} COLLATE NOCASE)'
+    return None
+
+
+def ensure_search_indexes(connection):
+    """Crear los índices que falten (no hace nada en otros motores)"""
+    from .models import Order
+
+    if Order._meta.db_table not in connection.introspection.table_names():
+        return
+    table = connection.ops.quote_name(Order._meta.db_table)
+    with connection.cursor() as cursor:
+        for name, column in SEARCH_COLUMNS.items():
+            expression = _index_expression(connection, column)
+            if expression is not None:
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} {expression}')
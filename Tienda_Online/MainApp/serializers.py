@@ -1,24 +1,139 @@
 # MainApp/serializers.py (COMPLETO CORREGIDO)
 
 from rest_framework import serializers
+from django.core.exceptions import FieldDoesNotExist
 from django.utils import timezone
 from datetime import datetime, timedelta
-from .models import Supply, Order, OrderImage, Product, Category, ProductImage
+from .models import Supply, Order, OrderImage, Product, Category, ProductImage, ProductRecommendation
+from . import analytics, lead_times
+from .order_updates import MAX_BULK_ORDERS, check_transition
+
+
+def parse_field_paths(value):
+    """'id,product_ref.name' -> {'id': {}, 'product_ref': {'name': {}}}"""
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for name in path.strip().split('.'):
+            if name:
+                node = node.setdefault(name, {})
+    return tree
+
+
+def collapsed_field(field):
+    """Reemplazo de un serializer anidado no expandido: solo su id (o lista de ids)"""
+    kwargs = {'read_only': True}
+    if field.source:
+        kwargs['source'] = field.source
+    if isinstance(field, serializers.ListSerializer):
+        kwargs['many'] = True
+    return serializers.PrimaryKeyRelatedField(**kwargs)
+
+
+# Campos a pedido para los serializers de lectura
+class SparseFieldsMixin:
+    """
+    ?fields=id,customer_name,product_ref.name -> solo esos campos (con puntos
+    para los de un serializer anidado).
+    ?expand=product_ref,product_ref.category -> solo se incrustan los anidados
+    indicados; los demás se devuelven como id o lista de ids.
+
+    Sin parámetros la representación es la completa. optimize_queryset() hace
+    los select_related/prefetch_related de lo que realmente se va a incrustar.
+    """
+
+    # Árboles de ?fields= y ?expand= que el serializer padre asigna a un anidado
+    sparse_fields = None
+    sparse_expand = None
+
+    def _is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # Con datos de entrada (create/update) no se recorta nada
+        if hasattr(self, 'initial_data'):
+            return fields
+
+        only, expand = self.sparse_fields, self.sparse_expand
+        if self._is_root():
+            params = getattr(self.context.get('request'), 'query_params', {})
+            if 'fields' in params:
+                only = parse_field_paths(params['fields'])
+            if 'expand' in params:
+                expand = parse_field_paths(params['expand'])
+        if only is None and expand is None:
+            return fields
+
+        for name, field in list(fields.items()):
+            if only is not None and name not in only:
+                del fields[name]
+                continue
+            nested = field.child if isinstance(field, serializers.ListSerializer) else field
+            if not isinstance(nested, serializers.BaseSerializer):
+                continue
+            # 'product_ref.name' en ?fields= expande product_ref aunque no esté en ?expand=
+            nested_fields = (only or {}).get(name) or None
+            if expand is not None and name not in expand and not nested_fields:
+                fields[name] = collapsed_field(field)
+                continue
+            if isinstance(nested, SparseFieldsMixin):
+                nested.sparse_fields = nested_fields
+                nested.sparse_expand = None if expand is None else expand.get(name, {})
+        return fields
+
+    def optimize_queryset(self, queryset):
+        """Agregar los joins y prefetches de los anidados incluidos (y solo esos)"""
+        select, prefetch = [], []
+        self._collect_relations(queryset.model, '', False, select, prefetch)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+    def _collect_relations(self, model, prefix, prefetching, select, prefetch):
+        for field in self.fields.values():
+            if field.write_only or not field.source or '.' in field.source or field.source == '*':
+                continue
+            try:
+                relation = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                continue
+            if not relation.is_relation:
+                continue
+
+            nested = field.child if isinstance(field, serializers.ListSerializer) else field
+            path = prefix + field.source
+            if relation.one_to_many or relation.many_to_many:
+                # Lista anidada o lista de ids: un prefetch en ambos casos
+                prefetch.append(path)
+                if isinstance(nested, SparseFieldsMixin):
+                    nested._collect_relations(relation.related_model, path + '__', True, select, prefetch)
+            elif isinstance(nested, serializers.BaseSerializer):
+                # FK incrustada (un id solo no necesita join: usa <campo>_id)
+                (prefetch if prefetching else select).append(path)
+                if isinstance(nested, SparseFieldsMixin):
+                    nested._collect_relations(relation.related_model, path + '__', prefetching, select, prefetch)
+
 
 # API para Categorías
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name', 'slug']
 
 # API para Imágenes de Productos
-class ProductImageSerializer(serializers.ModelSerializer):
+class ProductImageSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ProductImage
         fields = ['id', 'image', 'order']
 
 # API para Productos
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.all(), 
@@ -48,8 +163,19 @@ class ProductSerializer(serializers.ModelSerializer):
             return delta.days
         return None
 
+# API para Recomendaciones ("frecuentemente pedidos juntos", ver recommendations.py)
+class ProductRecommendationSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='recommended.id', read_only=True)
+    name = serializers.CharField(source='recommended.name', read_only=True)
+    slug = serializers.CharField(source='recommended.slug', read_only=True)
+    price = serializers.DecimalField(source='recommended.price', max_digits=10, decimal_places=2, read_only=True)
+    
+    class Meta:
+        model = ProductRecommendation
+        fields = ['id', 'name', 'slug', 'price', 'score', 'customers']
+
 # API para Imágenes de Pedidos
-class OrderImageSerializer(serializers.ModelSerializer):
+class OrderImageSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     # USANDO datetime para formatear fecha
     created_formatted = serializers.SerializerMethodField()
     
@@ -86,6 +212,17 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['delivery_urgency']
     
+    def validate(self, data):
+        # PUT/PATCH siguen las mismas transiciones que change_status y bulk-update
+        if self.instance is not None:
+            error = check_transition(
+                {'status': self.instance.status, 'payment_status': self.instance.payment_status},
+                data.get('status'), data.get('payment_status'),
+            )
+            if error:
+                raise serializers.ValidationError(error)
+        return data
+    
     def create(self, validated_data):
         images = validated_data.pop('reference_images', [])
         order = Order.objects.create(**validated_data)
@@ -113,7 +250,7 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         return "No especificado"
 
 # API para Ver/Actualizar Pedidos
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     product_ref = ProductSerializer(read_only=True)
     product_ref_id = serializers.PrimaryKeyRelatedField(
         queryset=Product.objects.all(), 
@@ -162,8 +299,28 @@ class OrderSerializer(serializers.ModelSerializer):
             return delta.days
         return None
     
+    def optimize_queryset(self, queryset):
+        """Además de los joins, cuándo entró cada pedido a su estado (para la fecha estimada)"""
+        queryset = super().optimize_queryset(queryset)
+        if 'estimated_completion' in self.fields and queryset.model is Order:
+            queryset = lead_times.with_status_entered(queryset)
+        return queryset
+    
+    def _lead_time_medians(self):
+        """Medianas por estado, leídas una vez por petición (el contexto es común a todas las filas)"""
+        medians = self.context.get('lead_time_medians')
+        if medians is None:
+            medians = self.context['lead_time_medians'] = lead_times.lead_time_stats()['medians']
+        return medians
+    
     def get_estimated_completion(self, obj):
-        """Calcular fecha estimada de completado usando timedelta"""
+        """Fecha estimada de completado según los tiempos medianos por estado"""
+        estimated_date = None
+        if obj.status in lead_times.STATUS_FLOW[:-1]:
+            estimated_date = lead_times.estimated_completion(obj, self._lead_time_medians())
+        if estimated_date:
+            return timezone.localtime(estimated_date).strftime('%d/%m/%Y')
+        # Sin historial suficiente: estimación fija
         if obj.status == 'en_proceso' and obj.created:
             # USANDO datetime y timedelta
             # Estimación: 5 días hábiles después de creación
@@ -172,7 +329,7 @@ class OrderSerializer(serializers.ModelSerializer):
         return None
 
 # API para Insumos (Supply)
-class SupplySerializer(serializers.ModelSerializer):
+class SupplySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     # Campos calculados usando timedelta
     restock_urgency = serializers.SerializerMethodField()
     
@@ -219,11 +376,14 @@ class StatisticsSerializer(serializers.Serializer):
                         "Fecha de inicio no puede ser mayor que fecha de fin"
                     )
                 
-                # USANDO timedelta para validar rango máximo
-                delta = end_date - start_date
-                if delta.days > 365:
+                # Rangos de varios años permitidos: la serie (daily_trend) se
+                # agrupa por día, semana, mes o año según period['granularity']
+                granularity = value.get('granularity', 'day')
+                if granularity not in analytics.BUCKETS:
+                    raise serializers.ValidationError("Granularidad no válida")
+                if analytics.bucket_count(start_date, end_date, granularity) > analytics.MAX_SERIES_POINTS:
                     raise serializers.ValidationError(
-                        "El período no puede exceder 365 días"
+                        f"La serie no puede exceder {analytics.MAX_SERIES_POINTS} puntos"
                     )
                     
             except ValueError:
@@ -239,6 +399,8 @@ class OrderFilterSerializer(serializers.Serializer):
     date_from = serializers.DateField(required=False)
     date_to = serializers.DateField(required=False)
     customer_name = serializers.CharField(required=False, allow_blank=True)
+    email = serializers.CharField(required=False, allow_blank=True)
+    phone = serializers.CharField(required=False, allow_blank=True)
     product_ref = serializers.IntegerField(required=False)
     
     # Nuevos campos que usan datetime, timezone y timedelta
@@ -360,4 +522,20 @@ class OrderFilterSerializer(serializers.Serializer):
         # USANDO timezone para fecha actual
         data['filter_applied_at'] = timezone.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        return data
\ No newline at end of file
+        return data
+
+# API para cambios masivos de estado/pago (OrderViewSet.bulk_update)
+class OrderBulkUpdateSerializer(serializers.Serializer):
+    orders = serializers.ListField(
+        child=serializers.CharField(),
+        allow_empty=False,
+        max_length=MAX_BULK_ORDERS,
+        help_text="Ids o tokens de los pedidos"
+    )
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES, required=False)
+    payment_status = serializers.ChoiceField(choices=Order.PAYMENT_STATUS, required=False)
+    
+    def validate(self, data):
+        if not data.get('status') and not data.get('payment_status'):
+            raise serializers.ValidationError('Indicar status y/o payment_status')
+        return data
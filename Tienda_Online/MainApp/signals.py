@@ -0,0 +1,139 @@
+# MainApp/signals.py
+#
+# Receptores que mantienen los datos derivados de pedidos y productos.
+# Se registran en MainappConfig.ready().
+
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import counters, lead_times, media, outbox, search_indexes
+from .models import ArchivedOrderImage, Category, Order, OrderImage, Product, ProductImage
+from .page_cache import bump_catalog_version
+
+
+def _stored_values(order):
+    """Valores de Order.TRACKED_FIELDS tal como estaban en la base de datos"""
+    loaded = getattr(order, '_loaded_values', None)
+    if loaded is not None and len(loaded) == len(Order.TRACKED_FIELDS):
+        return loaded
+    return None
+
+
+# --- PEDIDOS ---
+
+@receiver(pre_save, sender=Order)
+def remember_order_values(sender, instance, raw=False, **kwargs):
+    """Leer los valores guardados si el pedido no se cargó completo desde la BD"""
+    if raw or instance.pk is None or _stored_values(instance) is not None:
+        return
+    instance._loaded_values = (
+        Order.objects.filter(pk=instance.pk).values(*Order.TRACKED_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else _stored_values(instance)
+    counters.order_changed(previous, instance.tracked_values())
+
+    if previous is None:
+        lead_times.record_status_change(instance)
+    elif previous['status'] != instance.status:
+        lead_times.record_status_change(instance, previous['status'])
+
+    # Email/webhook al cliente: se escriben en la misma transacción (Order.save)
+    if created:
+        outbox.notify_order(instance, created=True)
+    elif previous is not None and previous['status'] != instance.status:
+        outbox.notify_order(instance)
+
+
+@receiver(pre_delete, sender=Order)
+def remember_deleted_order(sender, instance, **kwargs):
+    """La instancia puede estar desactualizada: restar lo que hay en la BD"""
+    instance._loaded_values = (
+        Order.objects.filter(pk=instance.pk).values(*Order.TRACKED_FIELDS).first()
+    )
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    counters.order_changed(instance._loaded_values, None)
+
+
+# --- PRODUCTOS ---
+
+@receiver(pre_save, sender=Product)
+def remember_product_category(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        instance._previous_category_id = None
+        return
+    instance._previous_category_id = (
+        Product.objects.filter(pk=instance.pk).values_list('category_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_category_id', None)
+    if not raw and previous is not None and previous != instance.category_id:
+        counters.product_category_changed(instance.pk, previous, instance.category_id)
+
+
+@receiver(pre_delete, sender=Product)
+def product_deleting(sender, instance, **kwargs):
+    counters.product_deleted(instance.pk, instance.category_id)
+
+
+# --- CATÁLOGO ---
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def catalog_changed(sender, **kwargs):
+    """Invalidar las páginas y fragmentos del catálogo en caché"""
+    bump_catalog_version()
+
+
+# --- IMÁGENES ---
+
+@receiver(pre_save, sender=ProductImage)
+@receiver(pre_save, sender=OrderImage)
+@receiver(pre_save, sender=ArchivedOrderImage)
+def remember_image(sender, instance, raw=False, **kwargs):
+    """Imagen guardada antes del cambio, para soltarla si se reemplaza"""
+    instance._previous_image = None
+    if not raw and instance.pk is not None:
+        instance._previous_image = sender.objects.filter(pk=instance.pk).values_list('image', flat=True).first()
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=OrderImage)
+@receiver(post_save, sender=ArchivedOrderImage)
+def image_saved(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_image', None)
+    if previous is not None and previous != instance.image:
+        media.release(previous)
+
+
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_delete, sender=OrderImage)
+@receiver(post_delete, sender=ArchivedOrderImage)
+def image_deleted(sender, instance, **kwargs):
+    media.release(instance.image)
+
+
+# --- MIGRACIONES ---
+
+@receiver(post_migrate)
+def restore_search_indexes(sender, using='default', **kwargs):
+    """Volver a crear los índices de búsqueda si una migración rehízo la tabla"""
+    if sender.name != 'MainApp':
+        return
+    search_indexes.ensure_search_indexes(connections[using])
@@ -0,0 +1,121 @@
+# MainApp/single_flight.py
+#
+# Coalescencia de cálculos caros e idénticos (estadísticas del dashboard).
+#
+# El primer pedido de una clave calcula el resultado; los pedidos idénticos
+# que llegan mientras tanto esperan ese resultado en vez de repetir el
+# cálculo. Dentro de un worker se coordinan con un lock por clave; entre
+# workers, con un "lease" en la caché (cache.add): quien lo obtiene calcula y
+# los demás sondean la caché hasta que aparece el resultado. El resultado se
+# reutiliza SINGLE_FLIGHT['RESULT_SECONDS'] segundos.
+#
+# Si quien tiene el lease muere o tarda más de WAIT_SECONDS, el que espera
+# calcula por su cuenta: nunca se bloquea indefinidamente.
+
+import hashlib
+import threading
+import time
+import uuid
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Parámetros que no cambian el resultado
+IGNORED_PARAMS = {'_', 'format'}
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def request_key(scope, params):
+    """Clave normalizada: mismo resultado aunque cambie el orden o haya parámetros vacíos"""
+    items = sorted(
+        (name, value)
+        for name in params
+        if name not in IGNORED_PARAMS
+        for value in params.getlist(name)
+        if value != ''
+    )
+    digest = hashlib.md5(urlencode(items).encode()).hexdigest()
+    return f'singleflight:{scope}:{digest}'
+
+
+class _KeyLock:
+    """Lock de una clave, con la cantidad de hilos que lo usan (para poder descartarlo)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0
+
+
+def _acquire(key, timeout):
+    with _locks_guard:
+        entry = _locks.setdefault(key, _KeyLock())
+        entry.users += 1
+    # Con timeout: si el que calcula se cuelga, se sigue sin el lock
+    return entry, entry.lock.acquire(timeout=timeout)
+
+
+def _release(key, entry, acquired):
+    if acquired:
+        entry.lock.release()
+    with _locks_guard:
+        entry.users -= 1
+        if not entry.users:
+            del _locks[key]
+
+
+def _wait_for_result(key, lease_key, deadline, poll):
+    """Sondear la caché mientras otro worker calcula (None = hay que calcular)"""
+    while time.monotonic() < deadline:
+        time.sleep(poll)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        if cache.get(lease_key) is None:
+            # El lease se liberó sin resultado (error en el otro worker)
+            return None
+    return None
+
+
+def coalesced(key, compute):
+    """
+    Resultado de compute() para la clave, calculado una sola vez entre todos
+    los pedidos simultáneos de este y de los demás workers.
+
+    El resultado debe poder guardarse en la caché (picklable).
+    """
+    config = settings.SINGLE_FLIGHT
+    entry = cache.get(key)
+    if entry is not None:
+        return entry[0]
+
+    local, acquired = _acquire(key, config['WAIT_SECONDS'])
+    try:
+        # Otro hilo de este worker pudo haberlo calculado mientras esperábamos
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+
+        lease_key = f'{key}:lease'
+        owner = uuid.uuid4().hex
+        if not cache.add(lease_key, owner, config['LEASE_SECONDS']):
+            deadline = time.monotonic() + config['WAIT_SECONDS']
+            entry = _wait_for_result(key, lease_key, deadline, config['POLL_INTERVAL'])
+            if entry is not None:
+                return entry[0]
+            # Sin resultado a tiempo: calcular igual (sin lease, no se reintenta esperar)
+            value = compute()
+            cache.set(key, (value,), config['RESULT_SECONDS'])
+            return value
+
+        try:
+            value = compute()
+            cache.set(key, (value,), config['RESULT_SECONDS'])
+            return value
+        finally:
+            if cache.get(lease_key) == owner:
+                cache.delete(lease_key)
+    finally:
+        _release(key, local, acquired)
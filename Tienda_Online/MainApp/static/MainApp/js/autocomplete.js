@@ -0,0 +1,88 @@
+// Autocompletado de productos (ProductAutocompleteWidget y buscador del catálogo)
+//
+// Cada contenedor [data-autocomplete] tiene un input de texto, una lista de
+// sugerencias y, opcionalmente, un input oculto donde se guarda el id elegido.
+// Con data-navigate, elegir una sugerencia abre el detalle del producto.
+
+(function() {
+    function setup(container) {
+        const input = container.querySelector('[data-autocomplete-input]');
+        const hidden = container.querySelector('[data-autocomplete-value]');
+        const list = container.querySelector('[data-autocomplete-list]');
+        let timer = null;
+        let controller = null;
+
+        function close() {
+            list.classList.add('d-none');
+            list.innerHTML = '';
+        }
+
+        function choose(item) {
+            if (container.dataset.navigate) {
+                window.location.href = container.dataset.navigate + item.slug + '/';
+                return;
+            }
+            input.value = item.name;
+            if (hidden) {
+                hidden.value = item.id;
+            }
+            close();
+        }
+
+        function render(results) {
+            list.innerHTML = '';
+            if (results.length === 0) {
+                close();
+                return;
+            }
+            results.forEach(item => {
+                const option = document.createElement('button');
+                option.type = 'button';
+                option.className = 'list-group-item list-group-item-action';
+                option.textContent = item.name;
+                option.addEventListener('mousedown', event => {
+                    event.preventDefault();
+                    choose(item);
+                });
+                list.appendChild(option);
+            });
+            list.classList.remove('d-none');
+        }
+
+        async function search() {
+            const query = input.value.trim();
+            if (!query) {
+                close();
+                return;
+            }
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+            try {
+                const url = container.dataset.url + '?q=' + encodeURIComponent(query);
+                const response = await fetch(url, {signal: controller.signal});
+                const data = await response.json();
+                render(data.results);
+            } catch (error) {
+                if (error.name !== 'AbortError') {
+                    close();
+                }
+            }
+        }
+
+        input.addEventListener('input', () => {
+            // El texto ya no corresponde al producto elegido
+            if (hidden) {
+                hidden.value = '';
+            }
+            clearTimeout(timer);
+            timer = setTimeout(search, 150);
+        });
+        input.addEventListener('blur', close);
+    }
+
+    document.addEventListener('DOMContentLoaded', () => {
+        document.querySelectorAll('[data-autocomplete]').forEach(setup);
+    });
+})();
@@ -0,0 +1,345 @@
+// Dashboard de reportes (dashboard_reports.html)
+//
+// Los datos llegan en los <script type="application/json"> que renderiza la
+// vista (json_script) y las URLs en los data-* de #dashboardUrls.
+
+// Obtener datos de los scripts JSON
+const urls = document.getElementById('dashboardUrls').dataset;
+const statusData = JSON.parse(document.getElementById('statusData').textContent);
+const platformData = JSON.parse(document.getElementById('platformData').textContent);
+const popularProducts = JSON.parse(document.getElementById('popularProductsData').textContent);
+const monthlyOrders = JSON.parse(document.getElementById('monthlyOrdersData').textContent);
+const revenueData = JSON.parse(document.getElementById('revenueData').textContent);
+
+// Mapeos para nombres legibles
+const statusLabels = {
+    'solicitado': 'Solicitado',
+    'aprobado': 'Aprobado',
+    'en_proceso': 'En Proceso',
+    'realizada': 'Realizada',
+    'entregada': 'Entregada',
+    'finalizada': 'Finalizada',
+    'cancelada': 'Cancelada'
+};
+
+const platformLabels = {
+    'web': 'Sitio Web',
+    'facebook': 'Facebook',
+    'instagram': 'Instagram',
+    'whatsapp': 'WhatsApp',
+    'presencial': 'Presencial',
+    'otro': 'Otro'
+};
+
+// Instancias de gráficos (se actualizan con los eventos en vivo)
+let statusChart = null;
+let platformChart = null;
+
+// Actualizar tarjetas de resumen
+function updateSummaryCards() {
+    let paidCount = 0;
+    let inProcessCount = 0;
+    let requestedCount = 0;
+    
+    statusData.forEach(item => {
+        if (item.status === 'pagado' || item.status === 'parcial') {
+            paidCount += item.total;
+        }
+        if (item.status === 'en_proceso') {
+            inProcessCount = item.total;
+        }
+        if (item.status === 'solicitado') {
+            requestedCount = item.total;
+        }
+    });
+    
+    document.getElementById('paidOrders').textContent = paidCount;
+    document.getElementById('inProcessOrders').textContent = inProcessCount;
+    document.getElementById('requestedOrders').textContent = requestedCount;
+}
+
+// Crear gráfico de estados
+function createStatusChart() {
+    if (statusData.length === 0) {
+        document.getElementById('statusChart').parentElement.innerHTML = 
+            '<p class="text-muted text-center">No hay datos disponibles</p>';
+        return;
+    }
+    
+    const ctx = document.getElementById('statusChart').getContext('2d');
+    statusChart = new Chart(ctx, {
+        type: 'doughnut',
+        data: {
+            labels: statusData.map(item => statusLabels[item.status] || item.status),
+            datasets: [{
+                data: statusData.map(item => item.total),
+                backgroundColor: [
+                    '#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0',
+                    '#9966FF', '#FF9F40', '#8AC926', '#FF595E'
+                ],
+                borderWidth: 2,
+                borderColor: '#fff'
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: {
+                    position: 'right',
+                    labels: {
+                        padding: 20,
+                        usePointStyle: true
+                    }
+                },
+                tooltip: {
+                    callbacks: {
+                        label: function(context) {
+                            const label = context.label || '';
+                            const value = context.raw || 0;
+                            const total = context.dataset.data.reduce((a, b) => a + b, 0);
+                            const percentage = Math.round((value / total) * 100);
+                            return `${label}: ${value} (${percentage}%)`;
+                        }
+                    }
+                }
+            }
+        }
+    });
+}
+
+// Crear gráfico de plataformas
+function createPlatformChart() {
+    if (platformData.length === 0) {
+        document.getElementById('platformChart').parentElement.innerHTML = 
+            '<p class="text-muted text-center">No hay datos disponibles</p>';
+        return;
+    }
+    
+    const ctx = document.getElementById('platformChart').getContext('2d');
+    platformChart = new Chart(ctx, {
+        type: 'bar',
+        data: {
+            labels: platformData.map(item => platformLabels[item.platform] || item.platform),
+            datasets: [{
+                label: 'Cantidad de Pedidos',
+                data: platformData.map(item => item.total),
+                backgroundColor: '#36A2EB',
+                borderColor: '#1E88E5',
+                borderWidth: 1,
+                borderRadius: 5
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            scales: {
+                y: {
+                    beginAtZero: true,
+                    ticks: {
+                        stepSize: 1,
+                        precision: 0
+                    },
+                    grid: {
+                        display: true,
+                        color: 'rgba(0,0,0,0.05)'
+                    }
+                },
+                x: {
+                    grid: {
+                        display: false
+                    }
+                }
+            },
+            plugins: {
+                legend: {
+                    display: false
+                }
+            }
+        }
+    });
+}
+
+// Llenar tabla de productos populares
+function populatePopularProductsTable() {
+    const tbody = document.getElementById('popularProductsBody');
+    
+    if (popularProducts.length === 0) {
+        tbody.innerHTML = `
+            <tr>
+                <td colspan="3" class="text-center text-muted py-4">
+                    <i class="bi bi-info-circle me-2"></i>
+                    No hay datos disponibles
+                </td>
+            </tr>
+        `;
+        return;
+    }
+    
+    // Calcular total para porcentajes
+    const totalOrders = popularProducts.reduce((sum, item) => sum + item.total_orders, 0);
+    
+    // Ordenar por cantidad
+    const sortedProducts = [...popularProducts].sort((a, b) => b.total_orders - a.total_orders);
+    
+    // Limitar a top 5
+    const topProducts = sortedProducts.slice(0, 5);
+    
+    tbody.innerHTML = '';
+    topProducts.forEach((product, index) => {
+        const percentage = totalOrders > 0 ? Math.round((product.total_orders / totalOrders) * 100) : 0;
+        
+        const row = document.createElement('tr');
+        row.innerHTML = `
+            <td>
+                <span class="badge bg-primary me-2">${index + 1}</span>
+                ${product.product_ref__name || 'Producto sin nombre'}
+            </td>
+            <td class="text-center">
+                <span class="badge bg-secondary">${product.total_orders}</span>
+            </td>
+            <td class="text-center">
+                <div class="progress" style="height: 8px;">
+                    <div class="progress-bar" role="progressbar" 
+                         style="width: ${percentage}%" 
+                         aria-valuenow="${percentage}" 
+                         aria-valuemin="0" 
+                         aria-valuemax="100">
+                    </div>
+                </div>
+                <small class="text-muted">${percentage}%</small>
+            </td>
+        `;
+        tbody.appendChild(row);
+    });
+}
+
+// Crear gráfico mensual
+function createMonthlyChart() {
+    if (monthlyOrders.length === 0) {
+        document.getElementById('monthlyChart').parentElement.innerHTML = 
+            '<p class="text-muted text-center">No hay datos disponibles</p>';
+        return;
+    }
+    
+    // Ordenar por mes
+    const sortedMonthly = [...monthlyOrders].sort((a, b) => a.month.localeCompare(b.month));
+    
+    // Formatear meses (ej: 2024-01 → Ene 2024)
+    const monthLabels = sortedMonthly.map(item => {
+        const [year, month] = item.month.split('-');
+        const date = new Date(year, month - 1);
+        return date.toLocaleDateString('es-ES', { month: 'short', year: '2-digit' });
+    });
+    
+    const ctx = document.getElementById('monthlyChart').getContext('2d');
+    const chart = new Chart(ctx, {
+        type: 'line',
+        data: {
+            labels: monthLabels,
+            datasets: [{
+                label: 'Pedidos por Mes',
+                data: sortedMonthly.map(item => item.total),
+                borderColor: '#4BC0C0',
+                backgroundColor: 'rgba(75, 192, 192, 0.1)',
+                borderWidth: 3,
+                tension: 0.3,
+                fill: true,
+                pointBackgroundColor: '#4BC0C0',
+                pointBorderColor: '#fff',
+                pointBorderWidth: 2,
+                pointRadius: 6
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            scales: {
+                y: {
+                    beginAtZero: true,
+                    ticks: {
+                        stepSize: 1
+                    },
+                    grid: {
+                        color: 'rgba(0,0,0,0.05)'
+                    }
+                },
+                x: {
+                    grid: {
+                        display: false
+                    }
+                }
+            },
+            plugins: {
+                legend: {
+                    display: false
+                }
+            }
+        }
+    });
+}
+
+// Refrescar estados y plataformas cuando llegan eventos de pedidos
+// (get_chart_data recibe los mismos filtros que el reporte)
+let refreshTimer = null;
+
+function chartDataUrl(type) {
+    const params = new URLSearchParams(window.location.search);
+    params.set('type', type);
+    return urls.chartData + '?' + params.toString();
+}
+
+async function refreshLiveCharts() {
+    const [statusRes, platformRes] = await Promise.all([
+        fetch(chartDataUrl('status')),
+        fetch(chartDataUrl('platform'))
+    ]);
+    const statusJson = await statusRes.json();
+    const platformJson = await platformRes.json();
+    
+    statusData.length = 0;
+    statusJson.labels.forEach((label, i) => statusData.push({status: label, total: statusJson.data[i]}));
+    updateSummaryCards();
+    
+    if (statusChart) {
+        statusChart.data.labels = statusJson.labels.map(s => statusLabels[s] || s);
+        statusChart.data.datasets[0].data = statusJson.data;
+        statusChart.update();
+    }
+    if (platformChart) {
+        platformChart.data.labels = platformJson.labels.map(p => platformLabels[p] || p);
+        platformChart.data.datasets[0].data = platformJson.data;
+        platformChart.update();
+    }
+}
+
+function listenOrderEvents() {
+    if (!urls.events) {
+        // Perfil WSGI (sin SSE): refrescar periódicamente mientras la pestaña está visible
+        setInterval(function() {
+            if (!document.hidden) {
+                refreshLiveCharts();
+            }
+        }, Number(urls.pollSeconds) * 1000);
+        return;
+    }
+    if (!window.EventSource) {
+        return;
+    }
+    const source = new EventSource(urls.events);
+    source.addEventListener('status', function() {
+        // Agrupar ráfagas de eventos en una sola actualización
+        clearTimeout(refreshTimer);
+        refreshTimer = setTimeout(refreshLiveCharts, 2000);
+    });
+}
+
+// Inicializar todo cuando la página cargue
+document.addEventListener('DOMContentLoaded', function() {
+    updateSummaryCards();
+    createStatusChart();
+    createPlatformChart();
+    populatePopularProductsTable();
+    createMonthlyChart();
+    listenOrderEvents();
+});
@@ -0,0 +1,24 @@
+// Modal "Mi Pedido" del menú (base.html)
+
+function openTracking() {
+    console.log("Abriendo modal de seguimiento…");
+
+    // SIEMPRE abre el modal, no importa si hay token guardado
+    const modal = new bootstrap.Modal(document.getElementById('trackingModal'));
+    modal.show();
+}
+
+
+function trackOrder() {
+    const token = document.getElementById('tokenInput').value.trim();
+
+    if (!token) {
+        alert("Ingresa un token válido");
+        return;
+    }
+
+    // Guardar para futuras búsquedas
+    localStorage.setItem('trackingToken', token);
+
+    window.location.href = `/seguimiento/${token}/`;
+}
@@ -0,0 +1,182 @@
+# MainApp/storage.py
+
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.db import transaction
+from django.db.models import F
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class ForgivingManifestStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    Archivos estáticos con hash en el nombre, comprimidos con gzip y brotli.
+
+    A diferencia de la clase de WhiteNoise, no falla en collectstatic cuando
+    un CSS o JS de terceros referencia un archivo que no se distribuye (mapas
+    de fuentes, imágenes opcionales) y, si un archivo no está en el manifiesto,
+    devuelve su URL sin hash en vez de lanzar un error.
+    """
+    manifest_strict = False
+
+    def hashed_name(self, name, content=None, filename=None):
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            return name
+
+
+# --- MEDIA DEDUPLICADA ---
+#
+# Alternativa local a Cloudinary (MEDIA_STORAGE=local en settings). Cada
+# archivo se guarda una sola vez bajo el sha256 de su contenido
+# (blobs/ab/cd/<sha256>.<ext>) y StoredBlob cuenta cuántas imágenes lo usan:
+# si el contenido ya existe no se vuelve a escribir, y el archivo se borra
+# cuando se libera la última referencia.
+#
+# Los manejadores de subida calculan el sha256 a medida que llegan los trozos
+# de la petición, así el almacenamiento sabe si el archivo ya existe sin
+# volver a leerlo. Los archivos que no vienen de una petición (comandos, la
+# shell) se hashean mientras se copian a un temporal.
+
+BLOB_NAME_RE = re.compile(r'^blobs/[0-9a-f]{2}/[0-9a-f]{2}/(?P<digest>[0-9a-f]{64})(\.\w+)?$')
+
+
+class HashingUploadMixin:
+    """Calcula el sha256 de cada archivo subido mientras se recibe"""
+
+    def new_file(self, *args, **kwargs):
+        # Antes de super(): MemoryFileUploadHandler termina con StopFutureHandlers
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        # MemoryFileUploadHandler solo se queda con archivos pequeños
+        if getattr(self, 'activated', True):
+            self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.sha256 = self.hasher.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(HashingUploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadMixin, TemporaryFileUploadHandler):
+    pass
+
+
+def blob_digest(name):
+    """sha256 de un nombre de blob, o None si el nombre no es de un blob"""
+    match = BLOB_NAME_RE.match(name or '')
+    return match.group('digest') if match else None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage direccionado por contenido: save() devuelve el nombre
+    del blob (igual para contenidos iguales) y delete() resta una referencia.
+    """
+
+    def blob_name(self, digest, name):
+        extension = os.path.splitext(name)[1].lower()
+        return f'blobs/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre final lo decide _save() según el contenido
+        return name
+
+    def _spool(self, content):
+        """Copiar el contenido a un temporal junto a los blobs; devuelve (sha256, ruta, tamaño)"""
+        directory = self.path('blobs')
+        os.makedirs(directory, exist_ok=True)
+        hasher = hashlib.sha256()
+        size = 0
+        fd, path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    hasher.update(chunk)
+                    size += len(chunk)
+                    temp.write(chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+        return hasher.hexdigest(), path, size
+
+    def _publish(self, temp_path, name):
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(temp_path, self.file_permissions_mode)
+        # Atómico: nadie ve un blob a medio escribir
+        os.replace(temp_path, path)
+
+    def _add_reference(self, digest):
+        """Sumar una referencia si el blob existe; devuelve su nombre o None"""
+        from .models import StoredBlob
+
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(digest=digest).first()
+            if blob is None or not self.exists(blob.name):
+                return None
+            StoredBlob.objects.filter(digest=digest).update(refs=F('refs') + 1)
+            return blob.name
+
+    def _save(self, name, content):
+        from .models import StoredBlob
+
+        digest = getattr(content, 'sha256', None)
+        if digest is not None:
+            existing = self._add_reference(digest)
+            if existing is not None:
+                # Contenido ya guardado: no se escribe nada
+                return existing
+
+        digest, temp_path, size = self._spool(content)
+        try:
+            with transaction.atomic():
+                blob = StoredBlob.objects.select_for_update().filter(digest=digest).first()
+                if blob is not None and self.exists(blob.name):
+                    StoredBlob.objects.filter(digest=digest).update(refs=F('refs') + 1)
+                    return blob.name
+                if blob is None:
+                    blob = StoredBlob.objects.create(
+                        digest=digest, name=self.blob_name(digest, name), size=size, refs=1,
+                    )
+                else:
+                    # Fila sin archivo (borrado a mano): volver a escribirlo
+                    StoredBlob.objects.filter(digest=digest).update(refs=F('refs') + 1)
+                self._publish(temp_path, blob.name)
+                temp_path = None
+                return blob.name
+        finally:
+            if temp_path is not None:
+                os.remove(temp_path)
+
+    def delete(self, name):
+        """Restar una referencia; el archivo se borra con la última"""
+        from .models import StoredBlob
+
+        digest = blob_digest(name)
+        if digest is None:
+            return super().delete(name)
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(digest=digest).first()
+            if blob is not None and blob.refs > 1:
+                StoredBlob.objects.filter(digest=digest).update(refs=F('refs') - 1)
+                return
+            if blob is not None:
+                blob.delete()
+            super().delete(name)
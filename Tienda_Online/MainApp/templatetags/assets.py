@@ -0,0 +1,30 @@
+from functools import lru_cache
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+
+from MainApp.assets import VENDOR_ASSETS
+
+register = template.Library()
+
+
+def _resolve(name):
+    path, cdn_url = VENDOR_ASSETS[name]
+    if staticfiles_storage.exists(path) or finders.find(path):
+        return static(path)
+    # Sin build_assets: seguir usando el CDN
+    return cdn_url
+
+
+_cached_resolve = lru_cache(maxsize=None)(_resolve)
+
+
+@register.simple_tag
+def vendor_url(name):
+    """URL local (con hash) de una librería de MainApp/assets.py, o la del CDN si falta"""
+    if settings.DEBUG:
+        return _resolve(name)
+    return _cached_resolve(name)
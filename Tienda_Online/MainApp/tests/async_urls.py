@@ -0,0 +1,18 @@
+# MainApp/tests/async_urls.py
+#
+# URLconf del perfil ASGI (DJANGO_ASYNC_VIEWS=1) para las pruebas: las
+# vistas asíncronas con los mismos nombres que las síncronas y los streams
+# SSE, que solo existen en ese perfil.
+
+from django.urls import include, path
+
+from MainApp import views
+
+urlpatterns = [
+    path('', views.product_list_async, name='product_list'),
+    path('producto/<slug:slug>/', views.product_detail_async, name='product_detail'),
+    path('seguimiento/<str:token>/', views.order_track_async, name='order_track'),
+    path('seguimiento/<str:token>/eventos/', views.order_events, name='order_events'),
+    path('dashboard/eventos/', views.dashboard_events, name='dashboard_events'),
+    path('', include('MainApp.urls')),
+]
@@ -0,0 +1,67 @@
+# MainApp/tests/helpers.py
+#
+# Datos de prueba y clase base: cada prueba empieza con la caché vacía
+# (páginas, contadores de límites de tasa, resúmenes de estadísticas).
+
+import itertools
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from MainApp.models import Category, Order, Product
+
+_sequence = itertools.count(1)
+
+
+def make_category(name=None):
+    number = next(_sequence)
+    name = name or f'Categoría {number}'
+    return Category.objects.create(name=name, slug=f'categoria-{number}')
+
+
+def make_product(category=None, name=None, price=1000, **fields):
+    number = next(_sequence)
+    return Product.objects.create(
+        name=name or f'Producto {number}',
+        slug=f'producto-{number}',
+        category=category or make_category(),
+        price=price,
+        **fields,
+    )
+
+
+def make_order(product=None, status='solicitado', total_price=1000, created=None, updated=None, **fields):
+    """Pedido guardado con Order.save (señales incluidas); created/updated se fijan después"""
+    fields.setdefault('customer_name', f'Cliente {next(_sequence)}')
+    order = Order.objects.create(product_ref=product, status=status, total_price=total_price, **fields)
+    dates = {}
+    if created is not None:
+        dates['created'] = created
+    if updated is not None or created is not None:
+        dates['updated'] = updated or created
+    if dates:
+        # auto_now/auto_now_add no se pueden fijar con save()
+        Order.objects.filter(pk=order.pk).update(**dates)
+        order.refresh_from_db()
+    return order
+
+
+def days_ago(days):
+    return timezone.now() - timedelta(days=days)
+
+
+def make_staff(username='staff', **fields):
+    # Sin contraseña: las pruebas usan force_login/force_authenticate
+    return User.objects.create(username=username, is_staff=True, **fields)
+
+
+class CacheTestCase(TestCase):
+    """TestCase que vacía la caché antes de cada prueba"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
@@ -0,0 +1,109 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from MainApp import paginators
+from MainApp.admin import OrderImageInline
+from MainApp.models import Order, OrderImage
+
+from .helpers import CacheTestCase, make_order, make_product, make_staff
+
+
+class EstimatedCountPaginatorTests(CacheTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for _ in range(5):
+            make_order(None)
+
+    def test_estimate_for_unfiltered_large_tables(self):
+        with mock.patch.object(paginators, 'ESTIMATE_THRESHOLD', 3):
+            paginator = paginators.EstimatedCountPaginator(Order.objects.order_by('pk'), 2)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(paginator.count, Order.objects.order_by('-pk').first().pk)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries))
+
+    def test_exact_count_below_threshold_or_with_filters(self):
+        self.assertEqual(paginators.EstimatedCountPaginator(Order.objects.order_by('pk'), 2).count, 5)
+        with mock.patch.object(paginators, 'ESTIMATE_THRESHOLD', 3):
+            filtered = Order.objects.filter(status='aprobado').order_by('pk')
+            self.assertEqual(paginators.EstimatedCountPaginator(filtered, 2).count, 0)
+
+
+class OrderChangelistTests(CacheTestCase):
+    """El listado del admin cuesta lo mismo con 3 o 30 pedidos y busca por índice"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(make_staff(is_superuser=True))
+        self.product = make_product()
+        self.ana = make_order(self.product, customer_name='Ana Pérez', email='ana@example.com', phone='+56 9 1234 5678')
+        make_order(self.product, customer_name='Bruno')
+
+    def changelist(self, **params):
+        return self.client.get('/admin/MainApp/order/', params)
+
+    def found(self, term):
+        return [order.pk for order in self.changelist(q=term).context['cl'].result_list]
+
+    def test_query_count_does_not_grow_with_rows(self):
+        with CaptureQueriesContext(connection) as few:
+            self.changelist()
+        for _ in range(30):
+            make_order(make_product())
+        with CaptureQueriesContext(connection) as many:
+            self.changelist()
+        self.assertEqual(len(few), len(many))
+
+    def test_indexed_search(self):
+        self.assertEqual(self.found(str(self.ana.pk)), [self.ana.pk])
+        self.assertEqual(self.found(str(self.ana.token)), [self.ana.pk])
+        self.assertEqual(self.found('ana p'), [self.ana.pk])
+        self.assertEqual(self.found('ANA@example.com'), [self.ana.pk])
+        self.assertEqual(self.found('+56 9 12'), [self.ana.pk])
+        self.assertEqual(self.found('pérez'), [])
+
+    def test_change_form_does_not_render_every_product(self):
+        make_product(name='Producto no elegido')
+        response = self.client.get(f'/admin/MainApp/order/{self.ana.pk}/change/')
+        self.assertContains(response, self.product.name)
+        self.assertNotContains(response, 'Producto no elegido')
+
+
+class OrderImagesAdminTests(CacheTestCase):
+    """La ficha del pedido muestra solo las últimas imágenes; el resto, en la lista filtrada"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = self.settings(MEDIA_ROOT=media_root, STORAGES={
+            'default': {'BACKEND': 'MainApp.storage.ContentAddressedStorage'},
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        })
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.client.force_login(make_staff(is_superuser=True))
+        self.order = make_order(make_product())
+        for index in range(OrderImageInline.max_shown + 3):
+            self.order.images.create(image=ContentFile(f'diseño {index}'.encode(), name='diseno.jpg'))
+        make_order().images.create(image=ContentFile(b'otro', name='otro.jpg'))
+
+    def test_change_form_shows_the_latest_images_read_only(self):
+        response = self.client.get(f'/admin/MainApp/order/{self.order.pk}/change/')
+        self.assertEqual(response.content.count(b'style="max-height: 80px"'), OrderImageInline.max_shown)
+        self.assertNotContains(response, 'type="file"')
+        self.assertContains(response, f'/admin/MainApp/orderimage/?order__exact={self.order.pk}')
+        self.assertContains(response, f'Ver las {OrderImageInline.max_shown + 3} imágenes')
+
+    def test_image_changelist_filtered_by_order(self):
+        response = self.client.get('/admin/MainApp/orderimage/', {'order__exact': self.order.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({image.order_id for image in response.context['cl'].result_list}, {self.order.pk})
+        self.assertEqual(response.context['cl'].result_count, OrderImageInline.max_shown + 3)
+        add = self.client.get('/admin/MainApp/orderimage/add/', {'order': self.order.pk})
+        self.assertEqual(add.context['adminform'].form.initial['order'], str(self.order.pk))
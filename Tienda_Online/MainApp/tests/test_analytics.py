@@ -0,0 +1,170 @@
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from MainApp import analytics
+
+from .helpers import CacheTestCase, days_ago, make_order, make_product, make_staff
+
+
+class AnalyticsQueryTests(CacheTestCase):
+    """Filtros comunes y costo fijo de consultas por widget"""
+
+    def setUp(self):
+        super().setUp()
+        self.mug = make_product(name='Taza')
+        self.shirt = make_product(name='Polera')
+        self.today = timezone.localdate()
+        make_order(self.mug, total_price=1000, platform='web')
+        make_order(self.mug, total_price=3000, platform='instagram', status='cancelada')
+        make_order(self.shirt, total_price=2000, platform='web', created=days_ago(40))
+        make_order(self.shirt, total_price=4000, platform='web', created=days_ago(100))
+
+    def test_filters(self):
+        self.assertEqual(analytics.filter_orders(platform='web').count(), 3)
+        self.assertEqual(analytics.filter_orders(status='cancelada').count(), 1)
+        self.assertEqual(analytics.filter_orders(date_from=self.today - timedelta(days=50)).count(), 3)
+        self.assertEqual(analytics.filter_orders(date_to=self.today - timedelta(days=1)).count(), 2)
+
+    def test_date_to_includes_the_whole_day(self):
+        self.assertEqual(analytics.filter_orders(date_from=self.today, date_to=self.today).count(), 2)
+
+    def test_totals_in_one_query(self):
+        with self.assertNumQueries(1):
+            result = analytics.totals(analytics.filter_orders())
+        self.assertEqual(result, {'orders': 4, 'revenue': 10000, 'avg_order_value': 2500})
+
+    def test_counts_by(self):
+        with self.assertNumQueries(1):
+            rows = analytics.counts_by(analytics.filter_orders(), 'platform')
+        self.assertEqual(rows[0], {'platform': 'web', 'total': 3})
+
+    def test_popular_products_excluding_cancelled(self):
+        rows = analytics.popular_products(
+            analytics.filter_orders(), revenue_key='revenue', exclude_cancelled=True,
+        )
+        self.assertEqual(rows[0], {'product_ref__name': 'Polera', 'total_orders': 2, 'revenue': 6000})
+        self.assertEqual(rows[1], {'product_ref__name': 'Taza', 'total_orders': 1, 'revenue': 1000})
+
+    def test_time_series_is_one_group_by_with_empty_periods(self):
+        start = analytics.last_months_start(6, self.today)
+        with self.assertNumQueries(1):
+            series = analytics.time_series(analytics.filter_orders(), 'month', start, self.today)
+        self.assertEqual(len(series), 6)
+        self.assertEqual(sum(item['total'] for item in series), 4)
+        self.assertEqual(series[-1]['period'], self.today.strftime('%Y-%m'))
+        self.assertEqual(series[-1]['total'], 2)
+
+    def test_time_series_by_day_fills_zeros(self):
+        start = self.today - timedelta(days=6)
+        series = analytics.time_series(analytics.filter_orders(), 'day', start, self.today, revenue_key='revenue')
+        self.assertEqual([item['total'] for item in series], [0, 0, 0, 0, 0, 0, 2])
+        self.assertEqual(series[-1]['revenue'], 4000)
+
+    def test_period_summary_in_one_query(self):
+        periods = {'month': timezone.now() - timedelta(days=30), 'quarter': timezone.now() - timedelta(days=90)}
+        with self.assertNumQueries(1):
+            summary = analytics.period_summary(analytics.filter_orders(), periods, status_counts=('cancelada',))
+        self.assertEqual(summary['month'], {'orders': 2, 'revenue': 4000})
+        self.assertEqual(summary['quarter'], {'orders': 3, 'revenue': 6000})
+        self.assertEqual(summary['by_status'], {'cancelada': 1})
+
+    def test_filters_from_params(self):
+        filters = analytics.filters_from_params({'platform': 'web', 'date_from': '2024-02-30', 'date_to': '2024-03-01'})
+        self.assertEqual(filters['date_to'], date(2024, 3, 1))
+        # Fecha inválida: sin límite, no un error
+        self.assertIsNone(filters['date_from'])
+
+
+class ReportViewsTests(CacheTestCase):
+    """Dashboard y gráficos aplican los mismos filtros de fecha"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(make_staff())
+        product = make_product()
+        make_order(product)
+        make_order(product, created=days_ago(40))
+
+    def test_dashboard_applies_date_filters(self):
+        since = (timezone.localdate() - timedelta(days=10)).isoformat()
+        response = self.client.get(reverse('dashboard_reports'), {'date_from': since})
+        self.assertEqual(sum(row['total'] for row in response.context['orders_by_status']), 1)
+        response = self.client.get(reverse('dashboard_reports'))
+        self.assertEqual(sum(row['total'] for row in response.context['orders_by_status']), 2)
+
+    def test_monthly_chart_defaults_to_the_last_six_months(self):
+        response = self.client.get(reverse('get_chart_data'), {'type': 'monthly'})
+        data = response.json()
+        self.assertEqual(data['labels'][0], analytics.last_months_start(6).strftime('%Y-%m'))
+        self.assertEqual(data['labels'][-1], timezone.localdate().strftime('%Y-%m'))
+        self.assertEqual(sum(data['data']), 2)
+
+    def test_status_chart_with_platform_filter(self):
+        response = self.client.get(reverse('get_chart_data'), {'type': 'status', 'platform': 'instagram'})
+        self.assertEqual(response.json(), {'labels': [], 'data': []})
+
+
+class GranularityTests(CacheTestCase):
+    """Series acotadas a MAX_SERIES_POINTS para rangos de cualquier largo"""
+
+    def test_choose_granularity(self):
+        start = date(2020, 1, 1)
+        self.assertEqual(analytics.choose_granularity(start, start + timedelta(days=100)), 'day')
+        self.assertEqual(analytics.choose_granularity(start, start + timedelta(days=400)), 'week')
+        self.assertEqual(analytics.choose_granularity(start, date(2026, 12, 31)), 'month')
+        self.assertEqual(analytics.choose_granularity(date(1990, 1, 1), date(2026, 12, 31)), 'year')
+
+    def test_bucket_count_matches_series_length(self):
+        start, end = date(2023, 11, 15), date(2025, 2, 3)
+        for bucket in ('day', 'week', 'month', 'year'):
+            series = analytics.time_series(analytics.filter_orders(), bucket, start, end)
+            self.assertEqual(len(series), analytics.bucket_count(start, end, bucket))
+
+
+class StatisticsAPITests(CacheTestCase):
+    """StatisticsAPIView acepta rangos de varios años con costo fijo"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(make_staff())
+        product = make_product()
+        make_order(product, total_price=1500)
+        make_order(product, total_price=500, created=days_ago(900))
+
+    def get(self, **params):
+        return self.client.get(reverse('statistics'), params)
+
+    def test_multi_year_range_uses_coarser_buckets(self):
+        response = self.get(days=1500)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['period']['granularity'], 'month')
+        self.assertLessEqual(len(data['daily_trend']), analytics.MAX_SERIES_POINTS)
+        self.assertEqual(sum(item['count'] for item in data['daily_trend']), 2)
+        self.assertEqual(data['totals']['orders'], 2)
+
+    def test_query_count_does_not_grow_with_the_range(self):
+        with CaptureQueriesContext(connection) as short:
+            self.get(days=7)
+        cache.clear()
+        with CaptureQueriesContext(connection) as long:
+            self.get(days=3650)
+        self.assertEqual(len(short), len(long))
+
+    def test_explicit_granularity(self):
+        data = self.get(days=60, granularity='week').json()
+        self.assertEqual(data['period']['granularity'], 'week')
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.get(days=0).status_code, 400)
+        self.assertEqual(self.get(days='abc').status_code, 400)
+        self.assertEqual(self.get(granularity='hour').status_code, 400)
+        # Demasiados puntos para la granularidad pedida
+        self.assertEqual(self.get(days=1000, granularity='day').status_code, 400)
+        self.assertEqual(self.get(start_date='2024-13-01').status_code, 400)
+        self.assertEqual(self.get(start_date='2024-05-01', end_date='2024-04-01').status_code, 400)
@@ -0,0 +1,188 @@
+import importlib
+import io
+import uuid
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from MainApp import analytics, archive
+from MainApp.models import ArchivedOrder, ArchivedOrderImage, Order, OrderEvent, OrderImage, ProductOrderStats
+
+from .helpers import CacheTestCase, days_ago, make_category, make_order, make_product, make_staff
+
+
+class ArchiveTestCase(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = make_product(make_category('Tazas'), name='Taza sublimada')
+        self.closed = make_order(self.product, status='entregada', total_price=3000, created=days_ago(500))
+        self.cancelled = make_order(self.product, status='cancelada', total_price=2000, created=days_ago(450))
+        self.image = OrderImage.objects.create(order=self.cancelled, image='orders/diseno.jpg')
+        # Cerrado pero modificado hace poco, y abierto pero antiguo: se quedan
+        self.recent = make_order(self.product, status='entregada', total_price=500,
+                                 created=days_ago(500), updated=days_ago(10))
+        self.open = make_order(self.product, status='solicitado', total_price=700, created=days_ago(500))
+
+    def archive(self, months=12):
+        return sum(count for _, count in archive.archive_orders(archive.months_ago(months)))
+
+
+class ArchiveOrdersTests(ArchiveTestCase):
+    """Solo los pedidos cerrados y sin cambios se mueven, con sus imágenes y sin tocar los contadores"""
+
+    def test_moves_closed_stale_orders_with_images(self):
+        counters = list(ProductOrderStats.objects.values())
+        self.assertEqual(self.archive(), 2)
+
+        self.assertCountEqual(Order.objects.values_list('pk', flat=True), [self.recent.pk, self.open.pk])
+        self.assertCountEqual(
+            ArchivedOrder.objects.values_list('pk', 'token', 'total_price'),
+            [(self.closed.pk, self.closed.token, 3000), (self.cancelled.pk, self.cancelled.token, 2000)],
+        )
+        self.assertFalse(OrderImage.objects.exists())
+        image = ArchivedOrderImage.objects.get()
+        self.assertEqual((image.pk, image.order_id), (self.image.pk, self.cancelled.pk))
+        self.assertEqual(image.created, self.image.created)
+        self.assertIsNotNone(ArchivedOrder.objects.get(pk=self.closed.pk).archived)
+        # Son totales históricos: archivar no los cambia
+        self.assertEqual(list(ProductOrderStats.objects.values()), counters)
+
+    def test_batches_and_reruns(self):
+        progress = list(archive.archive_orders(archive.months_ago(12), batch_size=1))
+        self.assertEqual([count for _, count in progress], [1, 1])
+        self.assertEqual(self.archive(), 0)
+
+    def test_migration_backfills_the_last_known_change(self):
+        # AddField dejó la fecha de la migración en todos los pedidos existentes
+        Order.objects.update(updated=timezone.now())
+        event = OrderEvent.objects.create(order_id=self.closed.pk, token=self.closed.token,
+                                          status='entregada', payment_status='pagado')
+        OrderEvent.objects.filter(pk=event.pk).update(created=days_ago(480))
+        migration = importlib.import_module('MainApp.migrations.0007_order_updated')
+        migration.backfill_updated(apps, None)
+
+        updated = dict(Order.objects.values_list('pk', 'updated'))
+        self.assertEqual(updated[self.closed.pk], OrderEvent.objects.get().created)
+        self.assertEqual(updated[self.cancelled.pk], OrderImage.objects.get().created)
+        self.assertEqual(updated[self.open.pk], Order.objects.get(pk=self.open.pk).created)
+        self.assertEqual(self.archive(), 2)
+        self.assertCountEqual(ArchivedOrder.objects.values_list('pk', flat=True), [self.closed.pk, self.recent.pk])
+
+    def test_order_changed_since_selection_is_skipped(self):
+        Order.objects.filter(pk=self.closed.pk).update(updated=timezone.now())
+        self.assertEqual(archive.archive_batch([self.closed.pk], archive.months_ago(12)), 0)
+        self.assertTrue(Order.objects.filter(pk=self.closed.pk).exists())
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('archive_orders', '--dry-run', stdout=out)
+        self.assertIn('2 pedidos a archivar', out.getvalue())
+        self.assertEqual(ArchivedOrder.objects.count(), 0)
+        call_command('archive_orders', '--batch-size', '1', stdout=io.StringIO())
+        self.assertEqual(ArchivedOrder.objects.count(), 2)
+
+    def test_months_ago_clamps_the_day(self):
+        now = timezone.now().replace(year=2024, month=3, day=31)
+        self.assertEqual(archive.months_ago(1, now).date().isoformat(), '2024-02-29')
+        self.assertEqual(archive.months_ago(15, now).date().isoformat(), '2022-12-31')
+
+
+class ArchivedLookupTests(ArchiveTestCase):
+    """Los pedidos archivados se siguen encontrando por token e id"""
+
+    def setUp(self):
+        super().setUp()
+        self.archive()
+
+    def test_find_order(self):
+        order = archive.find_order(token=self.closed.token)
+        self.assertIsInstance(order, ArchivedOrder)
+        self.assertEqual(order.product_ref, self.product)
+        self.assertEqual(
+            [image.pk for image in archive.find_order(pk=self.cancelled.pk).images.all()], [self.image.pk]
+        )
+        self.assertIsInstance(archive.find_order(token=self.open.token), Order)
+        self.assertIsNone(archive.find_order(token=uuid.uuid4()))
+
+    def test_tracking_page(self):
+        response = self.client.get(reverse('order_track', kwargs={'token': self.closed.token}))
+        self.assertContains(response, 'Taza sublimada')
+        self.assertEqual(self.client.get(reverse('order_track', kwargs={'token': 'no-es-un-uuid'})).status_code, 404)
+        self.assertEqual(
+            self.client.get(reverse('order_status', kwargs={'token': self.closed.token})).json()['status'],
+            'entregada',
+        )
+
+    def test_api_token_search_includes_archived_orders(self):
+        self.client.force_login(make_staff())
+        url = reverse('order-list')
+        found = self.client.get(url, {'search': str(self.closed.token)}).json()
+        self.assertEqual([row['id'] for row in found['results']], [self.closed.pk])
+        self.assertEqual(found['results'][0]['status'], 'entregada')
+        # Los demás filtros se aplican también al archivo
+        filtered = self.client.get(url, {'search': str(self.closed.token), 'status': 'solicitado'}).json()
+        self.assertEqual(filtered['results'], [])
+        active = self.client.get(url, {'search': str(self.open.token)}).json()
+        self.assertEqual([row['id'] for row in active['results']], [self.open.pk])
+
+    def test_api_retrieve_is_read_only(self):
+        self.client.force_login(make_staff())
+        url = reverse('order-detail', kwargs={'pk': self.closed.pk})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['token'], str(self.closed.token))
+        self.assertEqual(self.client.patch(url, {'status': 'finalizada'}, content_type='application/json').status_code, 404)
+
+
+class ArchivedReportsTests(ArchiveTestCase):
+    """Con el rango completo los reportes suman activos y archivados igual que antes de archivar"""
+
+    def test_all_time_results_survive_archiving(self):
+        before = (
+            analytics.totals(analytics.select_orders()),
+            analytics.counts_by(analytics.select_orders(), 'status'),
+            analytics.popular_products(analytics.select_orders(), revenue_key='revenue'),
+        )
+        self.archive()
+        orders = analytics.select_orders()
+        self.assertIsInstance(orders, analytics.WithArchive)
+        after = (
+            analytics.totals(orders),
+            analytics.counts_by(orders, 'status'),
+            analytics.popular_products(orders, revenue_key='revenue'),
+        )
+        self.assertEqual(after[0], before[0])
+        self.assertCountEqual(after[1], before[1])
+        self.assertEqual(after[2], before[2])
+
+    def test_date_ranges_reach_the_archive_only_when_needed(self):
+        self.archive()
+        self.assertTrue(archive.reaches_archive(days_ago(600)))
+        self.assertFalse(archive.reaches_archive(timezone.now().date() - timedelta(days=100)))
+        self.assertTrue(archive.reaches_archive())
+        self.assertEqual(analytics.totals(analytics.select_orders(date_from=days_ago(600).date()))['orders'], 4)
+
+    def test_reports_without_dates_include_the_archive(self):
+        self.archive()
+        orders = analytics.select_orders(**analytics.filters_from_params({}))
+        self.assertIsInstance(orders, analytics.WithArchive)
+        self.assertEqual(analytics.totals(orders)['orders'], 4)
+
+    def test_archiving_again_invalidates_cached_archive_results(self):
+        self.archive()
+        self.assertEqual(analytics.totals(analytics.select_orders())['orders'], 4)
+        Order.objects.filter(pk=self.recent.pk).update(updated=days_ago(500))
+        self.assertEqual(self.archive(), 1)
+        totals = analytics.totals(analytics.select_orders())
+        self.assertEqual(totals['orders'], 4)
+        self.assertEqual(totals['revenue'], 3000 + 2000 + 500 + 700)
+
+    @override_settings(ORDER_ARCHIVE={'AFTER_MONTHS': 12, 'STATUSES': ('entregada',), 'BATCH_SIZE': 1000,
+                                      'CACHE_SECONDS': 3600})
+    def test_statuses_come_from_settings(self):
+        self.assertEqual(self.archive(), 1)
+        self.assertTrue(Order.objects.filter(pk=self.cancelled.pk).exists())
@@ -0,0 +1,72 @@
+import io
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from MainApp import assets
+from MainApp.storage import ForgivingManifestStaticFilesStorage
+from MainApp.templatetags.assets import vendor_url
+
+
+class VendorUrlTests(SimpleTestCase):
+    """{% vendor_url %}: archivo local si build_assets lo descargó, si no el CDN"""
+
+    def setUp(self):
+        self.static_dir = Path(self.enterContext(tempfile.TemporaryDirectory()))
+
+    def test_falls_back_to_cdn(self):
+        with override_settings(DEBUG=True, STATICFILES_DIRS=[str(self.static_dir)]):
+            self.assertEqual(vendor_url('chart.js'), assets.VENDOR_ASSETS['chart.js'][1])
+
+    def test_uses_local_copy(self):
+        path, _ = assets.VENDOR_ASSETS['chart.js']
+        (self.static_dir / path).parent.mkdir(parents=True)
+        (self.static_dir / path).write_text('// chart')
+        with override_settings(DEBUG=True, STATICFILES_DIRS=[str(self.static_dir)]):
+            self.assertEqual(vendor_url('chart.js'), f'/static/{path}')
+
+
+class BuildAssetsTests(SimpleTestCase):
+
+    def setUp(self):
+        self.static_dir = Path(self.enterContext(tempfile.TemporaryDirectory()))
+
+    def download(self, url, timeout):
+        body = b'body{}\n/*# sourceMappingURL=bootstrap.min.css.map */' if url.endswith('.css') else b'font'
+        return io.BytesIO(body)
+
+    def test_downloads_every_file_without_source_maps(self):
+        with override_settings(STATIC_DIR=str(self.static_dir)), \
+                mock.patch('MainApp.management.commands.build_assets.urlopen', side_effect=self.download) as urlopen:
+            call_command('build_assets', stdout=io.StringIO())
+            self.assertEqual(urlopen.call_count, len(assets.downloads()))
+            css = self.static_dir / assets.VENDOR_ASSETS['bootstrap.css'][0]
+            self.assertEqual(css.read_bytes(), b'body{}\n')
+
+            # Los archivos existentes no se vuelven a descargar
+            call_command('build_assets', stdout=io.StringIO())
+            self.assertEqual(urlopen.call_count, len(assets.downloads()))
+
+
+class ForgivingManifestTests(SimpleTestCase):
+    """Hash en el nombre y compresión aunque un CSS referencie archivos que no existen"""
+
+    def test_post_process_tolerates_missing_references(self):
+        # Como collectstatic: el archivo ya copiado en STATIC_ROOT, luego post_process
+        target = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        css = 'body { background: url("missing.png"); }\n' + 'p { margin: 0 } ' * 100
+        (target / 'site.css').write_text(css)
+        storage = ForgivingManifestStaticFilesStorage(location=target, base_url='/static/')
+        paths = {'site.css': (FileSystemStorage(location=target), 'site.css')}
+
+        processed = [name for _, name, _ in storage.post_process(paths) if name]
+        hashed = storage.stored_name('site.css')
+        self.assertNotEqual(hashed, 'site.css')
+        self.assertIn(hashed, processed)
+        for suffix in ('.gz', '.br'):
+            self.assertTrue(storage.exists(hashed + suffix), suffix)
+        self.assertEqual(storage.url('no-existe.js'), '/static/no-existe.js')
@@ -0,0 +1,58 @@
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.test import override_settings
+
+from MainApp.models import ArchivedOrder
+
+from .helpers import CacheTestCase, make_category, make_order, make_product
+
+make_order_async = sync_to_async(make_order)
+
+
+@override_settings(ROOT_URLCONF='MainApp.tests.async_urls')
+class AsyncStorefrontTests(CacheTestCase):
+    """Las vistas async cargan todo antes de renderizar (sin consultas perezosas)"""
+
+    def setUp(self):
+        super().setUp()
+        self.category = make_category('Tazas')
+        self.product = make_product(self.category, name='Taza sublimada')
+        make_product(make_category('Poleras'), name='Polera estampada')
+
+    async def test_product_list_renders_catalog_and_facets(self):
+        response = await self.async_client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Taza sublimada')
+        self.assertContains(response, 'Polera estampada')
+        self.assertContains(response, 'Tazas')
+
+    async def test_product_list_filters_by_category(self):
+        response = await self.async_client.get('/', {'category': self.category.slug})
+        self.assertContains(response, 'Taza sublimada')
+        self.assertNotContains(response, 'Polera estampada')
+
+    async def test_product_detail(self):
+        response = await self.async_client.get(f'/producto/{self.product.slug}/')
+        self.assertContains(response, 'Taza sublimada')
+        response = await self.async_client.get('/producto/no-existe/')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_order_track_loads_product(self):
+        order = await make_order_async(self.product, customer_name='Ana')
+        response = await self.async_client.get(f'/seguimiento/{order.token}/')
+        self.assertContains(response, 'Taza sublimada')
+
+    async def test_order_track_unknown_or_invalid_token(self):
+        response = await self.async_client.get(f'/seguimiento/{uuid.uuid4()}/')
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get('/seguimiento/no-es-un-token/')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_order_track_finds_archived_order(self):
+        order = await make_order_async(self.product, status='entregada')
+        values = {field.attname: getattr(order, field.attname) for field in order._meta.concrete_fields}
+        await ArchivedOrder.objects.acreate(**values)
+        await order.adelete()
+        response = await self.async_client.get(f'/seguimiento/{order.token}/')
+        self.assertContains(response, 'Taza sublimada')
@@ -0,0 +1,62 @@
+from MainApp import autocomplete
+from MainApp.models import Product
+
+from .helpers import CacheTestCase, make_category, make_product, make_staff
+
+
+class ProductIndexTests(CacheTestCase):
+    """Búsqueda por prefijo de palabras sin tildes ni mayúsculas"""
+
+    def setUp(self):
+        super().setUp()
+        category = make_category()
+        self.truck = make_product(category, name='Camión de madera')
+        self.mug = make_product(category, name='Taza mágica')
+        self.mug_set = make_product(category, name='Set de tazas')
+        make_product(category, name='Polera')
+
+    def names(self, query, limit=10):
+        return [item['name'] for item in autocomplete.suggest(query, limit)]
+
+    def test_fold(self):
+        self.assertEqual(autocomplete.fold('Camión Ñandú'), 'camion nandu')
+
+    def test_prefix_without_accents(self):
+        self.assertEqual(self.names('CAMI'), ['Camión de madera'])
+        self.assertEqual(self.names('magic'), ['Taza mágica'])
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.names('taz mag'), ['Taza mágica'])
+        self.assertEqual(self.names('taza camion'), [])
+        self.assertEqual(self.names('   '), [])
+
+    def test_names_starting_with_the_query_come_first(self):
+        self.assertEqual(self.names('taza'), ['Taza mágica', 'Set de tazas'])
+        self.assertEqual(self.names('taza', limit=1), ['Taza mágica'])
+
+    def test_slug_words_are_indexed(self):
+        self.assertIn('Polera', self.names(Product.objects.get(name='Polera').slug.split('-')[0]))
+
+    def test_lookup_does_not_query_the_database(self):
+        autocomplete.suggest('taza')
+        with self.assertNumQueries(0):
+            autocomplete.suggest('camion')
+
+    def test_index_follows_catalog_changes(self):
+        self.assertEqual(self.names('lampara'), [])
+        make_product(name='Lámpara de noche')
+        self.assertEqual(self.names('lampara'), ['Lámpara de noche'])
+        self.truck.delete()
+        self.assertEqual(self.names('camion'), [])
+
+    def test_endpoint(self):
+        response = self.client.get('/api/products/autocomplete/', {'q': 'taza', 'limit': 500})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([item['slug'] for item in results], [self.mug.slug, self.mug_set.slug])
+        self.assertEqual(self.client.get('/api/products/autocomplete/', {'limit': 'x'}).json(), {'results': []})
+
+    def test_admin_search_uses_the_index(self):
+        self.client.force_login(make_staff(is_superuser=True))
+        response = self.client.get('/admin/MainApp/product/', {'q': 'magi'})
+        self.assertEqual([product.name for product in response.context['cl'].result_list], ['Taza mágica'])
@@ -0,0 +1,94 @@
+from datetime import timedelta
+from unittest import skipIf
+
+from django.test import override_settings
+from django.utils import timezone
+
+from MainApp import analytics, columnar
+from MainApp.order_updates import bulk_update_orders
+
+from .helpers import CacheTestCase, days_ago, make_order, make_product
+
+
+@skipIf(columnar.np is None, "requiere numpy")
+class ColumnarEngineTests(CacheTestCase):
+    """El motor columnar responde lo mismo que las consultas SQL de analytics.py"""
+
+    def setUp(self):
+        super().setUp()
+        self.mug = make_product(name='Taza')
+        self.shirt = make_product(name='Polera')
+        make_order(self.mug, total_price=1000)
+        make_order(self.mug, total_price=2500, platform='instagram', status='aprobado')
+        make_order(self.shirt, total_price=4000, status='cancelada', created=days_ago(20))
+        make_order(None, total_price=700, platform='whatsapp', created=days_ago(75))
+        self.engine = columnar.ColumnarEngine(max_bytes=10 ** 6, refresh_interval=0)
+        self.engine.refresh(force=True)
+
+    def assertMatchesSql(self, **filters):
+        orders = self.engine.slice().filter(**filters)
+        queryset = analytics.filter_orders(**filters)
+        today = timezone.localdate()
+        start = today - timedelta(days=90)
+        periods = {'week': timezone.now() - timedelta(days=7), 'quarter': timezone.now() - timedelta(days=90)}
+
+        self.assertEqual(analytics.totals(orders), analytics.totals(queryset))
+        # Los empates no tienen un orden definido en SQL: se comparan como conjuntos
+        for field in ('status', 'platform'):
+            self.assertCountEqual(analytics.counts_by(orders, field), analytics.counts_by(queryset, field))
+        options = dict(limit=None, revenue_key='revenue', avg_key='avg',
+                       fields=('product_ref__name', 'product_ref__id'), exclude_cancelled=True)
+        self.assertCountEqual(analytics.popular_products(orders, **options),
+                              analytics.popular_products(queryset, **options))
+        for bucket in ('day', 'week', 'month'):
+            self.assertEqual(
+                analytics.time_series(orders, bucket, start, today, revenue_key='revenue'),
+                analytics.time_series(queryset, bucket, start, today, revenue_key='revenue'),
+            )
+        self.assertEqual(
+            analytics.period_summary(orders, periods, ('cancelada',)),
+            analytics.period_summary(queryset, periods, ('cancelada',)),
+        )
+
+    def test_full_load_matches_sql(self):
+        self.assertEqual(len(self.engine.columns), 4)
+        self.assertMatchesSql()
+        self.assertMatchesSql(platform='web')
+        self.assertMatchesSql(status='cancelada')
+        self.assertMatchesSql(date_from=timezone.localdate() - timedelta(days=30))
+
+    def test_incremental_refresh_matches_sql(self):
+        new = make_order(self.shirt, total_price=900)
+        changed = make_order(self.mug, total_price=300)
+        self.engine.refresh(force=True)
+        changed.status = 'aprobado'
+        changed.total_price = 350
+        changed.save()
+        bulk_update_orders([new.pk], status='cancelada')
+        self.engine.refresh(force=True)
+
+        self.assertEqual(len(self.engine.columns), 6)
+        self.assertMatchesSql()
+        self.assertMatchesSql(status='cancelada')
+        self.assertMatchesSql(status='aprobado')
+
+    def test_deletion_triggers_reload(self):
+        make_order(self.mug).delete()
+        self.engine.refresh(force=True)
+        self.assertEqual(len(self.engine.columns), 4)
+        self.assertMatchesSql()
+
+    def test_over_budget_falls_back_to_sql(self):
+        engine = columnar.ColumnarEngine(max_bytes=columnar.ROW_BYTES, refresh_interval=0)
+        with self.assertLogs('MainApp.columnar', 'WARNING'):
+            engine.refresh(force=True)
+        self.assertTrue(engine.over_budget)
+        self.assertEqual(len(engine.columns), 0)
+
+    @override_settings(ORDER_COLUMNAR_ENGINE={'ENABLED': True, 'MAX_BYTES': 10 ** 6, 'REFRESH_INTERVAL': 0})
+    def test_select_orders_uses_engine_when_enabled(self):
+        self.addCleanup(setattr, columnar, '_engine', None)
+        columnar._engine = None
+        orders = analytics.select_orders(date_from=timezone.localdate() - timedelta(days=30))
+        self.assertIsInstance(orders, columnar.OrderSlice)
+        self.assertEqual(orders.count(), 3)
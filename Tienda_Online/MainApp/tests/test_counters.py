@@ -0,0 +1,96 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+from MainApp import analytics, archive, counters
+from MainApp.models import Order, ProductOrderStats
+from MainApp.order_updates import bulk_update_orders
+
+from .helpers import CacheTestCase, days_ago, make_category, make_order, make_product
+
+
+class OrderCountersTests(CacheTestCase):
+    """ProductOrderStats/CategoryOrderStats siempre igual a recalcularlos desde los pedidos"""
+
+    def setUp(self):
+        super().setUp()
+        self.category = make_category()
+        self.mug = make_product(self.category, name='Taza')
+        self.shirt = make_product(self.category, name='Polera')
+
+    def assertCountersExact(self):
+        # Una fila en cero equivale a no tenerla (igual que en reconcile_order_stats)
+        current = tuple(
+            {key: values for key, values in table.items() if any(values)}
+            for table in counters.current_counters()
+        )
+        self.assertEqual(current, counters.expected_counters())
+
+    def test_create_and_save(self):
+        order = make_order(self.mug, total_price=1200)
+        make_order(self.shirt, total_price=800)
+        make_order(None, total_price=500)
+        self.assertCountersExact()
+        self.assertEqual(ProductOrderStats.objects.get(product=self.mug).revenue, 1200)
+
+        order.status = 'cancelada'
+        order.total_price = 1500
+        order.save()
+        self.assertCountersExact()
+
+        order.product_ref = self.shirt
+        order.save(update_fields=['product_ref', 'updated'])
+        self.assertCountersExact()
+
+    def test_save_of_a_partially_loaded_order(self):
+        order = make_order(self.mug, total_price=1000)
+        stale = Order.objects.only('id', 'status').get(pk=order.pk)
+        stale.status = 'cancelada'
+        stale.save(update_fields=['status'])
+        self.assertCountersExact()
+
+    def test_delete(self):
+        make_order(self.mug).delete()
+        make_order(self.mug, total_price=300)
+        self.assertCountersExact()
+
+    def test_bulk_update(self):
+        orders = [make_order(self.mug), make_order(self.shirt), make_order(self.shirt, status='realizada')]
+        bulk_update_orders([order.pk for order in orders], status='cancelada')
+        self.assertCountersExact()
+        self.assertEqual(ProductOrderStats.objects.get(product=self.shirt).active_count, 1)
+
+    def test_archive_keeps_counters(self):
+        make_order(self.mug, status='entregada', created=days_ago(500))
+        make_order(self.mug)
+        moved = sum(count for _, count in archive.archive_orders(archive.months_ago(12)))
+        self.assertEqual(moved, 1)
+        self.assertCountersExact()
+        self.assertEqual(ProductOrderStats.objects.get(product=self.mug).order_count, 2)
+
+    def test_product_moves_to_another_category(self):
+        make_order(self.mug, total_price=700)
+        self.mug.category = make_category()
+        self.mug.save()
+        self.assertCountersExact()
+        self.mug.delete()
+        self.assertCountersExact()
+
+    def test_ranked_products_match_grouped_query(self):
+        make_order(self.shirt)
+        make_order(self.shirt)
+        make_order(self.mug)
+        with self.assertNumQueries(1):
+            ranked = analytics.ranked_products(revenue_key='revenue')
+        self.assertEqual(ranked, analytics.popular_products(analytics.filter_orders(), revenue_key='revenue'))
+
+    def test_reconcile_command_repairs_drift(self):
+        make_order(self.mug, total_price=900)
+        Order.objects.update(total_price=100)  # sin señales
+        out = StringIO()
+        call_command('reconcile_order_stats', '--dry-run', stdout=out)
+        self.assertIn('desfasados', out.getvalue())
+        self.assertNotEqual(counters.current_counters(), counters.expected_counters())
+
+        call_command('reconcile_order_stats', stdout=StringIO())
+        self.assertCountersExact()
@@ -0,0 +1,145 @@
+import importlib
+import io
+import uuid
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from MainApp import customers
+from MainApp.archive import archive_orders
+from MainApp.models import ArchivedOrder, Order
+
+from .helpers import CacheTestCase, days_ago, make_order, make_staff
+
+
+class NormalizationTests(SimpleTestCase):
+    def test_email(self):
+        self.assertEqual(customers.normalize_email('  Ana.Perez@Gmail.COM '), 'ana.perez@gmail.com')
+
+    def test_phone_formats_collapse_to_national_digits(self):
+        for value in ('+56 9 1234 5678', '0056912345678', '9 1234-5678', '(9) 12345678'):
+            with self.subTest(value):
+                self.assertEqual(customers.normalize_phone(value), '912345678')
+        self.assertEqual(customers.normalize_phone('12345'), '')
+        self.assertEqual(customers.normalize_phone('@ana_perez'), '')
+
+    def test_handles_and_profile_urls(self):
+        for value in ('@Ana_Perez', 'ana_perez', 'https://www.instagram.com/ana_perez/', 'instagram.com/@Ana_Perez'):
+            with self.subTest(value):
+                self.assertEqual(customers.normalize_handle(value), 'ana_perez')
+        self.assertEqual(customers.normalize_handle('+56 9 1234 5678'), '')
+
+    def test_lookup_from_params(self):
+        self.assertEqual(
+            customers.lookup_from_params({'email': 'A@B.CL', 'phone': '+56912345678', 'handle': ''}),
+            {'email_normalized': 'a@b.cl', 'phone_digits': '912345678'},
+        )
+        self.assertEqual(customers.lookup_from_params({'phone': 'no es un teléfono'}), {})
+
+
+class CustomerKeysTests(CacheTestCase):
+    """Order.save() completa las claves; backfill_keys las recalcula sin save()"""
+
+    def clear_keys(self, model=Order):
+        model.objects.update(**{name: '' for name in customers.KEY_FIELDS})
+
+    def keys(self, order, model=Order):
+        return model.objects.filter(pk=order.pk).values(*customers.KEY_FIELDS).get()
+
+    def test_save_fills_keys(self):
+        order = make_order(email='Ana@Correo.CL', phone='+56 9 1234 5678')
+        self.assertEqual(self.keys(order), {
+            'email_normalized': 'ana@correo.cl', 'phone_digits': '912345678', 'social_handle': '',
+        })
+
+    def test_backfill_only_writes_changed_rows(self):
+        first = make_order(email='Ana@Correo.CL')
+        make_order(email='otro@correo.cl')
+        Order.objects.filter(pk=first.pk).update(email_normalized='')
+        progress = list(customers.backfill_keys(Order, batch_size=1))
+        self.assertEqual(progress[-1][1:], (2, 1))
+        self.assertEqual(self.keys(first)['email_normalized'], 'ana@correo.cl')
+        self.assertEqual(list(customers.backfill_keys(Order))[-1][1:], (2, 0))
+
+    def test_dry_run_changes_nothing(self):
+        order = make_order(phone='@ana_perez')
+        self.clear_keys()
+        self.assertEqual(list(customers.backfill_keys(Order, dry_run=True))[-1][1:], (1, 1))
+        self.assertEqual(self.keys(order)['social_handle'], '')
+
+    def test_migration_backfills_active_and_archived_orders(self):
+        active = make_order(email='activo@correo.cl')
+        archived = make_order(status='entregada', email='archivado@correo.cl', created=days_ago(400))
+        list(archive_orders(days_ago(30)))
+        self.clear_keys(Order)
+        self.clear_keys(ArchivedOrder)
+
+        migration = importlib.import_module('MainApp.migrations.0016_backfill_customer_keys')
+        migration.backfill(apps, SimpleNamespace(connection=connection))
+        self.assertEqual(self.keys(active)['email_normalized'], 'activo@correo.cl')
+        self.assertEqual(self.keys(archived, ArchivedOrder)['email_normalized'], 'archivado@correo.cl')
+
+    def test_command(self):
+        order = make_order(email='Ana@Correo.CL')
+        self.clear_keys()
+        out = io.StringIO()
+        call_command('backfill_customer_keys', '--dry-run', stdout=out)
+        self.assertIn('1 de 1 sin actualizar', out.getvalue())
+        self.assertEqual(self.keys(order)['email_normalized'], '')
+        call_command('backfill_customer_keys', stdout=io.StringIO())
+        self.assertEqual(self.keys(order)['email_normalized'], 'ana@correo.cl')
+
+
+class CustomerHistoryAPITests(CacheTestCase):
+    """Historial de un cliente por claves normalizadas, incluidos los pedidos archivados"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(make_staff())
+        self.url = reverse('customer-history')
+        self.old = make_order(status='entregada', email='ana@correo.cl', created=days_ago(400))
+        list(archive_orders(days_ago(30)))
+        self.recent = make_order(phone='+56 9 1234 5678', email='ANA@correo.cl')
+        self.other = make_order(email='otra@correo.cl')
+
+    def ids(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [order['id'] for order in response.json()['results']]
+
+    def test_by_email_in_any_format_includes_archived(self):
+        self.assertEqual(self.ids(email=' Ana@Correo.CL'), [self.recent.pk, self.old.pk])
+
+    def test_by_phone(self):
+        self.assertEqual(self.ids(phone='912345678'), [self.recent.pk])
+
+    def test_parameters_combine_with_or(self):
+        self.assertEqual(
+            self.ids(phone='912345678', email='otra@correo.cl'),
+            [self.other.pk, self.recent.pk],
+        )
+
+    def test_by_token_uses_that_order_keys(self):
+        self.assertEqual(self.ids(token=str(self.old.token)), [self.recent.pk, self.old.pk])
+
+    def test_not_found(self):
+        cases = {
+            'token desconocido': {'token': str(uuid.uuid4())},
+            'token inválido': {'token': 'abc'},
+            'pedido sin claves': {'token': str(make_order().token)},
+            'valores no normalizables': {'phone': 'sin número'},
+        }
+        for label, params in cases.items():
+            with self.subTest(label):
+                self.assertEqual(self.client.get(self.url, params).status_code, 404)
+
+    def test_missing_parameters(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+
+    def test_requires_authentication(self):
+        self.client.logout()
+        self.assertIn(self.client.get(self.url, {'email': 'ana@correo.cl'}).status_code, (401, 403))
@@ -0,0 +1,119 @@
+import asyncio
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.test import override_settings
+from django.urls import NoReverseMatch, reverse
+
+from MainApp.events import ALL_ORDERS, broker, event_stream, order_topic, publish_order_change
+from MainApp.models import OrderEvent
+
+from .helpers import CacheTestCase, make_order, make_product, make_staff
+
+
+class WsgiFallbackTests(CacheTestCase):
+    """Bajo WSGI no hay streams SSE: las páginas sondean order_status"""
+
+    def setUp(self):
+        super().setUp()
+        self.order = make_order(make_product(), customer_name='Ana')
+
+    def test_sse_routes_are_not_published(self):
+        with self.assertRaises(NoReverseMatch):
+            reverse('order_events', kwargs={'token': self.order.token})
+        with self.assertRaises(NoReverseMatch):
+            reverse('dashboard_events')
+
+    def test_tracking_page_polls_status(self):
+        response = self.client.get(reverse('order_track', kwargs={'token': self.order.token}))
+        self.assertNotContains(response, 'EventSource(')
+        self.assertContains(response, reverse('order_status', kwargs={'token': self.order.token}))
+
+    def test_order_status_json(self):
+        response = self.client.get(reverse('order_status', kwargs={'token': self.order.token}))
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.assertEqual(response.json()['status'], 'solicitado')
+        self.assertEqual(response.json()['token'], str(self.order.token))
+
+    def test_order_status_unknown_token(self):
+        response = self.client.get(reverse('order_status', kwargs={'token': uuid.uuid4()}))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('order_status', kwargs={'token': 'no-es-un-token'}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_dashboard_polls_charts(self):
+        self.client.force_login(make_staff())
+        response = self.client.get(reverse('dashboard_reports'))
+        self.assertContains(response, 'data-poll-seconds=')
+        self.assertNotContains(response, 'data-events=')
+
+
+@override_settings(ROOT_URLCONF='MainApp.tests.async_urls', ASYNC_VIEWS=True)
+class AsgiEventsTests(CacheTestCase):
+    """Perfil ASGI: EventSource en la página y stream con el estado inicial"""
+
+    async def test_tracking_page_uses_event_source(self):
+        order = await sync_to_async(make_order)(None)
+        response = await self.async_client.get(f'/seguimiento/{order.token}/')
+        self.assertContains(response, 'EventSource(')
+
+    async def test_stream_starts_with_current_status(self):
+        order = await sync_to_async(make_order)(None, status='aprobado')
+        response = await self.async_client.get(f'/seguimiento/{order.token}/eventos/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b'retry: 5000\n\n')
+        first = (await anext(chunks)).decode()
+        self.assertTrue(first.startswith('event: status\n'))
+        self.assertIn('"status": "aprobado"', first)
+        await response.streaming_content.aclose()
+
+    async def test_dashboard_stream_requires_staff(self):
+        response = await self.async_client.get('/dashboard/eventos/')
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(ORDER_EVENTS_POLL_INTERVAL=0.01)
+class BrokerTests(CacheTestCase):
+    """Un sondeo por loop reparte cada OrderEvent a los tópicos del pedido y general"""
+
+    async def test_published_change_reaches_order_and_all_topics(self):
+        order = await sync_to_async(make_order)(None)
+        mine = broker.subscribe(order_topic(order.token))
+        everything = broker.subscribe(ALL_ORDERS)
+        other = broker.subscribe(order_topic(uuid.uuid4()))
+        try:
+            # Esperar a que el sondeo tome la marca de agua antes de publicar
+            await asyncio.sleep(0.05)
+            order.status = 'aprobado'
+            await sync_to_async(publish_order_change)(order)
+            payload = await asyncio.wait_for(mine.get(), 2)
+            self.assertEqual(payload['status'], 'aprobado')
+            self.assertEqual((await asyncio.wait_for(everything.get(), 2))['order_id'], order.pk)
+            self.assertTrue(other.empty())
+        finally:
+            broker.unsubscribe(order_topic(order.token), mine)
+            broker.unsubscribe(ALL_ORDERS, everything)
+
+    async def test_stream_yields_published_events(self):
+        order = await sync_to_async(make_order)(None)
+        stream = event_stream(order_topic(order.token))
+        self.assertEqual(await anext(stream), 'retry: 5000\n\n')
+        waiting = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.05)
+        await OrderEvent.objects.acreate(
+            order_id=order.pk, token=order.token, status='cancelada', payment_status='pendiente',
+        )
+        message = await asyncio.wait_for(waiting, 2)
+        self.assertIn('"status": "cancelada"', message)
+        await stream.aclose()
+
+    async def test_poll_task_stops_without_subscribers(self):
+        topic = order_topic(uuid.uuid4())
+        queue = broker.subscribe(topic)
+        _, state = broker._state()
+        task = state.task
+        broker.unsubscribe(topic, queue)
+        await asyncio.wait_for(task, 2)
+        self.assertIsNone(state.task)
+        self.assertIsNone(state.last_id)
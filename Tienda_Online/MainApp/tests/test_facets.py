@@ -0,0 +1,102 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from MainApp import facets
+from MainApp.models import Product
+
+from .helpers import CacheTestCase, make_category, make_product
+
+FACETS = {'PRICE_BUCKETS': (2000, 4000), 'CACHE_SECONDS': 3600}
+
+
+@override_settings(CATALOG_FACETS=FACETS)
+class PriceHelpersTests(SimpleTestCase):
+    def test_parse_price(self):
+        self.assertEqual(facets.parse_price('1990.5'), Decimal('1990.5'))
+        for value in ('', None, 'abc', 'NaN', 'Infinity'):
+            with self.subTest(value):
+                self.assertIsNone(facets.parse_price(value))
+
+    def test_buckets_are_inclusive_and_contiguous(self):
+        self.assertEqual(facets.price_buckets(), [
+            (None, Decimal('1999.99')),
+            (Decimal('2000'), Decimal('3999.99')),
+            (Decimal('4000'), None),
+        ])
+
+
+@override_settings(CATALOG_FACETS=FACETS)
+class CatalogFacetsTests(CacheTestCase):
+    """Una consulta agregada da los mismos conteos que filtrar faceta por faceta"""
+
+    def setUp(self):
+        super().setUp()
+        self.tazas = make_category('Tazas')
+        self.poleras = make_category('Poleras')
+        for price, featured in ((1000, True), (1999.99, False), (2000, False), (5000, True)):
+            make_product(self.tazas, price=price, featured=featured)
+        for price in (1500, 3000, 3999.99):
+            make_product(self.poleras, price=price)
+
+    def expected(self, category=None, min_price=None, max_price=None):
+        """Los mismos conteos, una consulta por faceta"""
+        in_price = Product.objects.filter(facets.price_filter(min_price, max_price))
+        selected = in_price.filter(category__slug=category) if category else in_price
+        in_category = Product.objects.filter(category__slug=category) if category else Product.objects.all()
+        return {
+            'total': selected.count(),
+            'featured': selected.filter(featured=True).count(),
+            'categories': sorted(
+                ({'slug': c.slug, 'name': c.name, 'count': in_price.filter(category=c).count()}
+                 for c in (self.tazas, self.poleras)),
+                key=lambda entry: entry['name'],
+            ),
+            'price': [
+                {
+                    'min': None if low is None else str(low),
+                    'max': None if high is None else str(high),
+                    'count': in_category.filter(facets.price_filter(low, high)).count(),
+                }
+                for low, high in facets.price_buckets()
+            ],
+        }
+
+    def test_matches_per_facet_queries(self):
+        cases = [
+            {},
+            {'category': self.tazas.slug},
+            {'min_price': Decimal('2000'), 'max_price': Decimal('3999.99')},
+            {'category': self.poleras.slug, 'max_price': Decimal('1999.99')},
+        ]
+        for selection in cases:
+            with self.subTest(**{key: str(value) for key, value in selection.items()}):
+                with self.assertNumQueries(1):
+                    result = facets.compute_facets(Product.objects.all(), **selection)
+                self.assertEqual(result, self.expected(**selection))
+
+    def test_text_search_is_applied_before_grouping(self):
+        make_product(self.poleras, name='Polera estampada', price=2500)
+        result = facets.compute_facets(Product.objects.filter(name__icontains='estampada'))
+        self.assertEqual(result['total'], 1)
+        self.assertEqual([entry['count'] for entry in result['price']], [0, 1, 0])
+
+    def test_cached_until_the_catalog_changes(self):
+        facets.catalog_facets(Product.objects.all(), 'q', '')
+        with self.assertNumQueries(0):
+            cached = facets.catalog_facets(Product.objects.all(), 'q', '')
+        self.assertEqual(cached['total'], 7)
+        make_product(self.tazas, price=100)
+        self.assertEqual(facets.catalog_facets(Product.objects.all(), 'q', '')['total'], 8)
+
+    def test_search_api_returns_facets_on_request(self):
+        url = reverse('search-products')
+        self.assertIsInstance(self.client.get(url).json(), list)
+        data = self.client.get(url, {'facets': '1', 'category': self.tazas.slug}).json()
+        self.assertEqual(len(data['results']), 4)
+        self.assertEqual(data['facets']['total'], 4)
+        self.assertEqual(
+            {entry['slug']: entry['count'] for entry in data['facets']['categories']},
+            {self.tazas.slug: 4, self.poleras.slug: 3},
+        )
@@ -0,0 +1,146 @@
+import importlib
+from datetime import timedelta
+from unittest import mock
+
+from django.apps import apps
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from MainApp import lead_times
+from MainApp.models import Order, OrderEvent, OrderStatusChange
+from MainApp.order_updates import bulk_update_orders
+
+from .helpers import CacheTestCase, make_order, make_product, make_staff
+
+HOUR = 3600
+
+
+def add_history(from_status, seconds, platform='web', count=1):
+    OrderStatusChange.objects.bulk_create([
+        OrderStatusChange(order_id=0, from_status=from_status, to_status='x', platform=platform,
+                          changed=timezone.now(), duration_seconds=seconds)
+        for _ in range(count)
+    ])
+
+
+class StatusHistoryTests(CacheTestCase):
+    """Cada cambio de estado (save o masivo) queda en OrderStatusChange con su duración"""
+
+    def test_history_from_save_and_bulk_update(self):
+        order = make_order(make_product())
+        OrderStatusChange.objects.filter(order_id=order.pk).update(changed=timezone.now() - timedelta(hours=5))
+        order.status = 'aprobado'
+        order.save()
+        bulk_update_orders([order.pk], status='en_proceso')
+
+        history = list(OrderStatusChange.objects.filter(order_id=order.pk).order_by('id'))
+        self.assertEqual([(h.from_status, h.to_status) for h in history],
+                         [('', 'solicitado'), ('solicitado', 'aprobado'), ('aprobado', 'en_proceso')])
+        self.assertIsNone(history[0].duration_seconds)
+        self.assertAlmostEqual(history[1].duration_seconds, 5 * HOUR, delta=60)
+        self.assertLess(history[2].duration_seconds, 60)
+
+    def test_saving_without_status_change_adds_nothing(self):
+        order = make_order(make_product())
+        order.total_price = 5000
+        order.save()
+        self.assertEqual(OrderStatusChange.objects.filter(order_id=order.pk).count(), 1)
+
+
+class LeadTimeStatsTests(CacheTestCase):
+
+    def test_percentiles_by_status_and_platform(self):
+        add_history('solicitado', HOUR, count=2)
+        add_history('solicitado', 3 * HOUR)
+        add_history('solicitado', 10 * HOUR, platform='instagram')
+        stats = lead_times.compute_lead_times(30)
+
+        requested = stats['statuses'][0]
+        self.assertEqual(requested['status'], 'solicitado')
+        self.assertEqual(requested['count'], 4)
+        self.assertEqual(requested['p50_seconds'], HOUR)
+        self.assertEqual(requested['p90_seconds'], 10 * HOUR)
+        self.assertEqual(stats['medians']['solicitado:instagram'], 10 * HOUR)
+        self.assertEqual(stats['medians']['solicitado:web'], HOUR)
+
+    def test_estimated_completion_sums_remaining_medians(self):
+        medians = {'solicitado': HOUR, 'aprobado': 2 * HOUR, 'en_proceso': 3 * HOUR, 'aprobado:instagram': 10 * HOUR}
+        order = make_order(None, status='aprobado')
+        entered = OrderStatusChange.objects.get(order_id=order.pk).changed
+        self.assertEqual(lead_times.estimated_completion(order, medians), entered + timedelta(hours=5))
+
+        order.platform = 'instagram'
+        self.assertEqual(lead_times.estimated_completion(order, medians), entered + timedelta(hours=13))
+
+        order.status = 'realizada'
+        self.assertIsNone(lead_times.estimated_completion(order, medians))
+        order.status = 'solicitado'
+        self.assertIsNone(lead_times.estimated_completion(order, {'solicitado': HOUR}))
+
+    def test_estimate_counts_from_the_last_status_change(self):
+        medians = {'aprobado': 2 * HOUR, 'en_proceso': 30 * HOUR}
+        order = make_order(None, status='aprobado')
+        entered = timezone.now() - timedelta(hours=20)
+        OrderStatusChange.objects.filter(order_id=order.pk).update(changed=entered)
+        order = Order.objects.get(pk=order.pk)
+        # Editar el pedido sin cambiar su estado no reinicia la estimación
+        order.description = 'Otro color'
+        order.save()
+        self.assertEqual(lead_times.estimated_completion(order, medians), entered + timedelta(hours=32))
+        annotated = lead_times.with_status_entered(Order.objects.all()).get(pk=order.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(lead_times.estimated_completion(annotated, medians), entered + timedelta(hours=32))
+
+        annotated.status = 'en_proceso'
+        annotated.save()
+        change = OrderStatusChange.objects.filter(order_id=order.pk).latest('id')
+        self.assertEqual(lead_times.estimated_completion(annotated, medians), change.changed + timedelta(hours=30))
+
+    def test_migration_seeds_history_from_events(self):
+        entered = timezone.now() - timedelta(days=3)
+        moved, untouched = make_order(None, status='aprobado'), make_order(None, status='aprobado')
+        OrderStatusChange.objects.all().delete()
+        for status, created in (('solicitado', 5), ('aprobado', 3), ('aprobado', 1)):
+            event = OrderEvent.objects.create(order_id=moved.pk, token=moved.token, status=status, payment_status='pendiente')
+            OrderEvent.objects.filter(pk=event.pk).update(created=timezone.now() - timedelta(days=created))
+        Order.objects.update(updated=timezone.now())
+        migration = importlib.import_module('MainApp.migrations.0009_order_status_change')
+        migration.backfill_current_status(apps, None)
+
+        changed = dict(OrderStatusChange.objects.values_list('order_id', 'changed'))
+        # La primera entrada al estado (el evento de hace 1 día fue un cambio de pago)
+        self.assertAlmostEqual(changed[moved.pk], entered, delta=timedelta(seconds=5))
+        self.assertEqual(changed[untouched.pk], untouched.created)
+
+    def test_stats_are_cached(self):
+        add_history('aprobado', HOUR)
+        with mock.patch.object(lead_times, 'compute_lead_times', wraps=lead_times.compute_lead_times) as compute:
+            lead_times.lead_time_stats()
+            lead_times.lead_time_stats()
+        self.assertEqual(compute.call_count, 1)
+
+
+class LeadTimeAPITests(CacheTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.api = APIClient()
+        self.api.force_authenticate(make_staff())
+
+    def test_order_list_reads_medians_once(self):
+        for status in lead_times.STATUS_FLOW[:-1]:
+            add_history(status, HOUR)
+        for _ in range(5):
+            make_order(make_product())
+        with mock.patch.object(lead_times, 'lead_time_stats', wraps=lead_times.lead_time_stats) as stats:
+            response = self.api.get('/api/orders/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(stats.call_count, 1)
+        self.assertTrue(all(row['estimated_completion'] for row in response.json()['results']))
+
+    def test_lead_time_endpoint(self):
+        add_history('en_proceso', 2 * HOUR)
+        response = self.api.get(reverse('lead-times'), {'days': 30})
+        self.assertEqual(response.json()['statuses'][0]['p50_seconds'], 2 * HOUR)
+        self.assertEqual(self.api.get(reverse('lead-times'), {'days': 0}).status_code, 400)
@@ -0,0 +1,157 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import RequestFactory, override_settings
+
+from MainApp.media import StoredMedia, uses_cloudinary
+from MainApp.models import ProductImage, StoredBlob
+from MainApp.storage import ContentAddressedStorage, blob_digest
+
+from .helpers import CacheTestCase, make_product
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'imagen de prueba' * 100
+OTHER_PNG = b'\x89PNG\r\n\x1a\n' + b'otra imagen' * 100
+
+
+class LocalMediaTestCase(CacheTestCase):
+    """MEDIA_STORAGE=local: ContentAddressedStorage sobre un MEDIA_ROOT temporal"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = self.settings(
+            MEDIA_ROOT=media_root,
+            STORAGES={
+                'default': {'BACKEND': 'MainApp.storage.ContentAddressedStorage'},
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+            },
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def blob_files(self):
+        root = default_storage.path('blobs')
+        return sorted(
+            name for _, _, names in os.walk(root) for name in names if not name.startswith('.')
+        )
+
+    def refs(self, name):
+        return StoredBlob.objects.get(digest=blob_digest(name)).refs
+
+
+class ContentAddressedStorageTests(LocalMediaTestCase):
+    """Un archivo por contenido, contado por referencias"""
+
+    def test_same_content_is_stored_once(self):
+        first = default_storage.save('products/taza.png', ContentFile(PNG))
+        second = default_storage.save('orders/otra.PNG', ContentFile(PNG))
+        digest = hashlib.sha256(PNG).hexdigest()
+        self.assertEqual(first, f'blobs/{digest[:2]}/{digest[2:4]}/{digest}.png')
+        self.assertEqual(second, first)
+        self.assertEqual(self.refs(first), 2)
+        self.assertEqual(self.blob_files(), [f'{digest}.png'])
+        with default_storage.open(first) as stored:
+            self.assertEqual(stored.read(), PNG)
+
+    def test_file_is_deleted_with_the_last_reference(self):
+        name = default_storage.save('taza.png', ContentFile(PNG))
+        default_storage.save('taza.png', ContentFile(PNG))
+        default_storage.delete(name)
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(self.refs(name), 1)
+        default_storage.delete(name)
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(StoredBlob.objects.exists())
+
+    def test_known_digest_skips_the_copy(self):
+        name = default_storage.save('taza.png', ContentFile(PNG))
+        upload = SimpleUploadedFile('taza.png', PNG)
+        upload.sha256 = hashlib.sha256(PNG).hexdigest()
+        with mock.patch.object(ContentAddressedStorage, '_spool') as spool:
+            self.assertEqual(default_storage.save('taza.png', upload), name)
+        spool.assert_not_called()
+        self.assertEqual(self.refs(name), 2)
+
+    def test_missing_file_is_rewritten(self):
+        name = default_storage.save('taza.png', ContentFile(PNG))
+        os.remove(default_storage.path(name))
+        self.assertEqual(default_storage.save('taza.png', ContentFile(PNG)), name)
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(self.blob_files(), [os.path.basename(name)])
+
+    def test_upload_handlers_hash_while_receiving(self):
+        request = RequestFactory().post('/', {'image': SimpleUploadedFile('taza.png', PNG, 'image/png')})
+        self.assertEqual(request.FILES['image'].sha256, hashlib.sha256(PNG).hexdigest())
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=100)
+    def test_large_uploads_are_hashed_on_disk(self):
+        request = RequestFactory().post('/', {'image': SimpleUploadedFile('taza.png', PNG, 'image/png')})
+        upload = request.FILES['image']
+        self.addCleanup(upload.close)
+        self.assertTrue(hasattr(upload, 'temporary_file_path'))
+        self.assertEqual(upload.sha256, hashlib.sha256(PNG).hexdigest())
+
+
+class MediaFieldTests(LocalMediaTestCase):
+    """MediaField guarda cualquier File con el almacenamiento local y suelta las referencias"""
+
+    def setUp(self):
+        super().setUp()
+        self.product = make_product()
+
+    def add_image(self, content, name='taza.png'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ProductImage.objects.create(product=self.product, image=ContentFile(content, name=name), order=1)
+
+    def test_content_file_is_saved_as_a_blob(self):
+        self.assertFalse(uses_cloudinary())
+        image = self.add_image(PNG)
+        self.assertIsInstance(image.image, StoredMedia)
+        self.assertIsNotNone(blob_digest(image.image.name))
+        stored = ProductImage.objects.get(pk=image.pk).image
+        self.assertEqual(stored, image.image)
+        self.assertEqual(stored.url, default_storage.url(stored.name))
+
+    def test_duplicate_uploads_share_the_blob(self):
+        first, second = self.add_image(PNG), self.add_image(PNG, name='copia.png')
+        self.assertEqual(first.image, second.image)
+        self.assertEqual(self.refs(first.image.name), 2)
+
+    def test_deleting_an_image_releases_its_reference(self):
+        first, second = self.add_image(PNG), self.add_image(PNG)
+        name = first.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.refs(name), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(default_storage.exists(name))
+
+    def test_replacing_an_image_releases_the_previous_one(self):
+        image = self.add_image(PNG)
+        old = image.image.name
+        image.image = ContentFile(OTHER_PNG, name='nueva.png')
+        with self.captureOnCommitCallbacks(execute=True):
+            image.save()
+        self.assertNotEqual(image.image.name, old)
+        self.assertFalse(default_storage.exists(old))
+        self.assertTrue(default_storage.exists(image.image.name))
+
+    def test_reconcile_command_fixes_drift(self):
+        image = self.add_image(PNG)
+        StoredBlob.objects.update(refs=5)
+        out = io.StringIO()
+        call_command('reconcile_media_blobs', '--dry-run', stdout=out)
+        self.assertIn('guardado 5, esperado 1', out.getvalue())
+        self.assertEqual(self.refs(image.image.name), 5)
+        call_command('reconcile_media_blobs', stdout=io.StringIO())
+        self.assertEqual(self.refs(image.image.name), 1)
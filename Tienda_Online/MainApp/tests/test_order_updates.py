@@ -0,0 +1,150 @@
+import uuid
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from MainApp import order_updates
+from MainApp.admin import OrderAdminForm
+from MainApp.models import Order, OrderEvent, OutboxMessage
+
+from .helpers import CacheTestCase, make_order, make_product, make_staff
+
+
+class BulkUpdateTests(CacheTestCase):
+    """Un resultado por identificador y solo transiciones de ALLOWED_TRANSITIONS"""
+
+    def setUp(self):
+        super().setUp()
+        self.api = APIClient()
+        self.api.force_authenticate(make_staff())
+        product = make_product()
+        self.requested = make_order(product)
+        self.approved = make_order(product, status='aprobado')
+        self.delivered = make_order(product, status='entregada')
+
+    def bulk(self, **data):
+        return self.api.post('/api/orders/bulk-update/', data, format='json')
+
+    def test_per_id_outcomes(self):
+        missing = str(uuid.uuid4())
+        response = self.bulk(
+            orders=[str(self.requested.pk), str(self.approved.token), str(self.delivered.pk), missing, 'basura'],
+            status='aprobado',
+        )
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([r['result'] for r in results], [
+            order_updates.UPDATED, order_updates.UNCHANGED, order_updates.INVALID,
+            order_updates.NOT_FOUND, order_updates.NOT_FOUND,
+        ])
+        self.assertEqual(results[0]['status'], 'aprobado')
+        self.assertEqual(results[2]['error'], "No se puede pasar de 'entregada' a 'aprobado'")
+        self.assertEqual(response.json()['summary'],
+                         {'updated': 1, 'unchanged': 1, 'not_found': 2, 'invalid_transition': 1})
+
+        self.requested.refresh_from_db()
+        self.delivered.refresh_from_db()
+        self.assertEqual(self.requested.status, 'aprobado')
+        self.assertEqual(self.delivered.status, 'entregada')
+
+    def test_derived_data_follows_the_update(self):
+        customer = make_order(None, email='ana@example.com')
+        OrderEvent.objects.all().delete()
+        OutboxMessage.objects.all().delete()
+        self.bulk(orders=[self.requested.pk, customer.pk], status='cancelada')
+        self.assertEqual(OrderEvent.objects.count(), 2)
+        # Solo el pedido con email recibe aviso
+        self.assertEqual(list(OutboxMessage.objects.values_list('order_id', flat=True)), [customer.pk])
+
+    def test_payment_transitions(self):
+        results = self.bulk(orders=[self.requested.pk], payment_status='pagado').json()['results']
+        self.assertEqual(results[0]['result'], order_updates.UPDATED)
+        results = self.bulk(orders=[self.requested.pk], payment_status='parcial').json()['results']
+        self.assertEqual(results[0]['result'], order_updates.INVALID)
+
+    def test_invalid_request(self):
+        self.assertEqual(self.bulk(orders=[self.requested.pk]).status_code, 400)
+        self.assertEqual(self.bulk(orders=[], status='aprobado').status_code, 400)
+        self.assertEqual(self.bulk(orders=[self.requested.pk], status='perdido').status_code, 400)
+        too_many = [str(n) for n in range(order_updates.MAX_BULK_ORDERS + 1)]
+        self.assertEqual(self.bulk(orders=too_many, status='aprobado').status_code, 400)
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        product = make_product()
+        few = [make_order(product).pk for _ in range(2)]
+        many = [make_order(make_product()).pk for _ in range(20)]
+        with CaptureQueriesContext(connection) as small:
+            order_updates.bulk_update_orders(few, status='aprobado')
+        with CaptureQueriesContext(connection) as large:
+            order_updates.bulk_update_orders(many, status='aprobado')
+        # Sin cambio de activos/cancelados los contadores no se tocan: mismas consultas
+        self.assertEqual(len(large), len(small))
+
+
+class SingleOrderTransitionTests(CacheTestCase):
+    """change_status, PUT/PATCH y el admin validan igual que bulk-update"""
+
+    def setUp(self):
+        super().setUp()
+        self.api = APIClient()
+        self.api.force_authenticate(make_staff())
+        self.order = make_order(make_product())
+
+    def change_status(self, new_status):
+        return self.api.post(f'/api/orders/{self.order.pk}/change_status/', {'status': new_status}, format='json')
+
+    def test_change_status_allowed(self):
+        response = self.change_status('aprobado')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['new_status'], 'aprobado')
+        self.assertEqual(response.json()['results'][0]['result'], order_updates.UPDATED)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'aprobado')
+
+    def test_change_status_rejects_transition_like_bulk_update(self):
+        response = self.change_status('finalizada')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['summary']['invalid_transition'], 1)
+        self.assertEqual(response.json()['results'][0]['result'], order_updates.INVALID)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'solicitado')
+
+    def test_change_status_invalid_value(self):
+        self.assertIn('status', self.change_status('perdido').json())
+        response = self.api.post(f'/api/orders/{self.order.pk}/change_status/', {}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_patch_validates_transition(self):
+        response = self.api.patch(f'/api/orders/{self.order.pk}/', {'status': 'entregada'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.api.patch(f'/api/orders/{self.order.pk}/', {'status': 'aprobado'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin_form_validates_transition(self):
+        data = {
+            'customer_name': self.order.customer_name, 'platform': 'web', 'total_price': 0,
+            'status': 'realizada', 'payment_status': 'pendiente',
+        }
+        form = OrderAdminForm(data, instance=Order.objects.get(pk=self.order.pk))
+        self.assertFalse(form.is_valid())
+        self.assertIn("No se puede pasar de 'solicitado' a 'realizada'", form.non_field_errors())
+
+        form = OrderAdminForm({**data, 'status': 'aprobado'}, instance=Order.objects.get(pk=self.order.pk))
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_admin_add_form_accepts_any_status(self):
+        data = {'customer_name': 'Nuevo', 'platform': 'web', 'total_price': 0,
+                'status': 'entregada', 'payment_status': 'pagado'}
+        self.assertTrue(OrderAdminForm(data).is_valid())
+
+    def test_admin_action_reports_invalid_transitions(self):
+        self.client.force_login(make_staff('admin', is_superuser=True))
+        response = self.client.post(reverse('admin:MainApp_order_changelist'), {
+            'action': 'bulk_finalizada', '_selected_action': [self.order.pk],
+        }, follow=True)
+        messages = [str(message) for message in response.context['messages']]
+        self.assertIn('1 con transición no permitida', messages[0])
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'solicitado')
@@ -0,0 +1,201 @@
+import json
+import urllib.error
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core import mail
+from django.db import transaction
+from django.test import override_settings
+from django.utils import timezone
+
+from MainApp import outbox
+from MainApp.models import OutboxMessage
+
+from .helpers import CacheTestCase, make_order
+
+WEBHOOK = dict(settings.OUTBOX, WEBHOOK_URL='https://hooks.example.com/pedidos')
+
+
+class OutboxTestCase(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        # Backoff sin jitter: BACKOFF_SECONDS * 2^(intento - 1)
+        patcher = mock.patch('MainApp.outbox.random.uniform', return_value=1.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def set_status(self, order, status):
+        order.status = status
+        order.save()
+
+    def states(self):
+        return list(OutboxMessage.objects.order_by('id').values_list('dedup_key', 'state'))
+
+    def make_ready(self):
+        OutboxMessage.objects.filter(state=outbox.PENDING).update(available_at=timezone.now())
+
+
+class EnqueueTests(OutboxTestCase):
+    """Las notificaciones se escriben con el cambio del pedido y se fusionan mientras esperan"""
+
+    def test_created_order_enqueues_an_email(self):
+        order = make_order(email='ana@correo.cl')
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.channel, message.dedup_key, message.state), ('email', f'email:{order.pk}:created', 'pending'))
+        self.assertEqual(message.payload['tracking_url'], f'{settings.OUTBOX["SITE_URL"]}/seguimiento/{order.token}/')
+
+    def test_rolled_back_changes_leave_no_message(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            make_order(email='ana@correo.cl')
+            raise RuntimeError
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_pending_status_messages_are_replaced_not_added(self):
+        order = make_order(email='ana@correo.cl')
+        self.set_status(order, 'aprobado')
+        self.set_status(order, 'en_proceso')
+        self.assertEqual(self.states(), [
+            (f'email:{order.pk}:created', 'pending'),
+            (f'email:{order.pk}:status', 'pending'),
+        ])
+        self.assertEqual(OutboxMessage.objects.get(dedup_key=f'email:{order.pk}:status').payload['status'], 'en_proceso')
+
+    def test_concurrent_pending_message_is_updated_not_duplicated(self):
+        order = make_order(email='ana@correo.cl')
+        key = f'email:{order.pk}:status'
+        insert = OutboxMessage.objects.bulk_create
+
+        def concurrent_insert(messages):
+            # Otra transacción dejó su pendiente después de la búsqueda de enqueue()
+            OutboxMessage.objects.create(channel='email', dedup_key=key, order_id=order.pk, payload={'status': 'aprobado'})
+            return insert(messages)
+
+        with mock.patch.object(OutboxMessage.objects, 'bulk_create', side_effect=concurrent_insert):
+            self.set_status(order, 'aprobado')
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'aprobado')
+        message = OutboxMessage.objects.get(dedup_key=key)
+        self.assertEqual((message.state, message.payload['status']), ('pending', 'aprobado'))
+        self.assertIn('tracking_url', message.payload)
+
+    def test_non_status_changes_and_orders_without_email(self):
+        order = make_order(email='ana@correo.cl')
+        order.description = 'Otro color'
+        order.save()
+        make_order()
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+    @override_settings(OUTBOX=WEBHOOK)
+    def test_webhook_only_for_configured_statuses(self):
+        order = make_order(email='ana@correo.cl')
+        self.set_status(order, 'aprobado')
+        self.set_status(order, 'cancelada')
+        self.assertEqual(
+            sorted(OutboxMessage.objects.values_list('channel', 'dedup_key')),
+            [('email', f'email:{order.pk}:created'), ('email', f'email:{order.pk}:status'),
+             ('webhook', f'webhook:{order.pk}:created'), ('webhook', f'webhook:{order.pk}:status')],
+        )
+
+
+class DrainTests(OutboxTestCase):
+    """Entrega por lotes, reintentos con backoff y reemplazo de mensajes viejos"""
+
+    def setUp(self):
+        super().setUp()
+        self.order = make_order(email='ana@correo.cl', customer_name='Ana')
+
+    def test_sends_each_message_once(self):
+        self.assertEqual(outbox.drain_batch(), (1, 1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        email = mail.outbox[0]
+        self.assertEqual(email.to, ['ana@correo.cl'])
+        self.assertEqual(email.extra_headers['X-Idempotency-Key'], str(OutboxMessage.objects.get().key))
+        self.assertIn(str(self.order.token), email.body)
+        self.assertEqual(self.states(), [(f'email:{self.order.pk}:created', 'sent')])
+        self.assertEqual(outbox.drain_batch(), (0, 0, 0))
+
+    def test_sent_messages_are_not_reused(self):
+        outbox.drain_batch()
+        self.set_status(self.order, 'aprobado')
+        self.set_status(self.order, 'en_proceso')
+        outbox.drain_batch()
+        self.set_status(self.order, 'realizada')
+        outbox.drain_batch()
+        self.assertEqual([email.to for email in mail.outbox], [['ana@correo.cl']] * 3)
+        self.assertEqual(OutboxMessage.objects.filter(state='sent').count(), 3)
+
+    def test_failures_back_off_exponentially_then_give_up(self):
+        config = dict(settings.OUTBOX, MAX_ATTEMPTS=3, BACKOFF_SECONDS=30)
+        with override_settings(OUTBOX=config), \
+                mock.patch('MainApp.outbox.build_email', side_effect=ConnectionRefusedError('sin SMTP')), \
+                self.assertLogs('MainApp.outbox', 'WARNING') as logs:
+            for attempt, delay in ((1, 30), (2, 60)):
+                before = timezone.now()
+                self.assertEqual(outbox.drain_batch(), (1, 0, 1))
+                message = OutboxMessage.objects.get()
+                self.assertEqual((message.state, message.attempts), ('pending', attempt))
+                self.assertIn('sin SMTP', message.last_error)
+                self.assertAlmostEqual((message.available_at - before).total_seconds(), delay, delta=2)
+                # No vuelve a salir hasta que vence la espera
+                self.assertEqual(outbox.drain_batch(), (0, 0, 0))
+                self.make_ready()
+            outbox.drain_batch()
+        self.assertEqual(OutboxMessage.objects.get().state, 'failed')
+        self.assertIn('descartada tras 3 intentos', logs.output[-1])
+
+    def test_failed_message_is_superseded_by_a_newer_one(self):
+        outbox.drain_batch()
+        self.set_status(self.order, 'aprobado')
+        claimed = outbox.claim()
+        # Cambio mientras el lote se envía: el mensaje tomado ya no se puede fusionar
+        self.set_status(self.order, 'en_proceso')
+        with mock.patch('MainApp.outbox.build_email', side_effect=ConnectionRefusedError):
+            outbox._finish(claimed, outbox.send_emails(claimed))
+        key = f'email:{self.order.pk}:status'
+        self.assertEqual(self.states()[1:], [(key, 'superseded'), (key, 'pending')])
+        self.assertEqual(outbox.drain_batch(), (1, 1, 0))
+        self.assertIn('En proceso', mail.outbox[-1].body)
+
+    def test_abandoned_leases_are_reclaimed(self):
+        self.assertEqual(len(outbox.claim()), 1)
+        self.assertEqual(outbox.claim(), [])
+        OutboxMessage.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        [message] = outbox.claim()
+        self.assertEqual(message.attempts, 2)
+
+    def test_batches(self):
+        for _ in range(4):
+            make_order(email='otro@correo.cl')
+        self.assertEqual(outbox.drain_batch(batch_size=2), (2, 2, 0))
+        self.assertEqual(outbox.drain_batch(batch_size=10), (3, 3, 0))
+
+    def test_prune_keeps_recent_and_pending_messages(self):
+        outbox.drain_batch()
+        make_order(email='otro@correo.cl')
+        OutboxMessage.objects.update(created=timezone.now() - timedelta(days=40))
+        self.assertEqual(outbox.prune(), 1)
+        self.assertEqual(list(OutboxMessage.objects.values_list('state', flat=True)), ['pending'])
+
+
+@override_settings(OUTBOX=WEBHOOK)
+class WebhookTests(OutboxTestCase):
+    def setUp(self):
+        super().setUp()
+        self.order = make_order()  # sin email: solo webhook
+
+    @mock.patch('MainApp.outbox.urllib.request.urlopen')
+    def test_posts_payload_with_idempotency_key(self, urlopen):
+        self.assertEqual(outbox.drain_batch(), (1, 1, 0))
+        request = urlopen.call_args.args[0]
+        self.assertEqual(request.full_url, WEBHOOK['WEBHOOK_URL'])
+        self.assertEqual(request.get_header('Idempotency-key'), str(OutboxMessage.objects.get().key))
+        self.assertEqual(json.loads(request.data)['event'], 'order.created')
+
+    @mock.patch('MainApp.outbox.urllib.request.urlopen',
+                side_effect=urllib.error.HTTPError(WEBHOOK['WEBHOOK_URL'], 500, 'Error', {}, None))
+    def test_http_errors_are_retried(self, urlopen):
+        with self.assertLogs('MainApp.outbox', 'WARNING'):
+            self.assertEqual(outbox.drain_batch(), (1, 0, 1))
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.state, message.last_error), ('pending', 'HTTP 500'))
@@ -0,0 +1,76 @@
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages import constants
+from django.contrib.messages.storage.base import Message
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+
+from MainApp.page_cache import cache_anonymous_page, catalog_version
+
+from .helpers import CacheTestCase, make_category, make_product, make_staff
+
+
+class StorefrontPageCacheTests(CacheTestCase):
+    """Páginas del catálogo en caché para anónimos, invalidadas por la versión del catálogo"""
+
+    def setUp(self):
+        super().setUp()
+        self.product = make_product(make_category('Tazas'), name='Taza sublimada')
+        self.url = reverse('product_list')
+
+    def test_second_anonymous_request_is_served_from_cache(self):
+        self.assertEqual(self.client.get(self.url)['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, 'Taza sublimada')
+
+    def test_query_string_is_part_of_the_key(self):
+        self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url, {'q': 'taza'})['X-Page-Cache'], 'miss')
+
+    def test_catalog_changes_invalidate_pages(self):
+        version = catalog_version()
+        self.client.get(self.url)
+        self.product.name = 'Taza mágica'
+        self.product.save()
+        self.assertNotEqual(catalog_version(), version)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Taza mágica')
+
+    def test_new_category_invalidates_sidebar_fragment(self):
+        self.client.get(self.url)
+        make_category('Poleras')
+        self.assertContains(self.client.get(self.url), 'Poleras')
+
+    def test_detail_page_is_cached(self):
+        url = reverse('product_detail', kwargs={'slug': self.product.slug})
+        self.client.get(url)
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'hit')
+
+    def test_staff_is_never_cached(self):
+        self.client.force_login(make_staff())
+        self.client.get(self.url)
+        response = self.client.get(self.url)
+        self.assertNotIn('X-Page-Cache', response)
+
+    def test_pending_flash_messages_skip_the_cache(self):
+        calls = []
+
+        @cache_anonymous_page
+        def view(request):
+            calls.append(request)
+            return HttpResponse('ok')
+
+        def request(messages=()):
+            request = RequestFactory().get('/mensajes/')
+            request.user = AnonymousUser()
+            request._messages = list(messages)
+            return request
+
+        view(request())
+        self.assertEqual(view(request())['X-Page-Cache'], 'hit')
+        response = view(request([Message(constants.SUCCESS, 'Solicitud enviada')]))
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertEqual(len(calls), 2)
@@ -0,0 +1,152 @@
+import os
+import pstats
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from django.urls import reverse
+
+from MainApp import profiling
+from MainApp.middleware import ProfilingMiddleware
+
+from .helpers import CacheTestCase, make_category, make_product, make_staff
+
+
+def profiling_settings(directory, **overrides):
+    return {**settings.PROFILING, 'ENABLED': True, 'DIR': directory, 'SAMPLE': {}, **overrides}
+
+
+class ProfilingTestCase(CacheTestCase):
+    """PROFILING encendido con un directorio temporal"""
+
+    extra_settings = {}
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        # Antes de super().setUp(): el cliente arma los middlewares con estos settings
+        overrides = self.settings(PROFILING=profiling_settings(self.directory, **self.extra_settings))
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        profiling._counters.clear()
+        super().setUp()
+        make_product(make_category('Tazas'), name='Taza sublimada')
+
+    def profiles(self):
+        return profiling.recent_profiles()
+
+
+class TokenAndSamplingTests(SimpleTestCase):
+    def test_token(self):
+        self.assertTrue(profiling.valid_token(profiling.make_token()))
+        self.assertFalse(profiling.valid_token('profile:abc:def'))
+        with self.settings(PROFILING=dict(settings.PROFILING, TOKEN_MAX_AGE=-1)):
+            self.assertFalse(profiling.valid_token(profiling.make_token()))
+
+    def test_sampling_is_one_in_n_per_url_name(self):
+        profiling._counters.clear()
+        with self.settings(PROFILING=dict(settings.PROFILING, SAMPLE={'product_list': 3})):
+            self.assertEqual([profiling.sampled('product_list') for _ in range(6)],
+                             [False, False, True, False, False, True])
+            self.assertFalse(profiling.sampled('product_detail'))
+
+    def test_profile_path_rejects_other_files(self):
+        for profile_id in ('', '../settings', 'a/b', '.oculto', 'no-existe'):
+            with self.subTest(profile_id):
+                self.assertIsNone(profiling.profile_path(profile_id, profiling.REPORT_SUFFIX))
+
+    def test_middleware_is_not_installed_when_disabled(self):
+        with self.settings(PROFILING=dict(settings.PROFILING, ENABLED=False)):
+            with self.assertRaises(MiddlewareNotUsed):
+                ProfilingMiddleware(lambda request: HttpResponse())
+
+
+class ProfilingMiddlewareTests(ProfilingTestCase):
+    """Se perfila solo con token, ?profile=1 del personal o muestreo, y se escribe el informe"""
+
+    def test_token_header_profiles_anonymous_requests(self):
+        response = self.client.get(reverse('product_list'), HTTP_X_PROFILE=profiling.make_token())
+        self.assertContains(response, 'Taza sublimada')
+        [meta] = self.profiles()
+        self.assertEqual((meta['method'], meta['path'], meta['status']), ('GET', '/', 200))
+        self.assertEqual((meta['view'], meta['reason']), ('product_list', 'token'))
+        self.assertGreater(meta['sql_count'], 0)
+        self.assertGreater(meta['template_ms'], 0)
+
+        report = profiling.profile_path(meta['id'], profiling.REPORT_SUFFIX).read_text(encoding='utf-8')
+        self.assertIn('== Sentencias SQL más lentas ==', report)
+        self.assertIn('== Árbol de llamadas ==', report)
+        stats = pstats.Stats(str(profiling.profile_path(meta['id'], profiling.STATS_SUFFIX)))
+        self.assertTrue(stats.stats)
+
+    def test_serializer_method_fields_are_broken_down(self):
+        self.client.get(reverse('product-list'), HTTP_X_PROFILE=profiling.make_token())
+        [meta] = self.profiles()
+        self.assertTrue(any('get_days_since_creation' in label for label in meta['method_fields']))
+
+    def test_query_parameter_only_for_staff(self):
+        url = reverse('product_list')
+        self.client.get(url, {'profile': '1'})
+        self.client.get(url, HTTP_X_PROFILE='token-falso')
+        self.assertEqual(self.profiles(), [])
+        self.client.force_login(make_staff())
+        self.client.get(url, {'profile': '1'})
+        self.assertEqual([meta['reason'] for meta in self.profiles()], ['staff'])
+
+    def test_only_one_profile_at_a_time(self):
+        request = RequestFactory().get('/')
+        with profiling._active:
+            response = profiling.run(request, lambda request: HttpResponse('ok'), 'token')
+        self.assertEqual(response.content, b'ok')
+        self.assertEqual(self.profiles(), [])
+
+    def test_keeps_the_most_recent_profiles(self):
+        with self.settings(PROFILING=profiling_settings(self.directory, KEEP=2)):
+            for index in range(3):
+                profiling.run(RequestFactory().get(f'/{index}/'), lambda request: HttpResponse(), 'token')
+                # mtime distinto aunque el sistema de archivos tenga poca resolución
+                for path in os.scandir(self.directory):
+                    if path.name.startswith(self.profiles()[0]['id']):
+                        os.utime(path.path, (index * 10, index * 10))
+        self.assertEqual([meta['path'] for meta in self.profiles()], ['/2/', '/1/'])
+        self.assertEqual(len(os.listdir(self.directory)), 4)
+
+
+class SampledProfilingTests(ProfilingTestCase):
+    extra_settings = {'SAMPLE': {'product-list': 2}}
+
+    def test_sampling(self):
+        for _ in range(4):
+            self.client.get(reverse('product-list'))
+        self.assertEqual([meta['reason'] for meta in self.profiles()], ['muestreo 1/2'] * 2)
+
+
+class ProfilePagesTests(ProfilingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.get(reverse('product_list'), HTTP_X_PROFILE=profiling.make_token())
+        [self.meta] = self.profiles()
+
+    def test_staff_only(self):
+        self.assertEqual(self.client.get(reverse('profile_list')).status_code, 302)
+        url = reverse('profile_report', args=[self.meta['id']])
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+    def test_list_and_report(self):
+        self.client.force_login(make_staff())
+        response = self.client.get(reverse('profile_list'))
+        self.assertContains(response, 'X-Profile')
+        self.assertContains(response, reverse('profile_report', args=[self.meta['id']]))
+
+        report = self.client.get(reverse('profile_report', args=[self.meta['id']]))
+        self.assertEqual(report['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertContains(report, 'Vista: product_list')
+
+        download = self.client.get(reverse('profile_report', args=[self.meta['id']]), {'download': '1'})
+        self.assertIn('attachment', download['Content-Disposition'])
+        self.assertTrue(b''.join(download.streaming_content))
+
+        self.assertEqual(self.client.get(reverse('profile_report', args=['no-existe'])).status_code, 404)
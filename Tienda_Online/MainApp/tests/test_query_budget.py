@@ -0,0 +1,123 @@
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.db import OperationalError, connection
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+
+from MainApp.api_views import OrderViewSet
+from MainApp.archive import archive_orders
+from MainApp.query_budget import is_timeout, query_budget, statement_timeout
+
+from .helpers import CacheTestCase, days_ago, make_order, make_staff
+
+# Cuenta hasta 10^9 en la VM de SQLite: varios segundos sin presupuesto
+SLOW_SQL = (
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c LIMIT 1000000000) "
+    "SELECT count(*) FROM c"
+)
+
+BUDGETS = dict(settings.QUERY_BUDGETS, TIMEOUT_MS={'default': 50, 'orders': 50, 'reports': 50}, MAX_ROWS=2)
+
+
+def slow_query():
+    with connection.cursor() as cursor:
+        cursor.execute(SLOW_SQL)
+        return cursor.fetchone()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'la consulta lenta es específica de SQLite')
+class StatementTimeoutTests(CacheTestCase):
+    """Cada sentencia dentro del bloque se corta al vencer su plazo"""
+
+    def test_slow_statement_is_interrupted(self):
+        with self.assertRaises(OperationalError) as context:
+            with statement_timeout(50):
+                slow_query()
+        self.assertTrue(is_timeout(context.exception))
+
+    def test_deadline_restarts_for_each_statement(self):
+        with statement_timeout(200):
+            for _ in range(20):
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    self.assertEqual(cursor.fetchone(), (1,))
+
+    def test_handler_is_removed_after_the_block(self):
+        with statement_timeout(50):
+            pass
+        with connection.cursor() as cursor:
+            cursor.execute(SLOW_SQL.replace('1000000000', '200000'))
+            self.assertEqual(cursor.fetchone(), (200000,))
+
+    def test_other_errors_are_not_timeouts(self):
+        self.assertFalse(is_timeout(OperationalError('no such table: x')))
+        self.assertFalse(is_timeout(ValueError()))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'la consulta lenta es específica de SQLite')
+@override_settings(QUERY_BUDGETS=BUDGETS)
+class BudgetedViewsTests(CacheTestCase):
+    def test_django_view_answers_503_with_retry_after(self):
+        view = query_budget('reports')(lambda request: HttpResponse(slow_query()))
+        with self.assertLogs('MainApp.query_budget', 'WARNING') as logs:
+            response = view(RequestFactory().get('/dashboard/?status=entregada'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], str(BUDGETS['RETRY_AFTER']))
+        self.assertIn('/dashboard/?status=entregada', logs.output[0])
+
+    def test_fast_django_view_is_untouched(self):
+        view = query_budget('reports')(lambda request: HttpResponse('ok'))
+        self.assertEqual(view(RequestFactory().get('/')).status_code, 200)
+
+    def test_api_view_answers_503(self):
+        self.client.force_login(make_staff())
+        with mock.patch.object(OrderViewSet, 'filter_queryset', side_effect=lambda queryset: slow_query()), \
+                self.assertLogs('MainApp.query_budget', 'WARNING'):
+            response = self.client.get(reverse('order-list'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], str(BUDGETS['RETRY_AFTER']))
+        self.assertEqual(response.json()['detail'], 'La consulta tardó demasiado. Acota los filtros o intenta nuevamente.')
+
+
+@override_settings(QUERY_BUDGETS=BUDGETS)
+class PaginatedListsTests(CacheTestCase):
+    """Los listados de pedidos se paginan (hasta MAX_ROWS por página) en vez de serializar todo"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(make_staff(username='ana'))
+
+    def test_unfiltered_list_is_paginated(self):
+        orders = [make_order(created=days_ago(days)) for days in (3, 2, 1)]
+        first = self.client.get(reverse('order-list')).json()
+        self.assertEqual(first['count'], 3)
+        self.assertEqual([row['id'] for row in first['results']], [orders[2].pk, orders[1].pk])
+        second = self.client.get(first['next']).json()
+        self.assertEqual([row['id'] for row in second['results']], [orders[0].pk])
+        self.assertIsNone(second['next'])
+
+    def test_page_size_is_capped(self):
+        for _ in range(3):
+            make_order()
+        response = self.client.get(reverse('order-list'), {'page_size': 500})
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertEqual(len(self.client.get(reverse('order-list'), {'page_size': 1}).json()['results']), 1)
+
+    def test_archived_rows_are_merged_up_to_the_cap(self):
+        old = make_order(email='ana@correo.cl', status='entregada', created=days_ago(500))
+        make_order(email='ana@correo.cl', status='entregada', created=days_ago(550))
+        list(archive_orders(days_ago(30)))
+        recent = make_order(email='ana@correo.cl')
+        url = reverse('customer-history')
+        page = self.client.get(url, {'email': 'ana@correo.cl'}).json()
+        self.assertEqual(page['count'], 3)
+        self.assertEqual([row['id'] for row in page['results']], [recent.pk, old.pk])
+        self.assertEqual(self.client.get(url, {'email': 'ana@correo.cl', 'page_size': 1, 'page': 2}).json()['results'][0]['id'], old.pk)
+        # Más allá de MAX_ROWS intercalados: acotar los filtros
+        with self.assertLogs('MainApp.query_budget', 'WARNING') as logs:
+            response = self.client.get(url, {'email': 'ana@correo.cl', 'page': 2})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('primeros 2 pedidos', response.json()['detail'])
+        self.assertIn('usuario=ana', logs.output[0])
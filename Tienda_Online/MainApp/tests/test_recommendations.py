@@ -0,0 +1,105 @@
+import io
+from unittest import skipIf
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from MainApp import recommendations
+from MainApp.archive import archive_orders
+from MainApp.models import ProductRecommendation
+from MainApp.page_cache import catalog_version
+
+from .helpers import CacheTestCase, days_ago, make_category, make_order, make_product
+
+
+@skipIf(recommendations.np is None, 'numpy no está instalado')
+class RecommendationsTests(CacheTestCase):
+    """
+    Clientes (unidos por email, teléfono o usuario) y productos:
+
+        c1: A B    c2: A B (archivados)    c3: A B C (tres pedidos con claves encadenadas)
+        c4: C (y D cancelado)              c5: B C
+
+    Clientes en común: A-B 3, B-C 2, A-C 1. Con MIN_CUSTOMERS=2 el par A-C no se recomienda.
+    """
+
+    def setUp(self):
+        super().setUp()
+        category = make_category()
+        self.a, self.b, self.c, self.d = (make_product(category, name=name) for name in 'ABCD')
+        for product in (self.a, self.b):
+            make_order(product, email='c1@correo.cl')
+            make_order(product, email='c2@correo.cl', status='entregada', created=days_ago(500))
+        list(archive_orders(days_ago(30)))
+        make_order(self.a, email='C3@correo.cl')
+        make_order(self.c, email='c3@correo.cl', phone='+56 9 1234 5678')
+        make_order(self.b, phone='9 1234 5678')
+        make_order(self.c, email='c4@correo.cl')
+        make_order(self.d, email='c4@correo.cl', status='cancelada')
+        make_order(self.b, phone='@cliente5')
+        make_order(self.c, phone='instagram.com/cliente5')
+        # Sin ninguna clave de cliente: no cuenta
+        make_order(self.d)
+
+    def stored(self):
+        return {
+            product: [(rec.recommended.name, round(rec.score, 3), rec.customers) for rec in rows]
+            for product, rows in (
+                (p.name, recommendations.recommended_products(p)) for p in (self.a, self.b, self.c, self.d)
+            )
+        }
+
+    def test_cosine_scores_over_merged_customers(self):
+        self.assertEqual(recommendations.build(), (3, 4))
+        self.assertEqual(self.stored(), {
+            'A': [('B', 0.866, 3)],
+            'B': [('A', 0.866, 3), ('C', 0.577, 2)],
+            'C': [('B', 0.577, 2)],
+            'D': [],
+        })
+
+    def test_min_customers_and_top_k(self):
+        recommendations.build(top_k=1, min_customers=1)
+        self.assertEqual(self.stored(), {
+            'A': [('B', 0.866, 3)],
+            'B': [('A', 0.866, 3)],
+            'C': [('B', 0.577, 2)],
+            'D': [],
+        })
+
+    def test_chunking_does_not_change_the_result(self):
+        recommendations.build()
+        expected = self.stored()
+        with override_settings(RECOMMENDATIONS={
+            'TOP_K': 6, 'MIN_CUSTOMERS': 2, 'EXCLUDE_STATUSES': ('cancelada',), 'CHUNK_CUSTOMERS': 1,
+        }):
+            recommendations.build()
+        self.assertEqual(self.stored(), expected)
+
+    def test_rebuild_replaces_rows_and_invalidates_pages(self):
+        recommendations.build()
+        version = catalog_version()
+        make_order(self.a, email='c4@correo.cl')
+        recommendations.build()
+        self.assertNotEqual(catalog_version(), version)
+        # c4 ahora pide A y C: A-C llega a 2 clientes en común
+        self.assertEqual(self.stored()['A'], [('B', 0.75, 3), ('C', 0.577, 2)])
+        self.assertEqual(ProductRecommendation.objects.filter(product=self.a).count(), 2)
+
+    def test_api_reads_recommendations_in_one_query(self):
+        recommendations.build()
+        url = reverse('product-recommendations', kwargs={'slug': self.b.slug})
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(url).json()
+        table = ProductRecommendation._meta.db_table
+        self.assertEqual(len([query for query in queries if table in query['sql']]), 1)
+        self.assertEqual([row['slug'] for row in data], [self.a.slug, self.c.slug])
+        self.assertEqual(data[0]['customers'], 3)
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('build_recommendations', '--top-k', '1', stdout=out)
+        self.assertIn('3 recomendaciones para 3 productos', out.getvalue())
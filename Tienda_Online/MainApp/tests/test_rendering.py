@@ -0,0 +1,139 @@
+import gzip
+import io
+import json
+import uuid
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import skipIf
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from MainApp import renderers
+from MainApp.middleware import CompressionMiddleware, accepted_encodings, brotli
+from MainApp.renderers import ORJSONParser, ORJSONRenderer
+
+from .helpers import CacheTestCase, make_category, make_product
+
+
+@skipIf(renderers.orjson is None, 'orjson no está instalado')
+class ORJSONRendererTests(SimpleTestCase):
+    """Misma salida que el JSONRenderer de DRF"""
+
+    def assertSameAsDrf(self, data):
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_drf_types(self):
+        self.assertSameAsDrf({
+            'price': Decimal('1990.50'),
+            'created': datetime(2024, 5, 1, 12, 30, tzinfo=dt_timezone.utc),
+            'lead_time': timedelta(hours=3),
+            'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'tags': ('a', 'b'),
+            'nothing': None,
+        })
+
+    def test_dates_and_times_keep_drf_format(self):
+        self.assertSameAsDrf({
+            'utc': datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            'offset': datetime(2024, 5, 1, 8, 30, 15, 987654, tzinfo=dt_timezone(timedelta(hours=-4))),
+            'naive': datetime(2024, 5, 1, 12, 30, 15, 500),
+            'day': date(2024, 5, 1),
+            'hour': time(9, 15, 30, 250000),
+        })
+        # Como DRF: una hora con zona horaria no se puede representar
+        with self.assertRaises(ValueError):
+            ORJSONRenderer().render({'hour': time(9, 15, tzinfo=dt_timezone.utc)})
+
+    def test_line_separators_are_escaped(self):
+        self.assertSameAsDrf({'text': 'uno\u2028dos\u2029tres ñandú'})
+
+    def test_integers_beyond_64_bits_fall_back(self):
+        self.assertSameAsDrf({'big': 2 ** 70})
+
+    def test_indent_uses_drf(self):
+        context = {'indent': 2}
+        self.assertEqual(
+            ORJSONRenderer().render({'a': 1}, renderer_context=context),
+            JSONRenderer().render({'a': 1}, renderer_context=context),
+        )
+
+    def test_parser(self):
+        body = '{"nombre": "Taza", "precio": 1990}'.encode()
+        self.assertEqual(
+            ORJSONParser().parse(io.BytesIO(body)),
+            JSONParser().parse(io.BytesIO(body)),
+        )
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"nombre":'))
+
+
+class AcceptedEncodingsTests(SimpleTestCase):
+    def test_qualities(self):
+        self.assertEqual(
+            accepted_encodings('gzip;q=0.5, br, identity;q=0, bogus;q=x'),
+            {'gzip': 0.5, 'br': 1.0, 'identity': 0.0},
+        )
+
+
+@override_settings(RESPONSE_COMPRESSION={'MIN_BYTES': 100, 'BROTLI_QUALITY': 5})
+class CompressionMiddlewareTests(SimpleTestCase):
+    """Compresión según Accept-Encoding; nunca en streaming ni si no reduce el cuerpo"""
+
+    body = b'{"items": [' + b'{"name": "Taza sublimada"},' * 50 + b'{}]}'
+
+    def process(self, response, accept='gzip, br'):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(lambda r: response).process_response(request, response)
+
+    def json_response(self, body=None):
+        response = HttpResponse(body if body is not None else self.body, content_type='application/json')
+        response['ETag'] = '"abc"'
+        return response
+
+    @skipIf(brotli is None, 'brotli no está instalado')
+    def test_brotli_for_json(self):
+        response = self.process(self.json_response())
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), self.body)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertEqual(response['ETag'], 'W/"abc"')
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_gzip_when_brotli_not_accepted(self):
+        response = self.process(self.json_response(), accept='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+
+    def test_html_is_always_gzip(self):
+        html = b'<html><body>' + b'<p>Taza sublimada</p>' * 50 + b'</body></html>'
+        response = self.process(HttpResponse(html, content_type='text/html; charset=utf-8'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), html)
+
+    def test_left_alone(self):
+        cases = {
+            'sin Accept-Encoding': (self.json_response(), ''),
+            'gzip con q=0': (self.json_response(), 'gzip;q=0'),
+            'cuerpo pequeño': (self.json_response(b'{"ok": true}'), 'gzip, br'),
+            'tipo no comprimible': (HttpResponse(self.body, content_type='image/png'), 'gzip, br'),
+            'streaming': (StreamingHttpResponse(iter([self.body]), content_type='text/event-stream'), 'gzip, br'),
+        }
+        for label, (response, accept) in cases.items():
+            with self.subTest(label):
+                self.assertFalse(self.process(response, accept).has_header('Content-Encoding'))
+
+
+class CompressedApiTests(CacheTestCase):
+    def test_api_list_is_compressed_end_to_end(self):
+        category = make_category()
+        for _ in range(20):
+            make_product(category, description='Descripción larga del producto ' * 5)
+        response = self.client.get(reverse('product-list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 20)
@@ -0,0 +1,101 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test import SimpleTestCase, override_settings
+
+from MainApp import single_flight
+from MainApp.single_flight import coalesced, request_key
+
+FAST = {'RESULT_SECONDS': 5, 'LEASE_SECONDS': 60, 'WAIT_SECONDS': 2, 'POLL_INTERVAL': 0.01}
+
+
+class RequestKeyTests(SimpleTestCase):
+    def test_order_empty_values_and_ignored_params_do_not_matter(self):
+        key = request_key('statistics', QueryDict('period=month&status=listo'))
+        self.assertEqual(key, request_key('statistics', QueryDict('status=listo&period=month&_=123&format=json&q=')))
+        self.assertNotEqual(key, request_key('statistics', QueryDict('period=week&status=listo')))
+        self.assertNotEqual(key, request_key('product-inventory', QueryDict('period=month&status=listo')))
+
+    def test_repeated_values_are_part_of_the_key(self):
+        self.assertNotEqual(
+            request_key('statistics', QueryDict('status=listo&status=entregado')),
+            request_key('statistics', QueryDict('status=listo')),
+        )
+
+
+@override_settings(SINGLE_FLIGHT=FAST)
+class CoalescedTests(SimpleTestCase):
+    """Un solo cálculo por clave entre pedidos simultáneos; nadie espera para siempre"""
+
+    key = 'singleflight:test:key'
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.calls = 0
+
+    def compute(self, value='resultado', delay=0):
+        def run():
+            self.calls += 1
+            time.sleep(delay)
+            return value
+        return run
+
+    def test_concurrent_callers_share_one_computation(self):
+        results = []
+        compute = self.compute(delay=0.2)
+        threads = [
+            threading.Thread(target=lambda: results.append(coalesced(self.key, compute)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['resultado'] * 8)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(single_flight._locks, {})
+
+    def test_result_is_reused_while_fresh(self):
+        coalesced(self.key, self.compute())
+        self.assertEqual(coalesced(self.key, self.compute('otro')), 'resultado')
+        self.assertEqual(self.calls, 1)
+
+    def test_falsy_results_are_cached_too(self):
+        self.assertEqual(coalesced(self.key, self.compute(None)), None)
+        coalesced(self.key, self.compute(None))
+        self.assertEqual(self.calls, 1)
+
+    def test_waits_for_the_worker_holding_the_lease(self):
+        # Otro worker tiene el lease y publica el resultado un momento después
+        cache.add(f'{self.key}:lease', 'otro-worker', 60)
+        timer = threading.Timer(0.1, lambda: cache.set(self.key, ('del otro worker',), 5))
+        timer.start()
+        self.addCleanup(timer.cancel)
+        self.assertEqual(coalesced(self.key, self.compute()), 'del otro worker')
+        self.assertEqual(self.calls, 0)
+
+    def test_computes_when_the_lease_is_released_without_result(self):
+        cache.add(f'{self.key}:lease', 'otro-worker', 60)
+        timer = threading.Timer(0.1, lambda: cache.delete(f'{self.key}:lease'))
+        timer.start()
+        self.addCleanup(timer.cancel)
+        self.assertEqual(coalesced(self.key, self.compute()), 'resultado')
+        self.assertEqual(self.calls, 1)
+
+    def test_computes_after_waiting_too_long(self):
+        cache.add(f'{self.key}:lease', 'otro-worker', 60)
+        with self.settings(SINGLE_FLIGHT=dict(FAST, WAIT_SECONDS=0.1)):
+            self.assertEqual(coalesced(self.key, self.compute()), 'resultado')
+        self.assertEqual(self.calls, 1)
+
+    def test_errors_release_the_lease(self):
+        def broken():
+            raise ValueError('falló')
+        with self.assertRaises(ValueError):
+            coalesced(self.key, broken)
+        self.assertIsNone(cache.get(f'{self.key}:lease'))
+        self.assertEqual(single_flight._locks, {})
+        self.assertEqual(coalesced(self.key, self.compute()), 'resultado')
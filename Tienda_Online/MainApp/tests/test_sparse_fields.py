@@ -0,0 +1,96 @@
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.request import Request
+
+from MainApp.models import ProductImage
+from MainApp.serializers import ProductSerializer, parse_field_paths
+
+from .helpers import CacheTestCase, make_category, make_order, make_product, make_staff
+
+
+class ParseFieldPathsTests(SimpleTestCase):
+    def test_tree(self):
+        self.assertEqual(
+            parse_field_paths('id, product_ref.name,product_ref.category.slug,,'),
+            {'id': {}, 'product_ref': {'name': {}, 'category': {'slug': {}}}},
+        )
+
+
+class SparseFieldsTests(CacheTestCase):
+    """?fields= recorta, ?expand= decide qué anidados se incrustan; sin parámetros nada cambia"""
+
+    def setUp(self):
+        super().setUp()
+        self.category = make_category('Tazas')
+        self.product = make_product(self.category, name='Taza sublimada')
+        self.image = ProductImage.objects.create(product=self.product, image='productos/taza.jpg', order=1)
+        self.url = reverse('product-list')
+
+    def get(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()[0]
+
+    def test_without_parameters_the_representation_is_complete(self):
+        request = Request(RequestFactory().get(self.url))
+        expected = ProductSerializer(self.product, context={'request': request}).data
+        self.assertEqual(self.get(), expected)
+        self.assertEqual(self.get()['category'], {'id': self.category.pk, 'name': 'Tazas', 'slug': self.category.slug})
+
+    def test_fields_keeps_only_listed_fields(self):
+        self.assertEqual(self.get(fields='id,name'), {'id': self.product.pk, 'name': 'Taza sublimada'})
+
+    def test_dotted_fields_reach_into_nested_serializers(self):
+        self.assertEqual(
+            self.get(fields='name,category.name'),
+            {'name': 'Taza sublimada', 'category': {'name': 'Tazas'}},
+        )
+
+    def test_unexpanded_relations_collapse_to_ids(self):
+        data = self.get(expand='')
+        self.assertEqual(data['category'], self.category.pk)
+        self.assertEqual(data['images'], [self.image.pk])
+        self.assertEqual(data['name'], 'Taza sublimada')
+
+    def test_expand_embeds_only_listed_relations(self):
+        data = self.get(expand='category')
+        self.assertEqual(data['category']['name'], 'Tazas')
+        self.assertEqual(data['images'], [self.image.pk])
+
+    def test_collapsed_listing_queries_do_not_grow_with_rows(self):
+        def count(params):
+            self.client.get(self.url, params)
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(self.url, params)
+            return len(queries)
+
+        few = {key: count(params) for key, params in (('full', {}), ('ids', {'expand': ''}))}
+        for _ in range(10):
+            make_product(make_category())
+        for key, params in (('full', {}), ('ids', {'expand': ''})):
+            with self.subTest(key):
+                self.assertEqual(count(params), few[key])
+
+    def test_writes_are_never_trimmed(self):
+        self.client.force_login(make_staff())
+        response = self.client.post(
+            f'{self.url}?fields=id',
+            {'name': 'Polera', 'category_id': self.category.pk, 'price': 5000},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        # La respuesta del alta sale completa aunque se pida ?fields=
+        self.assertEqual(response.json()['name'], 'Polera')
+        self.assertEqual(response.json()['category']['id'], self.category.pk)
+
+
+class SparseOrderFieldsTests(CacheTestCase):
+    def test_nested_path_through_orders(self):
+        product = make_product(make_category('Poleras'), name='Polera estampada')
+        order = make_order(product)
+        self.client.force_login(make_staff())
+        response = self.client.get(reverse('order-list'), {'fields': 'id,product_ref.category.name'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [{'id': order.pk, 'product_ref': {'category': {'name': 'Poleras'}}}])
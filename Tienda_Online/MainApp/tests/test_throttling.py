@@ -0,0 +1,137 @@
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+
+from MainApp.middleware import LoadSheddingMiddleware
+from MainApp.throttling import client_ip, take_tokens
+
+from .helpers import CacheTestCase, make_staff
+
+LIMITS = dict(
+    settings.RATE_LIMITS,
+    ENABLED=True,
+    PER_IP={'RATE': 1.0, 'BURST': 3},
+    GLOBAL={'RATE': 10.0, 'BURST': 5},
+    COSTS={'catalog': 1, 'search': 3},
+    PROXY_HOPS=0,
+)
+
+
+@override_settings(RATE_LIMITS=LIMITS)
+class TokenBucketTests(CacheTestCase):
+    """Cada petición paga su costo en el bucket de su IP y en el global"""
+
+    def test_burst_then_wait(self):
+        now = 1000.0
+        self.assertEqual([take_tokens('1.1.1.1', 'catalog', now) for _ in range(3)], [0, 0, 0])
+        self.assertEqual(take_tokens('1.1.1.1', 'catalog', now), 1.0)
+        # Una ficha por segundo
+        self.assertEqual(take_tokens('1.1.1.1', 'catalog', now + 1), 0)
+
+    def test_cost_depends_on_scope(self):
+        self.assertEqual(take_tokens('1.1.1.1', 'search', 1000.0), 0)
+        self.assertEqual(take_tokens('1.1.1.1', 'search', 1000.0), 3.0)
+        self.assertEqual(take_tokens('1.1.1.1', 'catalog', 1000.0), 1.0)
+
+    def test_rejected_requests_consume_nothing(self):
+        for _ in range(3):
+            take_tokens('1.1.1.1', 'catalog', 1000.0)
+        for _ in range(5):
+            take_tokens('1.1.1.1', 'catalog', 1000.0)
+        self.assertEqual(take_tokens('1.1.1.1', 'catalog', 1001.0), 0)
+
+    def test_global_bucket_is_shared_across_ips(self):
+        for ip in ('1.1.1.1', '2.2.2.2'):
+            for _ in range(2):
+                self.assertEqual(take_tokens(ip, 'catalog', 1000.0), 0)
+        self.assertEqual(take_tokens('3.3.3.3', 'catalog', 1000.0), 0)
+        self.assertGreater(take_tokens('4.4.4.4', 'catalog', 1000.0), 0)
+
+
+class ClientIpTests(SimpleTestCase):
+    def test_forwarded_for_only_with_proxy_hops(self):
+        request = RequestFactory().get('/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='6.6.6.6, 1.2.3.4, 10.0.0.2')
+        with override_settings(RATE_LIMITS=dict(LIMITS, PROXY_HOPS=0)):
+            self.assertEqual(client_ip(request), '10.0.0.1')
+        with override_settings(RATE_LIMITS=dict(LIMITS, PROXY_HOPS=1)):
+            self.assertEqual(client_ip(request), '10.0.0.2')
+        with override_settings(RATE_LIMITS=dict(LIMITS, PROXY_HOPS=2)):
+            self.assertEqual(client_ip(request), '1.2.3.4')
+
+
+@override_settings(RATE_LIMITS=LIMITS)
+class RateLimitedViewsTests(CacheTestCase):
+    def test_catalog_answers_429_with_retry_after(self):
+        url = reverse('product_list')
+        # Páginas distintas: una respuesta en caché no pasa por el límite
+        for page in range(3):
+            self.assertEqual(self.client.get(url, {'page': page}).status_code, 200)
+        response = self.client.get(url, {'page': 9})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_api_search_uses_the_same_buckets(self):
+        url = reverse('search-products')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '3')
+
+    def test_staff_is_not_limited(self):
+        self.client.force_login(make_staff())
+        url = reverse('search-products')
+        for _ in range(5):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_disabled(self):
+        url = reverse('search-products')
+        with self.settings(RATE_LIMITS=dict(LIMITS, ENABLED=False)):
+            for _ in range(5):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class LoadSheddingTests(SimpleTestCase):
+    """Con MAX_IN_FLIGHT peticiones en curso la siguiente recibe 503 sin llegar a la vista"""
+
+    def setUp(self):
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def slow_view(self, request):
+        self.entered.set()
+        self.release.wait(5)
+        return HttpResponse('ok')
+
+    def test_sheds_while_saturated_and_recovers(self):
+        config = {'MAX_IN_FLIGHT': 1, 'RETRY_AFTER': 2, 'EXEMPT_PATHS': ('/admin/',)}
+        with override_settings(LOAD_SHEDDING=config):
+            middleware = LoadSheddingMiddleware(self.slow_view)
+        factory = RequestFactory()
+        worker = threading.Thread(target=middleware, args=(factory.get('/'),))
+        worker.start()
+        self.addCleanup(worker.join)
+        self.addCleanup(self.release.set)
+        self.assertTrue(self.entered.wait(5))
+
+        response = middleware(factory.get('/'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '2')
+
+        # El admin nunca se rechaza
+        self.release.set()
+        self.assertEqual(middleware(factory.get('/admin/')).status_code, 200)
+        worker.join()
+        self.assertEqual(middleware.in_flight, 0)
+        self.assertEqual(middleware(factory.get('/')).status_code, 200)
+
+    def test_counter_is_released_on_errors(self):
+        def broken(request):
+            raise RuntimeError
+        with override_settings(LOAD_SHEDDING={'MAX_IN_FLIGHT': 1, 'RETRY_AFTER': 1, 'EXEMPT_PATHS': ()}):
+            middleware = LoadSheddingMiddleware(broken)
+        with self.assertRaises(RuntimeError):
+            middleware(RequestFactory().get('/'))
+        self.assertEqual(middleware.in_flight, 0)
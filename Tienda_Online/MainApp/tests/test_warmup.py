@@ -0,0 +1,79 @@
+import runpy
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from MainApp import warmup
+
+from .helpers import CacheTestCase, make_category, make_product
+
+GUNICORN_CONF = Path(settings.BASE_DIR) / 'gunicorn.conf.py'
+
+
+class PrepareCodeTests(SimpleTestCase):
+    def test_compiles_templates_without_queries(self):
+        self.assertIn('MainApp/base.html', warmup.template_names())
+        # SimpleTestCase no permite consultas: prepare_code corre antes del fork
+        timings = warmup.prepare_code()
+        self.assertEqual(set(timings), {'urls', 'plantillas'})
+
+
+# prime_caches cierra las conexiones al terminar (hilo del post_fork); dentro
+# de la transacción de la prueba eso la invalidaría
+@mock.patch('MainApp.warmup.connections')
+class PrimeCachesTests(CacheTestCase):
+    """Después del calentamiento las páginas del catálogo salen de la caché"""
+
+    def setUp(self):
+        super().setUp()
+        self.category = make_category('Tazas')
+        self.featured = [make_product(self.category, featured=True) for _ in range(3)]
+        self.plain = make_product(self.category)
+
+    @override_settings(WARMUP={'PATHS': ('/',), 'FEATURED_PRODUCTS': 2})
+    def test_paths(self, connections):
+        list_url = reverse('product_list')
+        self.assertEqual(warmup.warmup_paths(), [
+            '/',
+            f'{list_url}?category={self.category.slug}',
+            reverse('product_detail', args=[self.featured[2].slug]),
+            reverse('product_detail', args=[self.featured[1].slug]),
+        ])
+
+    def test_pages_are_served_from_cache_afterwards(self, connections):
+        timings = warmup.prime_caches()
+        self.assertEqual(set(timings), {'caché', 'páginas'})
+        connections.close_all.assert_called_once_with()
+
+        detail = reverse('product_detail', args=[self.featured[0].slug])
+        for path in ('/', f"{reverse('product_list')}?category={self.category.slug}", detail):
+            with self.subTest(path), self.assertNumQueries(0):
+                self.assertEqual(self.client.get(path)['X-Page-Cache'], 'hit')
+        self.assertEqual(
+            self.client.get(reverse('product_detail', args=[self.plain.slug]))['X-Page-Cache'], 'miss'
+        )
+
+    @override_settings(WARMUP={'PATHS': ('/no-existe/',), 'FEATURED_PRODUCTS': 0})
+    def test_failing_paths_are_logged(self, connections):
+        with self.assertLogs('MainApp.warmup', 'WARNING') as logs:
+            warmup.prime_caches()
+        self.assertIn('/no-existe/ respondió 404', logs.output[0])
+
+
+class GunicornConfTests(SimpleTestCase):
+    def setUp(self):
+        self.conf = runpy.run_path(str(GUNICORN_CONF))
+
+    def test_preloads_and_disables_sse_routes(self):
+        self.assertTrue(self.conf['preload_app'])
+        self.assertIn('DJANGO_ASYNC_VIEWS=0', self.conf['raw_env'])
+
+    def test_failed_warmup_does_not_kill_the_worker(self):
+        worker = SimpleNamespace(pid=1, log=mock.Mock())
+        with mock.patch('MainApp.warmup.warm_up', side_effect=RuntimeError):
+            self.conf['post_fork'](None, worker)
+        worker.log.exception.assert_called_once()
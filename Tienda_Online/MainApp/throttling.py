@@ -0,0 +1,132 @@
+# MainApp/throttling.py
+#
+# Límites de tasa para los endpoints públicos (catálogo, búsqueda y envío de
+# solicitudes), con token buckets guardados en la caché de Django: con
+# REDIS_URL los comparten todos los workers, si no cada worker tiene los suyos.
+#
+# Cada petición consume fichas de dos buckets: el de su IP y uno global. Las
+# fichas se reponen a RATE por segundo hasta BURST, y cada alcance tiene un
+# costo (una búsqueda pesa más que ver el catálogo). Si no alcanzan, se
+# responde 429 con Retry-After. El personal autenticado no tiene límite.
+#
+# La caché no ofrece una operación atómica de leer-y-escribir, así que con
+# peticiones simultáneas de la misma IP el límite es aproximado (puede dejar
+# pasar alguna de más), suficiente para frenar a un cliente abusivo.
+
+import math
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework.throttling import BaseThrottle
+
+
+def client_ip(request):
+    """IP del cliente (con PROXY_HOPS > 0 se toma de X-Forwarded-For)"""
+    hops = settings.RATE_LIMITS['PROXY_HOPS']
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if hops and forwarded:
+        addresses = [address.strip() for address in forwarded.split(',')]
+        return addresses[-min(hops, len(addresses))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _refill(state, rate, burst, now):
+    tokens, updated = state if state else (burst, now)
+    return min(burst, tokens + (now - updated) * rate)
+
+
+def take_tokens(ip, scope, now=None):
+    """
+    Consumir el costo del alcance en el bucket de la IP y en el global.
+
+    Devuelve 0 si se permite, o los segundos hasta que haya fichas suficientes.
+    """
+    config = settings.RATE_LIMITS
+    now = time.time() if now is None else now
+    buckets = {
+        f'ratelimit:ip:{ip}': config['PER_IP'],
+        'ratelimit:global': config['GLOBAL'],
+    }
+    states = cache.get_many(buckets)
+
+    wait, updates = 0, {}
+    for key, limit in buckets.items():
+        rate, burst = limit['RATE'], limit['BURST']
+        cost = min(config['COSTS'].get(scope, 1), burst)
+        tokens = _refill(states.get(key), rate, burst, now)
+        if tokens < cost:
+            wait = max(wait, (cost - tokens) / rate)
+        else:
+            updates[key] = (tokens - cost, now)
+
+    if wait:
+        return wait
+    # Sin actividad, un bucket se llena en BURST / RATE segundos: luego ya no hace falta
+    timeout = math.ceil(max(limit['BURST'] / limit['RATE'] for limit in buckets.values())) + 1
+    cache.set_many(updates, timeout)
+    return 0
+
+
+def too_many_requests(wait):
+    response = HttpResponse(
+        "Demasiadas solicitudes. Intenta nuevamente en unos segundos.",
+        status=429, content_type='text/plain; charset=utf-8',
+    )
+    response['Retry-After'] = str(math.ceil(wait))
+    return response
+
+
+def _limited(request, scope, is_staff):
+    """Segundos de espera para la petición (0 = permitida)"""
+    if not settings.RATE_LIMITS['ENABLED'] or is_staff:
+        return 0
+    if callable(scope):
+        scope = scope(request)
+    return take_tokens(client_ip(request), scope)
+
+
+def rate_limited(scope, methods=None):
+    """
+    Aplicar el límite de tasa a una vista (síncrona o asíncrona).
+
+    scope: alcance de RATE_LIMITS['COSTS'], o una función request -> alcance.
+    methods: limitar solo esos métodos HTTP (None = todos).
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if methods is None or request.method in methods:
+                    is_staff = await sync_to_async(lambda: request.user.is_staff)()
+                    wait = await sync_to_async(_limited)(request, scope, is_staff)
+                    if wait:
+                        return too_many_requests(wait)
+                return await view(request, *args, **kwargs)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if methods is None or request.method in methods:
+                wait = _limited(request, scope, request.user.is_staff)
+                if wait:
+                    return too_many_requests(wait)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttle de DRF con los mismos buckets; el alcance sale de view.throttle_scope"""
+
+    def allow_request(self, request, view):
+        self.wait_seconds = _limited(
+            request, getattr(view, 'throttle_scope', None), request.user.is_staff
+        )
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
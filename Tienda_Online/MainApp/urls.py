@@ -1,10 +1,21 @@
 # urls.py de la APLICACIÓN (Ej: MainApp/urls.py)
 
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .api_views import *
 from . import views
 
+# Perfil ASGI: catálogo, detalle y seguimiento con las vistas asíncronas
+if settings.ASYNC_VIEWS:
+    product_list_view = views.product_list_async
+    product_detail_view = views.product_detail_async
+    order_track_view = views.order_track_async
+else:
+    product_list_view = views.product_list
+    product_detail_view = views.product_detail
+    order_track_view = views.order_track
+
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet)
 router.register(r'products', ProductViewSet)
@@ -13,21 +24,25 @@ router.register(r'orders', OrderViewSet)
 
 urlpatterns = [
     # Catálogo (Req. 7)
-    path('', views.product_list, name='product_list'),
+    path('', product_list_view, name='product_list'),
     
     # Detalle del Producto (Req. 8)
-    path('producto/<slug:slug>/', views.product_detail, name='product_detail'),
+    path('producto/<slug:slug>/', product_detail_view, name='product_detail'),
     
     # Formulario de Solicitud (Req. 9)
     path('solicitar/', views.order_request, name='order_request'),
     
     # Seguimiento del Pedido (Req. 10)
-    path("seguimiento/<str:token>/", views.order_track, name="order_track"),
+    path("seguimiento/<str:token>/", order_track_view, name="order_track"),
+
+    path("seguimiento/<str:token>/estado/", views.order_status, name="order_status"),
 
     path("order/<uuid:order_id>/", views.order_detail, name="order_detail"),
 
     # Dashboard protegido
     path('dashboard/', views.dashboard_reports, name='dashboard_reports'),
+    path('dashboard/perfiles/', views.profile_list, name='profile_list'),
+    path('dashboard/perfiles/<str:profile_id>/', views.profile_report, name='profile_report'),
 
     # API para datos del gráfico
     path('api/chart-data/', views.get_chart_data, name='get_chart_data'),
@@ -38,14 +53,24 @@ urlpatterns = [
     # APIs de filtrado y búsqueda
     path('api/filter-orders/', OrderFilterAPIView.as_view(), name='filter-orders'),
     path('api/search-products/', ProductSearchAPIView.as_view(), name='search-products'),
+    path('api/customers/history/', CustomerHistoryAPIView.as_view(), name='customer-history'),
 
     # APIs de estadísticas
     path('api/statistics/', StatisticsAPIView.as_view(), name='statistics'),
     path('api/dashboard-stats/', DashboardStatsAPIView.as_view(), name='dashboard-stats'),
     path('api/product-inventory/', ProductInventoryAPIView.as_view(), name='product-inventory'),
+    path('api/lead-times/', LeadTimeAPIView.as_view(), name='lead-times'),
 
     # API por rango de fechas
     path('api/orders/<int:year>/', OrderByDateRangeAPIView.as_view(), name='orders-by-year'),
     path('api/orders/<int:year>/<int:month>/', OrderByDateRangeAPIView.as_view(), name='orders-by-month'),
     path('api/orders/<int:year>/<int:month>/<int:day>/', OrderByDateRangeAPIView.as_view(), name='orders-by-day'),
 ]
+
+# Eventos en vivo (SSE): solo con el perfil ASGI. Bajo WSGI cada stream abierto
+# ocuparía un hilo del worker indefinidamente; las páginas sondean en su lugar.
+if settings.ASYNC_VIEWS:
+    urlpatterns += [
+        path("seguimiento/<str:token>/eventos/", views.order_events, name="order_events"),
+        path('dashboard/eventos/', views.dashboard_events, name='dashboard_events'),
+    ]
@@ -1,43 +1,132 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Sum, Q
-from django.http import JsonResponse
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import FileResponse, JsonResponse, Http404, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.contrib.admin.views.decorators import staff_member_required
+from asgiref.sync import sync_to_async
+from urllib.parse import urlencode
 from django.utils import timezone
-from datetime import datetime, timedelta
+from django.utils.functional import SimpleLazyObject
 from .models import Product, Category, Order, OrderImage
 from .forms import OrderRequestForm
+from . import analytics, archive, facets, profiling, recommendations, single_flight
+from .page_cache import cache_anonymous_page, catalog_version
+from .query_budget import query_budget
+from .throttling import rate_limited
+from .events import ALL_ORDERS, event_payload, event_stream, order_topic
+from django.conf import settings
 from django.contrib import messages
 
 # --- VISTA 1: CATÁLOGO DE PRODUCTOS ---
-def product_list(request):
-    products = Product.objects.all().order_by('-created')
-    categories = Category.objects.all()
-    
-    category_slug = request.GET.get('category')
+def _catalog_queryset(category_slug, query, min_price=None, max_price=None):
+    """Productos del catálogo con los filtros de categoría, búsqueda y precio aplicados"""
+    products = Product.objects.prefetch_related('images').order_by('-created')
+
     if category_slug:
         products = products.filter(category__slug=category_slug)
 
-    query = request.GET.get('q')
     if query:
         products = products.filter(
             Q(name__icontains=query) | Q(description__icontains=query)
         ).distinct()
 
+    return products.filter(facets.price_filter(min_price, max_price))
+
+
+def _catalog_filters(request):
+    """(categoría, búsqueda, precio mínimo, precio máximo) de la URL; precios inválidos se ignoran"""
+    return (
+        request.GET.get('category'),
+        request.GET.get('q'),
+        facets.parse_price(request.GET.get('min_price')),
+        facets.parse_price(request.GET.get('max_price')),
+    )
+
+
+def _catalog_sidebar(categories, category_slug, query, min_price, max_price):
+    """Categorías y tramos de precio con sus conteos y enlaces (conservan los demás filtros)"""
+    counts = facets.catalog_facets(
+        _catalog_queryset(None, query), 'catalog', query,
+        category=category_slug, min_price=min_price, max_price=max_price,
+    )
+    current = {'q': query, 'category': category_slug, 'min_price': min_price, 'max_price': max_price}
+
+    def link(**changes):
+        params = {name: value for name, value in {**current, **changes}.items() if value not in (None, '')}
+        return f'?{urlencode(params)}' if params else ''
+
+    by_slug = {entry['slug']: entry['count'] for entry in counts['categories']}
+    return {
+        'total': sum(by_slug.values()),
+        'featured': counts['featured'],
+        'all_categories_url': link(category=None),
+        'categories': [
+            {'category': category, 'count': by_slug.get(category.slug, 0), 'url': link(category=category.slug)}
+            for category in categories
+        ],
+        'all_prices_url': link(min_price=None, max_price=None),
+        'price': [
+            {
+                **bucket,
+                'url': link(min_price=bucket['min'], max_price=bucket['max']),
+                'selected': (facets.parse_price(bucket['min']), facets.parse_price(bucket['max'])) == (min_price, max_price),
+            }
+            for bucket in counts['price']
+        ],
+    }
+
+
+def _catalog_scope(request):
+    """Costo en el límite de tasa: las búsquedas pesan más que navegar el catálogo"""
+    return 'search' if request.GET.get('q') else 'catalog'
+
+
+def _catalog_context():
+    """Datos para las claves de fragmentos en caché ({% cache %} en las plantillas)"""
+    return {
+        'catalog_version': catalog_version(),
+        'fragment_seconds': settings.STOREFRONT_CACHE['FRAGMENT_SECONDS'],
+    }
+
+
+@cache_anonymous_page
+@rate_limited(_catalog_scope)
+def product_list(request):
+    categories = Category.objects.all()
+    category_slug, query, min_price, max_price = _catalog_filters(request)
+    products = _catalog_queryset(category_slug, query, min_price, max_price)
+
     context = {
         'products': products,
         'categories': categories,
+        # Se calcula solo si el fragmento de la barra lateral no está en caché
+        'facets': SimpleLazyObject(
+            lambda: _catalog_sidebar(categories, category_slug, query, min_price, max_price)
+        ),
         'selected_category': category_slug,
         'search_query': query,
+        'min_price': min_price,
+        'max_price': max_price,
+        **_catalog_context(),
     }
     return render(request, 'MainApp/product_list.html', context)
 
 # --- VISTA 2: DETALLE DEL PRODUCTO ---
+@cache_anonymous_page
+@rate_limited('catalog')
 def product_detail(request, slug):
     product = get_object_or_404(Product, slug=slug)
-    context = {'product': product}
+    context = {
+        'product': product,
+        # Perezoso: solo se consulta si el fragmento de la página no está en caché
+        'recommendations': recommendations.recommended_products(product),
+        **_catalog_context(),
+    }
     return render(request, 'MainApp/product_detail.html', context)
 
 # --- VISTA 3: FORMULARIO DE SOLICITUD ---
+@rate_limited('order_request', methods=('POST',))
 def order_request(request, product_slug=None):
     initial_product = None
     if product_slug:
@@ -71,159 +160,177 @@ def order_request(request, product_slug=None):
     })
 
 # --- VISTA 4: SEGUIMIENTO DEL PEDIDO ---
+def _live_updates_context():
+    """Cómo se enteran las páginas de los cambios: SSE (perfil ASGI) o sondeo (WSGI)"""
+    return {
+        'live_events': settings.ASYNC_VIEWS,
+        'poll_seconds': settings.ORDER_EVENTS_FALLBACK_POLL_SECONDS,
+    }
+
 def order_track(request, token):
-    order = get_object_or_404(Order, token=token)
-    context = {'order': order}
+    # Los pedidos cerrados antiguos pueden estar en el archivo (ver archive.py)
+    try:
+        order = archive.find_order(token=token)
+    except ValidationError:
+        order = None
+    if order is None:
+        raise Http404("Pedido no encontrado")
+    context = {'order': order, **_live_updates_context()}
     return render(request, 'MainApp/order_tracking.html', context)
 
+def order_status(request, token):
+    """Estado actual de un pedido en JSON (sondeo de la página de seguimiento bajo WSGI)"""
+    try:
+        order = archive.find_order(token=token)
+    except ValidationError:
+        order = None
+    if order is None:
+        raise Http404("Pedido no encontrado")
+    response = JsonResponse(event_payload(order))
+    response['Cache-Control'] = 'no-cache'
+    return response
+
 def order_detail(request, order_id):
     order = get_object_or_404(Order, id=order_id)
     return render(request, "order_detail.html", {"order": order})
 
-# --- VISTA 5: DASHBOARD ADMINISTRATIVO (CORREGIDO timezone) ---
+# --- VISTAS ASÍNCRONAS (PERFIL ASGI) ---
+# Versiones async de catálogo, detalle y seguimiento usando el ORM asíncrono.
+# Todas las relaciones que usan las plantillas se cargan antes de renderizar
+# (select_related / prefetch_related), porque desde una vista async no se
+# puede consultar la base de datos de forma perezosa.
+
+@cache_anonymous_page
+@rate_limited(_catalog_scope)
+async def product_list_async(request):
+    category_slug, query, min_price, max_price = _catalog_filters(request)
+    categories = [c async for c in Category.objects.all()]
+
+    context = {
+        'products': [p async for p in _catalog_queryset(category_slug, query, min_price, max_price)],
+        'categories': categories,
+        'facets': await sync_to_async(_catalog_sidebar)(
+            categories, category_slug, query, min_price, max_price
+        ),
+        'selected_category': category_slug,
+        'search_query': query,
+        'min_price': min_price,
+        'max_price': max_price,
+        **await sync_to_async(_catalog_context)(),
+    }
+    return render(request, 'MainApp/product_list.html', context)
+
+
+@cache_anonymous_page
+@rate_limited('catalog')
+async def product_detail_async(request, slug):
+    try:
+        product = await Product.objects.select_related('category').prefetch_related('images').aget(slug=slug)
+    except Product.DoesNotExist:
+        raise Http404("Producto no encontrado")
+    context = {
+        'product': product,
+        'recommendations': [r async for r in recommendations.recommended_products(product)],
+        **await sync_to_async(_catalog_context)(),
+    }
+    return render(request, 'MainApp/product_detail.html', context)
+
+
+async def order_track_async(request, token):
+    try:
+        order = await archive.afind_order(token=token)
+    except ValidationError:
+        order = None
+    if order is None:
+        raise Http404("Pedido no encontrado")
+    return render(request, 'MainApp/order_tracking.html', {'order': order, **_live_updates_context()})
+
+# --- VISTA 5: DASHBOARD ADMINISTRATIVO ---
 @login_required
+@query_budget('reports')
 def dashboard_reports(request):
-    """Vista protegida para reportes del sistema - CORREGIDO timezone"""
+    """Vista protegida para reportes del sistema (consultas en MainApp/analytics.py)"""
     # Obtener parámetros de filtro
-    date_from = request.GET.get('date_from')
-    date_to = request.GET.get('date_to')
-    status_filter = request.GET.get('status')
-    platform_filter = request.GET.get('platform')
-    
-    # Filtrar órdenes
-    orders = Order.objects.all()
-    
-    # Aplicar filtros básicos
-    if status_filter:
-        orders = orders.filter(status=status_filter)
-    if platform_filter:
-        orders = orders.filter(platform=platform_filter)
+    filters = analytics.filters_from_params(request.GET)
+    orders = analytics.select_orders(**filters)
     
     # 1. Cantidad de pedidos por estado
-    orders_by_status = orders.values('status').annotate(
-        total=Count('id')
-    ).order_by('-total')
+    orders_by_status = analytics.counts_by(orders, 'status')
     
-    # 2. Productos más solicitados
-    popular_products = Order.objects.filter(product_ref__isnull=False).values(
-        'product_ref__name'
-    ).annotate(
-        total_orders=Count('id')
-    ).order_by('-total_orders')[:10]
+    # 2. Productos más solicitados (sin filtros: desde los contadores por producto)
+    if any(filters.values()):
+        popular_products = analytics.popular_products(orders, limit=10)
+    else:
+        popular_products = analytics.ranked_products(limit=10)
     
     # 3. Pedidos por plataforma
-    orders_by_platform = orders.values('platform').annotate(
-        total=Count('id')
-    ).order_by('-total')
+    orders_by_platform = analytics.counts_by(orders, 'platform')
     
-    # 4. Estadísticas mensuales CORREGIDO - con timezone.make_aware
-    monthly_orders = []
-    
-    # Obtener los últimos 6 meses
-    now = timezone.now()
-    for i in range(5, -1, -1):  # Últimos 6 meses
-        # Calcular inicio y fin del mes
-        if now.month - i <= 0:
-            year = now.year - 1
-            month = now.month - i + 12
-        else:
-            year = now.year
-            month = now.month - i
-        
-        # CORREGIDO: Usar make_aware para añadir zona horaria
-        start_date = timezone.make_aware(datetime(year, month, 1))
-        
-        # Calcular el último día del mes
-        if month == 12:
-            end_date = timezone.make_aware(datetime(year + 1, 1, 1)) - timedelta(seconds=1)
-        else:
-            end_date = timezone.make_aware(datetime(year, month + 1, 1)) - timedelta(seconds=1)
-        
-        # Contar pedidos del mes
-        month_count = Order.objects.filter(
-            created__gte=start_date,
-            created__lte=end_date
-        ).count()
-        
-        monthly_orders.append({
-            'month': f"{year}-{month:02d}",  # Formato YYYY-MM
-            'total': month_count
-        })
+    # 4. Pedidos por mes: rango filtrado o, por defecto, los últimos 6 meses
+    today = timezone.localdate()
+    monthly_orders = analytics.time_series(
+        orders, 'month',
+        start=filters['date_from'] or analytics.last_months_start(6, today),
+        end=filters['date_to'] or today,
+        label_key='month',
+    )
     
     # 5. Estadísticas generales
-    total_revenue = orders.aggregate(total=Sum('total_price'))['total'] or 0
-    avg_order_value = total_revenue / orders.count() if orders.count() > 0 else 0
+    totals = analytics.totals(orders)
     
     # Preparar contexto
     context = {
-        'orders_by_status': list(orders_by_status),
-        'popular_products': list(popular_products),
-        'orders_by_platform': list(orders_by_platform),
+        'orders_by_status': orders_by_status,
+        'popular_products': popular_products,
+        'orders_by_platform': orders_by_platform,
         'monthly_orders': monthly_orders,
-        'total_orders': orders.count(),
-        'total_revenue': total_revenue,
-        'avg_order_value': round(avg_order_value, 2),
+        'total_orders': totals['orders'],
+        'total_revenue': totals['revenue'],
+        'avg_order_value': round(totals['avg_order_value'], 2),
         'filter_params': {
-            'date_from': date_from,
-            'date_to': date_to,
-            'status': status_filter,
-            'platform': platform_filter,
-        }
+            'date_from': request.GET.get('date_from'),
+            'date_to': request.GET.get('date_to'),
+            'status': filters['status'],
+            'platform': filters['platform'],
+        },
+        **_live_updates_context(),
     }
     
     return render(request, 'MainApp/dashboard_reports.html', context)
 
-# --- VISTA 6: API PARA GRÁFICOS (CORREGIDO timezone) ---
+# --- VISTA 6: API PARA GRÁFICOS ---
 @login_required
+@query_budget('reports')
 def get_chart_data(request):
-    """API para obtener datos de gráficos en formato JSON - CORREGIDO timezone"""
+    """API para obtener datos de gráficos en formato JSON (acepta los filtros del dashboard)"""
+    # Pedidos idénticos simultáneos (auto-refresco en varias pestañas) se calculan una vez
+    result = single_flight.coalesced(
+        single_flight.request_key('chart-data', request.GET),
+        lambda: _chart_data(request),
+    )
+    return JsonResponse(result)
+
+
+def _chart_data(request):
     chart_type = request.GET.get('type', 'status')
+    filters = analytics.filters_from_params(request.GET)
+    orders = analytics.select_orders(**filters)
     
-    if chart_type == 'status':
-        data = Order.objects.values('status').annotate(total=Count('id')).order_by('-total')
+    if chart_type in ('status', 'platform'):
+        data = analytics.counts_by(orders, chart_type)
         result = {
-            'labels': [item['status'] for item in data],
-            'data': [item['total'] for item in data]
-        }
-    
-    elif chart_type == 'platform':
-        data = Order.objects.values('platform').annotate(total=Count('id')).order_by('-total')
-        result = {
-            'labels': [item['platform'] for item in data],
+            'labels': [item[chart_type] for item in data],
             'data': [item['total'] for item in data]
         }
     
     elif chart_type == 'monthly':
-        # CORREGIDO: con timezone.make_aware
-        monthly_data = []
-        now = timezone.now()
-        
-        for i in range(5, -1, -1):  # Últimos 6 meses
-            if now.month - i <= 0:
-                year = now.year - 1
-                month = now.month - i + 12
-            else:
-                year = now.year
-                month = now.month - i
-            
-            # CORREGIDO: Usar make_aware
-            start_date = timezone.make_aware(datetime(year, month, 1))
-            
-            if month == 12:
-                end_date = timezone.make_aware(datetime(year + 1, 1, 1)) - timedelta(seconds=1)
-            else:
-                end_date = timezone.make_aware(datetime(year, month + 1, 1)) - timedelta(seconds=1)
-            
-            month_count = Order.objects.filter(
-                created__gte=start_date,
-                created__lte=end_date
-            ).count()
-            
-            monthly_data.append({
-                'month': f"{year}-{month:02d}",
-                'total': month_count
-            })
-        
+        today = timezone.localdate()
+        monthly_data = analytics.time_series(
+            orders, 'month',
+            start=filters['date_from'] or analytics.last_months_start(6, today),
+            end=filters['date_to'] or today,
+            label_key='month',
+        )
         result = {
             'labels': [item['month'] for item in monthly_data],
             'data': [item['total'] for item in monthly_data]
@@ -232,4 +339,62 @@ def get_chart_data(request):
     else:
         result = {'error': 'Tipo de gráfico no válido'}
     
-    return JsonResponse(result)
+    return result
+
+
+# --- VISTA 7: EVENTOS EN VIVO (SERVER-SENT EVENTS) ---
+# Solo con el perfil ASGI (ver urls.py): cada stream abierto es una corrutina.
+# Bajo WSGI un stream infinito retendría un hilo del worker para siempre, así
+# que ahí las páginas sondean order_status y get_chart_data.
+
+def _sse_response(stream):
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def order_events(request, token):
+    """Stream SSE con los cambios de estado de un pedido (por token)"""
+    try:
+        order = await Order.objects.aget(token=token)
+    except (Order.DoesNotExist, ValidationError):
+        raise Http404("Pedido no encontrado")
+    return _sse_response(event_stream(order_topic(order.token), initial=event_payload(order)))
+
+
+async def dashboard_events(request):
+    """Stream SSE con los cambios de todos los pedidos (sesión del personal)"""
+    is_staff = await sync_to_async(lambda: request.user.is_authenticated and request.user.is_staff)()
+    if not is_staff:
+        return HttpResponseForbidden("Solo personal autorizado")
+    return _sse_response(event_stream(ALL_ORDERS))
+
+
+# --- VISTA 8: PERFILES DE PETICIONES (PERSONAL) ---
+@staff_member_required
+def profile_list(request):
+    """Perfiles más recientes (ver MainApp/profiling.py) y token para la cabecera X-Profile"""
+    context = {
+        'profiles': profiling.recent_profiles(limit=100),
+        'enabled': settings.PROFILING['ENABLED'],
+        'sample': settings.PROFILING['SAMPLE'],
+        'query_param': settings.PROFILING['QUERY_PARAM'],
+        'token': profiling.make_token(),
+        'token_max_age': settings.PROFILING['TOKEN_MAX_AGE'],
+    }
+    return render(request, 'MainApp/profile_list.html', context)
+
+
+@staff_member_required
+def profile_report(request, profile_id):
+    """Informe de texto de un perfil, o el .prof con ?download=1"""
+    if request.GET.get('download'):
+        path = profiling.profile_path(profile_id, profiling.STATS_SUFFIX)
+        if path is None:
+            raise Http404("Perfil no encontrado")
+        return FileResponse(path.open('rb'), as_attachment=True, filename=path.name)
+    path = profiling.profile_path(profile_id, profiling.REPORT_SUFFIX)
+    if path is None:
+        raise Http404("Perfil no encontrado")
+    return HttpResponse(path.read_text(encoding='utf-8'), content_type='text/plain; charset=utf-8')
@@ -0,0 +1,89 @@
+# MainApp/warmup.py
+#
+# Calentamiento de un worker antes de que reciba tráfico (ver gunicorn.conf.py).
+#
+# Django resuelve muchas cosas recién en la primera petición: compila las
+# URLs, carga y compila las plantillas, construye el índice de autocompletado
+# y llena la caché del catálogo. prepare_code() hace la parte que no toca la
+# base de datos (se puede ejecutar en el proceso maestro antes del fork, así
+# los workers la heredan) y prime_caches() recorre las páginas más visitadas
+# (catálogo, categorías y productos destacados) con una petición interna que
+# pasa por todos los middlewares y deja las respuestas en la caché de páginas.
+
+import logging
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+from django.template.loader import get_template
+from django.test import RequestFactory
+from django.urls import get_resolver, reverse
+
+logger = logging.getLogger(__name__)
+
+
+def _timed(timings, name, function):
+    start = time.perf_counter()
+    result = function()
+    timings[name] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def template_names():
+    """Plantillas de MainApp (las que usan las vistas)"""
+    root = Path(apps.get_app_config('MainApp').path) / 'templates'
+    return sorted(path.relative_to(root).as_posix() for path in root.rglob('*.html'))
+
+
+def prepare_code(timings=None):
+    """URLs y plantillas compiladas, módulos de la API importados (sin consultas)"""
+    timings = {} if timings is None else timings
+    # reverse_dict compila todos los patrones de URL
+    _timed(timings, 'urls', lambda: get_resolver().reverse_dict)
+    _timed(timings, 'plantillas', lambda: [get_template(name) for name in template_names()])
+    return timings
+
+
+def warmup_paths():
+    from .models import Category, Product
+
+    paths = list(settings.WARMUP['PATHS'])
+    list_url = reverse('product_list')
+    paths += [f'{list_url}?category={slug}' for slug in Category.objects.values_list('slug', flat=True)]
+    featured = Product.objects.filter(featured=True).order_by('-created').values_list('slug', flat=True)
+    paths += [reverse('product_detail', args=[slug]) for slug in featured[:settings.WARMUP['FEATURED_PRODUCTS']]]
+    return paths
+
+
+def prime_caches(timings=None):
+    """Índices en memoria y páginas del catálogo en la caché"""
+    from . import autocomplete, lead_times
+    from .page_cache import catalog_version
+
+    timings = {} if timings is None else timings
+    _timed(timings, 'caché', lambda: (catalog_version(), autocomplete.get_index(), lead_times.lead_time_stats()))
+
+    handler = WSGIHandler()
+    factory = RequestFactory()
+
+    def render_pages():
+        for path in warmup_paths():
+            response = handler.get_response(factory.get(path))
+            if response.status_code != 200:
+                logger.warning("Warm-up: %s respondió %s", path, response.status_code)
+            response.close()
+
+    _timed(timings, 'páginas', render_pages)
+    # Las conexiones de este hilo no se vuelven a usar
+    connections.close_all()
+    return timings
+
+
+def warm_up():
+    """Calentar el proceso completo; devuelve los milisegundos de cada paso"""
+    timings = prepare_code()
+    prime_caches(timings)
+    return timings
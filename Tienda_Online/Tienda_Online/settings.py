@@ -39,10 +39,13 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # ← debe ir aquí
+    'MainApp.middleware.LoadSheddingMiddleware',  # rechaza antes de sesión y BD si hay sobrecarga
+    'MainApp.middleware.CompressionMiddleware',   # después de WhiteNoise (estáticos ya comprimidos)
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'MainApp.middleware.ProfilingMiddleware',     # solo con PROFILING=1 (?profile=1 del personal, X-Profile, muestreo)
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -66,6 +69,185 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'Tienda_Online.wsgi.application'
+ASGI_APPLICATION = 'Tienda_Online.asgi.application'
+
+# API: JSON con orjson si está instalado (ver MainApp/renderers.py)
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'MainApp.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'MainApp.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Límites de tasa de los endpoints públicos (ver MainApp/throttling.py)
+RATE_LIMITS = {
+    'ENABLED': os.environ.get('RATE_LIMITS', '1') == '1',
+    'PER_IP': {'RATE': 2.0, 'BURST': 60},        # fichas por segundo y máximo acumulable
+    'GLOBAL': {'RATE': 200.0, 'BURST': 400},     # todas las IPs juntas
+    'COSTS': {                                    # fichas por petición según el alcance
+        'catalog': 1,
+        'search': 5,
+        'order_request': 20,
+    },
+    'PROXY_HOPS': int(os.environ.get('RATE_LIMIT_PROXY_HOPS', 0)),  # proxies delante (X-Forwarded-For)
+}
+
+# Rechazo temprano por concurrencia (ver LoadSheddingMiddleware en MainApp/middleware.py)
+LOAD_SHEDDING = {
+    'MAX_IN_FLIGHT': int(os.environ.get('MAX_IN_FLIGHT', 64)),  # por worker; 0 = desactivado
+    'RETRY_AFTER': 1,                                            # segundos
+    'EXEMPT_PATHS': ('/admin/',),
+}
+
+# Compresión de respuestas de la API y páginas (ver MainApp/middleware.py)
+RESPONSE_COMPRESSION = {
+    'MIN_BYTES': 1024,                    # por debajo no compensa
+    'BROTLI_QUALITY': 5,                  # 0-11: 4-6 es el rango razonable para contenido dinámico
+}
+
+# Vistas asíncronas para catálogo y seguimiento (perfil ASGI, ver asgi.py)
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS', '0') == '1'
+
+# Eventos en vivo de pedidos (SSE, ver MainApp/events.py)
+ORDER_EVENTS_POLL_INTERVAL = 1.0          # segundos entre consultas del broker
+ORDER_EVENTS_HEARTBEAT = 15               # segundos entre pings del stream
+ORDER_EVENTS_RETENTION_MINUTES = 60       # antigüedad máxima de OrderEvent
+ORDER_EVENTS_FALLBACK_POLL_SECONDS = 30   # perfil WSGI (sin SSE): sondeo de seguimiento y dashboard
+
+# Motor analítico columnar en memoria (opcional, requiere numpy; ver MainApp/columnar.py)
+ORDER_COLUMNAR_ENGINE = {
+    'ENABLED': os.environ.get('ORDER_COLUMNAR_ENGINE', '0') == '1',
+    'MAX_BYTES': int(os.environ.get('ORDER_COLUMNAR_MAX_BYTES', 256 * 1024 * 1024)),
+    'REFRESH_INTERVAL': 5,                # segundos mínimos entre refrescos
+}
+
+# Tiempos por estado de los pedidos (ver MainApp/lead_times.py)
+ORDER_LEAD_TIMES = {
+    'WINDOW_DAYS': 180,                   # historial considerado para los percentiles
+    'CACHE_SECONDS': 600,                 # vigencia del resumen en la caché
+}
+
+# Archivo de pedidos cerrados (ver MainApp/archive.py y `manage.py archive_orders`)
+ORDER_ARCHIVE = {
+    'AFTER_MONTHS': 12,                   # sin modificaciones durante este tiempo
+    'STATUSES': ('entregada', 'finalizada', 'cancelada'),
+    'BATCH_SIZE': 1000,                   # pedidos por transacción
+    'CACHE_SECONDS': 3600,                # agregados de reportes sobre el archivo
+}
+
+# Presupuestos de consulta por endpoint (ver MainApp/query_budget.py)
+QUERY_BUDGETS = {
+    'TIMEOUT_MS': {                       # máximo por sentencia SQL; 0 = sin límite
+        'default': 5000,
+        'orders': 5000,                   # listados y detalle de pedidos
+        'statistics': 15000,              # APIs de estadísticas
+        'reports': 15000,                 # dashboard y gráficos
+    },
+    'PAGE_SIZE': 100,                     # pedidos por página de los listados
+    'MAX_ROWS': 1000,                     # máximo por página (?page_size=) y hasta dónde se recorren los archivados
+    'RETRY_AFTER': 5,                     # segundos (respuesta 503)
+}
+
+# Perfilado bajo demanda de peticiones (ver MainApp/profiling.py, /dashboard/perfiles/)
+PROFILING = {
+    'ENABLED': os.environ.get('PROFILING', '0') == '1',  # apagado: el middleware no se instala
+    'DIR': os.environ.get('PROFILING_DIR', os.path.join(BASE_DIR, 'profiles')),
+    'SAMPLE': {                           # nombre de URL -> perfilar 1 de cada N peticiones
+        name: int(every)                  # PROFILING_SAMPLE="product-list=100,product_detail=50"
+        for name, _, every in (
+            item.partition('=') for item in os.environ.get('PROFILING_SAMPLE', '').split(',') if item
+        )
+    },
+    'QUERY_PARAM': 'profile',             # ?profile=1 (solo personal con sesión)
+    'TOKEN_MAX_AGE': 3600,                # vigencia del token de la cabecera X-Profile
+    'KEEP': 200,                          # perfiles guardados (se borran los más antiguos)
+    'TOP_FUNCTIONS': 40,                  # funciones listadas en el informe
+    'TOP_QUERIES': 10,                    # sentencias SQL más lentas listadas
+}
+
+# Calentamiento de cada worker de gunicorn al arrancar (ver MainApp/warmup.py)
+WARMUP = {
+    'PATHS': ('/',),                      # además: cada categoría del catálogo
+    'FEATURED_PRODUCTS': 12,              # detalles de productos destacados a renderizar
+}
+
+# Estadísticas idénticas simultáneas calculadas una sola vez (ver MainApp/single_flight.py)
+SINGLE_FLIGHT = {
+    'RESULT_SECONDS': 5,                  # reutilización del resultado
+    'LEASE_SECONDS': 60,                  # vigencia del lease entre workers
+    'WAIT_SECONDS': 30,                   # espera máxima antes de calcular por cuenta propia
+    'POLL_INTERVAL': 0.05,                # segundos entre consultas a la caché mientras se espera
+}
+
+# Caché: Redis si se define REDIS_URL (compartida entre workers), si no en memoria
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'tienda-online',
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+
+# Caché del catálogo para visitantes anónimos (ver MainApp/page_cache.py)
+STOREFRONT_CACHE = {
+    'PAGE_SECONDS': 300,                  # páginas completas (catálogo y detalle)
+    'FRAGMENT_SECONDS': 3600,             # barra de categorías y tarjetas de producto
+}
+
+# Facetas del catálogo y de la búsqueda (ver MainApp/facets.py)
+CATALOG_FACETS = {
+    'PRICE_BUCKETS': (2000, 4000, 6000),  # límites de los tramos de precio
+    'CACHE_SECONDS': 3600,                # se invalidan con la versión del catálogo
+}
+
+# "Frecuentemente pedidos juntos" (manage.py build_recommendations, requiere numpy)
+RECOMMENDATIONS = {
+    'TOP_K': 6,                           # recomendaciones guardadas por producto
+    'MIN_CUSTOMERS': 2,                   # clientes en común para recomendar un par
+    'EXCLUDE_STATUSES': ('cancelada',),   # pedidos que no cuentan
+    'CHUNK_CUSTOMERS': 4096,              # filas de la matriz cliente x producto por bloque
+}
+
+# Correo saliente (EMAIL_BACKEND=django.core.mail.backends.locmem.EmailBackend o
+# .filebased.EmailBackend con EMAIL_FILE_PATH para probar sin servidor SMTP)
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', '0') == '1'
+EMAIL_TIMEOUT = 10
+EMAIL_FILE_PATH = os.environ.get('EMAIL_FILE_PATH', os.path.join(BASE_DIR, 'sent_emails'))
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'pedidos@localhost')
+
+# Notificaciones de pedidos por bandeja de salida (ver MainApp/outbox.py, manage.py drain_outbox)
+OUTBOX = {
+    'BATCH_SIZE': 100,                    # mensajes por lote (una conexión SMTP por lote)
+    'MAX_ATTEMPTS': 8,                    # intentos antes de marcar el mensaje como fallido
+    'BACKOFF_SECONDS': 30,                # espera tras el primer fallo (se duplica en cada intento)
+    'BACKOFF_MAX_SECONDS': 3600,
+    'LEASE_SECONDS': 300,                 # reserva de un lote; al vencer otro worker lo retoma
+    'POLL_INTERVAL': 5,                   # segundos entre lotes vacíos (drain_outbox --loop)
+    'RETENTION_DAYS': 30,                 # antigüedad de los mensajes enviados que se borran
+    'SITE_URL': os.environ.get('SITE_URL', 'http://localhost:8000'),  # para el enlace de seguimiento
+    'SITE_NAME': 'Tienda Online',
+    'WEBHOOK_URL': os.environ.get('ORDER_WEBHOOK_URL', ''),           # vacío: sin webhook
+    'WEBHOOK_STATUSES': ('solicitado', 'cancelada', 'entregada'),     # estados que se avisan
+    'WEBHOOK_TIMEOUT': 5,
+}
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -110,11 +292,29 @@ STATICFILES_DIRS = [
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedStaticFilesStorage'
+# 💡 CONFIGURACIÓN MEDIA (Archivos subidos por usuarios) y ESTÁTICOS
+# Estáticos con hash en el nombre + gzip/brotli: WhiteNoise los sirve con caché inmutable
+STORAGES = {
+    'default': {
+        'BACKEND': 'cloudinary_storage.storage.MediaCloudinaryStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'MainApp.storage.ForgivingManifestStaticFilesStorage',
+    },
+}
+
+# MEDIA_STORAGE=local: imágenes en MEDIA_ROOT, una sola copia por contenido
+# (MainApp/storage.py: ContentAddressedStorage) en lugar de Cloudinary
+MEDIA_STORAGE = os.environ.get('MEDIA_STORAGE', 'cloudinary')
 
+if MEDIA_STORAGE == 'local':
+    STORAGES['default'] = {'BACKEND': 'MainApp.storage.ContentAddressedStorage'}
 
-# 💡 CONFIGURACIÓN MEDIA (Archivos subidos por usuarios)
-DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+# Calculan el sha256 de cada archivo mientras se recibe (evita guardar duplicados)
+FILE_UPLOAD_HANDLERS = [
+    'MainApp.storage.HashingMemoryFileUploadHandler',
+    'MainApp.storage.HashingTemporaryFileUploadHandler',
+]
 
 CLOUDINARY_STORAGE = {
     'CLOUD_NAME': os.environ.get('CLOUDINARY_CLOUD_NAME'),
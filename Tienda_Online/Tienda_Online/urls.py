@@ -3,14 +3,15 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from MainApp import views
+from MainApp.urls import product_list_view, product_detail_view, order_track_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('MainApp.urls')),
-    path('', views.product_list, name='product_list'),
-    path('product/<slug:slug>/', views.product_detail, name='product_detail'),
+    path('', product_list_view, name='product_list'),
+    path('product/<slug:slug>/', product_detail_view, name='product_detail'),
     path('order/request/', views.order_request, name='order_request'),
-    path('order/tracking/<str:token>/', views.order_track, name='order_tracking')
+    path('order/tracking/<str:token>/', order_track_view, name='order_tracking')
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,79 @@
+# Perfil de despliegue WSGI (gunicorn con hilos)
+#
+#   gunicorn Tienda_Online.wsgi     # gunicorn lee ./gunicorn.conf.py por defecto
+#
+# preload_app importa Django, DRF, cloudinary y las URLs una sola vez en el
+# proceso maestro; los workers lo heredan al hacer fork (copy-on-write), así
+# un worker nuevo (deploy o reciclado por max_requests) arranca en
+# milisegundos. Antes de recibir tráfico, cada worker calienta la caché del
+# catálogo y las páginas más visitadas (MainApp/warmup.py).
+#
+# Para medir el efecto: python manage.py bench_startup
+#
+# Este perfil no sirve los streams de eventos en vivo (/seguimiento/<token>/eventos/,
+# /dashboard/eventos/): cada conexión SSE abierta ocuparía uno de los `threads`
+# del worker indefinidamente y unas pocas pestañas agotarían el pool. Con
+# DJANGO_ASYNC_VIEWS=0 esas rutas no se registran y las páginas sondean cada
+# ORDER_EVENTS_FALLBACK_POLL_SECONDS. Para actualizaciones en vivo usar el perfil
+# ASGI (gunicorn_asgi.conf.py).
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Procesos x hilos: las vistas esperan sobre todo a la base de datos y a Cloudinary
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Vistas síncronas y sin rutas SSE aunque el entorno diga otra cosa (ver arriba)
+raw_env = ['DJANGO_ASYNC_VIEWS=0']
+
+preload_app = True
+
+# Reciclar workers de a poco (evita crecimiento de memoria) y no todos a la vez
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# Heartbeat de los workers en memoria (en contenedores /tmp puede ser un disco lento)
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+# WARMUP=0 desactiva el calentamiento
+WARMUP = os.environ.get('WARMUP', '1') != '0'
+
+
+def when_ready(server):
+    """Maestro con la app cargada: compilar URLs y plantillas una vez para todos los workers"""
+    from django.db import connections
+
+    if WARMUP:
+        from MainApp.warmup import prepare_code
+
+        timings = prepare_code()
+        server.log.info("Código precargado: %s", ', '.join(f'{k} {v:.0f} ms' for k, v in timings.items()))
+    # Ninguna conexión abierta en el maestro debe quedar compartida con los workers
+    connections.close_all()
+
+
+def post_fork(server, worker):
+    """Calentar cachés y páginas del worker antes de que acepte conexiones"""
+    if not WARMUP:
+        return
+    from MainApp.warmup import warm_up
+
+    try:
+        timings = warm_up()
+    except Exception:
+        # Sin calentamiento el worker funciona igual, solo más lento al principio
+        worker.log.exception("Falló el calentamiento del worker %s", worker.pid)
+        return
+    worker.log.info(
+        "Worker %s calentado en %.0f ms (%s)", worker.pid, sum(timings.values()),
+        ', '.join(f'{k} {v:.0f} ms' for k, v in timings.items()),
+    )
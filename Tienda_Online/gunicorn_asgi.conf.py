@@ -0,0 +1,22 @@
+# Perfil de despliegue ASGI (gunicorn + workers de uvicorn)
+#
+#   gunicorn -c gunicorn_asgi.conf.py Tienda_Online.asgi:application
+#
+# Cada worker atiende muchas conexiones lentas (clientes móviles) desde un
+# único event loop: catálogo, detalle y seguimiento usan las vistas async
+# (DJANGO_ASYNC_VIEWS=1) y el resto de vistas corre en el pool de hilos de Django.
+# Es el perfil que sirve los streams de eventos en vivo (SSE): cada conexión
+# abierta es una corrutina, no un hilo.
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = 'uvicorn_worker.UvicornWorker'
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+
+raw_env = ['DJANGO_ASYNC_VIEWS=1']
+
+# Conexiones lentas: mantener keep-alive corto y dar margen a respuestas largas
+keepalive = 5
+timeout = 60
+graceful_timeout = 30